@@ -0,0 +1,139 @@
+"""
+Benchmark of a track control button press, from Media.track_control() to the Bluetooth service.
+A stand-in Bluetooth service process answers the presses over the RPC channel, so the results are
+the cost of the channel itself: the first press (which connects) and the following ones.
+
+With --baseline, the previous path is measured too: every press built a new Bluetooth service,
+connecting to the system bus and calling GetManagedObjects before the player was reached. It
+needs a running BlueZ.
+
+Run from the backend directory (with PILOT Drive installed, or PYTHONPATH=.):
+    python benchmarks/bench_bluetooth_rpc.py [--presses 1000] [--baseline]
+"""
+
+import argparse
+import multiprocessing
+import statistics
+import threading
+import time
+import uuid
+from typing import List
+
+from pilot_drive.services.bluetooth import BluetoothClient
+from pilot_drive.services.bluetooth.constants import RpcMethods
+from pilot_drive.services.bluetooth.rpc import BluetoothRpcServer
+
+
+class QuietLogger:
+    """
+    Stands in for the MasterLogger so log traffic doesn't skew the results
+    """
+
+    def warning(self, msg: str) -> None:
+        """
+        Discard a warning message
+        """
+
+
+def stand_in_service(address: str, ready) -> None:
+    """
+    Serve track control requests like the Bluetooth service, without calling BlueZ
+    """
+    server = BluetoothRpcServer(
+        handlers={RpcMethods.TRACK_CONTROL: lambda command: None},
+        logger=QuietLogger(),
+        address=address,
+    )
+    ready.set()
+    server.serve_forever()
+
+
+def report(name: str, latencies: List[float]) -> None:
+    """
+    Print the latency percentiles of the presses in milliseconds
+    """
+    latencies = sorted(latencies)
+    print(
+        f"{name:>10}: p50 {statistics.median(latencies) * 1000:.3f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.3f} ms, "
+        f"max {latencies[-1] * 1000:.3f} ms ({len(latencies)} presses)"
+    )
+
+
+def measure_rpc(presses: int) -> None:
+    """
+    Press the button through the RPC channel
+    """
+    address = f"\0pilot-drive-bench-{uuid.uuid4()}"
+    ready = multiprocessing.Event()
+    service = multiprocessing.Process(
+        target=stand_in_service, args=(address, ready), daemon=True
+    )
+    service.start()
+    ready.wait()
+
+    client = BluetoothClient(address=address)
+    start = time.perf_counter()
+    client.track_control(command="Play")
+    print(f"{'first':>10}: {(time.perf_counter() - start) * 1000:.3f} ms (connects)")
+
+    latencies = []
+    for _ in range(presses):
+        start = time.perf_counter()
+        client.track_control(command="Play")
+        latencies.append(time.perf_counter() - start)
+    report(name="rpc", latencies=latencies)
+
+    # Presses from other threads wait for each other on the shared connection
+    latencies = []
+
+    def press() -> None:
+        for _ in range(presses // 4):
+            start = time.perf_counter()
+            client.track_control(command="Pause")
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=press) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report(name="rpc x4", latencies=latencies)
+
+    service.terminate()
+    service.join()
+
+
+def measure_baseline(presses: int) -> None:
+    """
+    Press the button the previous way, a new system bus connection and GetManagedObjects each
+    """
+    # pylint: disable=import-outside-toplevel
+    from dasbus.connection import SystemMessageBus
+
+    latencies = []
+    for _ in range(presses):
+        start = time.perf_counter()
+        bus = SystemMessageBus()
+        bus.get_proxy("org.bluez", "/").GetManagedObjects()
+        latencies.append(time.perf_counter() - start)
+        bus.disconnect()
+    report(name="baseline", latencies=latencies)
+
+
+def main() -> None:
+    """
+    Benchmark entrypoint
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--presses", type=int, default=1000)
+    parser.add_argument("--baseline", action="store_true")
+    args = parser.parse_args()
+
+    measure_rpc(presses=args.presses)
+    if args.baseline:
+        measure_baseline(presses=min(args.presses, 100))
+
+
+if __name__ == "__main__":
+    main()
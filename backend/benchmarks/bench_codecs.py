@@ -0,0 +1,118 @@
+"""
+Benchmark of the WebSocket event codecs. Encodes realistic vehicle and phone events with every
+available codec, reporting the encode cost and the bytes sent on the wire per event. Also times
+MasterEventQueue.push_event with debug logging disabled, which no longer serializes the event.
+
+Run from the backend directory (with PILOT Drive installed, or PYTHONPATH=.):
+    python benchmarks/bench_codecs.py [--iterations 20000]
+"""
+
+import argparse
+import time
+from logging import INFO
+
+from pilot_drive.master_queue import EventType, MasterEventQueue
+from pilot_drive.master_queue.codecs import available_codecs
+
+VEHICLE_EVENT = {
+    "type": "vehicle",
+    "vehicle": {
+        "enabled": True,
+        "connected": True,
+        "failures": False,
+        "stats": [
+            {"name": name, "value": {"quantity": 42.5, "unit": unit, "magnitude": 1}}
+            for name, unit in [
+                ("Speed", "kph"),
+                ("RPM", "revolutions_per_minute"),
+                ("Fuel Level", "percent"),
+                ("Coolant Temp", "degree_Celsius"),
+                ("Voltage", "volt"),
+                ("Throttle Position", "percent"),
+            ]
+        ],
+    },
+}
+
+PHONE_EVENT = {
+    "type": "phone",
+    "phone": {
+        "enabled": True,
+        "type": "android",
+        "state": "connected",
+        "notifications": [
+            {
+                "id": num,
+                "app_id": "com.example.messages",
+                "app_name": "Messages",
+                "title": f"Contact {num}",
+                "time": 1700000000 + num,
+                "body": "Running about 10 minutes late, see you soon!",
+            }
+            for num in range(20)
+        ],
+    },
+}
+
+
+class QuietLogger:
+    """
+    Stands in for the MasterLogger with debug logging disabled
+    """
+
+    def is_enabled_for(self, level: int) -> bool:
+        """
+        Only INFO and above are logged
+        """
+        return level >= INFO
+
+    def debug(self, msg: str) -> None:
+        """
+        Discard a debug message
+        """
+
+
+def bench_encode(iterations: int) -> None:
+    """
+    Time encoding each event with each codec
+    """
+    for name, event in [("vehicle", VEHICLE_EVENT), ("phone", PHONE_EVENT)]:
+        for codec in available_codecs():
+            start = time.perf_counter_ns()
+            for _ in range(iterations):
+                message = codec.encode(event)
+            elapsed = time.perf_counter_ns() - start
+            print(
+                f"{name:>8} {codec.subprotocol:>20}: "
+                f"{elapsed / iterations / 1e3:,.2f} us/event, {len(message):,} bytes"
+            )
+
+
+def bench_push(iterations: int) -> None:
+    """
+    Time pushing events with debug logging disabled
+    """
+    master_queue = MasterEventQueue(logging=QuietLogger())
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        master_queue.push_event(event_type=EventType.PHONE, event=PHONE_EVENT["phone"])
+    elapsed = time.perf_counter_ns() - start
+    master_queue.drain()
+    master_queue.close()
+    print(f"{'push_event (debug off)':>29}: {elapsed / iterations / 1e3:,.2f} us/event")
+
+
+def main() -> None:
+    """
+    Benchmark entrypoint
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    bench_encode(args.iterations)
+    bench_push(args.iterations // 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Regression benchmark of the per-call cost of MasterLogger calls. Compares the previous
+inspect.stack() origin lookup against the cached sys._getframe() lookup, for a call that's
+filtered out by level and one that's queued, from a stack as deep as a service loop's.
+
+Run from the backend directory (with PILOT Drive installed, or PYTHONPATH=.):
+    python benchmarks/bench_log_origin.py [--calls 2000] [--depth 20]
+"""
+
+import argparse
+import inspect
+import logging
+import time
+from typing import Callable
+
+from pilot_drive.constants import absolute_path
+from pilot_drive.master_logging import MasterLogger
+
+
+def legacy_origin() -> str:
+    """
+    The previous origin lookup of MasterLogger.__log_handler
+    """
+    return (
+        inspect.stack()[2]
+        .filename.replace("/main.py", "/__main__")
+        .replace(absolute_path, "")
+        .replace("/", ".")
+        .replace(".py", "")
+    )
+
+
+class LegacyLogger:
+    """
+    The previous log call path, the origin was looked up before the level was checked
+    """
+
+    def __init__(self, master_logger: MasterLogger) -> None:
+        self.master_logger = master_logger
+
+    def __log_handler(self, level: int, msg: str) -> None:
+        legacy_origin()
+        if self.master_logger.is_enabled_for(level):
+            self.master_logger.warning(msg=msg)
+
+    def debug(self, msg: str) -> None:
+        """
+        Log a debug event
+        """
+        self.__log_handler(logging.DEBUG, msg=msg)
+
+    def warning(self, msg: str) -> None:
+        """
+        Log a warning event
+        """
+        self.__log_handler(logging.WARNING, msg=msg)
+
+
+def call_at_depth(depth: int, func: Callable[[], None]) -> None:
+    """
+    Call a function from a stack depth frames deeper than the current one
+    """
+    if depth == 0:
+        func()
+    else:
+        call_at_depth(depth - 1, func)
+
+
+def time_calls(log_call: Callable[[str], None], calls: int, depth: int) -> float:
+    """
+    Time log calls, returning microseconds per call
+    """
+
+    def run() -> None:
+        for num in range(calls):
+            log_call(f"Polled {num} notifications")
+
+    start = time.perf_counter_ns()
+    call_at_depth(depth, run)
+    return (time.perf_counter_ns() - start) / calls / 1e3
+
+
+def main() -> None:
+    """
+    Benchmark entrypoint
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=20)
+    args = parser.parse_args()
+
+    master_logger = MasterLogger(
+        log_settings={"logLevel": logging.INFO, "logToFile": False}
+    )
+    logging.getLogger().handlers = [logging.NullHandler()]
+    master_logger.start()
+    legacy_logger = LegacyLogger(master_logger=master_logger)
+
+    for name, logger in [("legacy", legacy_logger), ("current", master_logger)]:
+        filtered = time_calls(logger.debug, args.calls, args.depth)
+        queued = time_calls(logger.warning, args.calls, args.depth)
+        print(
+            f"{name:>8}: filtered debug {filtered:,.2f} us/call, "
+            f"queued warning {queued:,.2f} us/call"
+        )
+
+    master_logger.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark of the MasterLogger's throughput. Several producer processes log a burst of records,
+reporting records/sec from the first record logged until the last one is output. The previous
+Manager queue logger, which output a single record every 100ms, is included for comparison with
+a much smaller burst.
+
+Run from the backend directory (with PILOT Drive installed, or PYTHONPATH=.):
+    python benchmarks/bench_logging.py [--producers 4] [--records 5000] [--legacy-records 20]
+"""
+
+import argparse
+import logging
+import threading
+import time
+from multiprocessing import Manager, Process
+
+from pilot_drive.master_logging import MasterLogger
+
+
+class CountingHandler(logging.Handler):
+    """
+    Counts output records, setting an event once the expected number is reached
+    """
+
+    def __init__(self, expected: int) -> None:
+        super().__init__()
+        self.count = 0
+        self.expected = expected
+        self.done = threading.Event()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Count a record
+        """
+        self.count += 1
+        if self.count == self.expected:
+            self.done.set()
+
+
+class LegacyLogger:
+    """
+    The previous MasterLogger queue logic, a Manager queue polled every 100ms
+    """
+
+    def __init__(self) -> None:
+        manager = Manager()
+        self.queue = manager.Queue()
+        self.new_log = manager.Value("i", 0)
+
+    def info(self, msg: str) -> None:
+        """
+        Add a record to the queue
+        """
+        self.queue.put(item={"level": logging.INFO, "message": msg})
+        self.new_log.value = 1
+
+    def main(self) -> None:
+        """
+        The previous main loop
+        """
+        logger = logging.getLogger("legacy")
+        while True:
+            if not self.new_log.value == 0:
+                log_dict = self.queue.get()
+                logger.log(level=log_dict["level"], msg=log_dict["message"])
+                if self.queue.empty():
+                    self.new_log.value = 0
+            time.sleep(0.1)
+
+
+def produce(master_logger, count: int) -> None:
+    """
+    Log a burst of records
+    """
+    for num in range(count):
+        master_logger.info(msg=f"Vehicle stats updated: {num}")
+
+
+def run(master_logger, producers: int, records: int) -> float:
+    """
+    Run the producers, returning the records/sec until every record was output
+    """
+    handler = CountingHandler(expected=producers * records)
+    logging.getLogger().addHandler(handler)
+
+    start = time.perf_counter()
+    procs = [
+        Process(target=produce, args=(master_logger, records)) for _ in range(producers)
+    ]
+    for proc in procs:
+        proc.start()
+    handler.done.wait()
+    elapsed = time.perf_counter() - start
+
+    for proc in procs:
+        proc.join()
+    logging.getLogger().removeHandler(handler)
+    return handler.count / elapsed
+
+
+def main() -> None:
+    """
+    Benchmark entrypoint
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--legacy-records", type=int, default=20)
+    args = parser.parse_args()
+
+    master_logger = MasterLogger(
+        log_settings={"logLevel": logging.INFO, "logToFile": False}
+    )
+    # Only count the records, writing them to the terminal would measure the terminal
+    logging.getLogger().handlers = []
+    master_logger.start()
+    rate = run(master_logger, args.producers, args.records)
+    master_logger.stop()
+    print(f"{'listener':>8}: {rate:,.0f} records/sec")
+
+    legacy_logger = LegacyLogger()
+    threading.Thread(target=legacy_logger.main, daemon=True).start()
+    rate = run(legacy_logger, args.producers, args.legacy_records)
+    print(f"{'legacy':>8}: {rate:,.1f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of the master queue backends. Several producer processes push vehicle sized events
+while the main process consumes them, reporting events/sec and push-to-get latency percentiles.
+
+Run from the backend directory (with PILOT Drive installed, or PYTHONPATH=.):
+    python benchmarks/bench_master_queue.py [--producers 8] [--events 2000]
+"""
+
+import argparse
+import statistics
+import time
+from multiprocessing import Event, Process
+
+from pilot_drive.master_queue.exceptions import QueueFullException
+from pilot_drive.master_queue.queue_backends import (
+    AbstractQueueBackend,
+    ManagerQueueBackend,
+)
+from pilot_drive.master_queue.shared_memory_ring import SharedMemoryRingBackend
+
+VEHICLE_STATS = [
+    {"name": name, "value": {"quantity": 42.0, "unit": unit, "magnitude": 1}}
+    for name, unit in [
+        ("Speed", "kph"),
+        ("RPM", "revolutions_per_minute"),
+        ("Fuel Level", "percent"),
+        ("Voltage", "volt"),
+    ]
+]
+
+
+def produce(backend: AbstractQueueBackend, start, count: int) -> None:
+    """
+    Push count events, each stamped with the time it was pushed
+    """
+    start.wait()
+    for _ in range(count):
+        event = {
+            "type": "vehicle",
+            "vehicle": {"connected": True, "failures": False, "stats": VEHICLE_STATS},
+            "sent": time.perf_counter_ns(),
+        }
+        while True:
+            try:
+                backend.put(event)
+                break
+            except QueueFullException:
+                time.sleep(0)
+
+
+def run(backend: AbstractQueueBackend, producers: int, events: int) -> dict:
+    """
+    Run the benchmark against a single backend
+    """
+    start = Event()
+    procs = [
+        Process(target=produce, args=(backend, start, events)) for _ in range(producers)
+    ]
+    for proc in procs:
+        proc.start()
+
+    latencies = []
+    total = producers * events
+    start.set()
+    began = time.perf_counter()
+    while len(latencies) < total:
+        event = backend.get()
+        if event is not None:
+            latencies.append(time.perf_counter_ns() - event["sent"])
+    elapsed = time.perf_counter() - began
+
+    for proc in procs:
+        proc.join()
+
+    latencies.sort()
+    return {
+        "events/sec": total / elapsed,
+        "p50 (us)": statistics.median(latencies) / 1000,
+        "p99 (us)": latencies[int(len(latencies) * 0.99) - 1] / 1000,
+    }
+
+
+def main() -> None:
+    """
+    Benchmark entrypoint
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    backends = {
+        "manager": ManagerQueueBackend,
+        "shared-memory": SharedMemoryRingBackend,
+    }
+    for name, backend_class in backends.items():
+        backend = backend_class()
+        results = run(backend, producers=args.producers, events=args.events)
+        backend.close()
+        print(
+            f"{name:>14}: "
+            + ", ".join(f"{key} {value:,.1f}" for key, value in results.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark of the service runtimes. Starts idle stand-in services with the "process" and "task"
+runtimes, reporting the time until every service is running along with the total RSS and PSS
+(proportional set size, which splits shared pages between processes) of PILOT Drive's processes.
+
+Each runtime is measured in a fresh interpreter, so the results don't affect each other.
+
+Run from the backend directory (with PILOT Drive installed, or PYTHONPATH=.):
+    python benchmarks/bench_runtime.py [--services 7]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from pilot_drive.master_queue import MasterEventQueue
+from pilot_drive.runtime import ProcessServiceRunner, RuntimeModes, TaskServiceRunner
+from pilot_drive.runtime.threads import run_in_daemon_thread
+
+
+class QuietLogger:
+    """
+    Stands in for the MasterLogger so log traffic doesn't skew the results
+    """
+
+    def is_enabled_for(self, level: int) -> bool:
+        """
+        Nothing is logged
+        """
+        return False
+
+    def debug(self, msg: str) -> None:
+        """
+        Discard a debug message
+        """
+
+    def error(self, msg: str) -> None:
+        """
+        Discard an error message
+        """
+
+
+class IdleService:
+    """
+    A stand-in service that holds some state, and idles in main() like most services do
+    """
+
+    def __init__(self, number: int, started) -> None:
+        self.service_type = f"service-{number}"
+        self.started = started
+        self.state = None
+
+    def main(self) -> None:
+        """
+        Build the service's state, then idle
+        """
+        self.state = [{"name": f"stat-{num}", "value": num} for num in range(10000)]
+        self.started.release()
+        threading.Event().wait()
+
+    async def run(self) -> None:
+        """
+        Run main() in a thread, like AbstractService.run()
+        """
+        await run_in_daemon_thread(func=self.main, name=self.service_type)
+
+
+def memory_kb(pid: int) -> dict:
+    """
+    Read the RSS and PSS of a process
+    """
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r", encoding="utf-8") as smaps:
+        for line in smaps:
+            name, *value = line.split()
+            if name in {"Rss:", "Pss:"}:
+                memory[name[:-1]] = int(value[0])
+    return memory
+
+
+async def measure(mode: RuntimeModes, services: int) -> None:
+    """
+    Start the services with a runtime, print the startup time and memory as key=value pairs
+    """
+    master_queue = MasterEventQueue(logging=QuietLogger())
+    started = multiprocessing.Semaphore(0)
+
+    start = time.perf_counter()
+    runner = (
+        TaskServiceRunner(logger=QuietLogger())
+        if mode == RuntimeModes.TASK
+        else ProcessServiceRunner(logger=QuietLogger())
+    )
+    for number in range(services):
+        runner.start(service=IdleService(number=number, started=started))
+    run_task = asyncio.create_task(runner.run())
+    for _ in range(services):
+        while not started.acquire(block=False):
+            await asyncio.sleep(0.001)
+    startup = time.perf_counter() - start
+
+    # Include the queue's manager process, it's there in both runtimes
+    pids = [os.getpid()] + [child.pid for child in multiprocessing.active_children()]
+    totals = {"Rss": 0, "Pss": 0}
+    for pid in pids:
+        for name, value in memory_kb(pid).items():
+            totals[name] += value
+
+    print(
+        f"startup={startup * 1000:.1f} processes={len(pids)} "
+        f"rss={totals['Rss'] / 1024:.1f} pss={totals['Pss'] / 1024:.1f}"
+    )
+    runner.terminate()
+    run_task.cancel()
+    master_queue.close()
+
+
+def main() -> None:
+    """
+    Benchmark entrypoint
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--services", type=int, default=7)
+    parser.add_argument("--mode", choices=list(RuntimeModes), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(measure(RuntimeModes(args.mode), args.services))
+        return
+
+    for mode in RuntimeModes:
+        result = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--mode",
+                mode,
+                "--services",
+                str(args.services),
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        values = dict(pair.split("=") for pair in result.stdout.split())
+        print(
+            f"{mode:>8}: startup {values['startup']} ms, {values['processes']} processes, "
+            f"RSS {values['rss']} MB, PSS {values['pss']} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
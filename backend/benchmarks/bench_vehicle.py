@@ -0,0 +1,241 @@
+"""
+End to end benchmark of the Vehicle service against the ELM327 emulator. The service queries the
+emulator in each acquisition mode, while a WebSocket client receives its events through the
+master queue and the broadcaster. Reports the achieved sample rate of every stat, the master
+queue push rate and the latency from the emulator answering a request to the client receiving
+the value. The emulator's latency, jitter and error rate simulate a slow or flaky adapter.
+
+Run from the backend directory (with PILOT Drive installed, or PYTHONPATH=.):
+    python benchmarks/bench_vehicle.py [--duration 10] [--latency 0.02] [--jitter 0.01] \\
+        [--error-rate 0]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+import obd
+import websockets
+
+from pilot_drive.constants import DEFAULT_VEHICLE_STATS
+from pilot_drive.emulator import Elm327Emulator
+from pilot_drive.emulator.constants import SIMULATED_PIDS
+from pilot_drive.master_queue import EventType, MasterEventQueue
+from pilot_drive.master_queue.broadcaster import EventBroadcaster
+from pilot_drive.master_queue.constants import SlowConsumerPolicies
+from pilot_drive.services.vehicle import Vehicle
+from pilot_drive.services.vehicle.constants import AcquisitionModes
+
+
+class QuietLogger:
+    """
+    Stands in for the MasterLogger so log traffic doesn't skew the results
+    """
+
+    def is_enabled_for(self, level: int) -> bool:
+        """
+        Nothing is logged
+        """
+        return False
+
+    def debug(self, msg: str) -> None:
+        """
+        Discard a debug message
+        """
+
+    def info(self, msg: str) -> None:
+        """
+        Discard an info message
+        """
+
+    def warning(self, msg: str) -> None:
+        """
+        Discard a warning message
+        """
+
+    def error(self, msg: str) -> None:
+        """
+        Discard an error message
+        """
+
+
+class FakeSettings:
+    """
+    Stands in for the Settings service, with the vehicle settings of the run
+    """
+
+    def __init__(self, port: str, acquisition: AcquisitionModes) -> None:
+        self.vehicle = {
+            "enabled": True,
+            "port": port,
+            "acquisition": acquisition,
+            "stats": DEFAULT_VEHICLE_STATS,
+            # Keep the benchmark from writing to the default telemetry path
+            "telemetry": {"enabled": False},
+        }
+
+    def get_setting(self, attribute: str) -> dict:
+        """
+        Get the vehicle settings
+        """
+        assert attribute == "vehicle"
+        return self.vehicle
+
+
+class SampledPid:
+    """
+    Wraps a simulated PID, counting its samples. The speed is replaced by a counter, so the time
+        each value was answered at is known when the client receives it.
+    """
+
+    def __init__(self, value: Callable[[float], bytes], probe: bool = False) -> None:
+        self.value = value
+        self.probe = probe
+        self.samples = 0
+        self.answered: Dict[int, float] = {}
+
+    def __call__(self, elapsed: float) -> bytes:
+        self.samples += 1
+        if not self.probe:
+            return self.value(elapsed)
+        counter = self.samples % 256
+        self.answered[counter] = time.perf_counter()
+        return bytes([counter])
+
+
+async def run(args: argparse.Namespace, acquisition: AcquisitionModes) -> dict:
+    """
+    Run the Vehicle service for the duration, with a single WebSocket client
+    """
+    # python-OBD logs the emulator closing at the end of the run
+    logging.getLogger("obd").setLevel(logging.CRITICAL + 1)
+    speed = obd.commands.SPEED.pid
+    pids = {
+        pid: SampledPid(value=value, probe=pid == speed)
+        for pid, value in SIMULATED_PIDS.items()
+    }
+    emulator = Elm327Emulator(
+        pids=pids,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=0,
+    )
+
+    master_queue = MasterEventQueue(logging=QuietLogger())
+    pushes = 0
+    push_event = master_queue.push_event
+
+    def counting_push_event(**kwargs) -> None:
+        nonlocal pushes
+        pushes += 1
+        push_event(**kwargs)
+
+    master_queue.push_event = counting_push_event
+    broadcaster = EventBroadcaster(
+        master_queue=master_queue,
+        logging=QuietLogger(),
+        outbox_size=256,
+        policy=SlowConsumerPolicies.DROP_OLDEST,
+    )
+
+    async def handler(websocket) -> None:
+        # Like PilotDrive.handler, the connection is over once the client closes it
+        sender = asyncio.create_task(broadcaster.register(websocket=websocket).run())
+        await websocket.wait_closed()
+        sender.cancel()
+        broadcaster.unregister(websocket=websocket)
+
+    vehicle = Vehicle(
+        master_event_queue=master_queue,
+        service_type=EventType.VEHICLE,
+        logger=QuietLogger(),
+        settings=FakeSettings(port=emulator.port, acquisition=acquisition),
+    )
+    threading.Thread(target=vehicle.main, daemon=True).start()
+
+    latencies: List[float] = []
+    events = 0
+    async with websockets.serve(handler, "localhost", 0) as server:
+        drain = asyncio.create_task(broadcaster.run())
+        port = server.sockets[0].getsockname()[1]
+        async with websockets.connect(f"ws://localhost:{port}") as client:
+            # Wait for the connection to the emulator, then only measure the steady state
+            while not pids[speed].samples:
+                await asyncio.sleep(0.01)
+            start_samples = {pid: sampled.samples for pid, sampled in pids.items()}
+            start_pushes, start = pushes, time.perf_counter()
+            last_speed = None
+            while time.perf_counter() - start < args.duration:
+                try:
+                    message = await asyncio.wait_for(client.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                received = time.perf_counter()
+                events += 1
+                stats = json.loads(message)["vehicle"]["stats"]
+                value = round(stats[0]["value"]["quantity"]) if stats else None
+                if value is not None and value != last_speed:
+                    answered = pids[speed].answered.get(value)
+                    if answered:
+                        latencies.append(received - answered)
+                    last_speed = value
+            elapsed = time.perf_counter() - start
+        drain.cancel()
+
+    emulator.close()
+    master_queue.close()
+
+    latencies.sort()
+    results = {
+        f"{stat['name']} (Hz)": (
+            pids[obd.commands[stat["command"]].pid].samples
+            - start_samples[obd.commands[stat["command"]].pid]
+        )
+        / elapsed
+        for stat in DEFAULT_VEHICLE_STATS
+    }
+    results["pushes/sec"] = (pushes - start_pushes) / elapsed
+    results["events/sec"] = events / elapsed
+    if latencies:
+        results["p50 (ms)"] = statistics.median(latencies) * 1000
+        results["p99 (ms)"] = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    return results
+
+
+def run_mode(args: argparse.Namespace, acquisition: AcquisitionModes) -> dict:
+    """
+    Run the benchmark of an acquisition mode
+    """
+    return asyncio.run(run(args=args, acquisition=acquisition))
+
+
+def main() -> None:
+    """
+    Benchmark entrypoint
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    for acquisition in AcquisitionModes:
+        # The service can't be stopped, so every mode runs in its own process
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results = executor.submit(run_mode, args, acquisition).result()
+        print(
+            f"{acquisition:>6}: "
+            + ", ".join(f"{key} {value:,.2f}" for key, value in results.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark of push-to-websocket.send latency under burst load. A producer process pushes bursts
+of events onto the master queue, while the main process forwards them to a fake WebSocket using
+both the old 50ms polling loop and the notifier driven MasterEventQueue.listen().
+
+Run from the backend directory (with PILOT Drive installed, or PYTHONPATH=.):
+    python benchmarks/bench_ws_producer.py [--bursts 20] [--burst-size 40]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from contextlib import aclosing
+from multiprocessing import Process
+
+from pilot_drive.master_queue import EventType, MasterEventQueue, QueueBackends
+
+
+class QuietLogger:
+    """
+    Stands in for the MasterLogger so log traffic doesn't skew the results
+    """
+
+    def is_enabled_for(self, level: int) -> bool:
+        """
+        Nothing is logged
+        """
+        return False
+
+    def debug(self, msg: str) -> None:
+        """
+        Discard a debug message
+        """
+
+    def warning(self, msg: str) -> None:
+        """
+        Discard a warning message
+        """
+
+
+class FakeWebSocket:
+    """
+    Records the latency of each event passed to send()
+    """
+
+    def __init__(self, expected: int) -> None:
+        self.latencies = []
+        self.expected = expected
+        self.done = asyncio.Event()
+
+    async def send(self, message: str) -> None:
+        """
+        Record the time since the event was pushed
+        """
+        sent = json.loads(message)["vehicle"]["sent"]
+        self.latencies.append(time.perf_counter_ns() - sent)
+        if len(self.latencies) == self.expected:
+            self.done.set()
+
+
+def produce(master_queue: MasterEventQueue, bursts: int, burst_size: int) -> None:
+    """
+    Push bursts of events, with a pause between each burst
+    """
+    time.sleep(0.5)
+    for _ in range(bursts):
+        for _ in range(burst_size):
+            master_queue.push_event(
+                event_type=EventType.VEHICLE, event={"sent": time.perf_counter_ns()}
+            )
+        time.sleep(0.25)
+
+
+async def polling_producer(master_queue: MasterEventQueue, websocket) -> None:
+    """
+    The previous PilotDrive.producer loop
+    """
+    while True:
+        if master_queue.is_new_event:
+            event = master_queue.get()
+            await websocket.send(json.dumps(event))
+        await asyncio.sleep(0.05)
+
+
+async def notified_producer(master_queue: MasterEventQueue, websocket) -> None:
+    """
+    The current PilotDrive.producer loop
+    """
+    async with aclosing(master_queue.listen()) as event_batches:
+        async for events in event_batches:
+            for event in events:
+                await websocket.send(json.dumps(event))
+
+
+async def run(producer, backend: QueueBackends, bursts: int, burst_size: int):
+    """
+    Run a producer loop until every pushed event has been sent
+    """
+    master_queue = MasterEventQueue(logging=QuietLogger(), backend=backend)
+    websocket = FakeWebSocket(expected=bursts * burst_size)
+
+    proc = Process(target=produce, args=(master_queue, bursts, burst_size))
+    proc.start()
+    task = asyncio.create_task(producer(master_queue, websocket))
+    await websocket.done.wait()
+    task.cancel()
+    proc.join()
+    master_queue.close()
+
+    latencies = sorted(websocket.latencies)
+    return {
+        "p50 (ms)": statistics.median(latencies) / 1e6,
+        "p99 (ms)": latencies[int(len(latencies) * 0.99) - 1] / 1e6,
+        "max (ms)": latencies[-1] / 1e6,
+    }
+
+
+def main() -> None:
+    """
+    Benchmark entrypoint
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=40)
+    parser.add_argument(
+        "--backend", choices=list(QueueBackends), default=QueueBackends.MANAGER
+    )
+    args = parser.parse_args()
+
+    for name, producer in [
+        ("polling", polling_producer),
+        ("notified", notified_producer),
+    ]:
+        results = asyncio.run(
+            run(producer, QueueBackends(args.backend), args.bursts, args.burst_size)
+        )
+        print(
+            f"{name:>9}: "
+            + ", ".join(f"{key} {value:,.2f}" for key, value in results.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
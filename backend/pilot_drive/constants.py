@@ -24,12 +24,21 @@ absolute_path = (
 STATIC_WEB_PORT = 8002
 # A relative filepath from the root project directory
 STATIC_WEB_PATH = "web/files/"
+# The URL the static web server serves the cover art cache at
+COVER_ART_URL = "/covers/"
 
 #
 # Constants for the websocket server
 #
 WS_PORT = 8000
 
+# "outboxSize" is the max number of unsent events held per client, "slowConsumerPolicy" is a
+# SlowConsumerPolicies value applied once a client's outbox is full
+DEFAULT_WEBSOCKET_SETTINGS = {
+    "outboxSize": 256,
+    "slowConsumerPolicy": "drop-oldest",
+}
+
 #
 # Constants for logging
 #
@@ -37,10 +46,50 @@ WS_PORT = 8000
 # Logging defaults
 LOG_PATH = "/etc/pilot-drive/logging/"
 LOG_FILE_NAME = "pilot_drive.log"
+# The log file is rotated once it reaches "maxFileSize" bytes or is "rotateInterval" seconds old.
+# Rotated segments are compressed with a LogCompressions value, and the oldest are removed once all
+# log files take up more than "maxTotalSize" bytes. Writes are buffered, and flushed every
+# "flushInterval" seconds or as soon as an event of "flushLevel" or above is logged. The newest
+# "recordBufferSize" events are also kept in memory, for the UI's log pane.
 DEFAULT_LOG_SETTINGS = {
     "logLevel": 20,
     "logToFile": True,
     "logPath": f"{LOG_PATH}{LOG_FILE_NAME}",
+    "maxFileSize": 1048576,
+    "rotateInterval": 86400,
+    "maxTotalSize": 20971520,
+    "compression": "gzip",
+    "flushInterval": 5,
+    "flushLevel": 40,
+    "recordBufferSize": 2000,
+}
+
+#
+# Constants for the master event queue
+#
+
+# "backend" is a QueueBackends value, "capacity" is the size in bytes of the shared memory ring and
+# "coalesce" only delivers the newest pending event of snapshot event types (ie. vehicle stats)
+DEFAULT_QUEUE_SETTINGS = {
+    "backend": "manager",
+    "capacity": 1048576,
+    "coalesce": True,
+}
+
+#
+# Constants for the service runtime
+#
+
+# "mode" is a RuntimeModes value, "process" runs every service in its own process while "task" runs
+# them all as tasks of the main event loop. Services that exit are restarted after "restartBackoff"
+# seconds, doubled after each consecutive failure up to "maxRestartBackoff". A service that fails
+# "crashLoopRestarts" times within "crashLoopWindow" seconds isn't restarted again.
+DEFAULT_RUNTIME_SETTINGS = {
+    "mode": "process",
+    "restartBackoff": 1,
+    "maxRestartBackoff": 60,
+    "crashLoopRestarts": 5,
+    "crashLoopWindow": 300,
 }
 
 
@@ -79,20 +128,93 @@ DEFAULT_WEB_SETTINGS = {
     ],
 }
 
+# A stat's "deadband" is the change of its value below which the new value isn't pushed to the UI
 DEFAULT_VEHICLE_STATS = [
     {"name": "Speed", "command": "SPEED", "interval": 0.5},
     {"name": "RPM", "command": "RPM", "interval": 0.5},
-    {"name": "Fuel Level", "command": "FUEL_LEVEL", "interval": 10},
-    {"name": "Voltage", "command": "CONTROL_MODULE_VOLTAGE", "interval": 3},
+    {"name": "Fuel Level", "command": "FUEL_LEVEL", "interval": 10, "deadband": 1},
+    {
+        "name": "Voltage",
+        "command": "CONTROL_MODULE_VOLTAGE",
+        "interval": 3,
+        "deadband": 0.1,
+    },
 ]
 
+# Every sample of the vehicle stats is recorded to segment files in "path", with a single fsync
+# every "fsyncInterval" seconds. A segment is rotated once it reaches "maxSegmentSize" bytes, and
+# the oldest are removed once all segments take up more than "maxTotalSize" bytes.
+TELEMETRY_PATH = "/etc/pilot-drive/telemetry/"
+DEFAULT_TELEMETRY_SETTINGS = {
+    "enabled": True,
+    "path": TELEMETRY_PATH,
+    "fsyncInterval": 30,
+    "maxSegmentSize": 4194304,
+    "maxTotalSize": 268435456,
+}
+
+# The protocol and baud rate negotiated with each OBD adapter, reused when reconnecting to it
+OBD_CACHE_PATH = "/etc/pilot-drive/obd.json"
+
+# Stored and pending DTCs are read every "interval" seconds in the gaps between the queries of the
+# poll acquisition, a request only starts if it delays the next stat by "budget" seconds at most.
+# Once a new code shows up, its freeze frame and the "history" seconds of stat samples before it are
+# saved to "path", and pushed to the UI as an alert.
+DTC_PATH = "/etc/pilot-drive/dtc/"
+DEFAULT_DTC_SETTINGS = {
+    "enabled": True,
+    "path": DTC_PATH,
+    "interval": 60,
+    "budget": 0.1,
+    "history": 30,
+}
+
+# Derived "metrics" are published as stats at their own "interval", "metric" is a DerivedMetrics
+# value of the vehicle service. The stats a metric is derived from are acquired even if they aren't
+# in the "stats", at the interval of the metric.
+DEFAULT_VEHICLE_METRICS = [
+    {"name": "Fuel Economy", "metric": "fuel_economy", "interval": 1, "deadband": 0.1},
+    {
+        "name": "Trip Fuel Economy",
+        "metric": "trip_fuel_economy",
+        "interval": 5,
+        "deadband": 0.1,
+    },
+    {"name": "Trip Distance", "metric": "trip_distance", "interval": 5},
+    {"name": "Idle", "metric": "idle_percent", "interval": 10, "deadband": 1},
+]
+
+# The cover art of the media is fetched from the phone over AVRCP's Basic Imaging Profile (BIP),
+# resized once to fit within the "resolution" of the display, and cached in "path". The least
+# recently used covers are removed once the cache takes up more than "maxTotalSize" bytes.
+COVER_ART_PATH = "/etc/pilot-drive/covers/"
+DEFAULT_COVER_ART_SETTINGS = {
+    "enabled": True,
+    "path": COVER_ART_PATH,
+    "resolution": [480, 480],
+    "maxTotalSize": 16777216,
+}
+
 DEFAULT_BACKEND_SETTINGS = {
     "updates": {
         "projectUrl": "https://pypi.org/pypi/pilot-drive/json",
         "indexUrl": "https://pypi.org/simple/",
     },
-    "vehicle": {"enabled": False, "port": None, "stats": DEFAULT_VEHICLE_STATS},
+    # "acquisition" is an AcquisitionModes value of the vehicle service
+    "vehicle": {
+        "enabled": False,
+        "port": None,
+        "acquisition": "poll",
+        "stats": DEFAULT_VEHICLE_STATS,
+        "metrics": DEFAULT_VEHICLE_METRICS,
+        "telemetry": {**DEFAULT_TELEMETRY_SETTINGS},
+        "dtc": {**DEFAULT_DTC_SETTINGS},
+    },
+    "media": {"coverArt": {**DEFAULT_COVER_ART_SETTINGS}},
     "phone": {"enabled": False, "type": None},
     "logging": {**DEFAULT_LOG_SETTINGS},
+    "queue": {**DEFAULT_QUEUE_SETTINGS},
+    "websocket": {**DEFAULT_WEBSOCKET_SETTINGS},
+    "runtime": {**DEFAULT_RUNTIME_SETTINGS},
     "camera": {"enabled": False, "buttonPin": 0},
 }
@@ -0,0 +1,5 @@
+"""
+A simulated ELM327 OBD adapter, used to run the Vehicle service without a vehicle
+"""
+
+from .elm327 import Elm327Emulator
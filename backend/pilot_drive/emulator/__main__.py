@@ -0,0 +1,56 @@
+"""
+Run the ELM327 emulator until interrupted, ie:
+    python -m pilot_drive.emulator --latency 0.03 --jitter 0.01 --error-rate 0.01
+
+Then set the vehicle.port setting to the printed pseudo terminal.
+"""
+
+import argparse
+import signal
+
+from .elm327 import Elm327Emulator
+
+
+def main() -> None:
+    """
+    Emulator entrypoint
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m pilot_drive.emulator", description="A simulated ELM327"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="seconds each OBD request takes"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0, help="max seconds added to the latency"
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0,
+        help="probability of an OBD request failing",
+    )
+    parser.add_argument(
+        "--dtc",
+        action="append",
+        default=[],
+        help="a stored DTC, ie. P0301. Can be repeated",
+    )
+    args = parser.parse_args()
+
+    emulator = Elm327Emulator(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate
+    )
+    emulator.dtcs = args.dtc
+    print(f"Emulating an ELM327 on: {emulator.port}")
+    try:
+        signal.pause()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.close()
+        print(f"Answered {emulator.requests} OBD requests, {emulator.errors} failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Constants of the ELM327 emulator
+"""
+
+import math
+from typing import Callable, Dict
+
+# The responses of the AT commands python-OBD sends while connecting
+ELM_VERSION = "ELM327 v1.5"
+ELM_VOLTAGE = "12.6V"
+# Automatically detected ISO 15765-4 CAN (11 bit ID, 500 kbaud)
+ELM_PROTOCOL = "A6"
+
+# The CAN ID of the engine ECU's responses
+ENGINE_HEADER = "7E8"
+
+# The response to requests for unsupported PIDs, and to requests that fail with the error rate
+NO_DATA = "NO DATA"
+
+# The max number of data bytes in a single CAN frame, longer responses are split with ISO-TP
+SINGLE_FRAME_SIZE = 7
+
+
+def _simulated_speed(elapsed: float) -> float:
+    """
+    The simulated speed in kph, cruising between 20 and 80 kph
+    """
+    return 50 + 30 * math.sin(elapsed / 20)
+
+
+# The data bytes of the DEFAULT_VEHICLE_STATS PIDs, and the inputs of the DEFAULT_VEHICLE_METRICS,
+# at a number of seconds since the emulator started. A vehicle cruising with a slowly draining tank
+SIMULATED_PIDS: Dict[int, Callable[[float], bytes]] = {
+    # SPEED, kph
+    0x0D: lambda elapsed: bytes([round(_simulated_speed(elapsed))]),
+    # RPM, a quarter rpm per bit
+    0x0C: lambda elapsed: round((800 + 30 * _simulated_speed(elapsed)) * 4).to_bytes(
+        2, "big"
+    ),
+    # MAF, a hundredth of a gram per second per bit
+    0x10: lambda elapsed: round((2 + 0.15 * _simulated_speed(elapsed)) * 100).to_bytes(
+        2, "big"
+    ),
+    # FUEL_LEVEL, 100/255 percent per bit
+    0x2F: lambda elapsed: bytes([max(round((75 - elapsed / 60) * 2.55), 0)]),
+    # CONTROL_MODULE_VOLTAGE, mV
+    0x42: lambda elapsed: round(13800 + 100 * math.sin(elapsed)).to_bytes(2, "big"),
+}
@@ -0,0 +1,243 @@
+"""
+The ELM327 emulator, a pseudo terminal that speaks enough of the ELM327's AT commands and OBD-II
+modes 01, 02, 03 and 07 over CAN for python-OBD to connect, query PIDs and read DTCs
+"""
+
+import os
+import random
+import threading
+import time
+import tty
+from typing import Callable, Dict, List, Optional, Union
+
+from .constants import (
+    ELM_PROTOCOL,
+    ELM_VERSION,
+    ELM_VOLTAGE,
+    ENGINE_HEADER,
+    NO_DATA,
+    SIMULATED_PIDS,
+    SINGLE_FRAME_SIZE,
+)
+
+# The data bytes of a PID, or a callable returning them at a number of seconds since the emulator
+# started
+PidValue = Union[bytes, Callable[[float], bytes]]
+
+
+class Elm327Emulator:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """
+    Answers the requests written to a pseudo terminal from a daemon thread, until closed. The
+        path of the pseudo terminal is used as the vehicle.port setting. OBD requests can be
+        slowed down with a latency and jitter, and fail with an error rate. The freeze frame
+        holds the current values of the PIDs.
+    """
+
+    def __init__(
+        self,
+        pids: Optional[Dict[int, PidValue]] = None,
+        latency: float = 0,
+        jitter: float = 0,
+        error_rate: float = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Open the pseudo terminal and start answering requests
+
+        :param pids: the mode 01 PIDs the vehicle supports, and their values. Can be changed at
+            any time. Defaults to SIMULATED_PIDS
+        :param latency: the seconds an OBD request takes to be answered
+        :param jitter: the max seconds randomly added to the latency
+        :param error_rate: the probability of an OBD request being answered with NO DATA
+        :param seed: the seed of the jitter and errors, for reproducible runs
+        """
+        # The stored and pending DTCs, ie. "P0301". Can be changed at any time
+        self.dtcs: List[str] = []
+        self.pending_dtcs: List[str] = []
+        self.pids: Dict[int, PidValue] = dict(SIMULATED_PIDS if pids is None else pids)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # The OBD requests answered so far
+        self.requests = 0
+        self.errors = 0
+
+        self.__random = random.Random(seed)
+        self.__started = time.monotonic()
+        self.__last = ""
+        self.__master, self.__slave = os.openpty()
+        tty.setraw(self.__slave)
+        self.port = os.ttyname(self.__slave)
+        self.__thread = threading.Thread(
+            target=self.__run, name="elm327-emulator", daemon=True
+        )
+        self.__thread.start()
+
+    def __pid_data(self, pid: int) -> bytes:
+        """
+        Get the current data bytes of a supported PID
+
+        :param pid: the mode 01 PID
+        :return: the data bytes, without the PID
+        """
+        value = self.pids[pid]
+        if callable(value):
+            return value(time.monotonic() - self.__started)
+        return value
+
+    def __supported(self, base: int) -> bytes:
+        """
+        Get the bit-array of supported PIDs returned by a PID listing command
+
+        :param base: the PID of the listing command, ie. 0x20 lists PIDs 0x21 to 0x40
+        :return: the 4 data bytes of the listing
+        """
+        bits = 0
+        for pid in self.pids:
+            if base < pid <= base + 32:
+                bits |= 1 << (32 - (pid - base))
+        # The next listing command is supported if any PID is past this range
+        if any(pid > base + 32 for pid in self.pids):
+            bits |= 1
+        return bits.to_bytes(4, "big")
+
+    @staticmethod
+    def __frames(payload: bytes) -> List[str]:
+        """
+        Split a response payload into CAN frames, as ISO-TP first and consecutive frames when it
+            doesn't fit in a single frame
+
+        :param payload: the response payload, starting with the mode byte
+        :return: the lines of the frames, with headers and spaces like the ELM327's output
+        """
+        if len(payload) <= SINGLE_FRAME_SIZE:
+            return [f"{ENGINE_HEADER} {(bytes([len(payload)]) + payload).hex(' ')}"]
+
+        frames = [
+            f"{ENGINE_HEADER} 1{len(payload) >> 8:X} {len(payload) & 0xFF:02x} "
+            + payload[: SINGLE_FRAME_SIZE - 1].hex(" ")
+        ]
+        for index, offset in enumerate(
+            range(SINGLE_FRAME_SIZE - 1, len(payload), SINGLE_FRAME_SIZE)
+        ):
+            frames.append(
+                f"{ENGINE_HEADER} 2{(index + 1) % 16:X} "
+                + payload[offset : offset + SINGLE_FRAME_SIZE].hex(" ")
+            )
+        return frames
+
+    @staticmethod
+    def __dtc_data(code: str) -> bytes:
+        """
+        Encode a DTC
+
+        :param code: the DTC, ie. "P0301"
+        :return: the 2 bytes of the DTC
+        """
+        return (("PCBU".index(code[0]) << 14) | int(code[1:], 16)).to_bytes(2, "big")
+
+    def __answer_pids(self, command: str) -> bytes:
+        """
+        Answer a mode 01 request of one or more PIDs, or a mode 02 request of a PID in the first
+            freeze frame
+
+        :param command: the request without spaces, ie. "010C0D" or "020C00"
+        :return: the response payload, empty if no PID is supported
+        """
+        if command.startswith("02"):
+            pid = int(command[2:4], 16)
+            if pid == 0x02 and self.dtcs:
+                # The DTC the freeze frame was stored for
+                return bytes([0x42, pid, 0]) + self.__dtc_data(code=self.dtcs[0])
+            if pid in self.pids and self.dtcs:
+                return bytes([0x42, pid, 0]) + self.__pid_data(pid=pid)
+            return b""
+
+        payload = bytearray()
+        for offset in range(2, len(command), 2):
+            pid = int(command[offset : offset + 2], 16)
+            if pid % 0x20 == 0:
+                payload += bytes([pid]) + self.__supported(base=pid)
+            elif pid in self.pids:
+                payload += bytes([pid]) + self.__pid_data(pid=pid)
+        return b"\x41" + payload if payload else b""
+
+    def __answer_obd(self, command: str) -> List[str]:
+        """
+        Answer an OBD request, after the latency
+
+        :param command: the request without spaces, ie. "010C0D"
+        :return: the response lines
+        """
+        self.requests += 1
+        time.sleep(self.latency + self.__random.uniform(0, self.jitter))
+        if self.error_rate and self.__random.random() < self.error_rate:
+            self.errors += 1
+            return [NO_DATA]
+
+        match command[:2]:
+            case "03" | "07":
+                dtcs = self.dtcs if command[:2] == "03" else self.pending_dtcs
+                # The response mode, then the number of DTCs
+                payload = bytes([0x40 + int(command[:2]), len(dtcs)]) + b"".join(
+                    self.__dtc_data(code=code) for code in dtcs
+                )
+            case _:
+                payload = self.__answer_pids(command=command)
+        if not payload:
+            return [NO_DATA]
+        return [frame.upper() for frame in self.__frames(payload=payload)]
+
+    def __answer(self, command: str) -> List[str]:
+        """
+        Answer a command
+
+        :param command: the command without spaces
+        :return: the response lines
+        """
+        if command.startswith("AT"):
+            match command:
+                case "ATZ":
+                    return [ELM_VERSION]
+                case "ATRV":
+                    return [ELM_VOLTAGE]
+                case "ATDPN":
+                    return [ELM_PROTOCOL]
+            # Every other setting is accepted, but ignored
+            return ["OK"]
+
+        # python-OBD may append the number of frames it expects
+        if len(command) % 2:
+            command = command[:-1]
+        if command[:2] in ("01", "02", "03", "07"):
+            return self.__answer_obd(command=command)
+        return [NO_DATA]
+
+    def __run(self) -> None:
+        """
+        The emulator thread's loop, answers every command terminated with a carriage return
+        """
+        buffer = b""
+        while True:
+            try:
+                buffer += os.read(self.__master, 1024)
+            except OSError:
+                return
+            while b"\r" in buffer:
+                line, buffer = buffer.split(b"\r", 1)
+                command = line.decode(errors="ignore").replace(" ", "").upper()
+                # An empty line repeats the last command
+                command = command.strip("\x7f") or self.__last
+                self.__last = command
+                response = "\r".join(self.__answer(command=command))
+                try:
+                    os.write(self.__master, f"{response}\r\r>".encode())
+                except OSError:
+                    return
+
+    def close(self) -> None:
+        """
+        Close the pseudo terminal, which stops the emulator thread
+        """
+        os.close(self.__slave)
+        os.close(self.__master)
@@ -0,0 +1,39 @@
+"""
+Constants of the master logger
+"""
+
+from enum import StrEnum
+
+# Max number of logging events output per wakeup of the listener
+LOG_BATCH_SIZE = 256
+
+# Max number of bytes buffered by the log storage before it's written, regardless of the flush
+# interval
+LOG_BUFFER_SIZE = 65536
+
+# Suffix of a rotated log segment that's still being compressed
+PARTIAL_SEGMENT_SUFFIX = ".tmp"
+
+
+class LogCompressions(StrEnum):
+    """
+    The compression used for rotated log segments
+    """
+
+    GZIP = "gzip"
+    ZSTD = "zstd"
+    NONE = "none"
+
+
+# The file extension of segments compressed with each LogCompressions member
+COMPRESSION_EXTENSIONS = {
+    LogCompressions.GZIP: ".gz",
+    LogCompressions.ZSTD: ".zst",
+    LogCompressions.NONE: "",
+}
+
+# Service of records logged outside of a service's package, ie. by the pd_manager or the runtime
+CORE_SERVICE = "core"
+
+# Max number of records sent in reply to a single log query
+LOG_QUERY_LIMIT = 500
@@ -2,20 +2,46 @@
 This module handles logging across PILOT Drive and is multiprocess friendly.
 """
 
-import inspect
+import functools
 import logging
 import os
+import queue
+import sys
+import threading
 import time
-from multiprocessing import Manager
-from typing import Callable
+from multiprocessing import Queue
+from typing import Callable, Dict, List, Optional
 
 from pilot_drive.constants import DEFAULT_LOG_SETTINGS, LOG_FILE_NAME, absolute_path
 
+from .constants import LOG_BATCH_SIZE, LogCompressions
+from .records import LogQuery, LogRecordRing, resolve_service
+from .storage import RotatingLogStorage, compression_available
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_origin(filename: str) -> str:
+    """
+    Format the file of a logging call to look like the typical logger origin, cached as every
+        call from the same module has the same origin
+
+    :param filename: the path of the calling module
+    :return: the origin, ie. ".services.vehicle.vehicle"
+    """
+    return (
+        filename.replace("/main.py", "/__main__")
+        .replace(absolute_path, "")
+        .replace("/", ".")
+        .replace(".py", "")
+    )  # Daisy chaining replace statements sucks. TODO: Use RegEx here.
+
 
 class MasterLogger:
     """
     The class that handles the logger for the entire application, allowing for logging across
-    multiple processes via the queue
+    multiple processes via the queue. Records are filtered by level in the logging process, then
+    drained in batches by a listener thread of the process that called start(), which also keeps
+    the newest records in memory for the UI.
     """
 
     def __init__(self, log_settings: dict) -> None:
@@ -26,9 +52,15 @@ class MasterLogger:
         {"logLevel": <0-50>, "logToFile": <bool>, "logPath": <LOG PATH>"}.
         the :func: `~pilot_drive.services.Settings.get_raw_settings` can be used to supply this
         """
-        manager = Manager()
-        self.__logging_queue = manager.Queue()
-        self.__new_log = manager.Value("i", 0)
+        self.__logging_queue: Queue = Queue()
+        self.__listener: Optional[threading.Thread] = None
+        self.__storage: Optional[RotatingLogStorage] = None
+        self.__records = LogRecordRing(
+            size=log_settings.get(
+                "recordBufferSize", DEFAULT_LOG_SETTINGS["recordBufferSize"]
+            )
+        )
+        self.__subscribers: List[Callable[[List[Dict]], None]] = []
         self.logger: logging.Logger = self.__initialize_logger(log_settings)
 
     def __initialize_logger(self, log_settings) -> logging.Logger:
@@ -43,6 +75,7 @@ class MasterLogger:
         init_errors = (
             []
         )  # Append any errors to a list to be logged after logger initialization
+        log_path = None
 
         try:
             log_level = log_settings["logLevel"]
@@ -71,8 +104,13 @@ class MasterLogger:
             dir_path = "/".join(dir_path)
             os.makedirs(name=dir_path, exist_ok=True)
 
+            self.__storage = self.__initialize_storage(
+                log_path=log_path, log_settings=log_settings, init_errors=init_errors
+            )
+
+        self.__log_level = log_level
         logging.basicConfig(
-            filename=log_path,
+            handlers=[self.__storage] if self.__storage else None,
             format="%(asctime)s:%(levelname)s:%(message)s",
             datefmt="%m/%d/%Y-%H:%M:%S",
             level=log_level,
@@ -84,104 +122,302 @@ class MasterLogger:
         logging.getLogger("websockets.server").setLevel(logging.ERROR)
         logging.getLogger("websockets.protocol").setLevel(logging.ERROR)
         logger = logging.getLogger(__name__)
+        for error in init_errors:
+            logger.error(msg=error)
         return logger
 
+    @staticmethod
+    def __initialize_storage(
+        log_path: str, log_settings: dict, init_errors: List[str]
+    ) -> RotatingLogStorage:
+        """
+        Create the log file storage, settings missing from an older settings file use the defaults
+
+        :param log_path: the path of the log file
+        :param log_settings: the dict of logger settings
+        :param init_errors: the list of errors logged after initialization
+        :return: the log storage handler
+        """
+        storage_settings = {**DEFAULT_LOG_SETTINGS, **log_settings}
+        try:
+            compression = LogCompressions(storage_settings["compression"])
+        except ValueError:
+            init_errors.append(
+                f'Invalid log compression "{storage_settings["compression"]}", '
+                f'defaulting to "{LogCompressions.GZIP}"'
+            )
+            compression = LogCompressions.GZIP
+
+        if not compression_available(compression=compression):
+            init_errors.append(
+                "zstd log compression requires the zstandard package, using gzip"
+            )
+            compression = LogCompressions.GZIP
+
+        return RotatingLogStorage(
+            path=log_path,
+            max_file_size=storage_settings["maxFileSize"],
+            rotate_interval=storage_settings["rotateInterval"],
+            max_total_size=storage_settings["maxTotalSize"],
+            compression=compression,
+            flush_interval=storage_settings["flushInterval"],
+            flush_level=storage_settings["flushLevel"],
+        )
+
     # Logic/APIs for services. Goal was to make it close to the feel of the logging module. Just
     # needs origin.
 
-    def __add_to_queue(self, level: int, origin: str, msg: str) -> None:
+    def __add_to_queue(self, level: int, origin: str, msg: str, fields: Dict) -> None:
         """
         Add the logging event to the multiprocessing queue
 
         :param level: the logging level of the event ie. (0-50)
         :param origin: the origin of the logging event
         :param msg: the logging event
+        :param fields: the structured fields of the logging event
         """
-        log_dict = {"level": level, "origin": origin, "message": msg}
-        self.__logging_queue.put(item=log_dict)
-        self.__new_log.value = 1  # Indicate there is a new log value in the queue
+        log_dict = {
+            "level": level,
+            "origin": origin,
+            "message": msg,
+            "created": time.time(),
+            "pid": os.getpid(),
+            "fields": fields,
+        }
+        self.__logging_queue.put(obj=log_dict)
 
     # pylint: disable=no-self-argument
-    def __log_handler(self, level: int, msg: str) -> Callable:
+    def __log_handler(self, level: int, msg: str, fields: Dict) -> Callable:
         """
-        Handles the incoming logging event and adds it to the queue.
+        Handles the incoming logging event and adds it to the queue. Events below the log level are
+            discarded before anything else is done.
 
         :param level: the intended log level ie. (0-50)
+        :param msg: the logging event
+        :param fields: the structured fields of the logging event
+        """
+        if level < self.__log_level:
+            return
+
+        # Get the calling origin, two frames up is the caller of debug(), info()... Unlike
+        # inspect.stack(), this doesn't read the source of every frame in the stack.
+        caller = sys._getframe(2)  # pylint: disable=protected-access
+        origin = resolve_origin(filename=caller.f_code.co_filename)
+        self.__add_to_queue(level=level, origin=origin, msg=msg, fields=fields)
+
+    def is_enabled_for(self, level: int) -> bool:
         """
-        # Get the calling origin and format it to look like the typical logger call.
-        origin = (
-            inspect.stack()[2]
-            .filename.replace("/main.py", "/__main__")
-            .replace(absolute_path, "")
-            .replace("/", ".")
-            .replace(".py", "")
-        )  # Daisy chaining replace statements sucks. TODO: Use RegEx here.
-        self.__add_to_queue(level=level, origin=origin, msg=msg)
+        Check if events of a level are logged, used to skip building expensive messages
+
+        :param level: the logging level ie. (0-50)
+        :return: True if events of the level are logged, False if they're discarded
+        """
+        return level >= self.__log_level
 
     # Attempt to make the logging feel as close to the stock library as possible
-    def critical(self, msg: str) -> None:
+    def critical(self, msg: str, **fields) -> None:
         """
         Log 'msg' with severity 'CRITICAL'.
 
         :param msg: The message to be logged
+        :param fields: structured fields kept with the record, ie. pid=1234
         """
-        self.__log_handler(logging.CRITICAL, msg=msg)
+        self.__log_handler(logging.CRITICAL, msg=msg, fields=fields)
 
-    def error(self, msg: str) -> None:
+    def error(self, msg: str, **fields) -> None:
         """
         Log 'msg' with severity 'ERROR'.
 
         :param msg: The message to be logged
+        :param fields: structured fields kept with the record, ie. pid=1234
         """
-        self.__log_handler(logging.ERROR, msg=msg)
+        self.__log_handler(logging.ERROR, msg=msg, fields=fields)
 
-    def warning(self, msg: str) -> None:
+    def warning(self, msg: str, **fields) -> None:
         """
         Log 'msg' with severity 'WARNING'.
 
         :param msg: The message to be logged
+        :param fields: structured fields kept with the record, ie. pid=1234
         """
-        self.__log_handler(logging.WARNING, msg=msg)
+        self.__log_handler(logging.WARNING, msg=msg, fields=fields)
 
-    def info(self, msg: str) -> None:
+    def info(self, msg: str, **fields) -> None:
         """
         Log 'msg' with severity 'INFO'.
 
         :param msg: The message to be logged
+        :param fields: structured fields kept with the record, ie. pid=1234
         """
-        self.__log_handler(logging.INFO, msg=msg)
+        self.__log_handler(logging.INFO, msg=msg, fields=fields)
 
-    def debug(self, msg: str) -> None:
+    def debug(self, msg: str, **fields) -> None:
         """
         Log 'msg' with severity 'DEBUG'.
 
         :param msg: The message to be logged
+        :param fields: structured fields kept with the record, ie. pid=1234
         """
-        self.__log_handler(logging.DEBUG, msg=msg)
+        self.__log_handler(logging.DEBUG, msg=msg, fields=fields)
 
     # Logic for actually logging.
 
-    def __log(self, level: int, origin: str, message: str) -> None:
+    def __log(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        level: int,
+        origin: str,
+        message: str,
+        created: float,
+        pid: int,
+        fields: Dict,
+    ) -> Dict:
         """
-        Output the log with the :func:`~logging.Logger.log` method
+        Output the log with the :func:`~logging.Logger.handle` method
 
         :param level: the logging level of the event ie. (0-50)
         :param origin: the origin of the logging event
         :param message: the logging event
+        :param created: the time the event was logged at, as it's output later in a batch
+        :param pid: the id of the process the event was logged from
+        :param fields: the structured fields of the logging event
+        :return: the structured record of the event, see ui/src/types/Logs.interface.ts
         """
-        full_message = f"{origin}: {message}"
-        self.logger.log(level=level, msg=full_message)
+        msg = f"{origin}: {message}"
+        if fields:
+            msg += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+
+        record = self.logger.makeRecord(
+            name=self.logger.name,
+            level=level,
+            fn=origin,
+            lno=0,
+            msg=msg,
+            args=None,
+            exc_info=None,
+        )
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        self.logger.handle(record)
+
+        return {
+            "timestamp": created,
+            "level": level,
+            "levelName": logging.getLevelName(level),
+            "origin": origin,
+            "service": resolve_service(origin=origin),
+            "pid": pid,
+            "message": message,
+            "fields": fields,
+        }
+
+    def __publish(self, records: List[Dict]) -> None:
+        """
+        Add structured records to the ring, and pass them to every subscriber
+
+        :param records: the records output by the listener, oldest first
+        """
+        self.__records.extend(records=records)
+        for subscriber in list(self.__subscribers):
+            try:
+                subscriber(records)
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                # The logger can't log its own failures, report them like the logging module
+                print(f"Failed to publish log records: {err}", file=sys.stderr)
+
+    def __drain(self) -> bool:
+        """
+        Block until there is a new logging event, then output it along with every other event
+            already queued, up to LOG_BATCH_SIZE. When logging to a file, the wait is limited to
+            the flush interval so buffered events are written even if nothing else is logged.
+
+        :return: False once stop() was called and the queue is drained, True otherwise
+        """
+        try:
+            batch: List[Optional[dict]] = [
+                self.__logging_queue.get(
+                    timeout=self.__storage.flush_interval if self.__storage else None
+                )
+            ]
+        except queue.Empty:
+            # Nothing was logged for a while, write out what's still buffered
+            if self.__storage:
+                self.__storage.flush_if_due()
+            return True
+
+        try:
+            while len(batch) < LOG_BATCH_SIZE:
+                batch.append(self.__logging_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        stopped = False
+        records = []
+        for log_dict in batch:
+            if log_dict is None:
+                stopped = True
+                continue
+            records.append(self.__log(**log_dict))
+        if records:
+            self.__publish(records=records)
+
+        if self.__storage:
+            self.__storage.flush_if_due()
+        return not stopped
 
     def main(self) -> None:
         """
-        The main loop for the logger, reads from the queue and when theres is a new logging event,
-        output it
+        The main loop for the logger, outputs logging events in batches as soon as they're queued
+            until stop() is called
         """
-        while True:
-            if not self.__new_log.value == 0:
-                self.__log(**self.__logging_queue.get())
+        while self.__drain():
+            pass
 
-                if self.__logging_queue.empty():
-                    self.__new_log.value = 0
+    def start(self) -> None:
+        """
+        Start the listener thread that runs the main loop in the calling process
+        """
+        self.__listener = threading.Thread(
+            target=self.main, name="master-logger", daemon=True
+        )
+        self.__listener.start()
 
-            time.sleep(0.1)
+    def stop(self) -> None:
+        """
+        Output the logging events still queued, then stop the listener thread
+        """
+        self.__logging_queue.put(obj=None)
+        if self.__listener:
+            self.__listener.join()
+            self.__listener = None
+        if self.__storage:
+            self.__storage.flush()
+
+    # Logic for the in-memory records
+
+    def query_records(self, query: LogQuery) -> List[Dict]:
+        """
+        Get the newest structured records kept in memory that match a query, only available in
+            the process running the listener
+
+        :param query: the LogQuery to filter with
+        :return: the matching records, oldest first
+        """
+        return self.__records.query(query=query)
+
+    def subscribe(self, callback: Callable[[List[Dict]], None]) -> None:
+        """
+        Pass every batch of new structured records to a callback, called from the listener thread
+
+        :param callback: the callable taking the list of records, oldest first
+        """
+        self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[List[Dict]], None]) -> None:
+        """
+        Stop passing new structured records to a callback
+
+        :param callback: a callable passed to subscribe()
+        """
+        if callback in self.__subscribers:
+            self.__subscribers.remove(callback)
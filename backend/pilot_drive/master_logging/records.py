@@ -0,0 +1,124 @@
+"""
+The structured log records kept in memory for the UI, and the queries used to filter them.
+"""
+
+import functools
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from .constants import CORE_SERVICE, LOG_QUERY_LIMIT
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_service(origin: str) -> str:
+    """
+    Get the service a logging event came from, based on its origin
+
+    :param origin: the origin of the logging event, ie. ".services.vehicle.vehicle"
+    :return: the service's package name ie. "vehicle", or CORE_SERVICE for modules outside of the
+        services package
+    """
+    parts = origin.strip(".").split(".")
+    if len(parts) > 1 and parts[0] == "services":
+        return parts[1]
+    return CORE_SERVICE
+
+
+@dataclass
+class LogQuery:
+    """
+    A filter of log records, all set conditions have to match
+    """
+
+    # The min logging level ie. (0-50)
+    level: Optional[int] = None
+    service: Optional[str] = None
+    # Unix times the records were logged between, inclusive
+    since: Optional[float] = None
+    until: Optional[float] = None
+    # Max number of records returned, the newest ones are kept
+    limit: int = LOG_QUERY_LIMIT
+
+    @classmethod
+    def from_request(cls, request: Dict) -> "LogQuery":
+        """
+        Create a query from the query of a logs message, see ui/src/types/Logs.interface.ts
+
+        :param request: the query dict, missing keys aren't filtered on
+        :return: the query
+        :raises: ValueError: if a condition has the wrong type
+        """
+        try:
+            return cls(
+                level=None if request.get("level") is None else int(request["level"]),
+                service=request.get("service"),
+                since=None if request.get("since") is None else float(request["since"]),
+                until=None if request.get("until") is None else float(request["until"]),
+                limit=min(int(request.get("limit", LOG_QUERY_LIMIT)), LOG_QUERY_LIMIT),
+            )
+        except TypeError as exc:
+            raise ValueError(f"Invalid log query: {request}") from exc
+
+    def matches(self, record: Dict) -> bool:
+        """
+        Check if a record matches the query's conditions, the limit is ignored
+
+        :param record: the log record dict
+        :return: True if the record matches, False otherwise
+        """
+        return (
+            (self.level is None or record["level"] >= self.level)
+            and (self.service is None or record["service"] == self.service)
+            and (self.since is None or record["timestamp"] >= self.since)
+            and (self.until is None or record["timestamp"] <= self.until)
+        )
+
+
+class LogRecordRing:
+    """
+    A bounded, thread safe buffer of the newest log records. Records are appended by the logger's
+        listener thread and queried from the main event loop.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        Initialize the ring
+
+        :param size: the max number of records kept, the oldest are discarded first
+        """
+        self.__records: Deque[Dict] = deque(maxlen=size)
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+    def extend(self, records: List[Dict]) -> None:
+        """
+        Add records to the ring
+
+        :param records: the log record dicts, oldest first
+        """
+        with self.__lock:
+            self.__records.extend(records)
+
+    def query(self, query: LogQuery) -> List[Dict]:
+        """
+        Get the newest records that match a query
+
+        :param query: the LogQuery to filter with
+        :return: the matching records, oldest first
+        """
+        with self.__lock:
+            records = list(self.__records)
+
+        matching: List[Dict] = []
+        # Walk from the newest record, stopping as soon as the limit is reached
+        for record in reversed(records):
+            if len(matching) >= query.limit:
+                break
+            if query.matches(record):
+                matching.append(record)
+        matching.reverse()
+        return matching
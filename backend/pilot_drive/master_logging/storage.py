@@ -0,0 +1,287 @@
+"""
+The log file storage, a buffered logging handler with size and time based rotation, background
+compression of rotated segments and a total disk budget.
+"""
+
+import glob
+import gzip
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from typing import List
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+from .constants import (
+    COMPRESSION_EXTENSIONS,
+    LOG_BUFFER_SIZE,
+    PARTIAL_SEGMENT_SUFFIX,
+    LogCompressions,
+)
+
+
+def compression_available(compression: LogCompressions) -> bool:
+    """
+    Check if the package a compression needs is installed
+
+    :param compression: the LogCompressions member
+    :return: False if the compression's optional package is missing, True otherwise
+    """
+    return compression != LogCompressions.ZSTD or zstandard is not None
+
+
+class RotatingLogStorage(logging.Handler):
+    """
+    A logging handler that buffers formatted records in memory and appends them to the log file
+        in a single write. The log file is rotated into timestamped segments, which a background
+        thread compresses before removing the oldest segments that exceed the disk budget.
+    """
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(
+        self,
+        *,
+        path: str,
+        max_file_size: int,
+        rotate_interval: float,
+        max_total_size: int,
+        compression: LogCompressions,
+        flush_interval: float,
+        flush_level: int,
+    ) -> None:
+        """
+        Initialize the storage, and queue any segments left uncompressed by a previous run
+
+        :param path: the path of the log file
+        :param max_file_size: the size in bytes the log file is rotated at
+        :param rotate_interval: the age in seconds the log file is rotated at
+        :param max_total_size: the max size in bytes of the log file and all of its segments
+        :param compression: the LogCompressions member used for rotated segments
+        :param flush_interval: the max seconds records are buffered before being written
+        :param flush_level: records of this level or above are written right away
+        """
+        super().__init__()
+        self.__path = path
+        self.__max_file_size = max_file_size
+        self.__rotate_interval = rotate_interval
+        self.__max_total_size = max_total_size
+        self.__compression = compression
+        self.__flush_interval = flush_interval
+        self.__flush_level = flush_level
+
+        self.__buffer: List[str] = []
+        self.__buffered = 0
+        self.__last_flush = time.monotonic()
+
+        self.__compress_queue: queue.Queue = queue.Queue()
+        for segment in self.__segments():
+            if not self.__is_compressed(segment):
+                self.__compress_queue.put(segment)
+        self.__compressor = threading.Thread(
+            target=self.__compress_segments, name="log-compressor", daemon=True
+        )
+        self.__compressor.start()
+
+        # The log file of a previous run is appended to, it's aged from its last write so a head
+        # unit that restarts every drive still rotates it
+        self.__opened = time.time()
+        try:
+            stat = os.stat(self.__path)
+            if stat.st_size:
+                self.__opened = stat.st_mtime
+        except OSError:
+            pass
+        self.__stream = open(  # pylint: disable=consider-using-with
+            self.__path, "a", encoding="utf-8"
+        )
+
+    def __is_compressed(self, segment: str) -> bool:
+        """
+        Check if a rotated segment was already compressed
+
+        :param segment: the path of the segment
+        :return: True if the segment has a compressed file extension
+        """
+        return any(
+            extension and segment.endswith(extension)
+            for extension in COMPRESSION_EXTENSIONS.values()
+        )
+
+    def __segments(self) -> List[str]:
+        """
+        List the rotated segments of the log file, removing any partially compressed leftovers.
+            Only called before the compressor thread starts, or from it between compressions.
+
+        :return: the paths of the segments, oldest first
+        """
+        segments = []
+        for segment in glob.glob(f"{glob.escape(self.__path)}.*"):
+            if segment.endswith(PARTIAL_SEGMENT_SUFFIX):
+                os.remove(segment)
+            else:
+                segments.append(segment)
+        return sorted(segments, key=os.path.getmtime)
+
+    def __compress(self, segment: str) -> None:
+        """
+        Compress a rotated segment, written to a partial file first so a crash never leaves a
+            corrupt segment behind
+
+        :param segment: the path of the uncompressed segment
+        """
+        if self.__compression == LogCompressions.NONE:
+            return
+
+        destination = f"{segment}{COMPRESSION_EXTENSIONS[self.__compression]}"
+        partial = f"{destination}{PARTIAL_SEGMENT_SUFFIX}"
+        with open(segment, "rb") as source:
+            if self.__compression == LogCompressions.ZSTD:
+                with open(partial, "wb") as target:
+                    zstandard.ZstdCompressor().copy_stream(source, target)
+            else:
+                with gzip.open(partial, "wb") as target:
+                    shutil.copyfileobj(source, target)
+
+        # Keep the segment's age, the budget removes the oldest segments first
+        stat = os.stat(segment)
+        os.utime(partial, (stat.st_atime, stat.st_mtime))
+        os.rename(partial, destination)
+        os.remove(segment)
+
+    def __enforce_budget(self) -> None:
+        """
+        Remove the oldest segments until the log file and its segments fit the disk budget
+        """
+        segments = self.__segments()
+        sizes = {segment: os.path.getsize(segment) for segment in segments}
+        total = sum(sizes.values())
+        if os.path.exists(self.__path):
+            total += os.path.getsize(self.__path)
+
+        for segment in segments:
+            if total <= self.__max_total_size:
+                break
+            os.remove(segment)
+            total -= sizes[segment]
+
+    def __compress_segments(self) -> None:
+        """
+        The compressor thread's loop, compresses segments as they're rotated
+        """
+        while True:
+            segment = self.__compress_queue.get()
+            try:
+                self.__compress(segment=segment)
+                self.__enforce_budget()
+            except OSError as err:
+                # The logger can't log its own failures, report them like the logging module
+                print(
+                    f"Failed to compress log segment {segment}: {err}", file=sys.stderr
+                )
+
+    def __rotate(self) -> None:
+        """
+        Move the log file to a timestamped segment, queue it for compression and start a new one
+        """
+        self.__stream.close()
+        segment = f"{self.__path}.{time.strftime('%Y%m%d-%H%M%S')}"
+        count = 0
+        while glob.glob(f"{glob.escape(segment)}*"):
+            count += 1
+            segment = f"{self.__path}.{time.strftime('%Y%m%d-%H%M%S')}-{count}"
+        os.rename(self.__path, segment)
+        self.__compress_queue.put(segment)
+
+        self.__opened = time.time()
+        self.__stream = open(  # pylint: disable=consider-using-with
+            self.__path, "a", encoding="utf-8"
+        )
+
+    def __write(self) -> None:
+        """
+        Write the buffered records, rotating the log file first if it's full or too old
+        """
+        self.__last_flush = time.monotonic()
+        if not self.__buffer or self.__stream.closed:
+            return
+
+        data = "".join(self.__buffer)
+        self.__buffer.clear()
+        self.__buffered = 0
+
+        written = self.__stream.tell()
+        if written and (
+            written + len(data.encode()) > self.__max_file_size
+            or time.time() - self.__opened >= self.__rotate_interval
+        ):
+            self.__rotate()
+
+        self.__stream.write(data)
+        self.__stream.flush()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Buffer a record, writing the buffer if the record's level calls for it or it's full
+        """
+        try:
+            line = f"{self.format(record)}\n"
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.handleError(record)
+            return
+
+        self.__buffer.append(line)
+        self.__buffered += len(line)
+        if (
+            record.levelno >= self.__flush_level
+            or self.__buffered >= LOG_BUFFER_SIZE
+            or time.monotonic() - self.__last_flush >= self.__flush_interval
+        ):
+            self.__write()
+
+    @property
+    def flush_interval(self) -> float:
+        """
+        The max seconds records are buffered before being written
+        """
+        return self.__flush_interval
+
+    def flush_if_due(self) -> None:
+        """
+        Write the buffered records if the flush interval has passed, called periodically so
+            records don't sit in the buffer when nothing else is logged
+        """
+        self.acquire()
+        try:
+            if time.monotonic() - self.__last_flush >= self.__flush_interval:
+                self.__write()
+        finally:
+            self.release()
+
+    def flush(self) -> None:
+        """
+        Write the buffered records
+        """
+        self.acquire()
+        try:
+            self.__write()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        """
+        Write the buffered records and close the log file
+        """
+        self.acquire()
+        try:
+            self.__write()
+            self.__stream.close()
+        finally:
+            self.release()
+        super().close()
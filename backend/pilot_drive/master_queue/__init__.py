@@ -1,2 +1,3 @@
 # pylint: disable=missing-module-docstring
 from .master_event_queue import MasterEventQueue, EventType
+from .constants import QueueBackends
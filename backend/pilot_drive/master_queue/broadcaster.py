@@ -0,0 +1,343 @@
+"""
+Module that fans out the master event queue to every connected WebSocket client
+"""
+
+import asyncio
+from collections import deque
+from contextlib import aclosing
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+import websockets
+
+from pilot_drive.master_logging.master_logger import MasterLogger
+from pilot_drive.master_logging.records import LogQuery
+
+from .codecs import get_codec
+from .constants import (
+    COALESCE_KEY_ATTRIBUTE,
+    SlowConsumerPolicies,
+    SLOW_CONSUMER_CLOSE_CODE,
+)
+from .master_event_queue import EventType, MasterEventQueue, SNAPSHOT_EVENT_TYPES
+from .state_sync import StateSync
+
+
+class ClientOutbox:  # pylint: disable=too-many-instance-attributes
+    """
+    A bounded queue of serialized events waiting to be sent to a single WebSocket client, along
+        with the task logic that sends them.
+    """
+
+    def __init__(self, websocket: Any, size: int, policy: SlowConsumerPolicies) -> None:
+        """
+        Initialize the outbox
+
+        :param websocket: the WebSocket of the client
+        :param size: the max number of unsent messages held for the client
+        :param policy: the SlowConsumerPolicies member applied once the outbox is full
+        """
+        self.websocket = websocket
+        # The codec of the subprotocol negotiated by the client
+        self.codec = get_codec(subprotocol=getattr(websocket, "subprotocol", None))
+        self.__size = size
+        self.__policy = policy
+        # The event type and coalescing sub-key of each message, with the message
+        self.__messages: Deque[
+            Tuple[Tuple[str, Optional[str]], Union[str, bytes]]
+        ] = deque()
+        self.__ready = asyncio.Event()
+        self.__disconnect = False
+
+        # Whether the client opted in to the delta state sync protocol
+        self.sync = False
+        # The query of the live log records the client subscribed to, if any
+        self.logs: Optional[LogQuery] = None
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self.__messages)
+
+    def __coalesce(self, event_type: str, key: Optional[str]) -> bool:
+        """
+        Remove the oldest unsent message with the same event type and sub-key, as it's
+            superseded. Only snapshot event types are coalesced.
+
+        :param event_type: the event type of the new message
+        :param key: the coalescing sub-key of the new message
+        :return: True if a message was removed, False if there was none to remove
+        """
+        if event_type not in SNAPSHOT_EVENT_TYPES:
+            return False
+
+        for index, (pending_key, _) in enumerate(self.__messages):
+            if pending_key == (event_type, key):
+                del self.__messages[index]
+                self.coalesced += 1
+                return True
+        return False
+
+    def offer(
+        self, event_type: str, message: Union[str, bytes], key: Optional[str] = None
+    ) -> bool:
+        """
+        Add a message to the outbox, applying the slow consumer policy if it's full
+
+        :param event_type: the EventType of the message, used to coalesce
+        :param message: the serialized message
+        :param key: the coalescing sub-key of the message's event, if it was pushed with one
+        :return: False if the client has to be disconnected, True otherwise
+        """
+        if self.__disconnect:
+            return False
+
+        if len(self.__messages) >= self.__size:
+            match self.__policy:
+                case SlowConsumerPolicies.DISCONNECT:
+                    self.__disconnect = True
+                    self.__ready.set()
+                    return False
+                case SlowConsumerPolicies.COALESCE:
+                    if not self.__coalesce(event_type=event_type, key=key):
+                        self.__messages.popleft()
+                        self.dropped += 1
+                case _:
+                    self.__messages.popleft()
+                    self.dropped += 1
+
+        self.__messages.append(((event_type, key), message))
+        self.__ready.set()
+        return True
+
+    async def run(self) -> None:
+        """
+        Send messages to the client as they arrive, until the connection closes or the client is
+            disconnected for being too slow.
+        """
+        try:
+            while True:
+                await self.__ready.wait()
+                self.__ready.clear()
+                if self.__disconnect:
+                    await self.websocket.close(
+                        code=SLOW_CONSUMER_CLOSE_CODE, reason="Client too slow"
+                    )
+                    return
+                while self.__messages and not self.__disconnect:
+                    _, message = self.__messages.popleft()
+                    await self.websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            return
+
+
+class EventBroadcaster:
+    """
+    Drains the master event queue in a single task, serializing each event once and offering it to
+        the outbox of every registered WebSocket client.
+    """
+
+    def __init__(
+        self,
+        master_queue: MasterEventQueue,
+        logging: MasterLogger,
+        outbox_size: int,
+        policy: SlowConsumerPolicies,
+    ) -> None:
+        """
+        Initialize the broadcaster
+
+        :param master_queue: the master event queue to drain
+        :param logging: an instance of the MasterLogger
+        :param outbox_size: the max number of unsent messages held per client
+        :param policy: the SlowConsumerPolicies member used when a client's outbox is full
+        """
+        self.__master_queue = master_queue
+        self.__logging = logging
+        self.__outbox_size = outbox_size
+        self.__policy = policy
+        self.__clients: Dict[Any, ClientOutbox] = {}
+        self.__state_sync = StateSync()
+
+    @property
+    def clients(self) -> int:
+        """
+        The number of registered clients
+        """
+        return len(self.__clients)
+
+    def register(self, websocket: Any) -> ClientOutbox:
+        """
+        Register a client, every event drained from now on is offered to its outbox
+
+        :param websocket: the WebSocket of the client
+        :return: the client's outbox, its run() method must be awaited to send the messages
+        """
+        outbox = ClientOutbox(
+            websocket=websocket, size=self.__outbox_size, policy=self.__policy
+        )
+        self.__clients[websocket] = outbox
+        return outbox
+
+    def unregister(self, websocket: Any) -> None:
+        """
+        Stop offering events to a client
+
+        :param websocket: the WebSocket of the client
+        """
+        outbox = self.__clients.pop(websocket, None)
+        if outbox and (outbox.dropped or outbox.coalesced):
+            self.__logging.info(
+                msg=f"WebSocket client disconnected, {outbox.dropped} messages were dropped and "
+                f"{outbox.coalesced} coalesced while it was connected."
+            )
+
+    def sync_request(self, websocket: Any, request: Dict) -> List[str]:
+        """
+        Handle a state sync request from a client, opting it in or out of delta updates and
+            sending it the requested snapshots.
+
+        :param websocket: the WebSocket of the client
+        :param request: the content of the sync message, see ui/src/types/Sync.interface.ts
+        :return: the requested topics that have no known state yet, which need to be refreshed
+        """
+        outbox = self.__clients.get(websocket)
+        if outbox is None:
+            return []
+
+        if "enable" in request:
+            outbox.sync = bool(request["enable"])
+
+        topics = request.get("snapshot")
+        if topics is None:
+            return []
+
+        missing = []
+        for topic in topics or SNAPSHOT_EVENT_TYPES:
+            snapshots = self.__state_sync.snapshots(topic=topic)
+            if not snapshots:
+                missing.append(topic)
+            for snapshot in snapshots:
+                outbox.offer(
+                    event_type=topic,
+                    message=outbox.codec.encode(snapshot),
+                    key=snapshot.get(COALESCE_KEY_ATTRIBUTE),
+                )
+        return missing
+
+    def logs_request(self, websocket: Any, request: Dict) -> None:
+        """
+        Handle a logs request from a client, sending it the records kept in memory that match the
+            query and optionally subscribing it to the matching live records.
+
+        :param websocket: the WebSocket of the client
+        :param request: the content of the logs message, see ui/src/types/Logs.interface.ts
+        """
+        outbox = self.__clients.get(websocket)
+        if outbox is None:
+            return
+
+        try:
+            query = LogQuery.from_request(request=request.get("query") or {})
+        except ValueError as err:
+            self.__logging.error(msg=f"Failed to handle logs request: {err}")
+            return
+
+        outbox.logs = query if request.get("live") else None
+        records = self.__logging.query_records(query=query)
+        self.__offer(
+            websocket=websocket,
+            outbox=outbox,
+            event_type=EventType.LOGS,
+            message=outbox.codec.encode(
+                {"type": EventType.LOGS, EventType.LOGS: {"records": records}}
+            ),
+        )
+
+    def broadcast_logs(self, records: List[Dict]) -> None:
+        """
+        Offer new log records to every client subscribed to live records, filtered by each
+            client's query. Must be called from the event loop.
+
+        :param records: the structured log records, oldest first
+        """
+        for websocket, outbox in list(self.__clients.items()):
+            if outbox.logs is None:
+                continue
+            matching = [record for record in records if outbox.logs.matches(record)]
+            if not matching:
+                continue
+            self.__offer(
+                websocket=websocket,
+                outbox=outbox,
+                event_type=EventType.LOGS,
+                message=outbox.codec.encode(
+                    {"type": EventType.LOGS, EventType.LOGS: {"records": matching}}
+                ),
+            )
+
+    def __offer(
+        self,
+        websocket: Any,
+        outbox: ClientOutbox,
+        event_type: str,
+        message: Union[str, bytes],
+        key: Optional[str] = None,
+    ):
+        """
+        Offer a message to a client's outbox, disconnecting the client if it's too slow
+
+        :param websocket: the WebSocket of the client
+        :param outbox: the client's outbox
+        :param event_type: the type of the message
+        :param message: the serialized message
+        :param key: the coalescing sub-key of the message's event, if any
+        """
+        if not outbox.offer(event_type=event_type, message=message, key=key):
+            self.__logging.warning(
+                msg="Disconnecting a WebSocket client that couldn't keep up with events!"
+            )
+            self.__clients.pop(websocket, None)
+
+    def broadcast(self, event: Dict) -> None:
+        """
+        Serialize an event and offer it to every client. Clients that opted in to delta updates
+            are sent the state sync message of the event instead. Each message is serialized once
+            per codec in use, no matter the number of clients.
+
+        :param event: the event dict to send, its coalescing sub-key isn't sent
+        """
+        key = event.pop(COALESCE_KEY_ATTRIBUTE, None)
+        sync_clients = any(outbox.sync for outbox in self.__clients.values())
+        sync_event = self.__state_sync.update(
+            event=event, key=key, track_only=not sync_clients
+        )
+
+        messages: Dict[Tuple[bool, str], Union[str, bytes]] = {}
+        for websocket, outbox in list(self.__clients.items()):
+            client_event = sync_event if outbox.sync else event
+            # The state didn't change, so there's nothing to send
+            if client_event is None:
+                continue
+
+            message_key = (outbox.sync, outbox.codec.subprotocol)
+            if message_key not in messages:
+                messages[message_key] = outbox.codec.encode(client_event)
+            self.__offer(
+                websocket=websocket,
+                outbox=outbox,
+                event_type=client_event["type"],
+                message=messages[message_key],
+                key=key,
+            )
+
+    async def run(self) -> None:
+        """
+        The single drain task, broadcasts every event of the master queue
+        """
+        async with aclosing(self.__master_queue.listen()) as event_batches:
+            async for events in event_batches:
+                for event in events:
+                    self.broadcast(event=event)
+                    # Give the client tasks a turn, so a large batch doesn't overflow the
+                    # outboxes of clients that are keeping up
+                    await asyncio.sleep(0)
@@ -0,0 +1,140 @@
+"""
+The codecs used to serialize events sent to the UI, negotiated per client via WebSocket
+subprotocol. JSON is used when a client doesn't request a subprotocol.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+try:
+    import msgpack
+except ImportError:  # The optional "msgpack" extra isn't installed
+    msgpack = None
+
+from .constants import EventCodecs
+from .exceptions import EventDecodeException
+
+
+class EncodedEvent(dict):
+    """
+    An event dict that keeps the JSON it was decoded from, so the JSON codec sends those bytes
+        instead of encoding the event again. It must not be modified once decoded, other than
+        the coalescing sub-key being removed.
+    """
+
+    def __init__(self, event: Dict, encoded: str) -> None:
+        """
+        Initialize the event
+
+        :param event: the decoded event
+        :param encoded: the JSON the event was decoded from
+        """
+        super().__init__(event)
+        self.encoded = encoded
+
+
+class AbstractEventCodec(ABC):
+    """
+    The abstract class for event codecs
+    """
+
+    subprotocol: EventCodecs
+
+    @abstractmethod
+    def encode(self, event: Dict) -> Union[str, bytes]:
+        """
+        Serialize an event, str results are sent as text frames and bytes as binary frames
+
+        :param event: the event dict
+        :return: the serialized event
+        """
+
+    @abstractmethod
+    def decode(self, message: Union[str, bytes]) -> Dict:
+        """
+        Deserialize a message from a client
+
+        :param message: the received message
+        :raises EventDecodeException: if the message can't be decoded
+        :return: the message dict
+        """
+
+
+class JsonCodec(AbstractEventCodec):
+    """
+    The default codec, events are sent as JSON text frames
+    """
+
+    subprotocol = EventCodecs.JSON
+
+    def encode(self, event: Dict) -> str:
+        if isinstance(event, EncodedEvent):
+            return event.encoded
+        return json.dumps(event)
+
+    def decode(self, message: Union[str, bytes]) -> Dict:
+        try:
+            return json.loads(message)
+        except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+            raise EventDecodeException(f'Failed to decode "{message}": {exc}') from exc
+
+
+class MsgPackCodec(AbstractEventCodec):
+    """
+    A compact binary codec, events are sent as MessagePack binary frames
+    """
+
+    subprotocol = EventCodecs.MSGPACK
+
+    def encode(self, event: Dict) -> bytes:
+        return msgpack.packb(event)
+
+    def decode(self, message: Union[str, bytes]) -> Dict:
+        if isinstance(message, str):
+            message = message.encode()
+        try:
+            return msgpack.unpackb(message)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise EventDecodeException(f'Failed to decode "{message}": {exc}') from exc
+
+
+def available_codecs() -> List[AbstractEventCodec]:
+    """
+    Get the codecs that can be used, in order of server preference
+
+    :return: a list of codec instances, JSON is always available
+    """
+    codecs: List[AbstractEventCodec] = [JsonCodec()]
+    if msgpack is not None:
+        codecs.append(MsgPackCodec())
+    return codecs
+
+
+def get_codec(subprotocol: Optional[str]) -> AbstractEventCodec:
+    """
+    Get the codec of a negotiated WebSocket subprotocol
+
+    :param subprotocol: the subprotocol of the connection, None if none was negotiated
+    :return: the codec instance, JSON if there's no matching codec
+    """
+    for codec in available_codecs():
+        if codec.subprotocol == subprotocol:
+            return codec
+    return JsonCodec()
+
+
+def select_subprotocol(_connection: Any, subprotocols: Sequence[str]) -> Optional[str]:
+    """
+    Pick the subprotocol of a connecting client, passed to websockets.serve(). Unlike the default
+        negotiation, clients that don't request a subprotocol are accepted and use JSON.
+
+    :param _connection: the connection being opened
+    :param subprotocols: the subprotocols requested by the client, in its order of preference
+    :return: the first requested subprotocol with an available codec, None to use JSON
+    """
+    available = [codec.subprotocol for codec in available_codecs()]
+    for subprotocol in subprotocols:
+        if subprotocol in available:
+            return subprotocol
+    return None
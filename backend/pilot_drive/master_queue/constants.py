@@ -0,0 +1,84 @@
+"""
+Constants for the master event queue
+"""
+
+import struct
+from enum import StrEnum
+
+# Attribute that carries an event's optional coalescing sub-key through the queue backend
+COALESCE_KEY_ATTRIBUTE = "coalesceKey"
+
+
+class QueueBackends(StrEnum):
+    """
+    Enum of the available master queue backends, selected via the "queue" settings block
+    """
+
+    MANAGER = "manager"
+    SHARED_MEMORY = "shared-memory"
+
+
+#
+# Shared memory ring layout
+#
+
+# Header fields, each an 8 byte little endian unsigned int. The data region starts after a full
+# cache line so the header and the first records don't share one.
+HEAD_OFFSET = 0  # Total bytes ever written by producers (monotonic)
+TAIL_OFFSET = 8  # Total bytes ever consumed by the reader (monotonic)
+SEQUENCE_OFFSET = 16  # Sequence number that will be given to the next record
+DROPPED_OFFSET = 24  # Number of events dropped because the ring was full
+HEADER_SIZE = 64
+
+HEADER_FIELD = struct.Struct("<Q")
+
+# Every record is prefixed with its sequence number and payload length
+RECORD_HEADER = struct.Struct("<QQ")
+
+# A record's payload is the JSON of the event's coalescing sub-key, a newline (which JSON escapes
+# within strings) and the JSON of the event without the sub-key, as sent to JSON clients
+RECORD_KEY_SEPARATOR = b"\n"
+
+# Records are padded so every record header starts 8 byte aligned
+RECORD_ALIGNMENT = 8
+
+# Default size of the ring's data region in bytes
+DEFAULT_RING_CAPACITY = 1024 * 1024
+
+
+class SlowConsumerPolicies(StrEnum):
+    """
+    Enum of what the broadcaster does when a WebSocket client's outbox is full
+    """
+
+    DROP_OLDEST = "drop-oldest"  # Discard the client's oldest unsent message
+    COALESCE = "coalesce"  # Replace the client's unsent message of the same event type
+    DISCONNECT = "disconnect"  # Close the client's connection
+
+
+# Close code sent to clients disconnected for being too slow (1013: "Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+#
+# WebSocket codecs
+#
+
+
+class EventCodecs(StrEnum):
+    """
+    The WebSocket subprotocols of the event codecs
+    """
+
+    JSON = "pilot-drive.json"
+    MSGPACK = "pilot-drive.msgpack"
+
+
+#
+# State sync protocol
+#
+
+# Message type the UI sends to opt in to delta updates or request snapshots
+SYNC_MESSAGE_TYPE = "sync"
+# Message type of the deltas sent to clients that opted in
+PATCH_MESSAGE_TYPE = "patch"
@@ -0,0 +1,15 @@
+"""
+Exceptions of the master event queue
+"""
+
+
+class QueueFullException(Exception):
+    """
+    Raised when an event can't be added to a bounded queue backend as there is no room left
+    """
+
+
+class EventDecodeException(Exception):
+    """
+    Raised when a message from a WebSocket client can't be decoded by its codec
+    """
@@ -1,15 +1,22 @@
 """
-Module used to track and display  
+Module used to track and display
 """
 
+import asyncio
 import json
 from enum import StrEnum
-from multiprocessing import Manager
+from logging import DEBUG
 from types import NoneType
-from typing import Union, Dict
+from typing import AsyncIterator, List, Optional, Set, Tuple, Union, Dict
 
 from pilot_drive.master_logging.master_logger import MasterLogger
 
+from .constants import COALESCE_KEY_ATTRIBUTE, QueueBackends, DEFAULT_RING_CAPACITY
+from .exceptions import QueueFullException
+from .notifier import EventNotifier
+from .queue_backends import AbstractQueueBackend, ManagerQueueBackend
+from .shared_memory_ring import SharedMemoryRingBackend
+
 
 class EventType(StrEnum):
     """
@@ -24,35 +31,94 @@ class EventType(StrEnum):
     MEDIA = "media"
     WEB = "web"
     UPDATER = "updater"
+    LOGS = "logs"
+    HISTORY = "history"
+    ALERT = "alert"
+
+
+# Event types whose events are full state snapshots, so only the newest unsent one matters. Any
+# other event type is discrete (ie. an update result) and is always delivered.
+SNAPSHOT_EVENT_TYPES = {
+    EventType.BLUETOOTH,
+    EventType.SETTINGS,
+    EventType.PHONE,
+    EventType.SYSTEM,
+    EventType.VEHICLE,
+    EventType.MEDIA,
+}
 
 
 class MasterEventQueue:
     """
     The class that manages the master event queue. Services are passed the created MasterEventQueue
         object from the main loop, and use the push_event() method to add events to the queue. The
-        main loop will use the is_new_event() and pop_event() methods to handle new events.
+        main loop will use the listen() async iterator (or is_new_event() and get()) to handle new
+        events.
+
+    In coalescing mode, snapshot events (see SNAPSHOT_EVENT_TYPES) are last-value-wins: when
+        events are drained, only the newest pending event per event type and sub-key is returned.
+        Drained events keep their sub-key in COALESCE_KEY_ATTRIBUTE, so the broadcaster can tell
+        the snapshots of a type apart too.
     """
 
-    def __init__(self, logging: MasterLogger) -> None:
-        manager = Manager()
-        self.__queue = manager.Queue()
-        self.__new_event = manager.Value("i", 0)
-        self.__logging = logging
+    def __init__(
+        self,
+        logging: MasterLogger,
+        backend: QueueBackends = QueueBackends.MANAGER,
+        capacity: int = DEFAULT_RING_CAPACITY,
+        coalesce: bool = False,
+    ) -> None:
+        """
+        Initialize the master event queue
 
-    def push_event(self, event_type: EventType, event: str) -> None:
+        :param logging: an instance of the MasterLogger
+        :param backend: the QueueBackends member of the storage backend to use
+        :param capacity: the size in bytes of bounded backends (ie. the shared memory ring)
+        :param coalesce: drop snapshot events superseded by a newer pending one when draining
+        """
+        self.__logging = logging
+        self.__coalesce = coalesce
+        # Count of superseded events dropped per event type, only used in the main process
+        self.__coalesced: Dict[str, int] = {}
+        self.__queue: AbstractQueueBackend
+
+        match backend:
+            case QueueBackends.SHARED_MEMORY:
+                self.__queue = SharedMemoryRingBackend(capacity=capacity)
+            case _:
+                self.__queue = ManagerQueueBackend()
+
+        self.__notifier = EventNotifier()
+        # asyncio events of the listen() iterators currently waiting, only used in the main process
+        self.__waiters: Set[asyncio.Event] = set()
+
+    def push_event(
+        self, event_type: EventType, event: str, key: Optional[str] = None
+    ) -> None:
         """
         Used to push a new event to the Master Event Queue
 
         :param event_type: the event source, utilizing the EventType enum
         :param event: the dict of the event to be converted to JSON
+        :param key: an optional sub-key for coalescing, snapshot events of the same type only
+            supersede each other when their keys match
         """
 
         event = {"type": event_type, event_type: event}
+        if key is not None:
+            event[COALESCE_KEY_ATTRIBUTE] = key
 
-        self.__logging.debug(msg=f"New Event: {json.dumps(event)}")
+        # Only serialize the event for the log when it's actually logged
+        if self.__logging.is_enabled_for(DEBUG):
+            self.__logging.debug(msg=f"New Event: {json.dumps(event)}")
 
-        self.__queue.put(event)
-        self.__new_event.value = 1
+        try:
+            self.__queue.put(event)
+        except QueueFullException as err:
+            self.__logging.warning(msg=f"Dropped {event_type} event: {err}")
+            return
+
+        self.__notifier.notify()
 
     def get(self) -> Union[Dict, NoneType]:
         """
@@ -62,15 +128,103 @@ class MasterEventQueue:
             is empty.
         """
 
-        if self.__queue.empty():
-            return None
+        event = self.__queue.get()
+        if event is not None:
+            event.pop(COALESCE_KEY_ATTRIBUTE, None)
+        return event
+
+    @property
+    def coalesced(self) -> Dict[str, int]:
+        """
+        The number of snapshot events dropped by coalescing since the queue was created
+
+        :return: a dict of event type to the number of its events that were coalesced away
+        """
+        return dict(self.__coalesced)
+
+    def __coalesce_events(self, events: List[Dict]) -> List[Dict]:
+        """
+        Remove every snapshot event superseded by a newer event of the same type and key, keeping
+            the newest at its own position.
+
+        :param events: the events in the order they were pushed
+        :return: the remaining events, still in order
+        """
+        keys = []
+        newest: Dict[Tuple[str, Optional[str]], int] = {}
+        for index, event in enumerate(events):
+            key = None
+            if event["type"] in SNAPSHOT_EVENT_TYPES:
+                key = (event["type"], event.get(COALESCE_KEY_ATTRIBUTE))
+                newest[key] = index
+            keys.append(key)
+
+        remaining = []
+        for index, event in enumerate(events):
+            key = keys[index]
+            if key is not None and newest[key] != index:
+                self.__coalesced[event["type"]] = (
+                    self.__coalesced.get(event["type"], 0) + 1
+                )
+                continue
+            remaining.append(event)
+
+        return remaining
+
+    def drain(self, max_events: Optional[int] = None) -> List[Dict]:
+        """
+        Remove and return all pending events from the queue
 
-        queue_return = self.__queue.get()
+        :param max_events: optionally stop after this many events
+        :return: a list of event dicts, oldest first, with their coalescing sub-key if they were
+            pushed with one
+        """
+        events = []
+        while max_events is None or len(events) < max_events:
+            event = self.__queue.get()
+            if event is None:
+                break
+            events.append(event)
+
+        if self.__coalesce and len(events) > 1:
+            events = self.__coalesce_events(events=events)
 
-        if self.__queue.empty():
-            self.__new_event.value = 0
+        return events
 
-        return queue_return
+    def __wake_waiters(self) -> None:
+        """
+        The event loop reader callback for the notifier, wakes up every waiting listener
+        """
+        self.__notifier.clear()
+        for waiter in self.__waiters:
+            waiter.set()
+
+    async def listen(self) -> AsyncIterator[List[Dict]]:
+        """
+        Asynchronously iterate over batches of new events. Instead of polling, the iterator sleeps
+            until a producer notifies the queue, then yields every pending event at once.
+
+        :return: an async iterator of event lists, each holding at least one event
+        """
+        loop = asyncio.get_running_loop()
+        waiter = asyncio.Event()
+        waiter.set()  # Drain anything pushed before the listener started
+
+        if not self.__waiters:
+            loop.add_reader(self.__notifier.fileno(), self.__wake_waiters)
+        self.__waiters.add(waiter)
+
+        try:
+            while True:
+                await waiter.wait()
+                waiter.clear()
+                events = self.drain()
+                if events:
+                    yield events
+        finally:
+            self.__waiters.discard(waiter)
+            if not self.__waiters:
+                loop.remove_reader(self.__notifier.fileno())
 
     @property
     def is_new_event(self) -> bool:
@@ -80,4 +234,12 @@ class MasterEventQueue:
         :returns: boolean if there is a new event or not
         """
 
-        return not self.__new_event.value == 0
+        return not self.__queue.empty
+
+    def close(self) -> None:
+        """
+        Release the resources held by the queue's backend. Should only be called by the process that
+            created the queue, once all services have exited.
+        """
+        self.__queue.close()
+        self.__notifier.close()
@@ -0,0 +1,49 @@
+"""
+Cross process wakeup notifications for the master event queue
+"""
+
+import os
+
+
+class EventNotifier:
+    """
+    An eventfd based notifier. Producers in any process signal it after pushing an event, and the
+        consumer watches its file descriptor (ie. via asyncio's loop.add_reader) to be woken up
+        instead of polling. Like the queue it must be created before services are forked.
+    """
+
+    def __init__(self) -> None:
+        self.__fd = os.eventfd(0, os.EFD_NONBLOCK)
+
+    def fileno(self) -> int:
+        """
+        Get the file descriptor to watch, it becomes readable once notified
+
+        :return: the eventfd file descriptor
+        """
+        return self.__fd
+
+    def notify(self) -> None:
+        """
+        Signal that there are new events
+        """
+        try:
+            os.eventfd_write(self.__fd, 1)
+        except BlockingIOError:
+            pass  # The counter is saturated, the consumer is already being woken
+
+    def clear(self) -> None:
+        """
+        Reset the notifier, should be called before the consumer drains the queue so no
+            notification is lost
+        """
+        try:
+            os.eventfd_read(self.__fd)
+        except BlockingIOError:
+            pass  # Nothing was pending
+
+    def close(self) -> None:
+        """
+        Close the notifier's file descriptor
+        """
+        os.close(self.__fd)
@@ -0,0 +1,77 @@
+"""
+The storage backends that the MasterEventQueue can be built on
+"""
+
+from abc import ABC, abstractmethod
+from multiprocessing import Manager
+from types import NoneType
+from typing import Dict, Union
+
+
+class AbstractQueueBackend(ABC):
+    """
+    The abstract class used to implement master queue backends. Backends are created in the main
+        process before the services are forked, and must be usable from all of them.
+    """
+
+    @abstractmethod
+    def put(self, event: Dict) -> None:
+        """
+        Add an event to the backend
+
+        :param event: the event dict to be stored
+        :raises QueueFullException: if a bounded backend has no room for the event
+        """
+
+    @abstractmethod
+    def get(self) -> Union[Dict, NoneType]:
+        """
+        Remove and return the oldest event from the backend
+
+        :return: the event dict, or None if the backend is empty
+        """
+
+    @property
+    @abstractmethod
+    def empty(self) -> bool:
+        """
+        Check if the backend has no pending events
+
+        :return: True if there are no pending events, False if there are
+        """
+
+    def close(self) -> None:
+        """
+        Release any resources held by the backend. Only called by the process that created it.
+        """
+
+
+class ManagerQueueBackend(AbstractQueueBackend):
+    """
+    Backend built on a multiprocessing Manager queue. Every put/get is proxied through the
+        manager's server process.
+    """
+
+    def __init__(self) -> None:
+        manager = Manager()
+        self.__queue = manager.Queue()
+        self.__new_event = manager.Value("i", 0)
+
+    def put(self, event: Dict) -> None:
+        self.__queue.put(event)
+        self.__new_event.value = 1
+
+    def get(self) -> Union[Dict, NoneType]:
+        if self.__queue.empty():
+            return None
+
+        queue_return = self.__queue.get()
+
+        if self.__queue.empty():
+            self.__new_event.value = 0
+
+        return queue_return
+
+    @property
+    def empty(self) -> bool:
+        return self.__new_event.value == 0
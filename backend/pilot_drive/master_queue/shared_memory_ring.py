@@ -0,0 +1,215 @@
+"""
+A master queue backend built on a ring buffer in shared memory, avoiding the manager server
+process round trip that every Manager queue put/get costs.
+"""
+
+import json
+from multiprocessing import Lock
+from multiprocessing.shared_memory import SharedMemory
+from types import NoneType
+from typing import Dict, Union
+
+from .codecs import EncodedEvent
+from .constants import (
+    COALESCE_KEY_ATTRIBUTE,
+    DEFAULT_RING_CAPACITY,
+    DROPPED_OFFSET,
+    HEAD_OFFSET,
+    HEADER_FIELD,
+    HEADER_SIZE,
+    RECORD_ALIGNMENT,
+    RECORD_HEADER,
+    RECORD_KEY_SEPARATOR,
+    SEQUENCE_OFFSET,
+    TAIL_OFFSET,
+)
+from .exceptions import QueueFullException
+from .queue_backends import AbstractQueueBackend
+
+
+class SharedMemoryRingBackend(AbstractQueueBackend):
+    """
+    Fixed size byte ring of length prefixed, pre-serialized (JSON) events with sequence numbers.
+        Events are serialized once, the events read keep their JSON for the JSON codec to send.
+
+    The ring supports many producers and a single consumer. Producers serialize their event before
+        taking a lock (a semaphore living in shared memory, so no extra process is involved), and
+        only hold it while copying the record in. The consumer never takes the lock: it reads the
+        published head, and only writes the tail, which producers read to find free space.
+
+    A record is published by writing its payload, then its header, then moving the head. The
+        consumer additionally checks that the record's sequence number is the one it expects
+        before trusting the payload, so a partially visible record is treated as not ready yet.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_RING_CAPACITY) -> None:
+        """
+        Create the shared memory block for the ring
+
+        :param capacity: the size of the ring's data region in bytes, rounded up to the record
+            alignment
+        """
+        self.__capacity = -(-capacity // RECORD_ALIGNMENT) * RECORD_ALIGNMENT
+        self.__shm = SharedMemory(create=True, size=HEADER_SIZE + self.__capacity)
+        self.__buf = self.__shm.buf
+        self.__buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        self.__producer_lock = Lock()
+
+        # Consumer side state, only meaningful in the (single) consuming process
+        self.__next_read_seq = 0
+        self.gaps = 0
+
+    @property
+    def name(self) -> str:
+        """
+        The name of the shared memory block backing the ring
+        """
+        return self.__shm.name
+
+    @property
+    def capacity(self) -> int:
+        """
+        The size of the ring's data region in bytes
+        """
+        return self.__capacity
+
+    @property
+    def dropped(self) -> int:
+        """
+        The number of events dropped since creation because the ring was full
+        """
+        return self.__read_field(DROPPED_OFFSET)
+
+    def __read_field(self, offset: int) -> int:
+        return HEADER_FIELD.unpack_from(self.__buf, offset)[0]
+
+    def __write_field(self, offset: int, value: int) -> None:
+        HEADER_FIELD.pack_into(self.__buf, offset, value)
+
+    def __write(self, position: int, data: bytes) -> None:
+        """
+        Copy data into the ring, wrapping around the end of the data region if needed
+
+        :param position: the monotonic byte position to write at
+        :param data: the bytes to copy in
+        """
+        start = position % self.__capacity
+        first = min(len(data), self.__capacity - start)
+        self.__buf[HEADER_SIZE + start : HEADER_SIZE + start + first] = data[:first]
+        if first < len(data):
+            self.__buf[HEADER_SIZE : HEADER_SIZE + len(data) - first] = data[first:]
+
+    def __read(self, position: int, size: int) -> bytes:
+        """
+        Copy data out of the ring, wrapping around the end of the data region if needed
+
+        :param position: the monotonic byte position to read from
+        :param size: the number of bytes to read
+        :return: the bytes read
+        """
+        start = position % self.__capacity
+        first = min(size, self.__capacity - start)
+        data = bytes(self.__buf[HEADER_SIZE + start : HEADER_SIZE + start + first])
+        if first < size:
+            data += bytes(self.__buf[HEADER_SIZE : HEADER_SIZE + size - first])
+        return data
+
+    @staticmethod
+    def record_size(payload_size: int) -> int:
+        """
+        Get the number of ring bytes a payload occupies, including its header and padding
+
+        :param payload_size: the size of the serialized event
+        :return: the aligned record size
+        """
+        size = RECORD_HEADER.size + payload_size
+        return -(-size // RECORD_ALIGNMENT) * RECORD_ALIGNMENT
+
+    def put_bytes(self, payload: bytes) -> None:
+        """
+        Add a pre-serialized event to the ring
+
+        :param payload: the serialized event
+        :raises QueueFullException: if there is no room in the ring for the event
+        """
+        size = self.record_size(len(payload))
+        if size > self.__capacity:
+            raise QueueFullException(
+                f"Event of {len(payload)} bytes can never fit a ring of {self.__capacity} bytes!"
+            )
+
+        with self.__producer_lock:
+            head = self.__read_field(HEAD_OFFSET)
+            tail = self.__read_field(TAIL_OFFSET)
+            if head + size - tail > self.__capacity:
+                self.__write_field(
+                    DROPPED_OFFSET, self.__read_field(DROPPED_OFFSET) + 1
+                )
+                raise QueueFullException(
+                    f"Ring is full ({head - tail}/{self.__capacity} bytes used)!"
+                )
+
+            seq = self.__read_field(SEQUENCE_OFFSET)
+            self.__write(head + RECORD_HEADER.size, payload)
+            self.__write(head, RECORD_HEADER.pack(seq, len(payload)))
+            self.__write_field(SEQUENCE_OFFSET, seq + 1)
+            self.__write_field(HEAD_OFFSET, head + size)
+
+    def get_bytes(self) -> Union[bytes, NoneType]:
+        """
+        Remove and return the oldest serialized event from the ring. Must only be called from a
+            single consumer.
+
+        :return: the serialized event, or None if the ring is empty
+        """
+        tail = self.__read_field(TAIL_OFFSET)
+        if self.__read_field(HEAD_OFFSET) == tail:
+            return None
+
+        seq, length = RECORD_HEADER.unpack(self.__read(tail, RECORD_HEADER.size))
+        if seq < self.__next_read_seq:
+            # The record header isn't visible yet, check again on the next read
+            return None
+        if seq > self.__next_read_seq:
+            # Shouldn't happen as dropped events never get a sequence number, but never stall
+            self.gaps += seq - self.__next_read_seq
+
+        payload = self.__read(tail + RECORD_HEADER.size, length)
+        self.__next_read_seq = seq + 1
+        self.__write_field(TAIL_OFFSET, tail + self.record_size(length))
+        return payload
+
+    def put(self, event: Dict) -> None:
+        key = event.get(COALESCE_KEY_ATTRIBUTE)
+        if key is not None:
+            event = {
+                name: value
+                for name, value in event.items()
+                if name != COALESCE_KEY_ATTRIBUTE
+            }
+        self.put_bytes(
+            json.dumps(key).encode() + RECORD_KEY_SEPARATOR + json.dumps(event).encode()
+        )
+
+    def get(self) -> Union[EncodedEvent, NoneType]:
+        payload = self.get_bytes()
+        if payload is None:
+            return None
+
+        key, _, encoded = payload.partition(RECORD_KEY_SEPARATOR)
+        event = EncodedEvent(json.loads(encoded), encoded=encoded.decode())
+        key = json.loads(key)
+        if key is not None:
+            event[COALESCE_KEY_ATTRIBUTE] = key
+        return event
+
+    @property
+    def empty(self) -> bool:
+        return self.__read_field(HEAD_OFFSET) == self.__read_field(TAIL_OFFSET)
+
+    def close(self) -> None:
+        """
+        Detach from and remove the shared memory block
+        """
+        self.__shm.close()
+        self.__shm.unlink()
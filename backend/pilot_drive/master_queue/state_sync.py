@@ -0,0 +1,188 @@
+"""
+The versioned state sync protocol used for WebSocket clients that opt in to delta updates.
+
+Instead of every snapshot event, opted in clients receive JSON Patch (RFC 6902) style deltas of a
+topic's state, each with a per topic sequence number. The first event of a topic, and any
+snapshot a client requests after detecting a gap, is sent whole along with its sequence number.
+Snapshot events pushed with a coalescing sub-key are separate topics of their event type, their
+messages carry the sub-key.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Tuple
+
+from .constants import COALESCE_KEY_ATTRIBUTE, PATCH_MESSAGE_TYPE
+from .master_event_queue import SNAPSHOT_EVENT_TYPES
+
+
+def escape_pointer(token: str) -> str:
+    """
+    Escape a key for use as a JSON Pointer (RFC 6901) reference token
+
+    :param token: the dict key
+    :return: the escaped reference token
+    """
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def unescape_pointer(token: str) -> str:
+    """
+    Unescape a JSON Pointer (RFC 6901) reference token
+
+    :param token: the escaped reference token
+    :return: the dict key
+    """
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict]:
+    """
+    Create the patch operations that turn one JSON compatible value into another. Dicts are
+        compared key by key and lists of the same length item by item, a list that changes length
+        is replaced whole.
+
+    :param old: the previously sent value
+    :param new: the new value
+    :param path: the JSON Pointer of the values, the document root by default
+    :return: a list of "add", "remove" and "replace" operations, empty if nothing changed
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        operations = []
+        for key in old:
+            if key not in new:
+                operations.append(
+                    {"op": "remove", "path": f"{path}/{escape_pointer(key)}"}
+                )
+        for key, value in new.items():
+            key_path = f"{path}/{escape_pointer(key)}"
+            if key not in old:
+                operations.append({"op": "add", "path": key_path, "value": value})
+            else:
+                operations.extend(diff(old=old[key], new=value, path=key_path))
+        return operations
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        operations = []
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            operations.extend(diff(old=old_item, new=new_item, path=f"{path}/{index}"))
+        return operations
+
+    # Compare types too, as True == 1 but they aren't the same JSON value
+    if type(old) is type(new) and old == new:
+        return []
+
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply_patch(document: Any, operations: List[Dict]) -> Any:
+    """
+    Apply patch operations created by diff() to a document, the reference for how UI clients
+        handle patches.
+
+    :param document: the value to patch, it isn't modified
+    :param operations: the patch operations
+    :return: the patched value
+    """
+    document = copy.deepcopy(document)
+    for operation in operations:
+        tokens = [unescape_pointer(token) for token in operation["path"].split("/")[1:]]
+        if not tokens:
+            document = operation["value"]
+            continue
+
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token) if isinstance(parent, list) else token]
+
+        last = int(tokens[-1]) if isinstance(parent, list) else tokens[-1]
+        if operation["op"] == "remove":
+            del parent[last]
+        else:
+            parent[last] = operation["value"]
+
+    return document
+
+
+class StateSync:
+    """
+    Keeps the last sent state and sequence number of every snapshot topic (event type and
+        coalescing sub-key), turning new snapshot events into the messages sent to clients that
+        opted in to delta updates.
+    """
+
+    def __init__(self) -> None:
+        self.__states: Dict[Tuple[str, Optional[str]], Tuple[int, Any]] = {}
+
+    @property
+    def topics(self) -> List[str]:
+        """
+        The topics (event types) that have a known state
+        """
+        return list(dict.fromkeys(topic for topic, _ in self.__states))
+
+    def snapshot(self, topic: str, key: Optional[str] = None) -> Optional[Dict]:
+        """
+        Get a full snapshot message of a topic's current state
+
+        :param topic: the topic (event type) of the snapshot
+        :param key: the coalescing sub-key of the snapshot, if its events were pushed with one
+        :return: the snapshot message, or None if the topic has no state yet
+        """
+        if (topic, key) not in self.__states:
+            return None
+
+        seq, state = self.__states[(topic, key)]
+        snapshot = {"type": topic, topic: state, "seq": seq}
+        if key is not None:
+            snapshot[COALESCE_KEY_ATTRIBUTE] = key
+        return snapshot
+
+    def snapshots(self, topic: str) -> List[Dict]:
+        """
+        Get the full snapshot messages of a topic's current state, one per coalescing sub-key
+
+        :param topic: the topic (event type) of the snapshots
+        :return: the snapshot messages, empty if the topic has no state yet
+        """
+        return [
+            self.snapshot(topic=topic, key=key)
+            for state_topic, key in list(self.__states)
+            if state_topic == topic
+        ]
+
+    def update(
+        self, event: Dict, key: Optional[str] = None, track_only: bool = False
+    ) -> Optional[Dict]:
+        """
+        Record a new event, and create the message sent to delta clients for it
+
+        :param event: the event dict drained from the master queue, without its sub-key
+        :param key: the coalescing sub-key the event was pushed with, if any
+        :param track_only: only record the new state, as no delta client needs the message
+        :return: a patch message, a snapshot message if the topic had no state, the event itself
+            if it isn't a snapshot event, or None if the state didn't change
+        """
+        topic = event["type"]
+        if topic not in SNAPSHOT_EVENT_TYPES:
+            return event
+
+        state = event.get(topic)
+        previous = self.__states.get((topic, key))
+        if previous is None:
+            self.__states[(topic, key)] = (0, state)
+            return self.snapshot(topic=topic, key=key)
+
+        seq, previous_state = previous
+        if track_only:
+            self.__states[(topic, key)] = (seq + 1, state)
+            return None
+
+        operations = diff(old=previous_state, new=state)
+        if not operations:
+            return None
+
+        self.__states[(topic, key)] = (seq + 1, state)
+        patch = {"topic": topic, "seq": seq + 1, "ops": operations}
+        if key is not None:
+            patch[COALESCE_KEY_ATTRIBUTE] = key
+        return {"type": PATCH_MESSAGE_TYPE, PATCH_MESSAGE_TYPE: patch}
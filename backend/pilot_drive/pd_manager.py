@@ -3,14 +3,24 @@ The main PILOT Drive module that contains the class that starts the services and
 websockets logic.
 """
 
-import json
 from multiprocessing import Process
-from typing import Callable, Dict, Generic, List, Tuple, TypeVar
+from threading import Thread
+from typing import Callable, Dict, Generic, TypeVar, Union
 import asyncio
 import websockets
 
 from pilot_drive.master_logging.master_logger import MasterLogger
-from pilot_drive.master_queue import MasterEventQueue, EventType
+from pilot_drive.master_queue import MasterEventQueue, EventType, QueueBackends
+from pilot_drive.master_queue.broadcaster import EventBroadcaster
+from pilot_drive.master_queue.codecs import (
+    AbstractEventCodec,
+    JsonCodec,
+    get_codec,
+    select_subprotocol,
+)
+from pilot_drive.master_queue.constants import SlowConsumerPolicies, SYNC_MESSAGE_TYPE
+from pilot_drive.master_queue.exceptions import EventDecodeException
+from pilot_drive.runtime import RuntimeModes, ServiceSupervisor
 from pilot_drive.web import Web
 from pilot_drive.services import (
     Settings,
@@ -46,35 +56,114 @@ class PilotDrive:
         """
 
         # Logging initialization
-        try:
-            log_settings = Settings.get_raw_settings()["logging"]
-        except FailedToReadSettingsException:
-            log_settings = constants.DEFAULT_LOG_SETTINGS
+        log_settings = self.__get_raw_setting(
+            attribute="logging", default=constants.DEFAULT_LOG_SETTINGS
+        )
 
         self.logging = MasterLogger(log_settings=log_settings)
-        self.logger_proc = Process(target=self.logging.main, daemon=True)
-        self.logger_proc.start()
+        self.logging.start()
 
         # Queue initialization
-        self.master_queue = MasterEventQueue(logging=self.logging)
+        queue_settings = self.__get_raw_setting(
+            attribute="queue", default=constants.DEFAULT_QUEUE_SETTINGS
+        )
+        try:
+            queue_backend = QueueBackends(queue_settings["backend"])
+        except (KeyError, ValueError):
+            self.logging.error(
+                msg=f'Invalid queue backend "{queue_settings.get("backend")}", '
+                f'defaulting to "{QueueBackends.MANAGER}"!'
+            )
+            queue_backend = QueueBackends.MANAGER
+
+        self.master_queue = MasterEventQueue(
+            logging=self.logging,
+            backend=queue_backend,
+            capacity=queue_settings.get(
+                "capacity", constants.DEFAULT_QUEUE_SETTINGS["capacity"]
+            ),
+            coalesce=queue_settings.get(
+                "coalesce", constants.DEFAULT_QUEUE_SETTINGS["coalesce"]
+            ),
+        )
 
-        # Sevice initialization
-        self.__services: List[Tuple[AbstractService, Process]] = []
+        # WebSocket broadcaster initialization
+        websocket_settings = self.__get_raw_setting(
+            attribute="websocket", default=constants.DEFAULT_WEBSOCKET_SETTINGS
+        )
+        try:
+            slow_consumer_policy = SlowConsumerPolicies(
+                websocket_settings["slowConsumerPolicy"]
+            )
+        except (KeyError, ValueError):
+            self.logging.error(
+                msg="Invalid slow consumer policy "
+                f'"{websocket_settings.get("slowConsumerPolicy")}", '
+                f'defaulting to "{SlowConsumerPolicies.DROP_OLDEST}"!'
+            )
+            slow_consumer_policy = SlowConsumerPolicies.DROP_OLDEST
+
+        self.broadcaster = EventBroadcaster(
+            master_queue=self.master_queue,
+            logging=self.logging,
+            outbox_size=websocket_settings.get(
+                "outboxSize", constants.DEFAULT_WEBSOCKET_SETTINGS["outboxSize"]
+            ),
+            policy=slow_consumer_policy,
+        )
+
+        # Runtime initialization, settings missing from an older settings file use the defaults
+        runtime_settings = {
+            **constants.DEFAULT_RUNTIME_SETTINGS,
+            **self.__get_raw_setting(
+                attribute="runtime", default=constants.DEFAULT_RUNTIME_SETTINGS
+            ),
+        }
+        try:
+            runtime_mode = RuntimeModes(runtime_settings["mode"])
+        except ValueError:
+            self.logging.error(
+                msg=f'Invalid runtime mode "{runtime_settings["mode"]}", '
+                f'defaulting to "{RuntimeModes.PROCESS}"!'
+            )
+            runtime_mode = RuntimeModes.PROCESS
+
+        self.logging.info(msg=f'Running services in "{runtime_mode}" mode')
+        self.supervisor = ServiceSupervisor(
+            mode=runtime_mode,
+            master_queue=self.master_queue,
+            logger=self.logging,
+            runtime_settings=runtime_settings,
+        )
+
+        # The cover art cache is written by the media service and served by the web server
+        cover_art_settings = {
+            **constants.DEFAULT_COVER_ART_SETTINGS,
+            **self.__get_raw_setting(attribute="media", default={}).get("coverArt", {}),
+        }
 
+        # Sevice initialization
         self.web = Web(
             logger=self.logging,
             port=constants.STATIC_WEB_PORT,
             relative_directory=constants.STATIC_WEB_PATH,
+            covers_directory=(
+                cover_art_settings["path"] if cover_art_settings["enabled"] else None
+            ),
         )
-        web_process = Process(target=self.web.main, daemon=True)
-        web_process.start()
+        if runtime_mode == RuntimeModes.TASK:
+            Thread(target=self.web.main, daemon=True).start()
+        else:
+            Process(target=self.web.main, daemon=True).start()
 
         self.settings: Settings = self.service_factory(service=Settings)
         self.updater: Updater = self.service_factory(
             service=Updater, settings=self.settings
         )
         self.bluetooth: Bluetooth = self.service_factory(service=Bluetooth)
-        self.media: Media = self.service_factory(service=Media)
+        self.media: Media = self.service_factory(
+            service=Media, cover_art_settings=cover_art_settings
+        )
 
         if self.settings.get_setting("phone")["enabled"]:
             self.phone: Phone = self.service_factory(
@@ -95,9 +184,26 @@ class PilotDrive:
         self.service_msg_handlers: Dict[str, Callable] = {
             EventType.SETTINGS: self.settings.set_web_settings,
             EventType.MEDIA: self.media.track_control,
-            EventType.UPDATER: self.updater.handler
+            EventType.UPDATER: self.updater.handler,
             # EventType.BLUETOOTH: self.bluetooth.handler
         }
+        if self.settings.get_setting("vehicle")["enabled"]:
+            self.service_msg_handlers[EventType.VEHICLE] = self.vehicle.handler
+
+    @staticmethod
+    def __get_raw_setting(attribute: str, default: dict) -> dict:
+        """
+        Read a settings block before the Settings service exists, falling back to its defaults if
+            the settings file or the block is missing.
+
+        :param attribute: the top level settings attribute to read
+        :param default: the value to use when the attribute can't be read
+        :return: the settings block
+        """
+        try:
+            return Settings.get_raw_settings()[attribute]
+        except (FailedToReadSettingsException, KeyError):
+            return default
 
     T = TypeVar("T", bound=AbstractService)
 
@@ -125,10 +231,7 @@ class PilotDrive:
                 **kwargs,
             )
 
-            service_process = Process(target=new_service.main, daemon=True)
-            service_process.start()
-
-            self.__services.append((new_service, service_process))
+            self.supervisor.start(service=new_service)
 
             return new_service
 
@@ -152,20 +255,54 @@ class PilotDrive:
         self.settings.refresh()
         self.bluetooth.refresh()
         self.updater.refresh()
+        self.supervisor.refresh()
+
+    def handle_sync(self, websocket, request: dict) -> None:
+        """
+        The handler for state sync messages from the UI client, topics that have never been sent
+            are refreshed so their snapshot follows as soon as the services push it.
 
-    def handle_message(self, message: str) -> None:
+        :param websocket: the WebSocket the UI is connected to
+        :param request: the content of the sync message
+        """
+        missing = self.broadcaster.sync_request(websocket=websocket, request=request)
+        if missing:
+            self.logging.debug(
+                msg=f"No state to snapshot yet for: {missing}, refreshing services"
+            )
+            self.refresh()
+
+    def handle_message(
+        self,
+        message: Union[str, bytes],
+        websocket=None,
+        codec: AbstractEventCodec = None,
+    ) -> None:
         """
         The handler for when a new WebSocket event recieved from the UI client
 
-        :params message: the event in from the UI, recieved as a JSON string to be converted to a
-            dict
+        :params message: the event in from the UI, recieved as a JSON string (or in the format of
+            the negotiated codec) to be converted to a dict
+        :param websocket: the WebSocket the message came from, needed for state sync and logs
+            messages
+        :param codec: the codec negotiated by the client, JSON by default
         """
         if message:
             try:
-                message_in = json.loads(s=message)
-            except json.JSONDecodeError as err:
+                message_in = (codec or JsonCodec()).decode(message=message)
+            except EventDecodeException as err:
                 self.logging.error(
-                    msg=f'Failed to decode recieved websocket message "{message}": {err}'
+                    msg=f"Failed to decode recieved websocket message: {err}"
+                )
+                return
+            if message_in.get("type") == SYNC_MESSAGE_TYPE:
+                self.handle_sync(
+                    websocket=websocket, request=message_in.get(SYNC_MESSAGE_TYPE, {})
+                )
+                return
+            if message_in.get("type") == EventType.LOGS:
+                self.broadcaster.logs_request(
+                    websocket=websocket, request=message_in.get(EventType.LOGS, {})
                 )
                 return
             try:
@@ -187,67 +324,88 @@ class PilotDrive:
 
         :param websocket: the WebSocket the UI is connected to
         """
+        codec = get_codec(subprotocol=websocket.subprotocol)
         while True:
             try:
                 message = await websocket.recv()
-                self.handle_message(message=message)
-            except websockets.exceptions.ConnectionClosedOK:
+                self.handle_message(message=message, websocket=websocket, codec=codec)
+            except websockets.exceptions.ConnectionClosed:
                 break
 
     async def producer(self, websocket) -> None:
         """
-        The producer used when new events need to be pushed to the UI via WebSocket
+        The producer used when new events need to be pushed to the UI via WebSocket. Events are
+            drained from the master queue once by the broadcaster, this sends the client's share.
 
         :param websocket: the WebSocket the UI is connected to
         """
-        self.refresh()  # When the app is started/UI is refreshed, send a settings event on the bus
-        while True:
-            try:
-                if self.master_queue.is_new_event:
-                    event = self.master_queue.get()
-                    await websocket.send(json.dumps(event))
-                await asyncio.sleep(0.05)
-            except websockets.exceptions.ConnectionClosedOK:
-                break
+        outbox = self.broadcaster.register(websocket=websocket)
+        try:
+            # When the app is started/UI is refreshed, send a settings event on the bus
+            self.refresh()
+            await outbox.run()
+        finally:
+            self.broadcaster.unregister(websocket=websocket)
 
     async def handler(self, websocket) -> None:
         """
-        The handler used for the WebSocket connection, creates consumer and producer tasks
+        The handler used for the WebSocket connection, creates consumer and producer tasks. When
+            either one finishes the connection is over, and the other is cancelled.
 
         :param websocket: the WebSocket the UI is connected to
         """
-        await asyncio.gather(
-            self.consumer(websocket=websocket), self.producer(websocket=websocket)
-        )
+        tasks = [
+            asyncio.create_task(self.consumer(websocket=websocket)),
+            asyncio.create_task(self.producer(websocket=websocket)),
+        ]
+        _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
 
     async def main(self) -> None:
         """
         The main method to be run, handles the WebSocket connection to the UI
         """
+        loop = asyncio.get_running_loop()
+
+        def publish_logs(records: list) -> None:
+            # Records are output by the logger's listener thread, and broadcast from the loop
+            loop.call_soon_threadsafe(self.broadcaster.broadcast_logs, records)
+
+        self.logging.subscribe(callback=publish_logs)
         try:
             self.logging.info(msg="Initializing PILOT Drive main loop!")
             # pylint: disable=no-member
-            async with websockets.serve(self.handler, "", constants.WS_PORT):
+            async with websockets.serve(
+                self.handler,
+                "",
+                constants.WS_PORT,
+                select_subprotocol=select_subprotocol,
+            ):
                 self.logging.info(msg="Starting WebSocket server!")
-                await asyncio.Future()  # run forever
+                # A single task drains the master queue for every connected client, next to
+                # the supervisor watching the services
+                await asyncio.gather(
+                    self.broadcaster.run(), self.supervisor.run()
+                )  # run forever
         except asyncio.CancelledError:
             self.logging.info(
                 msg="SIGINT/SIGTERM recieved, terminating websocket server!"
             )
+        finally:
+            self.logging.unsubscribe(callback=publish_logs)
 
     def terminate(self, signum, frame):
         """
-        Cleanly terminates each process and calls it's cleanup method
+        Cleanly terminates each process and calls it's cleanup method. Services are stopped in
+            the reverse order they were started, then the master queue and the logger.
         """
         self.logging.info(
             msg=f'Recieved signal: "{signum}" with frame "{frame}", terminating!'
         )
 
-        for service in self.__services:
-            service_obj, process = service
-            self.logging.debug(msg=f"Terminating: {service_obj} process")
-            process.terminate()
-            process.join()
+        self.supervisor.terminate()
+
+        self.master_queue.close()
 
-        self.logger_proc.terminate()
-        self.logger_proc.join()
+        self.logging.stop()
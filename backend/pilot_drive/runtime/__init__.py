@@ -0,0 +1,8 @@
+# pylint: disable=missing-module-docstring
+from .constants import RuntimeModes, RestartPolicies, ServiceStates
+from .service_runners import (
+    AbstractServiceRunner,
+    ProcessServiceRunner,
+    TaskServiceRunner,
+)
+from .supervisor import ServiceSupervisor
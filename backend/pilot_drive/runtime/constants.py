@@ -0,0 +1,39 @@
+"""
+Constants of the service runtime
+"""
+
+from enum import StrEnum
+
+
+class RuntimeModes(StrEnum):
+    """
+    The ways services can be run
+    """
+
+    PROCESS = "process"
+    TASK = "task"
+
+
+class RestartPolicies(StrEnum):
+    """
+    When the supervisor restarts a service that exited
+    """
+
+    ALWAYS = "always"
+    ON_FAILURE = "on-failure"
+    NEVER = "never"
+
+
+class ServiceStates(StrEnum):
+    """
+    The states of a supervised service, as reported in system events
+    """
+
+    RUNNING = "running"
+    RESTARTING = "restarting"
+    STOPPED = "stopped"
+    CRASH_LOOP = "crash-loop"
+
+
+# Seconds a terminated service process gets to exit before it's killed
+TERMINATE_TIMEOUT = 5
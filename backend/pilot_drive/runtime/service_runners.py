@@ -0,0 +1,222 @@
+"""
+The runners that run PILOT Drive's services, either each in its own process or all as tasks of
+the main event loop.
+"""
+
+import asyncio
+import signal
+import sys
+from abc import ABC, abstractmethod
+from multiprocessing import Process
+from typing import Callable, Dict, Optional, Tuple, TYPE_CHECKING
+
+from pilot_drive.master_logging.master_logger import MasterLogger
+
+from .constants import TERMINATE_TIMEOUT
+
+# Importing the services package at runtime would import every service
+if TYPE_CHECKING:
+    from pilot_drive.services import AbstractService
+
+# Called with the service, a description of why it exited and whether it failed
+ExitCallback = Callable[["AbstractService", str, bool], None]
+
+
+def describe_exit_code(exitcode: int) -> str:
+    """
+    Describe the exit code of a service process
+
+    :param exitcode: the Process.exitcode of the exited process
+    :return: the exit reason
+    """
+    if exitcode == 0:
+        return "exited"
+    if exitcode > 0:
+        return f"exited with code {exitcode}"
+    try:
+        return f"killed by {signal.Signals(-exitcode).name}"
+    except ValueError:
+        return f"killed by signal {-exitcode}"
+
+
+def run_service_process(service: "AbstractService") -> None:
+    """
+    The target of a service process. SIGTERM exits the process like an exception, so the service
+        is stopped before the process ends.
+
+    :param service: the service instance to run
+    """
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        service.main()
+    finally:
+        service.stop()
+
+
+class AbstractServiceRunner(ABC):
+    """
+    The abstract class of service runners
+    """
+
+    def __init__(self, logger: MasterLogger, on_exit: Optional[ExitCallback] = None):
+        """
+        Initialize the runner
+
+        :param logger: an instance of the MasterLogger
+        :param on_exit: called when a service exits on its own, once run() has been awaited
+        """
+        self.logger = logger
+        self.on_exit = on_exit
+
+    @abstractmethod
+    def start(self, service: "AbstractService") -> None:
+        """
+        Start running a service, also used to restart a service that exited
+
+        :param service: the service instance to run
+        """
+
+    @abstractmethod
+    async def run(self) -> None:
+        """
+        Awaited once the main event loop runs, from then on exits are reported to on_exit
+        """
+
+    @abstractmethod
+    def terminate(self) -> None:
+        """
+        Stop every service, in the reverse order they were first started
+        """
+
+
+class ProcessServiceRunner(AbstractServiceRunner):
+    """
+    Runs the main() method of every service in its own process
+    """
+
+    def __init__(self, logger: MasterLogger, on_exit: Optional[ExitCallback] = None):
+        super().__init__(logger=logger, on_exit=on_exit)
+        self.__services: Dict[str, Tuple["AbstractService", Process]] = {}
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __watch(self, service: "AbstractService", process: Process) -> None:
+        """
+        Watch a service process, its sentinel becomes readable once it exits
+
+        :param service: the service instance
+        :param process: the process running the service
+        """
+        self.__loop.add_reader(process.sentinel, self.__exited, service, process)
+
+    def __exited(self, service: "AbstractService", process: Process) -> None:
+        """
+        Reap an exited service process and report it
+
+        :param service: the service instance
+        :param process: the exited process
+        """
+        self.__loop.remove_reader(process.sentinel)
+        process.join()
+        if self.on_exit:
+            self.on_exit(
+                service, describe_exit_code(process.exitcode), process.exitcode != 0
+            )
+
+    def start(self, service: "AbstractService") -> None:
+        service_process = Process(
+            target=run_service_process,
+            args=(service,),
+            name=f"{service.service_type}-service",
+            daemon=True,
+        )
+        service_process.start()
+
+        self.__services[service.service_type] = (service, service_process)
+        if self.__loop:
+            self.__watch(service=service, process=service_process)
+
+    async def run(self) -> None:
+        """
+        Start watching the service processes, which run on their own
+        """
+        self.__loop = asyncio.get_running_loop()
+        for service, process in self.__services.values():
+            self.__watch(service=service, process=process)
+
+    def terminate(self) -> None:
+        for service, process in reversed(self.__services.values()):
+            self.logger.debug(msg=f"Terminating: {service} process")
+            if self.__loop and not self.__loop.is_closed():
+                self.__loop.remove_reader(process.sentinel)
+
+            process.terminate()
+            process.join(timeout=TERMINATE_TIMEOUT)
+            if process.is_alive():
+                self.logger.warning(
+                    msg=f"The {service.service_type} service didn't exit, killing it!"
+                )
+                process.kill()
+                process.join()
+
+
+class TaskServiceRunner(AbstractServiceRunner):
+    """
+    Runs every service as a task of the main event loop, by awaiting the service's run() method.
+        Services with a blocking main() run it in a thread, and services that have nothing to run
+        return right away, so no interpreter is duplicated per service.
+    """
+
+    def __init__(self, logger: MasterLogger, on_exit: Optional[ExitCallback] = None):
+        super().__init__(logger=logger, on_exit=on_exit)
+        self.__services: Dict[str, "AbstractService"] = {}
+        self.__tasks: Dict[str, asyncio.Task] = {}
+        self.__running = False
+
+    def start(self, service: "AbstractService") -> None:
+        """
+        Add a service to run, as services are created before the event loop runs their tasks are
+            created once run() is awaited.
+
+        :param service: the service instance to run
+        """
+        self.__services[service.service_type] = service
+        if self.__running:
+            self.__tasks[service.service_type] = asyncio.create_task(
+                self.__run_service(service=service)
+            )
+
+    async def __run_service(self, service: "AbstractService") -> None:
+        """
+        Run a single service, an exception is logged and reported instead of taking the other
+            services down
+
+        :param service: the service instance to run
+        """
+        try:
+            await service.run()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.logger.error(msg=f"The {service.service_type} service failed: {exc}")
+            reason, failed = f"raised {type(exc).__name__}: {exc}", True
+        else:
+            reason, failed = "exited", False
+
+        if self.on_exit:
+            self.on_exit(service, reason, failed)
+
+    async def run(self) -> None:
+        """
+        Create the tasks of every service added so far
+        """
+        self.__running = True
+        for service in self.__services.values():
+            self.start(service=service)
+
+    def terminate(self) -> None:
+        """
+        Cancel the service tasks and stop the services. Threads of blocking services are daemons,
+            and end with the main process.
+        """
+        for service_type, task in reversed(self.__tasks.items()):
+            self.logger.debug(msg=f"Terminating: {service_type} task")
+            task.cancel()
+            self.__services[service_type].stop()
@@ -0,0 +1,210 @@
+"""
+The service supervisor, restarts services that exit and reports their health to the UI
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, TYPE_CHECKING
+
+from pilot_drive.master_logging.master_logger import MasterLogger
+from pilot_drive.master_queue import EventType, MasterEventQueue
+
+from .constants import RestartPolicies, RuntimeModes, ServiceStates
+from .service_runners import (
+    AbstractServiceRunner,
+    ProcessServiceRunner,
+    TaskServiceRunner,
+)
+
+# Importing the services package at runtime would import every service
+if TYPE_CHECKING:
+    from pilot_drive.services import AbstractService
+
+
+@dataclass
+class ServiceHealth:  # pylint: disable=too-many-instance-attributes
+    """
+    The health of a single supervised service
+    """
+
+    service: "AbstractService"
+    state: ServiceStates = ServiceStates.RUNNING
+    started: float = field(default_factory=time.time)
+    restarts: int = 0
+    last_exit: Optional[str] = None
+    # Consecutive failures, reset once the service stays up for the crash loop window
+    failures: int = 0
+    # Monotonic times of recent failures, used to detect crash loops
+    failure_times: Deque[float] = field(default_factory=deque)
+    restart_handle: Optional[asyncio.TimerHandle] = None
+
+    def to_event(self) -> dict:
+        """
+        Get the health as sent to the UI in the system event
+
+        :return: the health dict
+        """
+        running = self.state == ServiceStates.RUNNING
+        return {
+            "name": str(self.service.service_type),
+            "state": str(self.state),
+            "startedAt": self.started if running else None,
+            "uptime": round(time.time() - self.started, 1) if running else 0,
+            "restarts": self.restarts,
+            "lastExit": self.last_exit,
+        }
+
+
+class ServiceSupervisor:  # pylint: disable=too-many-instance-attributes
+    """
+    Runs the services with the runner of the runtime mode, restarting the ones that exit based on
+        their restart policy with an exponential backoff, and giving up on services stuck in a
+        crash loop. Every change is published to the UI as a system event.
+    """
+
+    def __init__(
+        self,
+        mode: RuntimeModes,
+        master_queue: MasterEventQueue,
+        logger: MasterLogger,
+        runtime_settings: dict,
+    ) -> None:
+        """
+        Initialize the supervisor
+
+        :param mode: the RuntimeModes member used to run the services
+        :param master_queue: the master event queue system events are pushed to
+        :param logger: an instance of the MasterLogger
+        :param runtime_settings: the "runtime" settings block, see DEFAULT_RUNTIME_SETTINGS
+        """
+        self.__master_queue = master_queue
+        self.__logger = logger
+        self.__backoff = runtime_settings["restartBackoff"]
+        self.__max_backoff = runtime_settings["maxRestartBackoff"]
+        self.__crash_loop_restarts = runtime_settings["crashLoopRestarts"]
+        self.__crash_loop_window = runtime_settings["crashLoopWindow"]
+
+        self.__health: Dict[str, ServiceHealth] = {}
+        self.__terminating = False
+
+        match mode:
+            case RuntimeModes.TASK:
+                self.runner: AbstractServiceRunner = TaskServiceRunner(
+                    logger=logger, on_exit=self.__exited
+                )
+            case _:
+                self.runner = ProcessServiceRunner(logger=logger, on_exit=self.__exited)
+
+    @property
+    def health(self) -> Dict[str, ServiceHealth]:
+        """
+        The health of every supervised service, by service type
+        """
+        return self.__health
+
+    def start(self, service: "AbstractService") -> None:
+        """
+        Start supervising and running a service
+
+        :param service: the service instance to run
+        """
+        self.__health[service.service_type] = ServiceHealth(service=service)
+        self.runner.start(service=service)
+
+    def refresh(self) -> None:
+        """
+        Push the health of every service to the master queue
+        """
+        self.__master_queue.push_event(
+            event_type=EventType.SYSTEM,
+            event={
+                "services": [health.to_event() for health in self.__health.values()]
+            },
+        )
+
+    def __exited(self, service: "AbstractService", reason: str, failed: bool) -> None:
+        """
+        Handle a service that exited, scheduling its restart if the restart policy allows
+
+        :param service: the service instance that exited
+        :param reason: why the service exited
+        :param failed: whether the service exited with an error
+        """
+        if self.__terminating:
+            return
+
+        health = self.__health[service.service_type]
+        health.last_exit = reason
+        policy = getattr(service, "restart_policy", RestartPolicies.ON_FAILURE)
+
+        if policy == RestartPolicies.NEVER or (
+            policy == RestartPolicies.ON_FAILURE and not failed
+        ):
+            self.__logger.info(msg=f"The {service.service_type} service {reason}.")
+            health.state = ServiceStates.STOPPED
+            self.refresh()
+            return
+
+        now = time.monotonic()
+        # A service that stayed up for the whole window isn't crash looping anymore
+        if time.time() - health.started >= self.__crash_loop_window:
+            health.failures = 0
+        health.failures += 1
+        health.failure_times.append(now)
+        while health.failure_times[0] < now - self.__crash_loop_window:
+            health.failure_times.popleft()
+
+        if len(health.failure_times) > self.__crash_loop_restarts:
+            self.__logger.error(
+                msg=f"The {service.service_type} service {reason}, and failed "
+                f"{len(health.failure_times)} times in {self.__crash_loop_window}s. "
+                "It won't be restarted!"
+            )
+            health.state = ServiceStates.CRASH_LOOP
+            self.refresh()
+            return
+
+        backoff = min(self.__backoff * 2 ** (health.failures - 1), self.__max_backoff)
+        self.__logger.warning(
+            msg=f"The {service.service_type} service {reason}, restarting in {backoff}s."
+        )
+        health.state = ServiceStates.RESTARTING
+        health.restart_handle = asyncio.get_running_loop().call_later(
+            backoff, self.__restart, health
+        )
+        self.refresh()
+
+    def __restart(self, health: ServiceHealth) -> None:
+        """
+        Restart a service once its backoff is over
+
+        :param health: the health of the service to restart
+        """
+        health.restart_handle = None
+        if self.__terminating:
+            return
+
+        health.restarts += 1
+        health.started = time.time()
+        health.state = ServiceStates.RUNNING
+        self.runner.start(service=health.service)
+        self.refresh()
+
+    async def run(self) -> None:
+        """
+        Start watching the services, awaited once the main event loop runs
+        """
+        await self.runner.run()
+        self.refresh()
+
+    def terminate(self) -> None:
+        """
+        Stop restarting services, then stop them in the reverse order they were started
+        """
+        self.__terminating = True
+        for health in self.__health.values():
+            if health.restart_handle:
+                health.restart_handle.cancel()
+        self.runner.terminate()
@@ -0,0 +1,44 @@
+"""
+Helpers used to run blocking work from the event loop of the task runtime
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable
+
+
+async def run_in_daemon_thread(func: Callable[[], Any], name: str) -> Any:
+    """
+    Run a blocking function in its own daemon thread, and wait for it to return. Unlike
+        loop.run_in_executor(), the thread never blocks the interpreter from exiting, as service
+        main loops don't return on their own.
+
+    :param func: the function to run
+    :param name: the name of the thread
+    :return: the value returned by the function
+    :raises: any exception raised by the function
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def set_result(result: Any) -> None:
+        if not future.done():
+            future.set_result(result)
+
+    def set_exception(exc: BaseException) -> None:
+        if not future.done():
+            future.set_exception(exc)
+
+    def target() -> None:
+        try:
+            callback, value = set_result, func()
+        except BaseException as exc:  # pylint: disable=broad-exception-caught
+            callback, value = set_exception, exc
+
+        try:
+            loop.call_soon_threadsafe(callback, value)
+        except RuntimeError:  # The event loop was closed while the function ran
+            pass
+
+    threading.Thread(target=target, name=name, daemon=True).start()
+    return await future
@@ -6,6 +6,10 @@ from abc import ABC, abstractmethod
 from typing import Optional
 from pilot_drive.master_queue import MasterEventQueue, EventType
 from pilot_drive.master_logging import MasterLogger
+from pilot_drive.runtime.constants import RestartPolicies
+from pilot_drive.runtime.threads import run_in_daemon_thread
+
+from .shared.event_loop import thread_main_context
 
 
 class AbstractService(ABC):
@@ -13,6 +17,9 @@ class AbstractService(ABC):
     The abstract class used to implement all other services
     """
 
+    # When the supervisor restarts the service after main() exits
+    restart_policy: RestartPolicies = RestartPolicies.ON_FAILURE
+
     @abstractmethod
     def __init__(
         self,
@@ -33,7 +40,12 @@ class AbstractService(ABC):
         self.logger = logger
         self.logger.info(msg=f"Initializing {service_type} service!")
 
-    def push_to_queue(self, event: dict, event_type: Optional[dict] = None) -> None:
+    def push_to_queue(
+        self,
+        event: dict,
+        event_type: Optional[dict] = None,
+        key: Optional[str] = None,
+    ) -> None:
         """
         Push a new event to the master queue.
 
@@ -41,11 +53,12 @@ class AbstractService(ABC):
             the UI.
         :param event_type: the event type that will go on the queue. If no argument is specified,
             it defaults to the calling services type
+        :param key: an optional coalescing sub-key, see MasterEventQueue.push_event()
         """
         if not event_type:
             event_type = self.service_type
 
-        self.event_queue.push_event(event_type=self.service_type, event=event)
+        self.event_queue.push_event(event_type=event_type, event=event, key=key)
 
     @abstractmethod
     def refresh(self) -> None:
@@ -58,3 +71,26 @@ class AbstractService(ABC):
         """
         runs servce main loop and logic
         """
+
+    def stop(self) -> None:
+        """
+        Release what the service holds (ie. write buffered data), called once the service is
+            stopped. By default there is nothing to release.
+        """
+
+    def __main_in_context(self) -> None:
+        """
+        Run main() with its own thread default GLib main context
+        """
+        with thread_main_context():
+            self.main()
+
+    async def run(self) -> None:
+        """
+        Run the service as a task of the main event loop, used by the "task" runtime. By default
+            the blocking main() is run in its own thread, services with nothing to run in main()
+            override this to return right away.
+        """
+        await run_in_daemon_thread(
+            func=self.__main_in_context, name=f"{self.service_type}-service"
+        )
@@ -3,3 +3,5 @@ The module that manages the connected bluetooth device and it's metadata
 """
 
 from .bluetooth import Bluetooth, BluetoothDevice, NoPlayerException, NoAdapterException
+from .exceptions import BluetoothRpcException, BluetoothUnavailableException
+from .rpc import BluetoothClient
@@ -1,7 +1,10 @@
 """
 Module for the Bluetooth service
 """
+import time
 from dataclasses import dataclass, field
+from functools import partial
+from threading import Lock, Thread
 from typing import Any, Dict, List, Tuple, Optional, Callable
 from dasbus.connection import (  # type: ignore # missing
     SystemMessageBus,
@@ -13,7 +16,16 @@ from pilot_drive.master_logging.master_logger import MasterLogger
 from pilot_drive.master_queue import MasterEventQueue, EventType
 
 from .exceptions import NoAdapterException, NoPlayerException
-from .constants import ANCS_CHARS, MEDIA_UUIDS
+from .constants import (
+    ANCS_CHARS,
+    MEDIA_UUIDS,
+    PLAYER_COMMANDS,
+    PLAYER_PROPERTIES,
+    RpcMethods,
+    RpcTopics,
+)
+from .object_model import BluezObjectModel
+from .rpc import BluetoothRpcServer
 
 from ..shared.bluez_api import (
     MessageBus,
@@ -22,17 +34,20 @@ from ..shared.bluez_api import (
     BluezMediaPlayer,
     BluezGattCharacteristic,
 )
+from ..shared.event_loop import ThreadEventLoop
 from ..abstract_service import AbstractService
 
 
 @dataclass
 class BluetoothDevice:  # pylint: disable=too-many-instance-attributes
     """
-    Dataclass used to store information and states on BlueZ devices.
+    Dataclass used to store information and states on BlueZ devices. The properties are read from
+        the mirrored object tree, which is kept current from the same PropertiesChanged signals.
     """
 
     bluez_device: BluezDevice = field(repr=False)
     path: ObjPath = field(repr=False)
+    objects: BluezObjectModel = field(repr=False)
     props_changed_callback: Callable = field(repr=False)
     logger: MasterLogger = field(repr=False)
     name: Optional[str] = field(init=False, default=None)
@@ -42,15 +57,16 @@ class BluetoothDevice:  # pylint: disable=too-many-instance-attributes
     media: bool = field(init=False)
     ancs: bool = False  # This is populated after the device is created
 
-    def __is_av_device(self, device: BluezDevice) -> bool:
+    @staticmethod
+    def __is_av_device(uuids: List[str]) -> bool:
         """
         Determine if the BlueZ device is a media device or not based on A2DP UUIDs
 
-        :param device: a BluezDevice instance to check for media profiles on
+        :param uuids: the UUIDs of the device's profiles to check for media profiles in
         :return: True if the device has media capabilities, False if not.
         """
         media_temp_uuids = list(MEDIA_UUIDS)
-        for uuid in device.UUIDs:
+        for uuid in uuids:
             if uuid in MEDIA_UUIDS:
                 media_temp_uuids.remove(uuid)
 
@@ -58,14 +74,18 @@ class BluetoothDevice:  # pylint: disable=too-many-instance-attributes
         return not media_temp_uuids
 
     def __post_init__(self):
-        try:
-            self.name = self.bluez_device.Name
-        except DBusError:
-            self.name = None
-        self.alias = self.bluez_device.Alias
-        self.address = self.bluez_device.Address
-        self.connected = self.bluez_device.Connected
-        self.media = self.__is_av_device(device=self.bluez_device)
+        properties = {
+            name: value.unpack()
+            for name, value in self.objects.properties(
+                path=self.path, interface=BluezDevice.interface
+            ).items()
+        }
+        # Devices without a name don't have the property
+        self.name = properties.get("Name")
+        self.alias = properties.get("Alias")
+        self.address = properties.get("Address")
+        self.connected = properties.get("Connected", False)
+        self.media = self.__is_av_device(uuids=properties.get("UUIDs", []))
 
     def prop_changed(
         self,
@@ -106,7 +126,13 @@ class BluetoothDevice:  # pylint: disable=too-many-instance-attributes
         :return: a dict of the device's informational attributes.
         """
         # Attributes to removed as they aren't informational/serializable.
-        attrs_to_remove = {"bluez_device", "path", "props_changed_callback", "logger"}
+        attrs_to_remove = {
+            "bluez_device",
+            "path",
+            "objects",
+            "props_changed_callback",
+            "logger",
+        }
         device_dict = self.__dict__.copy()
         for attribute in attrs_to_remove:
             device_dict.pop(attribute)
@@ -116,7 +142,9 @@ class BluetoothDevice:  # pylint: disable=too-many-instance-attributes
 
 class Bluetooth(AbstractService):
     """
-    The service that manages the DBus Bluetooth APIs of PILOT Drive.
+    The service that manages the DBus Bluetooth APIs of PILOT Drive. It owns the BlueZ connection
+        and the device registry, other services reach it through a BluetoothClient. The state of
+        the media player is published to them as well, so they don't follow BlueZ themselves.
     """
 
     def __init__(
@@ -137,43 +165,94 @@ class Bluetooth(AbstractService):
         """
         super().__init__(master_event_queue, service_type, logger)
         self.bus, self.bluez_root = Bluetooth.get_bus_and_bluez_root(bus=bus)
+        self.objects = BluezObjectModel(bus=self.bus, bluez_root=self.bluez_root)
 
-    def push_bluetooth_to_queue(self, devices: List[BluetoothDevice]) -> None:
-        """
-        Push bluetooth information to the queue
+        # The devices known to BlueZ by path, updated by main() and read by RPC requests
+        self.__devices: Dict[ObjPath, BluetoothDevice] = {}
+        self.__devices_lock = Lock()
+        self.__server: Optional[BluetoothRpcServer] = None
+
+        # The proxy of each media player and the PropertiesChanged callback connected to it
+        self.__player_watchers: Dict[ObjPath, Tuple[BluezMediaPlayer, partial]] = {}
+        # The wall clock time the Position of each media player was received at, BlueZ doesn't
+        # signal it while a track plays so subscribers extrapolate it from then
+        self.__positions_received: Dict[ObjPath, float] = {}
 
-        :param devices: A list of devices track by the external service using bluetooth. This is
-            temporary and will likely be integrated into the Bluetooth service itself soon.
+    def push_bluetooth_to_queue(self) -> None:
         """
-        bluetooth_adapter = self.bluez_adapter
+        Push bluetooth information to the queue, and to the subscribers of the RPC channel. The
+            adapter's properties are read from the mirrored object tree.
+        """
+        bluetooth_adapter = self.adapter_properties
 
-        if (
-            bluetooth_adapter.Alias
-            and bluetooth_adapter.Alias != bluetooth_adapter.Name
-        ):
-            hostname = bluetooth_adapter.Alias
+        alias = bluetooth_adapter.get("Alias")
+        if alias and alias != bluetooth_adapter.get("Name"):
+            hostname = alias
         else:
-            hostname = bluetooth_adapter.Name
+            hostname = bluetooth_adapter.get("Name")
 
         bluetooth_event = {
             "hostname": hostname,
-            "address": bluetooth_adapter.Address,
-            "powered": bluetooth_adapter.Powered,
-            "devices": self.__serialize_devices(devices),
+            "address": bluetooth_adapter.get("Address"),
+            "powered": bluetooth_adapter.get("Powered"),
+            "devices": self.devices,
         }
 
         self.push_to_queue(event=bluetooth_event)
+        if self.__server:
+            self.__server.publish(event=bluetooth_event)
 
-    def __serialize_devices(self, devices: List[BluetoothDevice]) -> List[Dict]:
+    @property
+    def player_state(self) -> Dict:
+        """
+        Get the state of the media player from the mirrored object tree, as published to the
+            player subscribers
+
+        :return: a dict of the player's path, its PLAYER_PROPERTIES, the address of its device and
+            the epoch time its Position was received at. The path is None if there's no player.
+        """
+        for path in self.objects.paths(interface=BluezMediaPlayer.interface):
+            properties = self.objects.properties(
+                path=path, interface=BluezMediaPlayer.interface
+            )
+            device = {}
+            if "Device" in properties:
+                device = self.objects.properties(
+                    path=properties["Device"].unpack(), interface=BluezDevice.interface
+                )
+            return {
+                "path": path,
+                "properties": {
+                    name: properties[name].unpack()
+                    for name in PLAYER_PROPERTIES
+                    if name in properties
+                },
+                "address": device["Address"].unpack() if "Address" in device else None,
+                "positionReceived": self.__positions_received.get(path),
+            }
+
+        return {"path": None, "properties": {}, "address": None, "positionReceived": None}
+
+    def publish_player(self) -> None:
+        """
+        Publish the state of the media player to the player subscribers of the RPC channel
+        """
+        if self.__server:
+            self.__server.publish(event=self.player_state, topic=RpcTopics.PLAYER)
+
+    @property
+    def devices(self) -> List[Dict]:
         """
         Format devices in a way that the frontend expects/is serializable
 
-        :param: a list containing many BluezDevice instances
         :return: a serialized device list
         """
+        ancs_devices = self.active_ancs_devices
         serialized_devices = []
-        for device in devices:
-            serialized_devices.append(device.serialize())
+        with self.__devices_lock:
+            for device in self.__devices.values():
+                device.ancs = device.address in ancs_devices
+                serialized_devices.append(device.serialize())
 
         return serialized_devices
 
@@ -200,10 +279,25 @@ class Bluetooth(AbstractService):
 
         :return: a BluezAdapter instance
         """
-        for path, services in self.bluez_root.GetManagedObjects().items():
-            if BluezAdapter.interface in services:
-                adapter_obj = BluezAdapter.connect(bus=self.bus, path=path)
-                return adapter_obj
+        for path in self.objects.paths(interface=BluezAdapter.interface):
+            return self.objects.proxy(api=BluezAdapter, path=path)
+
+        raise NoAdapterException("No BlueZ Adapter was found!")
+
+    @property
+    def adapter_properties(self) -> Dict[str, Any]:
+        """
+        Get the properties of the BlueZ Adapter1 from the mirrored object tree
+
+        :return: the unpacked Adapter1 properties
+        """
+        for path in self.objects.paths(interface=BluezAdapter.interface):
+            return {
+                name: value.unpack()
+                for name, value in self.objects.properties(
+                    path=path, interface=BluezAdapter.interface
+                ).items()
+            }
 
         raise NoAdapterException("No BlueZ Adapter was found!")
 
@@ -214,10 +308,8 @@ class Bluetooth(AbstractService):
 
         :return: a BluezMediaPlayer instance
         """
-        for path, services in self.bluez_root.GetManagedObjects().items():
-            if BluezMediaPlayer.interface in services:
-                player_obj = BluezMediaPlayer.connect(bus=self.bus, path=path)
-                return player_obj
+        for path in self.objects.paths(interface=BluezMediaPlayer.interface):
+            return self.objects.proxy(api=BluezMediaPlayer, path=path)
 
         raise NoPlayerException("No BlueZ media player was found!")
 
@@ -230,10 +322,11 @@ class Bluetooth(AbstractService):
         :param path: The path to the BlueZ device
         :param props_changed_callback: the callback to connect for when device properties change
         """
-        bluez_device = BluezDevice.connect(self.bus, path)
+        bluez_device = self.objects.proxy(api=BluezDevice, path=path)
         device = BluetoothDevice(
             path=path,
             bluez_device=bluez_device,
+            objects=self.objects,
             props_changed_callback=props_changed_callback,
             logger=self.logger,
         )
@@ -320,18 +413,146 @@ class Bluetooth(AbstractService):
 
         :return: a list of connected device MAC addresses capable of ANCS
         """
+        return self.objects.ancs_devices()
+
+    def track_control(self, command: str) -> None:
+        """
+        Call a method of the BlueZ media player, handles the TRACK_CONTROL requests
+
+        :param command: the MediaPlayer1 method, one of PLAYER_COMMANDS
+        :raises: ValueError: if the command isn't one of PLAYER_COMMANDS
+        :raises: NoPlayerException: if there is no media player
+        """
+        if command not in PLAYER_COMMANDS:
+            raise ValueError(f'Invalid media player command: "{command}"')
+        getattr(self.bluez_media_player, command)()
+
+    def __add_device(self, path: ObjPath) -> None:
+        """
+        Add a BlueZ device to the registry, following its property changes
+
+        :param path: The path to the BlueZ device
+        """
+        device = self.get_bluez_device(
+            path=path, props_changed_callback=self.__properties_changed
+        )
+        device.bluez_device.PropertiesChanged.connect(device.prop_changed)
+        with self.__devices_lock:
+            self.__devices[path] = device
+
+    def __watch_player(self, path: ObjPath) -> None:
+        """
+        Follow the property changes of a media player, its properties were just read
+
+        :param path: DBus path of the media player
+        """
+        self.__positions_received[path] = time.time()
+        player = self.objects.proxy(api=BluezMediaPlayer, path=path)
+        watcher = partial(self.__player_changed, path)
+        player.PropertiesChanged.connect(watcher)
+        self.__player_watchers[path] = (player, watcher)
+
+    def __unwatch_player(self, path: ObjPath) -> None:
+        """
+        Stop following the property changes of a removed media player
+
+        :param path: DBus path of the media player
+        """
+        self.__positions_received.pop(path, None)
+        player, watcher = self.__player_watchers.pop(path, (None, None))
+        if player is not None:
+            player.PropertiesChanged.disconnect(watcher)
+
+    def __player_changed(
+        self,
+        path: ObjPath,
+        interface: str,
+        changes: Dict[str, Variant],
+        invalidated_properties: List[str],
+    ) -> None:
+        """
+        Callback utilized when a media player's properties change, the mirror was already updated
 
-        ancs_devices = []
-        for path, services in self.bluez_root.GetManagedObjects().items():
-            if BluezGattCharacteristic.interface in services:
-                uuid = services[BluezGattCharacteristic.interface]["UUID"].unpack()
-                if uuid in ANCS_CHARS:
-                    device_path = "/".join(path.split("/")[:-2])
-                    device = BluezDevice.connect(bus=self.bus, path=device_path)
-                    if device.Connected and device.Address not in ancs_devices:
-                        ancs_devices.append(device.Address)
+        :param path: DBus path of the media player, bound when the callback is connected
+        :param interface: names of interface that had a property change
+        :param changes: a dict of changes on the properties of the interface
+        :param invalidated_properties: a list of properties that were invalidated
+        """
+        if interface != BluezMediaPlayer.interface:
+            return
+
+        if invalidated_properties:
+            # A gap, the values are unknown until they're read again
+            try:
+                self.objects.reload(path=path, interface=interface)
+            except DBusError as exc:
+                # Most likely the player was removed in the meantime
+                self.logger.warning(
+                    msg=f'Failed to get the properties of player "{path}" raised: "{exc}"!'
+                )
+        if "Position" in changes or invalidated_properties:
+            self.__positions_received[path] = time.time()
+        self.publish_player()
+
+    def __interfaces_added(
+        self, path: ObjPath, interfaces: Dict[Str, Dict[Str, Variant]]
+    ) -> None:
+        """
+        Callback utilized when a new interface is added
 
-        return ancs_devices
+        :param path: DBus path to the new interface
+        :param interfaces: the added interfaces, with their properties
+        """
+        if BluezMediaPlayer.interface in interfaces:
+            self.__watch_player(path=path)
+            self.publish_player()
+
+        if BluezDevice.interface in interfaces:
+            self.__add_device(path=path)
+        elif (
+            BluezGattCharacteristic.interface not in interfaces
+            or interfaces[BluezGattCharacteristic.interface]["UUID"].unpack()
+            not in ANCS_CHARS
+        ):
+            # Other objects don't change the devices
+            return
+
+        self.push_bluetooth_to_queue()
+
+    def __interfaces_removed(self, path: ObjPath, interfaces: List[Str]) -> None:
+        """
+        Callback utilized when an interface is removed
+
+        :param path: DBus path to the removed interface
+        :param interfaces: list of names of interfaces that were removed
+        """
+        if BluezMediaPlayer.interface in interfaces:
+            self.__unwatch_player(path=path)
+            self.publish_player()
+
+        if BluezDevice.interface not in interfaces:
+            return
+
+        with self.__devices_lock:
+            device = self.__devices.pop(path, None)
+        if device is not None:
+            device.bluez_device.PropertiesChanged.disconnect(device.prop_changed)
+        self.push_bluetooth_to_queue()
+
+    def __properties_changed(
+        self,
+        interface: str,  # pylint: disable=unused-argument
+        changes: Dict[str, Variant],  # pylint: disable=unused-argument
+        invalidated_properties: List[str],  # pylint: disable=unused-argument
+    ) -> None:
+        """
+        Callback utilized when the adapter's or a device's properties change
+
+        :param interface: names of interface that had a property change
+        :param changes: a dict of changes on the properties of the interface
+        :param invalidated_properties: a list of properties that were invalidated
+        """
+        self.push_bluetooth_to_queue()
 
     def refresh(self) -> None:
         """
@@ -341,5 +562,36 @@ class Bluetooth(AbstractService):
 
     def main(self) -> None:
         """
-        Currently a do-nothing method but may get it's own loop eventually.
+        Main loop of the Bluetooth service. Tracks the devices known to BlueZ, and serves the
+            other services over the RPC channel.
         """
+        loop = ThreadEventLoop()
+
+        for path, interfaces in self.objects.managed_objects().items():
+            if BluezDevice.interface in interfaces:
+                self.__add_device(path=path)
+            if BluezMediaPlayer.interface in interfaces:
+                self.__watch_player(path=path)
+
+        self.bluez_root.InterfacesAdded.connect(self.__interfaces_added)
+        self.bluez_root.InterfacesRemoved.connect(self.__interfaces_removed)
+        self.bluez_adapter.PropertiesChanged.connect(self.__properties_changed)
+
+        self.__server = BluetoothRpcServer(
+            handlers={
+                RpcMethods.TRACK_CONTROL: self.track_control,
+                RpcMethods.DEVICES: lambda: self.devices,
+                RpcMethods.ANCS_DEVICES: lambda: self.active_ancs_devices,
+            },
+            logger=self.logger,
+        )
+        Thread(
+            target=self.__server.serve_forever, name="bluetooth-rpc", daemon=True
+        ).start()
+        self.push_bluetooth_to_queue()
+        self.publish_player()
+
+        try:
+            loop.run()
+        finally:
+            self.__server.close()
@@ -46,3 +46,39 @@ AUDIO_SOURCE = "0000110a-0000-1000-8000-00805f9b34fb"
 AVRCP_UUID = "0000110e-0000-1000-8000-00805f9b34fb"
 A2DP_UUID = "0000110d-0000-1000-8000-00805f9b34fb"
 MEDIA_UUIDS = [AUDIO_SOURCE, AVRCP_UUID, A2DP_UUID]
+
+
+class RpcMethods(StrEnum):
+    """
+    Enum of the requests served by the Bluetooth service over its RPC channel
+    """
+
+    TRACK_CONTROL = "track-control"
+    DEVICES = "devices"
+    ANCS_DEVICES = "ancs-devices"
+    # Turns the connection into a stream of the events of a RpcTopics topic
+    SUBSCRIBE = "subscribe"
+
+
+class RpcTopics(StrEnum):
+    """
+    Enum of the event streams published by the Bluetooth service over its RPC channel
+    """
+
+    # The bluetooth events, the adapter and device list sent on every change
+    BLUETOOTH = "bluetooth"
+    # The state of the media player, sent on every change of its properties
+    PLAYER = "player"
+
+
+# The Bluetooth RPC channel, a socket of the Linux abstract namespace so there's no file to clean up
+RPC_ADDRESS = "\0pilot-drive-bluetooth"
+# Seconds a client waits for the Bluetooth service to answer a request
+RPC_TIMEOUT = 5
+# Seconds a subscriber waits before reconnecting to the Bluetooth service
+RPC_RECONNECT_DELAY = 1
+
+# The MediaPlayer1 methods clients can call through track control
+PLAYER_COMMANDS = ("Play", "Pause", "Next", "Previous")
+# The MediaPlayer1 properties published to the player subscribers
+PLAYER_PROPERTIES = ("Track", "Status", "Position", "ObexPort")
@@ -13,3 +13,15 @@ class NoPlayerException(Exception):
     """
     Raised when there is no BlueZ media player found on DBus
     """
+
+
+class BluetoothUnavailableException(Exception):
+    """
+    Raised when the Bluetooth service can't be reached over its RPC channel
+    """
+
+
+class BluetoothRpcException(Exception):
+    """
+    Raised when the Bluetooth service failed to handle a request
+    """
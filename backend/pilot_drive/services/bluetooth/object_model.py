@@ -0,0 +1,268 @@
+"""
+A local mirror of the BlueZ object tree. GetManagedObjects returns every object of BlueZ, GATT
+characteristics included, so it's called once and the mirror is kept current from the
+ObjectManager and PropertiesChanged signals instead.
+"""
+
+from functools import partial
+from threading import RLock
+from typing import Any, Dict, List, Optional, Set, Type, cast
+
+from dasbus.typing import ObjPath, Str, Variant  # type: ignore # missing
+
+from .constants import ANCS_CHARS
+from ..shared.bluez_api import (
+    BluezAdapter,
+    BluezBaseApi,
+    BluezDevice,
+    BluezGattCharacteristic,
+    BluezMediaPlayer,
+    BluezRootApi,
+    MessageBus,
+)
+
+# The interfaces whose properties are kept current, the others' are only read once
+WATCHED_INTERFACES = (
+    BluezAdapter.interface,
+    BluezDevice.interface,
+    BluezMediaPlayer.interface,
+)
+
+
+def device_path(path: ObjPath) -> ObjPath:
+    """
+    Get the path of the device a GATT characteristic belongs to
+
+    :param path: the path of the characteristic, ie. /org/bluez/hci0/dev_XX/service0010/char0011
+    :return: the path of the device, ie. /org/bluez/hci0/dev_XX
+    """
+    return cast(ObjPath, "/".join(path.split("/")[:-2]))
+
+
+class BluezObjectModel:  # pylint: disable=too-many-instance-attributes
+    """
+    The objects of BlueZ, with their interfaces and properties. Indexed by interface and device
+        address, so lookups don't go through DBus.
+
+    The mirror is populated on first use, the signals are then dispatched by the GLib main context
+        of the thread that used it first.
+    """
+
+    def __init__(self, bus: MessageBus, bluez_root: BluezRootApi) -> None:
+        """
+        Initialize the object model, without populating it yet
+
+        :param bus: an instance of the DBus system bus
+        :param bluez_root: a proxy to the BlueZ root
+        """
+        self.__bus = bus
+        self.__bluez_root = bluez_root
+        # Signals are dispatched by the event loop thread, lookups may come from any other
+        self.__lock = RLock()
+        self.__populated = False
+
+        # The interfaces of each object, and their properties
+        self.__objects: Dict[ObjPath, Dict[Str, Dict[Str, Variant]]] = {}
+        # The paths of the objects implementing each interface, in the order they were added
+        self.__paths: Dict[Str, Dict[ObjPath, None]] = {}
+        # The path of each device by address
+        self.__addresses: Dict[Str, ObjPath] = {}
+        # The paths of the ANCS characteristics of each device
+        self.__ancs: Dict[ObjPath, Set[ObjPath]] = {}
+
+        self.__proxies: Dict[ObjPath, Any] = {}
+        # The PropertiesChanged callback connected for each watched object
+        self.__watchers: Dict[ObjPath, partial] = {}
+
+    def __populate(self) -> None:
+        """
+        Populate the mirror with the managed objects, once. The signals are connected first so no
+            change is missed in between.
+        """
+        with self.__lock:
+            if self.__populated:
+                return
+            self.__populated = True
+            self.__bluez_root.InterfacesAdded.connect(self.__interfaces_added)
+            self.__bluez_root.InterfacesRemoved.connect(self.__interfaces_removed)
+            for path, interfaces in self.__bluez_root.GetManagedObjects().items():
+                self.__interfaces_added(path=path, interfaces=interfaces)
+
+    def __interfaces_added(
+        self, path: ObjPath, interfaces: Dict[Str, Dict[Str, Variant]]
+    ) -> None:
+        """
+        Callback of InterfacesAdded, adds the interfaces to the mirror and its indices
+
+        :param path: DBus path of the object
+        :param interfaces: the added interfaces, with their properties
+        """
+        with self.__lock:
+            obj = self.__objects.setdefault(path, {})
+            for interface, properties in interfaces.items():
+                obj[interface] = dict(properties)
+                self.__paths.setdefault(interface, {})[path] = None
+
+                if interface == BluezDevice.interface and "Address" in properties:
+                    self.__addresses[properties["Address"].unpack()] = path
+                elif (
+                    interface == BluezGattCharacteristic.interface
+                    and "UUID" in properties
+                    and properties["UUID"].unpack() in ANCS_CHARS
+                ):
+                    self.__ancs.setdefault(device_path(path=path), set()).add(path)
+
+                if interface in WATCHED_INTERFACES and path not in self.__watchers:
+                    watcher = partial(self.__properties_changed, path)
+                    self.__watchers[path] = watcher
+                    self.proxy(api=BluezDevice, path=path).PropertiesChanged.connect(
+                        watcher
+                    )
+
+    def __interfaces_removed(self, path: ObjPath, interfaces: List[Str]) -> None:
+        """
+        Callback of InterfacesRemoved, removes the interfaces from the mirror and its indices.
+            The object is forgotten once it has none left.
+
+        :param path: DBus path of the object
+        :param interfaces: names of the removed interfaces
+        """
+        with self.__lock:
+            obj = self.__objects.get(path, {})
+            for interface in interfaces:
+                properties = obj.pop(interface, {})
+                self.__paths.get(interface, {}).pop(path, None)
+
+                if interface == BluezDevice.interface and "Address" in properties:
+                    self.__addresses.pop(properties["Address"].unpack(), None)
+                elif interface == BluezGattCharacteristic.interface:
+                    characteristics = self.__ancs.get(device_path(path=path), set())
+                    characteristics.discard(path)
+                    if not characteristics:
+                        self.__ancs.pop(device_path(path=path), None)
+
+            if obj:
+                return
+            self.__objects.pop(path, None)
+            proxy = self.__proxies.pop(path, None)
+            watcher = self.__watchers.pop(path, None)
+            if proxy is not None and watcher is not None:
+                proxy.PropertiesChanged.disconnect(watcher)
+
+    def __properties_changed(
+        self,
+        path: ObjPath,
+        interface: Str,
+        changes: Dict[Str, Variant],
+        invalidated_properties: List[Str],
+    ) -> None:
+        """
+        Callback of PropertiesChanged, for the objects with a watched interface
+
+        :param path: DBus path of the object, bound when the callback is connected
+        :param interface: name of the interface that had a property change
+        :param changes: a dict of changes on the properties of the interface
+        :param invalidated_properties: a list of properties that were invalidated
+        """
+        with self.__lock:
+            properties = self.__objects.get(path, {}).get(interface)
+            if properties is None:
+                return
+            properties.update(changes)
+            for name in invalidated_properties:
+                properties.pop(name, None)
+
+    def reload(self, path: ObjPath, interface: Str) -> None:
+        """
+        Read every property of an interface of an object again in a single GetAll call, ie. after
+            BlueZ invalidated some instead of sending their values
+
+        :param path: DBus path of the object
+        :param interface: name of the interface
+        :raises: DBusError: if the properties couldn't be read, ie. the object was removed
+        """
+        properties = self.proxy(api=BluezDevice, path=path).GetAll(interface)
+        with self.__lock:
+            obj = self.__objects.get(path)
+            if obj is not None and interface in obj:
+                obj[interface] = dict(properties)
+
+    def managed_objects(self) -> Dict[ObjPath, Dict[Str, Dict[Str, Variant]]]:
+        """
+        Get a copy of the mirror, in the form of GetManagedObjects
+
+        :return: a dict of the objects, their interfaces and properties
+        """
+        self.__populate()
+        with self.__lock:
+            return {
+                path: {
+                    interface: dict(properties)
+                    for interface, properties in interfaces.items()
+                }
+                for path, interfaces in self.__objects.items()
+            }
+
+    def paths(self, interface: Str) -> List[ObjPath]:
+        """
+        Get the paths of the objects implementing an interface
+
+        :param interface: name of the interface
+        :return: the paths, in the order the objects were added
+        """
+        self.__populate()
+        with self.__lock:
+            return list(self.__paths.get(interface, {}))
+
+    def properties(self, path: ObjPath, interface: Str) -> Dict[Str, Variant]:
+        """
+        Get the properties of an interface of an object
+
+        :param path: DBus path of the object
+        :param interface: name of the interface
+        :return: a copy of the properties, empty if the object doesn't implement the interface
+        """
+        self.__populate()
+        with self.__lock:
+            return dict(self.__objects.get(path, {}).get(interface, {}))
+
+    def device_path(self, address: Str) -> Optional[ObjPath]:
+        """
+        Get the path of a device by address
+
+        :param address: the MAC address of the device
+        :return: the path of the device, None if BlueZ doesn't know it
+        """
+        self.__populate()
+        with self.__lock:
+            return self.__addresses.get(address)
+
+    def ancs_devices(self) -> List[Str]:
+        """
+        Get the connected devices that have Apple Notification Center Service (ANCS)
+            characteristics
+
+        :return: a list of the devices' MAC addresses
+        """
+        self.__populate()
+        addresses = []
+        with self.__lock:
+            for path in self.__ancs:
+                device = self.__objects.get(path, {}).get(BluezDevice.interface, {})
+                connected = device.get("Connected")
+                if connected is not None and connected.unpack() and "Address" in device:
+                    addresses.append(device["Address"].unpack())
+        return addresses
+
+    def proxy(self, api: Type[BluezBaseApi], path: ObjPath) -> Any:
+        """
+        Get a proxy to an object, connected once per object
+
+        :param api: the BlueZ API class of the proxy, ie. BluezAdapter
+        :param path: DBus path of the object
+        :return: the proxy to the object
+        """
+        with self.__lock:
+            if path not in self.__proxies:
+                self.__proxies[path] = api.connect(bus=self.__bus, path=path)
+            return self.__proxies[path]
@@ -0,0 +1,416 @@
+"""
+The RPC channel of the Bluetooth service. The service owns the only BlueZ connection and device
+registry, other services reach it through a BluetoothClient over a local socket. Every process is
+forked from the main one, so its multiprocessing authkey authenticates them.
+"""
+
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+from multiprocessing import AuthenticationError, current_process
+from multiprocessing.connection import (
+    Client,
+    Connection,
+    answer_challenge,
+    deliver_challenge,
+)
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from pilot_drive.master_logging import MasterLogger
+
+from .constants import (
+    RPC_ADDRESS,
+    RPC_RECONNECT_DELAY,
+    RPC_TIMEOUT,
+    RpcMethods,
+    RpcTopics,
+)
+from .exceptions import (
+    BluetoothRpcException,
+    BluetoothUnavailableException,
+    NoAdapterException,
+    NoPlayerException,
+)
+
+# The exceptions raised by handlers that are raised again by the client, others are wrapped
+FORWARDED_EXCEPTIONS = {
+    exception.__name__: exception
+    for exception in (NoAdapterException, NoPlayerException)
+}
+
+
+@dataclass(eq=False)
+class Subscriber:
+    """
+    A connection that subscribed to the published events of a topic
+    """
+
+    connection: Connection
+    topic: RpcTopics
+    # Held while sending, so events sent from several threads don't interleave on the connection
+    lock: Lock = field(default_factory=Lock)
+    # The sequence number of the last event sent, an older one that lost a race isn't sent after it
+    seq: int = -1
+    # Set once the connection is about to be closed, nothing is sent after it
+    closed: bool = False
+
+    def send(self, seq: int, event: dict) -> None:
+        """
+        Send an event, unless a newer one was already sent
+
+        :param seq: the sequence number of the event
+        :param event: the event dict
+        :raises: OSError: if the connection was closed
+        """
+        with self.lock:
+            if self.closed or seq <= self.seq:
+                return
+            self.seq = seq
+            self.connection.send(event)
+
+
+class BluetoothRpcServer:  # pylint: disable=too-many-instance-attributes
+    """
+    Serves the requests of BluetoothClients, each connection in its own thread. A request is a
+        dict of the method and its keyword parameters, answered with a dict of the result or of
+        the error the handler raised.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[RpcMethods, Callable[..., Any]],
+        logger: MasterLogger,
+        address: str = RPC_ADDRESS,
+    ) -> None:
+        """
+        Initialize the server, listening right away
+
+        :param handlers: the function called for each method, with the parameters of the request
+        :param logger: an instance of the MasterLogger
+        :param address: the address of the socket
+        :raises: OSError: if the address is already in use, ie. by another Bluetooth service
+        """
+        self.__handlers = handlers
+        self.__logger = logger
+        # Unlike a multiprocessing Listener, the socket can be shut down while accept() blocks
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__socket.bind(address)
+        self.__socket.listen()
+        # Held while serve_forever() runs, so close() returns once the address is free again
+        self.__serving = Lock()
+
+        self.__lock = Lock()
+        # The sockets of the connected clients, shut down once the server is closed
+        self.__clients: Set[socket.socket] = set()
+        self.__subscribers: Dict[RpcTopics, List[Subscriber]] = {
+            topic: [] for topic in RpcTopics
+        }
+        # The sequence number of the latest published event of each topic and the event, sent to
+        # subscribers once they subscribe
+        self.__latest: Dict[RpcTopics, Tuple[int, Optional[dict]]] = {
+            topic: (0, None) for topic in RpcTopics
+        }
+
+    def serve_forever(self) -> None:
+        """
+        Accept connections until the server is closed
+        """
+        with self.__serving:
+            self.__accept()
+
+    def __accept(self) -> None:
+        """
+        Accept connections, each answered in its own thread, until the server is closed
+        """
+        while True:
+            try:
+                client_socket, _ = self.__socket.accept()
+            except OSError:
+                # The server was closed
+                return
+
+            connection = Connection(os.dup(client_socket.fileno()))
+            try:
+                # Authenticate both ways, like a multiprocessing Listener
+                deliver_challenge(connection, current_process().authkey)
+                answer_challenge(connection, current_process().authkey)
+            except (AuthenticationError, EOFError, OSError) as exc:
+                self.__logger.warning(msg=f"Rejected a Bluetooth RPC connection: {exc}")
+                connection.close()
+                client_socket.close()
+                continue
+
+            with self.__lock:
+                self.__clients.add(client_socket)
+            Thread(
+                target=self.__serve,
+                args=(connection, client_socket),
+                name="bluetooth-rpc",
+                daemon=True,
+            ).start()
+
+    def __subscribe(self, connection: Connection, topic: RpcTopics) -> None:
+        """
+        Stream the published events of a topic to a connection, until the client closes it
+
+        :param connection: the connection of the client
+        :param topic: the topic subscribed to
+        """
+        subscriber = Subscriber(connection=connection, topic=topic)
+        with self.__lock:
+            seq, latest = self.__latest[topic]
+            self.__subscribers[topic].append(subscriber)
+        try:
+            if latest is not None:
+                subscriber.send(seq=seq, event=latest)
+            # Nothing else is received, this returns once the connection is closed
+            connection.recv()
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.__unsubscribe(subscriber=subscriber)
+            # Waits for a publish still sending to it, the connection is closed once this returns
+            with subscriber.lock:
+                subscriber.closed = True
+
+    def __unsubscribe(self, subscriber: Subscriber) -> None:
+        """
+        Stop sending the published events to a subscriber
+
+        :param subscriber: the subscriber
+        """
+        with self.__lock:
+            if subscriber in self.__subscribers[subscriber.topic]:
+                self.__subscribers[subscriber.topic].remove(subscriber)
+
+    def __serve(self, connection: Connection, client_socket: socket.socket) -> None:
+        """
+        Answer the requests of a connection, until the client or the server closes it
+
+        :param connection: the connection of the client
+        :param client_socket: the socket of the connection
+        """
+        try:
+            self.__answer(connection=connection)
+        finally:
+            connection.close()
+            with self.__lock:
+                self.__clients.discard(client_socket)
+            client_socket.close()
+
+    def __answer(self, connection: Connection) -> None:
+        """
+        Answer the requests of a connection
+
+        :param connection: the connection of the client
+        """
+        while True:
+            try:
+                request = connection.recv()
+            except (EOFError, OSError):
+                return
+
+            method = request.get("method")
+            params = request.get("params", {})
+            topic = params.get("topic", RpcTopics.BLUETOOTH)
+            if method == RpcMethods.SUBSCRIBE and topic in list(RpcTopics):
+                self.__subscribe(connection=connection, topic=RpcTopics(topic))
+                return
+
+            handler = self.__handlers.get(method)
+            if method == RpcMethods.SUBSCRIBE:
+                response = {
+                    "error": BluetoothRpcException.__name__,
+                    "message": f'Unknown topic: "{topic}"',
+                }
+            elif handler is None:
+                response = {
+                    "error": BluetoothRpcException.__name__,
+                    "message": f'Unknown method: "{method}"',
+                }
+            else:
+                try:
+                    response = {"result": handler(**params)}
+                except Exception as exc:  # pylint: disable=broad-exception-caught
+                    response = {"error": type(exc).__name__, "message": str(exc)}
+
+            try:
+                connection.send(response)
+            except OSError:
+                return
+
+    def publish(self, event: dict, topic: RpcTopics = RpcTopics.BLUETOOTH) -> None:
+        """
+        Send an event to every subscriber of its topic
+
+        :param event: the event dict
+        :param topic: the topic of the event
+        """
+        with self.__lock:
+            seq = self.__latest[topic][0] + 1
+            self.__latest[topic] = (seq, event)
+            subscribers = list(self.__subscribers[topic])
+
+        # Sent outside of the lock, so a slow subscriber doesn't hold up publishing, subscribing
+        # or unsubscribing
+        for subscriber in subscribers:
+            try:
+                subscriber.send(seq=seq, event=event)
+            except OSError:
+                self.__unsubscribe(subscriber=subscriber)
+
+    def close(self) -> None:
+        """
+        Stop accepting connections, and close the connected ones
+        """
+        with self.__lock:
+            sockets = [self.__socket, *self.__clients]
+        for server_socket in sockets:
+            try:
+                server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        with self.__serving:
+            self.__socket.close()
+
+
+class BluetoothClient:
+    """
+    The client of the Bluetooth service's RPC channel. A connection is made on the first request
+        and kept, so a request costs a single round trip over the local socket. Safe to use from
+        several threads.
+    """
+
+    def __init__(self, address: str = RPC_ADDRESS) -> None:
+        """
+        Initialize the client, without connecting yet
+
+        :param address: the address of the Bluetooth service's socket
+        """
+        self.__address = address
+        self.__lock = Lock()
+        self.__connection: Optional[Connection] = None
+        # The process the connection was made in, a forked copy of the client connects again
+        self.__pid: Optional[int] = None
+
+    def __connect(self) -> Connection:
+        """
+        Connect to the Bluetooth service
+
+        :return: the connection
+        :raises: BluetoothUnavailableException: if the service isn't listening
+        """
+        try:
+            return Client(
+                address=self.__address,
+                family="AF_UNIX",
+                authkey=current_process().authkey,
+            )
+        except (OSError, EOFError, AuthenticationError) as exc:
+            raise BluetoothUnavailableException(
+                f"Failed to connect to the Bluetooth service: {exc}"
+            ) from exc
+
+    def __disconnect(self) -> None:
+        """
+        Drop the connection, it's made again on the next request
+        """
+        if self.__connection is not None and self.__pid == os.getpid():
+            self.__connection.close()
+        self.__connection = None
+
+    def call(self, method: RpcMethods, **params) -> Any:
+        """
+        Make a request to the Bluetooth service. If the connection was lost, ie. as the service
+            restarted, the request is retried once over a new one.
+
+        :param method: the method requested
+        :param params: the keyword parameters of the method
+        :return: the result of the method
+        :raises: BluetoothUnavailableException: if the service can't be reached or didn't answer
+            within RPC_TIMEOUT
+        :raises: NoAdapterException: if the service has no BlueZ adapter
+        :raises: NoPlayerException: if the service has no BlueZ media player
+        :raises: BluetoothRpcException: if the method failed otherwise
+        """
+        with self.__lock:
+            if self.__pid != os.getpid():
+                self.__connection = None
+
+            for retry in (False, True):
+                if self.__connection is None:
+                    self.__connection = self.__connect()
+                    self.__pid = os.getpid()
+                try:
+                    self.__connection.send({"method": method, "params": params})
+                    if not self.__connection.poll(RPC_TIMEOUT):
+                        # A late answer would be taken for the next request's
+                        self.__disconnect()
+                        raise BluetoothUnavailableException(
+                            f'The Bluetooth service didn\'t answer "{method}" in time!'
+                        )
+                    response = self.__connection.recv()
+                    break
+                except (EOFError, OSError) as exc:
+                    self.__disconnect()
+                    if retry:
+                        raise BluetoothUnavailableException(
+                            f"Lost the connection to the Bluetooth service: {exc}"
+                        ) from exc
+
+        if "error" in response:
+            exception = FORWARDED_EXCEPTIONS.get(response["error"])
+            if exception is None:
+                raise BluetoothRpcException(
+                    f'{response["error"]}: {response["message"]}'
+                )
+            raise exception(response["message"])
+        return response["result"]
+
+    def track_control(self, command: str) -> None:
+        """
+        Call a method of the BlueZ media player
+
+        :param command: the MediaPlayer1 method, one of PLAYER_COMMANDS
+        """
+        self.call(method=RpcMethods.TRACK_CONTROL, command=command)
+
+    def devices(self) -> List[Dict]:
+        """
+        Get the devices known to BlueZ
+
+        :return: a list of serialized BluetoothDevices
+        """
+        return self.call(method=RpcMethods.DEVICES)
+
+    def ancs_devices(self) -> List[str]:
+        """
+        Get the connected devices that have Apple Notification Center Service (ANCS) capabilities
+
+        :return: a list of the devices' MAC addresses
+        """
+        return self.call(method=RpcMethods.ANCS_DEVICES)
+
+    def subscribe(
+        self, callback: Callable[[dict], None], topic: RpcTopics = RpcTopics.BLUETOOTH
+    ) -> None:
+        """
+        Call a callback with every event of a topic of the service, the latest one first. Blocks
+            forever, reconnecting after RPC_RECONNECT_DELAY whenever the service can't be reached.
+
+        :param callback: called with the event dict, in the form of the bluetooth events pushed to
+            the queue for the bluetooth topic, or of Bluetooth.player_state for the player topic
+        :param topic: the RpcTopics member subscribed to
+        """
+        while True:
+            try:
+                with self.__connect() as connection:
+                    connection.send(
+                        {"method": RpcMethods.SUBSCRIBE, "params": {"topic": topic}}
+                    )
+                    while True:
+                        callback(connection.recv())
+            except (BluetoothUnavailableException, EOFError, OSError):
+                time.sleep(RPC_RECONNECT_DELAY)
@@ -62,6 +62,11 @@ class Camera(AbstractService):
     def main(self):
         pass
 
+    async def run(self) -> None:
+        """
+        The camera is driven by GPIO callbacks, so there's nothing to run in the task runtime
+        """
+
     def refresh(self):
         pass
 
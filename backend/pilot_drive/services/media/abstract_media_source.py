@@ -1,12 +1,15 @@
 """
 Abstract media managers & their data types
 """
+import time
 from abc import ABC, abstractmethod
 from types import NoneType
-from typing import Callable, TypedDict, Union
+from typing import Callable, Optional, TypedDict, Union
 
 from pilot_drive.master_logging import MasterLogger
 
+from .constants import PLAYBACK_RATE, POSITION_DRIFT
+
 
 class TrackProps(TypedDict):
     """
@@ -19,34 +22,106 @@ class TrackProps(TypedDict):
     duration: Union[int, NoneType]
 
 
+class PositionAnchor(TypedDict):
+    """
+    A typed dict used to store the playback position at a point in time, the UI extrapolates the
+        current position from it. The timestamp is of the wall clock, which the UI shares on the
+        head unit, so an anchor delivered late (ie. a snapshot replayed to a new client) is still
+        extrapolated from when it was read.
+    """
+
+    position: int  # milliseconds
+    timestamp: int  # milliseconds since the epoch
+    playing: bool
+    rate: float
+
+
+def extrapolate(anchor: PositionAnchor, timestamp: int) -> int:
+    """
+    Get the position an anchor predicts at a point in time
+
+    :param anchor: the position anchor
+    :param timestamp: milliseconds since the epoch
+    :return: the predicted position in milliseconds
+    """
+    if not anchor["playing"]:
+        return anchor["position"]
+    elapsed = max(timestamp - anchor["timestamp"], 0)
+    return anchor["position"] + int(elapsed * anchor["rate"])
+
+
 class BaseMediaSource(ABC):
     """
     The base class for a media manager
     """
 
-    def __init__(self, push_to_queue_callback: Callable, logger: MasterLogger) -> None:
+    def __init__(
+        self,
+        push_to_queue_callback: Callable,
+        logger: MasterLogger,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
         """
         Initialize the media manager
 
         :param push_to_queue_callback: method that pushes new events to the queue
         :param logger: an instance of the MasterLogger
+        :param clock: the wall clock the anchors are stamped with, replaceable for testing. A
+            clock change is seen as a drift, so the anchor is resynced on the next push.
         """
         self.push_to_queue = push_to_queue_callback
         self.logger = logger
+        self.__clock = clock
+        self.__anchor: Optional[PositionAnchor] = None
+        # The track the anchor was published for
+        self.__anchor_track: Optional[dict] = None
+
+    def position_anchor(self, track: dict) -> PositionAnchor:
+        """
+        Get the position anchor of the current track. The published anchor is kept as long as
+            it predicts the position, it's only resynced when the track or status changes, or the
+            position drifts past POSITION_DRIFT (ie. on a seek).
+
+        :param track: the current track metadata
+        :return: the position anchor
+        """
+        position = self.position
+        playing = self.playing
+        now = int(self.__clock() * 1000)
+
+        anchor = self.__anchor
+        if (
+            anchor is None
+            or anchor["playing"] != playing
+            or self.__anchor_track != track
+            or abs(extrapolate(anchor=anchor, timestamp=now) - position)
+            > POSITION_DRIFT
+        ):
+            anchor = {
+                "position": position,
+                "timestamp": now,
+                "playing": playing,
+                "rate": PLAYBACK_RATE,
+            }
+            self.__anchor = anchor
+            self.__anchor_track = track
+        return anchor
 
     def push_media_to_queue(self) -> None:
         """
-        Pushes media info to the queue utilizing the callback provided in initializer
+        Pushes media info to the queue utilizing the callback provided in initializer. The
+            position is published as an anchor, so events with only a new position are identical
+            until the position drifts.
         """
         track = self.track
+        anchor = self.position_anchor(track=track)
         media_event = {
             "title": track.get("Title"),
             "artist": track.get("Artist"),
             "album": track.get("Album"),
-            "duration": self.track.get("Duration"),
-            "position": self.position,
-            "playing": self.playing,
-            "cover": None,
+            "duration": track.get("Duration"),
+            **anchor,
+            "cover": self.cover,
         }
         self.push_to_queue(media_event)
 
@@ -77,6 +152,15 @@ class BaseMediaSource(ABC):
         :return: track position in milliseconds
         """
 
+    @property
+    def cover(self) -> Optional[str]:
+        """
+        Get the URL of the track's cover, sources without cover art have none
+
+        :return: the URL on the static web server, None if there is no cover
+        """
+        return None
+
     @abstractmethod
     def main(self) -> None:
         """
@@ -1,77 +1,86 @@
 """
 The Bluetooth media manager
 """
+import time
+from functools import partial
+from threading import Thread
 from types import NoneType
-from typing import Any, Callable, Dict, List, Union
-from dasbus.loop import EventLoop  # type: ignore # missing
-from dasbus.typing import ObjPath, Variant, Str
-from dasbus.error import DBusError
+from typing import Any, Callable, Dict, Optional, Union
 
 from pilot_drive.master_logging import MasterLogger
 
 from .abstract_media_source import BaseMediaSource, TrackProps
-from .constants import TrackStatus
-from ..bluetooth import Bluetooth, BluetoothDevice
-from ..shared.bluez_api import BluezDevice, BluezMediaPlayer, BluezAdapter
+from .constants import MEDIA_DEBOUNCE, PLAYBACK_RATE, TrackStatus
+from .cover_art import CoverArt
+from ..bluetooth import BluetoothClient
+from ..bluetooth.constants import RpcTopics
+from ..shared.event_loop import ThreadEventLoop, call_later
 
 
-class BluetoothMedia(BaseMediaSource):
+class BluetoothMedia(BaseMediaSource):  # pylint: disable=too-many-instance-attributes
     """
-    The Bluetooth media manager for Media. Utilizes the bluetooth service to relay metadata on
-        currently playing media.
+    The Bluetooth media manager for Media. Relays metadata on currently playing media, from the
+        state of the BlueZ media player published by the Bluetooth service.
+
+    The Bluetooth service follows the player's PropertiesChanged signals and publishes its state
+        on every change. BlueZ doesn't signal the position while a track plays, so the state
+        carries the time it was received and the position is extrapolated from it.
     """
 
     def __init__(
         self,
         push_to_queue_callback: Callable,
-        bluetooth: Bluetooth,
         logger: MasterLogger,
+        client: Optional[BluetoothClient] = None,
+        cover_art: Optional[CoverArt] = None,
+        clock: Callable[[], float] = time.time,
     ) -> None:
         """
         Initialize the Bluetooth media manager
 
         :param push_to_queue_callback: method that pushes new events to the queue
-        :param bluetooth: an instance of the Bluetooth service
         :param logger: an instance of the MasterLogger
-        """
-        super().__init__(push_to_queue_callback, logger)
-        self.bluetooth = bluetooth
-        self.adapter = self.bluetooth.bluez_adapter
-        self.media_player: Union[BluezMediaPlayer, NoneType] = None
-        self.__devices: List[BluetoothDevice] = []
+        :param client: Provide an optional client of the Bluetooth service, otherwise one will be
+            created
+        :param cover_art: the cover art of the tracks, None if it's disabled
+        :param clock: the wall clock the positions are extrapolated by, replaceable for testing
+        """
+        super().__init__(push_to_queue_callback, logger, clock=clock)
+        self.__clock = clock
+        self.__client = client or BluetoothClient()
+
+        # The path of the current player and its properties, as published by the Bluetooth service
+        self.__path: Optional[str] = None
+        self.__properties: Dict[str, Any] = {}
+        # The address of the player's device, for its cover art channel
+        self.__address: Optional[str] = None
+        # The time the service received the Position at, and the time the cached Position is from
+        self.__position_signaled: Optional[float] = None
+        self.__position_received: float = clock()
+        # The pending push of a burst of changes, None if there is none
+        self.__pending_push = None
+        self.__cover_art = cover_art
+        self.__loop: Optional[ThreadEventLoop] = None
 
         # on iOS sometimes only a duration comes in for an associated track.
         # It's important to store track info in this case
         self.__current_track = {}
 
-    def __get_track_property_failed(
-        self, prop: str, exc: DBusError, default: Any
-    ) -> None:
-        """
-        Used to log when the getting of a property (position, track, playing) fails, most likely
-            due to a state change.
-
-        :param property: the property that failed
-        :param exec: the DBus exception that was thrown
-        :param default: the default value to be returned
-        """
-        self.logger.warning(
-            msg=f'Failed to get property "{prop}" raised: "{exc}", defaulting to "{default}"!'
-        )
-
     @property
     def position(self) -> int:
         """
-        Get the track position
+        Get the track position, extrapolated from the last Position the player signaled
 
         :return: track position in milliseconds
         """
-        try:
-            return self.bluetooth.bluez_media_player.Position
-        except DBusError as exc:
-            default = 0
-            self.__get_track_property_failed(prop="position", exc=exc, default=default)
-            return default
+        position = self.__properties.get("Position", 0)
+        if self.__properties.get("Status") != TrackStatus.PLAYING:
+            return position
+
+        elapsed = max(self.__clock() - self.__position_received, 0)
+        position += int(elapsed * 1000 * PLAYBACK_RATE)
+        duration = self.__properties.get("Track", {}).get("Duration")
+        return min(position, duration) if duration else position
 
     @property
     def track(self) -> Union[TrackProps, Dict[str, NoneType]]:
@@ -80,43 +89,24 @@ class BluetoothMedia(BaseMediaSource):
 
         :return: a dict of Title, Artist, Album, and Duration with corresponding values.
         """
-        try:
-            track = self.bluetooth.bluez_media_player.Track
-            print(track)
-        except DBusError as exc:
-            print("GETTING TRACK FAILED")
-            default = {"Title": None, "Artist": None, "Album": None, "Duration": None}
-            self.__get_track_property_failed(prop="track", exc=exc, default=default)
-            return default
+        track = self.__properties.get("Track", {})
 
         is_empty_track = not bool(
             track.get("Title") or track.get("Album") or track.get("Artist")
         )
         if is_empty_track and (track.get("Duration") and self.__current_track):
-            media_dict = {
+            return {
                 **self.__current_track,
                 "Duration": track.get("Duration"),
             }
-        else:
-            # Convert the dasbus variant types to normal types (probably better ways to do this)
-            media_dict = {
-                "Title": track.get("Title"),
-                "Artist": track.get("Artist"),
-                "Album": track.get("Album"),
-                "Duration": track.get("Duration"),
-            }
 
-            self.__current_track = media_dict
-
-        # Convert dasbus Variants to native objects
-        converted_dict = {}
-        for key, value in media_dict.items():
-            if value is not None:
-                converted_dict[key] = value.unpack()
-            else:
-                converted_dict[key] = value
-
-        return converted_dict
+        self.__current_track = {
+            "Title": track.get("Title"),
+            "Artist": track.get("Artist"),
+            "Album": track.get("Album"),
+            "Duration": track.get("Duration"),
+        }
+        return self.__current_track
 
     @property
     def playing(self) -> bool:
@@ -125,118 +115,111 @@ class BluetoothMedia(BaseMediaSource):
 
         :return: a boolean of True if playing and False if not playing
         """
-        try:
-            return self.bluetooth.bluez_media_player.Status == TrackStatus.PLAYING
-        except DBusError as exc:
-            default = False
-            self.__get_track_property_failed(prop="playing", exc=exc, default=default)
-            return default
+        return self.__properties.get("Status") == TrackStatus.PLAYING
 
     @property
-    def active_av_devices(self) -> List[BluetoothDevice]:
-        """
-        Get a list of connected devices that have media capabilities
-
-        :return: A list of connected & media capable BluetoothDevice instances
-        """
-        av_list = []
-        for device in self.__devices:
-            if device.connected and device.media:
-                av_list.append(device)
-
-        return av_list
+    def cover(self) -> Optional[str]:
+        """
+        Get the URL of the track's cover. If it isn't cached yet, it's fetched in the background
+            from the player's cover art (BIP) channel and pushed once it's ready.
+
+        :return: the URL on the static web server, None if the cover isn't cached
+        """
+        if self.__cover_art is None:
+            return None
+
+        track = self.track
+        key = (track.get("Title"), track.get("Artist"), track.get("Album"))
+        url = self.__cover_art.url(track=key)
+        if url is not None:
+            return url
+
+        # Only present while the player's cover art channel is connected
+        handle = self.__properties.get("Track", {}).get("ImgHandle")
+        psm = self.__properties.get("ObexPort")
+        if handle and psm and self.__address:
+            self.__cover_art.request(
+                track=key,
+                address=self.__address,
+                psm=psm,
+                handle=handle,
+                callback=self.__cover_fetched,
+            )
+        return None
 
-    def __metadata_changed(self) -> None:
+    def __cover_fetched(self) -> None:
         """
-        Metadata (BlueZ MediaPlayer1) callback when properties change
+        Callback of the cover art, from its background thread once a cover is cached
         """
-        if len(self.active_av_devices) > 0:
-            self.push_media_to_queue()
+        if self.__loop is not None:
+            call_later(
+                delay=0, callback=self.__schedule_push, context=self.__loop.context
+            )
 
-    def __interfaces_added(
-        self, path: ObjPath, interface: str
-    ) -> None:  # pylint: disable=unused-argument
+    def __schedule_push(self) -> None:
         """
-        Callback utilized when a new interface is added
-
-        :param path: DBus path to the new interface
-        :param interface: name of the interface that was added
+        Push the media to the queue after MEDIA_DEBOUNCE, so a burst of changes (ie. the track,
+            status and position on a track change) is pushed as a single event
         """
+        if self.__pending_push is None:
+            self.__pending_push = call_later(delay=MEDIA_DEBOUNCE, callback=self.__push)
 
-        if BluezMediaPlayer.interface in interface:
-            self.bluetooth.push_bluetooth_to_queue(devices=self.__devices)
-            self.push_media_to_queue()
-            self.bluetooth.bluez_media_player.PropertiesChanged.connect(
-                self.__properties_changed
-            )
-        elif BluezDevice.interface in interface:
-            bt_device = self.bluetooth.get_bluez_device(
-                path=path, props_changed_callback=self.__properties_changed
-            )
-            self.__devices.append(bt_device)
-            bt_device.bluez_device.PropertiesChanged.connect(bt_device.prop_changed)
-
-    def __interfaces_removed(
-        self, path: ObjPath, interfaces: List[Str]
-    ) -> None:  # pylint: disable=unused-argument
+    def __push(self) -> None:
         """
-        Callback utilized when an interface is removed
-
-        :param path: DBus path to the new interface
-        :param interface: list of names of interfaces that were removed
+        Push the media collected during the debounce to the queue
         """
-        if BluezDevice.interface in interfaces:
-            for count, device in enumerate(self.__devices):
-                if device.path == path:
-                    self.__devices.pop(count)
-                    break
-
-        self.bluetooth.push_bluetooth_to_queue(devices=self.__devices)
+        self.__pending_push = None
+        self.push_media_to_queue()
 
-    def __properties_changed(
-        self,
-        interface: str,
-        changes: Dict[str, Variant],  # pylint: disable=unused-argument
-        invalidated_properties: List[str],  # pylint: disable=unused-argument
-    ) -> None:
+    def __apply(self, state: Dict[str, Any]) -> None:
         """
-        Callback utilized when an interface's properties change
+        Apply a player state published by the Bluetooth service, from the event loop
 
-        :param interface: names of interface that had a property change
-        :param changes: a dict of changes on the properties of the interface
-        :param invalidated_properties: a list of properties that were invalidated
+        :param state: the player state, see Bluetooth.player_state
         """
-        match interface:
-            case BluezAdapter.interface:
-                self.bluetooth.push_bluetooth_to_queue(devices=self.__devices)
-            case BluezDevice.interface:
-                self.bluetooth.push_bluetooth_to_queue(devices=self.__devices)
-            case BluezMediaPlayer.interface:
-                self.__metadata_changed()
-
-    def __initialize_observers(self) -> None:
-        for path, services in self.bluetooth.bluez_root.GetManagedObjects().items():
-            self.__interfaces_added(path, services)
+        properties = dict(state["properties"])
+        if (
+            self.__path is not None
+            and state["path"] == self.__path
+            and state["positionReceived"] == self.__position_signaled
+        ):
+            # The Position wasn't signaled again, rebase it so a status change extrapolates from
+            # where it happened
+            properties["Position"] = self.position
+            self.__position_received = self.__clock()
+        else:
+            self.__position_received = state["positionReceived"] or self.__clock()
 
-        self.bluetooth.bluez_root.InterfacesAdded.connect(self.__interfaces_added)
-        self.bluetooth.bluez_root.InterfacesRemoved.connect(self.__interfaces_removed)
-        self.adapter.PropertiesChanged.connect(self.__properties_changed)
+        self.__path = state["path"]
+        self.__properties = properties
+        self.__address = state["address"]
+        self.__position_signaled = state["positionReceived"]
+        self.__schedule_push()
 
     def main(self) -> None:
         """
-        Main loop of the bluetooth media manager. Creates a dasbus event loop and sets up initial
-            callbacks, along with initial queue pushes.
+        Main loop of the bluetooth media manager. Creates a dasbus event loop, and subscribes to the
+            player state of the Bluetooth service, which is applied from the loop.
         """
-        loop = EventLoop()
+        loop = ThreadEventLoop()
+        self.__loop = loop
 
-        self.__initialize_observers()
+        def player_changed(state: Dict[str, Any]) -> None:
+            """
+            Callback utilized when the Bluetooth service publishes the player state
 
-        self.bluetooth.push_bluetooth_to_queue(devices=self.__devices)
-
-        if len(self.active_av_devices) > 0:
-            self.bluetooth.bluez_media_player.PropertiesChanged.connect(
-                self.__properties_changed
+            :param state: the player state, see Bluetooth.player_state
+            """
+            call_later(
+                delay=0, callback=partial(self.__apply, state), context=loop.context
             )
-            self.push_media_to_queue()
+
+        Thread(
+            target=self.__client.subscribe,
+            args=(player_changed,),
+            kwargs={"topic": RpcTopics.PLAYER},
+            name="media-bluetooth",
+            daemon=True,
+        ).start()
 
         loop.run()
@@ -54,3 +54,40 @@ class TrackAttributes(StrEnum):
     GENRE = "Genre"
     TRACK_NUMBER = "TrackNumber"
     NUMBER_OF_TRACKS = "NumberOfTracks"
+
+
+# Seconds the media player's property changes are collected for before an event is pushed, BlueZ
+# signals the track, status and position separately on a track change
+MEDIA_DEBOUNCE = 0.05
+
+# Milliseconds the reported position may drift from the published anchor's extrapolation before
+# the anchor is resynced, ie. on a seek
+POSITION_DRIFT = 2000
+
+# The playback rate of a playing track, BlueZ doesn't expose another
+PLAYBACK_RATE = 1.0
+
+
+class TransferStatus(StrEnum):
+    """
+    Enum used for the status of an OBEX transfer
+
+    Transfer docs: https://github.com/bluez/bluez/blob/master/doc/obex-api.txt
+    """
+
+    QUEUED = "queued"
+    ACTIVE = "active"
+    SUSPENDED = "suspended"
+    COMPLETE = "complete"
+    ERROR = "error"
+
+
+# The OBEX target of the AVRCP cover art, the session is made on the player's "ObexPort" L2CAP PSM
+BIP_TARGET = "bip-avrcp"
+# Seconds a cover transfer may take, and the seconds between checks of its status
+BIP_TIMEOUT = 10
+BIP_POLL_INTERVAL = 0.05
+
+# Covers are stored as JPEGs named by the digest of their content
+COVER_ART_EXTENSION = ".jpg"
+COVER_ART_QUALITY = 85
@@ -0,0 +1,381 @@
+"""
+The cover art of the media. Covers are fetched from the phone over AVRCP's Basic Imaging Profile
+(BIP) through obexd, resized once to fit the display and kept in a content addressed disk cache.
+The static web server serves the cache, so media events only carry the URL of a cover.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Dict, Optional, Sequence, Set, Tuple
+
+from dasbus.error import DBusError  # type: ignore # missing
+from dasbus.typing import ObjPath, Str, UInt16, get_variant  # type: ignore # missing
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, cover art is disabled without it
+    Image = None
+
+from pilot_drive.constants import COVER_ART_URL
+from pilot_drive.master_logging import MasterLogger
+
+from .constants import (
+    BIP_POLL_INTERVAL,
+    BIP_TARGET,
+    BIP_TIMEOUT,
+    COVER_ART_EXTENSION,
+    COVER_ART_QUALITY,
+    TransferStatus,
+)
+from .exceptions import CoverArtException
+from ..shared.dbus_api import MessageBus, SessionBus
+from ..shared.obex_api import ObexClient, ObexImage, ObexTransfer
+
+# Whether the optional dependencies of cover art are installed
+COVER_ART_SUPPORTED = Image is not None
+
+# The title, artist and album of a track
+TrackKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def resize_cover(image: bytes, resolution: Sequence[int]) -> bytes:
+    """
+    Decode a cover and shrink it to fit within a resolution, keeping its aspect ratio
+
+    :param image: the encoded image, in any format Pillow reads
+    :param resolution: the width and height to fit within
+    :return: the resized cover, encoded as a JPEG
+    :raises: CoverArtException: if the image can't be decoded
+    """
+    output = io.BytesIO()
+    try:
+        with Image.open(io.BytesIO(image)) as cover:
+            cover = cover.convert("RGB")
+            cover.thumbnail((resolution[0], resolution[1]))
+            cover.save(output, format="JPEG", quality=COVER_ART_QUALITY)
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise CoverArtException(f"Failed to decode the cover: {exc}") from exc
+    return output.getvalue()
+
+
+class CoverArtCache:
+    """
+    A content addressed disk cache of covers, with a byte budget. Covers are named by the digest
+        of their content, the least recently used ones are removed once the cache is over budget.
+        File modification times keep the order of use across restarts.
+    """
+
+    def __init__(self, directory: str, max_total_size: int) -> None:
+        """
+        Initialize the cache with the covers already in the directory
+
+        :param directory: the directory the covers are stored in, created if it doesn't exist
+        :param max_total_size: the bytes the covers may take up
+        :raises: OSError: if the directory can't be created or read
+        """
+        self.__directory = directory
+        self.__max_total_size = max_total_size
+        self.__lock = Lock()
+        # The size of each cover by digest, the least recently used first
+        self.__entries: "OrderedDict[str, int]" = OrderedDict()
+
+        os.makedirs(directory, exist_ok=True)
+        covers = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(COVER_ART_EXTENSION):
+                stat = entry.stat()
+                digest = entry.name[: -len(COVER_ART_EXTENSION)]
+                covers.append((stat.st_mtime, digest, stat.st_size))
+        for _, digest, size in sorted(covers):
+            self.__entries[digest] = size
+        with self.__lock:
+            self.__evict()
+
+    @property
+    def total_size(self) -> int:
+        """
+        The bytes the cached covers take up
+        """
+        with self.__lock:
+            return sum(self.__entries.values())
+
+    def path(self, digest: str) -> str:
+        """
+        Get the path of a cover
+
+        :param digest: the digest of the cover
+        :return: the path of the cover's file
+        """
+        return os.path.join(self.__directory, f"{digest}{COVER_ART_EXTENSION}")
+
+    def get(self, digest: str) -> bool:
+        """
+        Check whether a cover is cached, marking it as the most recently used
+
+        :param digest: the digest of the cover
+        :return: True if the cover is cached
+        """
+        with self.__lock:
+            if digest not in self.__entries:
+                return False
+            self.__entries.move_to_end(digest)
+
+        try:
+            os.utime(self.path(digest=digest))
+        except FileNotFoundError:
+            # Removed from the outside
+            with self.__lock:
+                self.__entries.pop(digest, None)
+            return False
+        return True
+
+    def store(self, image: bytes) -> str:
+        """
+        Store a cover, unless it's already cached
+
+        :param image: the encoded cover
+        :return: the digest of the cover
+        :raises: OSError: if the cover can't be written
+        """
+        digest = hashlib.blake2b(image, digest_size=16).hexdigest()
+        if self.get(digest=digest):
+            return digest
+
+        # Written whole before it's renamed, so a cover is never served half written
+        descriptor, temporary = tempfile.mkstemp(dir=self.__directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(image)
+            os.replace(temporary, self.path(digest=digest))
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+        with self.__lock:
+            self.__entries[digest] = len(image)
+            self.__evict()
+        return digest
+
+    def __evict(self) -> None:
+        """
+        Remove the least recently used covers until the cache is within budget. The most recent
+            one is kept regardless, as its URL is about to be published.
+        """
+        total_size = sum(self.__entries.values())
+        while total_size > self.__max_total_size and len(self.__entries) > 1:
+            digest, size = self.__entries.popitem(last=False)
+            total_size -= size
+            try:
+                os.remove(self.path(digest=digest))
+            except FileNotFoundError:
+                pass
+
+
+class BipClient:  # pylint: disable=too-few-public-methods
+    """
+    Fetches images over the AVRCP cover art (BIP) OBEX channel of phones. A session is made per
+        phone and kept for its following images.
+    """
+
+    def __init__(self, bus: MessageBus) -> None:
+        """
+        Initialize the client, without connecting yet
+
+        :param bus: an instance of the DBus session bus, that obexd is on
+        """
+        self.__bus = bus
+        # The session of each phone, by address and PSM
+        self.__sessions: Dict[Tuple[Str, int], ObjPath] = {}
+
+    def __session(self, address: Str, psm: int) -> ObjPath:
+        """
+        Get the BIP session of a phone, created on first use
+
+        :param address: the MAC address of the phone
+        :param psm: the L2CAP PSM of the cover art, the "ObexPort" of the player
+        :return: the path of the session
+        """
+        key = (address, psm)
+        if key not in self.__sessions:
+            self.__sessions[key] = ObexClient.connect(bus=self.__bus).CreateSession(
+                address,
+                {
+                    "Target": get_variant(Str, BIP_TARGET),
+                    "PSM": get_variant(UInt16, psm),
+                },
+            )
+        return self.__sessions[key]
+
+    def __wait(self, transfer: ObjPath) -> None:
+        """
+        Wait for a transfer to complete
+
+        :param transfer: the path of the transfer
+        :raises: CoverArtException: if the transfer failed or didn't complete within BIP_TIMEOUT
+        """
+        proxy = ObexTransfer.connect(bus=self.__bus, path=transfer)
+        deadline = time.monotonic() + BIP_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                status = proxy.Status
+            except DBusError:
+                # obexd removes a transfer once it's done
+                return
+            if status == TransferStatus.COMPLETE:
+                return
+            if status == TransferStatus.ERROR:
+                raise CoverArtException(f'Transfer "{transfer}" failed!')
+            time.sleep(BIP_POLL_INTERVAL)
+
+        raise CoverArtException(f'Transfer "{transfer}" timed out!')
+
+    def fetch(self, address: Str, psm: int, handle: Str) -> bytes:
+        """
+        Fetch the native image of a handle. If the session was lost, ie. as the phone reconnected,
+            the image is fetched once more over a new one.
+
+        :param address: the MAC address of the phone
+        :param psm: the L2CAP PSM of the cover art, the "ObexPort" of the player
+        :param handle: the image handle, the "ImgHandle" of the player's track
+        :return: the encoded image
+        :raises: CoverArtException: if the image couldn't be fetched
+        """
+        for retry in (False, True):
+            try:
+                session = self.__session(address=address, psm=psm)
+                image = ObexImage.connect(bus=self.__bus, path=session)
+                with tempfile.TemporaryDirectory() as directory:
+                    target = os.path.join(directory, "cover")
+                    transfer, _ = image.Get(target, handle, {})
+                    self.__wait(transfer=transfer)
+                    with open(target, "rb") as file:
+                        return file.read()
+            except (DBusError, OSError) as exc:
+                self.__sessions.pop((address, psm), None)
+                if retry:
+                    raise CoverArtException(
+                        f'Failed to fetch image "{handle}" from "{address}": {exc}'
+                    ) from exc
+
+        raise CoverArtException(f'Failed to fetch image "{handle}" from "{address}"!')
+
+
+class CoverArt:  # pylint: disable=too-many-instance-attributes
+    """
+    The cover art of the tracks. Covers are fetched in the background, one at a time, and then
+        served from the cache.
+    """
+
+    def __init__(
+        self,
+        logger: MasterLogger,
+        directory: str,
+        max_total_size: int,
+        resolution: Sequence[int],
+        bus: Optional[MessageBus] = None,
+    ) -> None:
+        """
+        Initialize the cover art
+
+        :param logger: an instance of the MasterLogger
+        :param directory: the directory of the cover art cache
+        :param max_total_size: the bytes the cached covers may take up
+        :param resolution: the width and height the covers are resized to fit within
+        :param bus: Provide an optional session bus, otherwise one will be created
+        :raises: OSError: if the cache directory can't be created or read
+        """
+        self.__logger = logger
+        self.__resolution = resolution
+        self.__cache = CoverArtCache(directory=directory, max_total_size=max_total_size)
+        self.__bip = BipClient(bus=bus or SessionBus())
+
+        self.__lock = Lock()
+        # The digest of the cover of each track
+        self.__covers: Dict[TrackKey, str] = {}
+        # The tracks whose cover is being fetched, and the handle each failed on
+        self.__pending: Set[TrackKey] = set()
+        self.__failed: Dict[TrackKey, Str] = {}
+        self.__executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="cover-art"
+        )
+
+    def url(self, track: TrackKey) -> Optional[str]:
+        """
+        Get the URL of a track's cover
+
+        :param track: the title, artist and album of the track
+        :return: the URL on the static web server, None if the cover isn't cached
+        """
+        with self.__lock:
+            digest = self.__covers.get(track)
+        if digest is None or not self.__cache.get(digest=digest):
+            return None
+        return f"{COVER_ART_URL}{digest}{COVER_ART_EXTENSION}"
+
+    def request(
+        self,
+        track: TrackKey,
+        address: Str,
+        psm: int,
+        handle: Str,
+        callback: Callable[[], None],
+    ) -> None:
+        """
+        Fetch the cover of a track in the background, unless it's already being fetched or failed
+            for the same handle
+
+        :param track: the title, artist and album of the track
+        :param address: the MAC address of the phone
+        :param psm: the L2CAP PSM of the cover art, the "ObexPort" of the player
+        :param handle: the image handle, the "ImgHandle" of the player's track
+        :param callback: called from the background thread once the cover is cached
+        """
+        with self.__lock:
+            if track in self.__pending or self.__failed.get(track) == handle:
+                return
+            self.__pending.add(track)
+        self.__executor.submit(self.__fetch, track, address, psm, handle, callback)
+
+    def __fetch(
+        self,
+        track: TrackKey,
+        address: Str,
+        psm: int,
+        handle: Str,
+        callback: Callable[[], None],
+    ) -> None:
+        """
+        Fetch, resize and cache the cover of a track
+
+        :param track: the title, artist and album of the track
+        :param address: the MAC address of the phone
+        :param psm: the L2CAP PSM of the cover art
+        :param handle: the image handle
+        :param callback: called once the cover is cached
+        """
+        try:
+            image = self.__bip.fetch(address=address, psm=psm, handle=handle)
+            digest = self.__cache.store(
+                image=resize_cover(image=image, resolution=self.__resolution)
+            )
+        except (CoverArtException, OSError) as exc:
+            self.__logger.warning(
+                msg=f'Failed to get the cover of "{track[0]}" raised: "{exc}"!'
+            )
+            with self.__lock:
+                self.__pending.discard(track)
+                self.__failed[track] = handle
+            return
+
+        with self.__lock:
+            self.__pending.discard(track)
+            self.__failed.pop(track, None)
+            self.__covers[track] = digest
+        callback()
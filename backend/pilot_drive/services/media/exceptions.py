@@ -0,0 +1,9 @@
+"""
+Exceptions of the Media service
+"""
+
+
+class CoverArtException(Exception):
+    """
+    Raised when the cover art of a track can't be fetched or stored
+    """
@@ -2,14 +2,21 @@
 The module that manages the media of PILOT Drive, ie. A/V metadata
 """
 import json
-from typing import Dict
+from typing import Dict, Optional
 
+from pilot_drive.constants import DEFAULT_COVER_ART_SETTINGS
 from pilot_drive.master_logging.master_logger import MasterLogger
 from pilot_drive.master_queue import MasterEventQueue, EventType
 
 from .bluetooth_media import BluetoothMedia
 from .constants import MediaSources, TrackControl
-from ..bluetooth import Bluetooth, NoPlayerException
+from .cover_art import COVER_ART_SUPPORTED, CoverArt
+from ..bluetooth import (
+    BluetoothClient,
+    BluetoothRpcException,
+    BluetoothUnavailableException,
+    NoPlayerException,
+)
 from ..abstract_service import AbstractService
 
 
@@ -23,6 +30,7 @@ class Media(AbstractService):
         master_event_queue: MasterEventQueue,
         service_type: EventType,
         logger: MasterLogger,
+        cover_art_settings: Optional[dict] = None,
     ) -> None:
         """
         Initialize the Media service.
@@ -30,12 +38,19 @@ class Media(AbstractService):
         :param master_event_queue: the master event queue (message bus) that handles new events
         :param service_type: the EvenType enum that indicated what the service will appear as on
         the event queue
+        :param cover_art_settings: the "coverArt" of the media settings, the defaults if None
         """
         super().__init__(master_event_queue, service_type, logger)
         self.source = MediaSources.BLUETOOTH
+        self.__cover_art_settings = {
+            **DEFAULT_COVER_ART_SETTINGS,
+            **(cover_art_settings or {}),
+        }
 
         # var used to prevent excessive pushing of info to the queue
         self.__last_event = ""
+        # Track control goes through the Bluetooth service, which owns the media player
+        self.__bluetooth = BluetoothClient()
 
     def __push_media_to_queue(self, track_data: Dict[str, str]) -> None:
         media_event = {"source": self.source, "song": {**track_data}}
@@ -51,32 +66,51 @@ class Media(AbstractService):
         """
         match self.source:
             case MediaSources.BLUETOOTH:
-                bluetooth = Bluetooth(
-                    master_event_queue=self.event_queue,
-                    service_type=EventType.BLUETOOTH,
-                    logger=self.logger,
-                )
                 try:
-                    media_player = bluetooth.bluez_media_player
                     match action:
                         case TrackControl.PLAY:
-                            media_player.Play()
+                            self.__bluetooth.track_control(command="Play")
                         case TrackControl.PAUSE:
-                            media_player.Pause()
+                            self.__bluetooth.track_control(command="Pause")
                         case TrackControl.NEXT:
-                            media_player.Next()
+                            self.__bluetooth.track_control(command="Next")
                         case TrackControl.PREV:
-                            media_player.Previous()
+                            self.__bluetooth.track_control(command="Previous")
                 except NoPlayerException:
                     self.logger.warning(
                         f'Track control "{action}" issued but there is no active media player!'
                     )
+                except (BluetoothUnavailableException, BluetoothRpcException) as exc:
+                    self.logger.error(msg=f'Track control "{action}" failed: {exc}')
 
     def refresh(self) -> None:
         """
         Currently a do-nothing method as there are no events stored within the object to serve
         """
 
+    def __create_cover_art(self) -> Optional[CoverArt]:
+        """
+        Create the cover art of the media
+
+        :return: the cover art, or None if it's disabled or failed to start
+        """
+        if not self.__cover_art_settings["enabled"]:
+            return None
+        if not COVER_ART_SUPPORTED:
+            self.logger.warning(msg="Pillow is not installed, cover art is disabled!")
+            return None
+
+        try:
+            return CoverArt(
+                logger=self.logger,
+                directory=self.__cover_art_settings["path"],
+                max_total_size=self.__cover_art_settings["maxTotalSize"],
+                resolution=self.__cover_art_settings["resolution"],
+            )
+        except OSError as exc:
+            self.logger.error(msg=f"Failed to start the cover art: {exc}")
+            return None
+
     def main(self) -> None:
         """
         The main method of the Media service, dictates which media manager to use based on media
@@ -86,15 +120,11 @@ class Media(AbstractService):
 
         match source:
             case MediaSources.BLUETOOTH:
-                bluetooth = Bluetooth(
-                    master_event_queue=self.event_queue,
-                    service_type=EventType.BLUETOOTH,
-                    logger=self.logger,
-                )
                 media = BluetoothMedia(
                     push_to_queue_callback=self.__push_media_to_queue,
-                    bluetooth=bluetooth,
                     logger=self.logger,
+                    client=self.__bluetooth,
+                    cover_art=self.__create_cover_art(),
                 )
             case _:
                 raise ValueError(f"Media source {source} is not supported yet!")
@@ -3,12 +3,10 @@ The iOS notification manager for PILOT Drive phone notifications
 """
 
 import json
-from typing import List, Dict
-from dasbus.typing import ObjPath, Str, Variant
+from typing import List, Dict, Optional
 
 from pilot_drive.master_logging import MasterLogger
-from ..bluetooth import Bluetooth, BluetoothDevice
-from ..shared.bluez_api import BluezDevice, BluezAdapter
+from ..bluetooth import BluetoothClient, BluetoothUnavailableException
 from .constants import Notification, PhoneStates
 from .exceptions import NoANCSDeviceConnectedException
 
@@ -18,11 +16,24 @@ class IOSManager:
     Abstract manager that to encourage proper implementation of Android/iOS devices
     """
 
-    def __init__(self, logger: MasterLogger, bluetooth: Bluetooth) -> None:
+    def __init__(self, logger: MasterLogger, bluetooth: BluetoothClient) -> None:
         self.logger = logger
         self.__notifications: List[Notification] = []
         self.bluetooth = bluetooth
-        self.__devices: List[BluetoothDevice] = []
+        # The latest bluetooth event of the Bluetooth service, None until it's received
+        self.__bluetooth_event: Optional[Dict] = None
+
+    def __ancs_devices(self) -> List[str]:
+        """
+        Look up the connected ANCS devices with the Bluetooth service
+
+        :return: a list of the devices' MAC addresses, empty if the service can't be reached
+        """
+        try:
+            return self.bluetooth.ancs_devices()
+        except BluetoothUnavailableException as exc:
+            self.logger.warning(msg=f"Failed to look up the ANCS devices: {exc}")
+            return []
 
     @property
     def notifications(self) -> List[Notification]:
@@ -31,7 +42,7 @@ class IOSManager:
 
         :return: a list of notifications collected by the manager
         """
-        if self.bluetooth.active_ancs_devices:
+        if self.__ancs_devices():
             return self.__notifications
 
         raise NoANCSDeviceConnectedException(
@@ -41,18 +52,19 @@ class IOSManager:
     @property
     def state(self) -> PhoneStates:
         """
-        Return the state of the connected ANCS device
+        Return the state of the connected ANCS device, from the latest bluetooth event
 
         :return: the current state of the phone via the PhoneState attribute
         """
-        if not self.bluetooth.bluez_adapter.Powered:
-            return PhoneStates.BLUETOOTH_DISABLED
+        if self.__bluetooth_event is None:
+            return PhoneStates.DISCONNECTED
 
-        # Get a list of connected devices
-        connected_devices = [device for device in self.__devices if device.connected]
+        if not self.__bluetooth_event["powered"]:
+            return PhoneStates.BLUETOOTH_DISABLED
 
-        if self.bluetooth.active_ancs_devices and connected_devices:
-            return PhoneStates.CONNECTED
+        for device in self.__bluetooth_event["devices"]:
+            if device["connected"] and device["ancs"]:
+                return PhoneStates.CONNECTED
 
         return PhoneStates.DISCONNECTED
 
@@ -63,80 +75,35 @@ class IOSManager:
 
         :return: the name of the connected device
         """
-        ancs_devices = self.bluetooth.active_ancs_devices
+        ancs_devices = self.__ancs_devices()
 
         if not ancs_devices:
             raise NoANCSDeviceConnectedException(
                 "Cannot get device name, none connected!"
             )
 
-        for device in self.__devices:
+        devices = self.__bluetooth_event["devices"] if self.__bluetooth_event else []
+        for device in devices:
             # Temporarily assume the first device in the ANCS list is the intended one
-            if device.address.upper() == ancs_devices[0].upper():
-                return device.name
+            if device["address"].upper() == ancs_devices[0].upper():
+                return device["name"]
 
         raise NoANCSDeviceConnectedException("Failed to get device name!")
 
-    def device_added(
-        self, device: BluetoothDevice
-    ) -> None:  # pylint: disable=unused-argument
-        """
-        Callback utilized when a new interface is added
-
-        :param path: DBus path to the new interface
-        :param interface: name of the interface that was added
+    def bluetooth_changed(self, event: Dict) -> None:
         """
-        self.__devices.append(device)
+        Callback utilized when the Bluetooth service publishes a bluetooth event
 
-    def interfaces_removed(
-        self, path: ObjPath, interfaces: List[Str]
-    ) -> None:  # pylint: disable=unused-argument
+        :param event: the bluetooth event, with the adapter's state and the device list
         """
-        Callback utilized when an interface is removed
-
-        :param path: DBus path to the new interface
-        :param interface: list of names of interfaces that were removed
-        """  # pylint: disable=duplicate-code
-        if BluezDevice.interface in interfaces:
-            for count, device in enumerate(self.__devices):
-                if device.path == path:
-                    self.__devices.pop(count)
-                    break
-
-        self.bluetooth.push_bluetooth_to_queue(devices=self.__devices)
-
-    def properties_changed(
-        self,
-        interface: str,
-        changes: Dict[str, Variant],  # pylint: disable=unused-argument
-        invalidated_properties: List[str],  # pylint: disable=unused-argument
-    ) -> None:
-        """
-        Callback utilized when an interface's properties change
-
-        :param interface: names of interface that had a property change
-        :param changes: a dict of changes on the properties of the interface
-        :param invalidated_properties: a list of properties that were invalidated
-        """
-        match interface:
-            case BluezAdapter.interface:
-                self.bluetooth.push_bluetooth_to_queue(devices=self.__devices)
-            case BluezDevice.interface:
-                self.bluetooth.push_bluetooth_to_queue(devices=self.__devices)
-
-    # def initialize_observers(self) -> None:
-    #     for path, services in self.bluetooth.bluez_root.GetManagedObjects().items():
-    #         self.interfaces_added(path, services)
-
-    #     self.bluetooth.bluez_root.InterfacesAdded.connect(self.interfaces_added)
-    #     self.bluetooth.bluez_root.InterfacesRemoved.connect(self.interfaces_removed)
+        self.__bluetooth_event = event
 
     def show_notification(self, notification_json: str) -> None:
         """
         Callback used when a new notification is detected on the iOS device
 
         :param notification_json: JSON string passed by ANCS containing new notification
-        """
+        """  # pylint: disable=duplicate-code
         notification = json.loads(notification_json)
         formatted_notif = {
             # Only the last 3 digits of the ID matter, found via trial and error
@@ -2,9 +2,8 @@
 The module that handles the phone connectivity to PILOT Drive
 """
 import time
+from threading import Thread
 from typing import Dict, List
-from dasbus.loop import EventLoop  # type: ignore # missing
-from dasbus.typing import ObjPath, Str, Variant
 from dasbus.connection import (  # type: ignore # missing
     SystemMessageBus,
 )
@@ -13,9 +12,9 @@ from pilot_drive.master_logging.master_logger import MasterLogger
 from pilot_drive.master_queue.master_event_queue import MasterEventQueue, EventType
 
 from ..settings import Settings
-from ..bluetooth import Bluetooth
+from ..bluetooth import BluetoothClient
 from ..abstract_service import AbstractService
-from ..shared.bluez_api import BluezDevice
+from ..shared.event_loop import ThreadEventLoop
 from .android_manager import AndroidManager
 from .ios_manager import IOSManager
 from .ancs_api import ANCSObserver
@@ -76,14 +75,10 @@ class Phone(AbstractService):
                 case PhoneTypes.ANDROID:
                     self.__phone_manager = AndroidManager(logger=self.logger)
                 case PhoneTypes.IOS:
+                    # The bus of the ANCS observer, BlueZ is reached through the Bluetooth service
                     self.bus = SystemMessageBus()
-                    bluetooth = Bluetooth(
-                        master_event_queue=self.event_queue,
-                        service_type=EventType.BLUETOOTH,
-                        logger=self.logger,
-                    )
                     self.__phone_manager = IOSManager(
-                        logger=self.logger, bluetooth=bluetooth
+                        logger=self.logger, bluetooth=BluetoothClient()
                     )
                 case _:
                     raise FailedToReadSettingsException("Unrecognized phone type!")
@@ -198,60 +193,17 @@ class Phone(AbstractService):
             ).__dict__
         )
 
-        loop = EventLoop()
+        loop = ThreadEventLoop()
         # manager.initialize_observers()
         ancs = ANCSObserver.connect(bus=self.bus)
 
-        def interfaces_added(path: ObjPath, interface: str) -> None:
-            if BluezDevice.interface in interface:
-                bt_device = manager.bluetooth.get_bluez_device(
-                    path=path, props_changed_callback=properties_changed
-                )
-                bt_device.bluez_device.PropertiesChanged.connect(bt_device.prop_changed)
-                manager.device_added(bt_device)
-                phone_container = PhoneContainer(
-                    enabled=self.__enabled,
-                    type=self.__type.value,
-                    state=self.state.value,
-                    notifications=self.__notifications,
-                )
-                self.push_to_queue(event=phone_container.__dict__)
-
-        def interfaces_removed(
-            path: ObjPath, interfaces: List[Str]
-        ) -> None:  # pylint: disable=unused-argument
-            """
-            Callback utilized when an interface is removed
-
-            :param path: DBus path to the new interface
-            :param interface: list of names of interfaces that were removed
-            """
-            manager.interfaces_removed(path=path, interfaces=interfaces)
-            phone_container = PhoneContainer(
-                enabled=self.__enabled,
-                type=self.__type.value,
-                state=self.state.value,
-                notifications=self.__notifications,
-            )
-            self.push_to_queue(event=phone_container.__dict__)
-
-        def properties_changed(
-            interface: str,
-            changes: Dict[str, Variant],  # pylint: disable=unused-argument
-            invalidated_properties: List[str],  # pylint: disable=unused-argument
-        ) -> None:
+        def bluetooth_changed(event: Dict) -> None:
             """
-            Callback utilized when an interface's properties change
+            Callback utilized when the Bluetooth service publishes a bluetooth event
 
-            :param interface: names of interface that had a property change
-            :param changes: a dict of changes on the properties of the interface
-            :param invalidated_properties: a list of properties that were invalidated
+            :param event: the bluetooth event, with the adapter's state and the device list
             """
-            manager.properties_changed(
-                interface=interface,
-                changes=changes,
-                invalidated_properties=invalidated_properties,
-            )
+            manager.bluetooth_changed(event=event)
             phone_container = PhoneContainer(
                 enabled=self.__enabled,
                 type=self.__type.value,
@@ -282,20 +234,20 @@ class Phone(AbstractService):
             )
             self.push_to_queue(event=phone_container.__dict__)
 
-        # Initialize observers
-        for path, services in manager.bluetooth.bluez_root.GetManagedObjects().items():
-            interfaces_added(path, services)
-
-        manager.bluetooth.bluez_root.InterfacesAdded.connect(interfaces_added)
-        manager.bluetooth.bluez_root.InterfacesRemoved.connect(interfaces_removed)
-        manager.bluetooth.bluez_adapter.PropertiesChanged.connect(properties_changed)
+        # Initialize observers, the devices are followed through the Bluetooth service
+        Thread(
+            target=manager.bluetooth.subscribe,
+            args=(bluetooth_changed,),
+            name="phone-bluetooth",
+            daemon=True,
+        ).start()
 
         ancs.ShowNotification.connect(show_ios_notification)
         ancs.DismissNotification.connect(dismiss_ios_notification)
 
         loop.run()
 
-    def push_to_queue(self, event: dict, event_type: dict = None):
+    def push_to_queue(self, event: dict, event_type: dict = None, key: str = None):
         """
         Push a new event to the master queue.
 
@@ -303,6 +255,7 @@ class Phone(AbstractService):
             to the UI.
         :param event_type: the event type that will go on the queue. If no argument is specified,
             it defaults to the calling services type
+        :param key: an optional coalescing sub-key, see MasterEventQueue.push_event()
         """
         if not event_type:
             event_type = self.service_type
@@ -314,7 +267,7 @@ class Phone(AbstractService):
 
         event["notifications"] = json_notifs
 
-        self.event_queue.push_event(event_type=self.service_type, event=event)
+        self.event_queue.push_event(event_type=self.service_type, event=event, key=key)
 
     def main(self):
         if not self.__enabled:
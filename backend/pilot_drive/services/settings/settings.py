@@ -85,6 +85,11 @@ class Settings(AbstractService):
          settings.json file, but is just for abstract method purposes now.
         """
 
+    async def run(self) -> None:
+        """
+        main() does nothing, so there's no need for a thread in the task runtime
+        """
+
     @property
     def web_settings(self) -> dict:
         """
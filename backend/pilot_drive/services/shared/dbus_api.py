@@ -4,6 +4,7 @@ Typings used to assist with DBus/dasbus related activities.
 from abc import ABC, abstractmethod
 from typing import Any, Dict, cast
 from dasbus.connection import (  # type: ignore # missing
+    SessionMessageBus,
     SystemMessageBus,
 )
 
@@ -59,6 +60,15 @@ def SystemBus() -> MessageBus:  # pylint: disable=invalid-name
     return cast(MessageBus, SystemMessageBus())
 
 
+def SessionBus() -> MessageBus:  # pylint: disable=invalid-name
+    """
+    Get a new DBus session bus
+
+    :return: A new DBus session bus instance
+    """
+    return cast(MessageBus, SessionMessageBus())
+
+
 class ObjectManagerAPI(ABC):  # pylint: disable=too-few-public-methods
     """
     Type for the DBus ObjectManager
@@ -0,0 +1,82 @@
+"""
+GLib event loop helpers, so dasbus based services can run in threads of the task runtime as well
+as in their own processes.
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from gi.repository import GLib  # type: ignore # missing
+
+
+class ThreadEventLoop:
+    """
+    A GLib event loop of the calling thread's default main context. A drop in replacement for
+        dasbus' EventLoop, which always runs the global default main context. In a service process
+        the thread default context is the global default one, so both behave the same.
+    """
+
+    def __init__(self) -> None:
+        self.__loop = GLib.MainLoop(GLib.MainContext.ref_thread_default())
+
+    @property
+    def context(self) -> GLib.MainContext:
+        """
+        The main context the event loop runs
+        """
+        return self.__loop.get_context()
+
+    def run(self) -> None:
+        """
+        Start the event loop
+        """
+        self.__loop.run()
+
+    def quit(self) -> None:
+        """
+        Stop the event loop
+        """
+        self.__loop.quit()
+
+
+@contextmanager
+def thread_main_context() -> Iterator[GLib.MainContext]:
+    """
+    Give the calling thread its own default GLib main context. DBus signals subscribed to within
+        the context are dispatched by a ThreadEventLoop of the same thread, rather than the global
+        default context another service's thread may be running.
+
+    :return: the new main context
+    """
+    context = GLib.MainContext.new()
+    context.push_thread_default()
+    try:
+        yield context
+    finally:
+        context.pop_thread_default()
+
+
+def call_later(
+    delay: float,
+    callback: Callable[[], None],
+    context: Optional[GLib.MainContext] = None,
+) -> GLib.Source:
+    """
+    Call a function once after a delay, from the event loop of the calling thread's default main
+        context. Unlike GLib.timeout_add(), which always uses the global default context.
+
+    :param delay: the seconds to wait
+    :param callback: the function to call
+    :param context: the main context to call it from instead, ie. a ThreadEventLoop's context when
+        called from another thread
+    :return: the timeout source, destroy() it to cancel the call
+    """
+
+    def dispatch(*_) -> bool:
+        callback()
+        return GLib.SOURCE_REMOVE
+
+    source = GLib.timeout_source_new(int(delay * 1000))
+    source.set_callback(dispatch)
+    source.attach(context or GLib.MainContext.ref_thread_default())
+    return source
@@ -0,0 +1,167 @@
+"""
+Wrappers/API for the DBus BlueZ OBEX interface (obexd, on the session bus) that PILOT Drive
+utilizes or plans to utilize.
+
+For more info, see: https://github.com/bluez/bluez/blob/master/doc/obex-api.txt
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Tuple, cast
+from dasbus.typing import ObjPath, Str, UInt64, Variant  # type: ignore # missing
+
+from .dbus_api import PropertiesAPI, MessageBus
+
+
+class ObexBaseApi(ABC):  # pylint: disable=too-few-public-methods
+    """
+    Base class for the BlueZ OBEX APIs
+    """
+
+    name = "org.bluez.obex"
+
+    @classmethod
+    @abstractmethod
+    def connect(cls, bus: MessageBus, path: ObjPath) -> Any:
+        """
+        Get a proxy for the specified API
+
+        :param bus: an instance of the DBus session bus
+        :param path: an ObjPath to intended object
+
+        :return: proxy to the specified API
+        """
+
+
+class ObexClient(ABC):
+    """
+    Type wrapper for the org.bluez.obex.Client1
+    https://github.com/bluez/bluez/blob/master/doc/obex-api.txt
+    """
+
+    name = "org.bluez.obex"
+    interface = "org.bluez.obex.Client1"
+    path = ObjPath("/org/bluez/obex")
+
+    @classmethod
+    def connect(cls, bus: MessageBus) -> "ObexClient":
+        """
+        Get a proxy to the OBEX client
+
+        :param bus: an instance of the DBus session bus
+        :return: an instance of ObexClient
+        """
+        return cast(ObexClient, bus.get_proxy(cls.name, cls.path))
+
+    @abstractmethod
+    def CreateSession(  # pylint: disable=invalid-name
+        self, destination: Str, args: Dict[Str, Variant]
+    ) -> ObjPath:
+        """
+        Create a new OBEX session for the given remote address.
+
+        :param destination: the MAC address of the remote device
+        :param args: the session's "Target" (ie. "bip-avrcp"), and optionally "Source",
+            "Channel" and "PSM"
+        :return: the path of the session
+        """
+
+    @abstractmethod
+    def RemoveSession(self, session: ObjPath) -> None:  # pylint: disable=invalid-name
+        """
+        Unregister session and abort pending transfers.
+
+        :param session: the path of the session
+        """
+
+
+class ObexImage(ObexBaseApi, ABC):
+    """
+    Type wrapper for the org.bluez.obex.Image1, the cover art (BIP) of an AVRCP session
+    https://github.com/bluez/bluez/blob/master/doc/obex-api.txt
+    """
+
+    interface = "org.bluez.obex.Image1"
+
+    @classmethod
+    def connect(cls, bus: MessageBus, path: ObjPath) -> "ObexImage":
+        """
+        Get a proxy for the OBEX Image1 of a session
+
+        :param bus: an instance of the DBus session bus
+        :param path: an ObjPath to the session
+
+        :return: an instance of ObexImage
+        """
+        return cast(ObexImage, bus.get_proxy(cls.name, path))
+
+    @abstractmethod
+    def Get(  # pylint: disable=invalid-name
+        self, targetfile: Str, handle: Str, description: Dict[Str, Variant]
+    ) -> Tuple[ObjPath, Dict[Str, Variant]]:
+        """
+        Retrieve the image of a handle and store it in a local file. If the description is
+            empty, the native image is retrieved.
+
+        :param targetfile: the path of the local file
+        :param handle: the image handle, ie. the "ImgHandle" of a MediaPlayer1 track
+        :param description: one of the descriptions returned by Properties()
+        :return: the path of the transfer, and its properties
+        """
+
+    @abstractmethod
+    def Properties(  # pylint: disable=invalid-name
+        self, handle: Str
+    ) -> List[Dict[Str, Variant]]:
+        """
+        Retrieve the image properties of a handle, the native one and the available variants.
+
+        :param handle: the image handle
+        :return: a list of the image descriptions
+        """
+
+    @abstractmethod
+    def GetThumbnail(  # pylint: disable=invalid-name
+        self, targetfile: Str, handle: Str
+    ) -> Tuple[ObjPath, Dict[Str, Variant]]:
+        """
+        Retrieve the 200x200 JPEG thumbnail of a handle and store it in a local file.
+
+        :param targetfile: the path of the local file
+        :param handle: the image handle
+        :return: the path of the transfer, and its properties
+        """
+
+
+class ObexTransfer(ObexBaseApi, PropertiesAPI, ABC):
+    """
+    Type wrapper for the org.bluez.obex.Transfer1
+    https://github.com/bluez/bluez/blob/master/doc/obex-api.txt
+    """
+
+    interface = "org.bluez.obex.Transfer1"
+
+    @classmethod
+    def connect(cls, bus: MessageBus, path: ObjPath) -> "ObexTransfer":
+        """
+        Get a proxy for the OBEX Transfer1
+
+        :param bus: an instance of the DBus session bus
+        :param path: an ObjPath to intended object
+
+        :return: an instance of ObexTransfer
+        """
+        return cast(ObexTransfer, bus.get_proxy(cls.name, path))
+
+    @abstractmethod
+    def Cancel(self) -> None:  # pylint: disable=invalid-name
+        """
+        Stop the current transference.
+        """
+
+    Status: Str
+    Session: ObjPath
+    Name: Str
+    Type: Str
+    Size: UInt64
+    Transferred: UInt64
+    Filename: Str
@@ -0,0 +1,180 @@
+"""
+The connection to the OBD adapter of the Vehicle service. Detecting the adapter's baud rate and the
+vehicle's protocol takes seconds, so the negotiated ones are cached and reused when reconnecting,
+ie. once the adapter reset during a crank voltage dip.
+"""
+
+import json
+import os
+import random
+from typing import Callable, Dict, Optional
+
+import obd
+import serial  # type: ignore # missing
+
+from .constants import (
+    BAUDRATE_PROBE_TIMEOUT,
+    BAUDRATES,
+    MAX_CACHED_ATTEMPTS,
+    RECONNECT_BASE_DELAY,
+    RECONNECT_JITTER,
+    RECONNECT_MAX_DELAY,
+    ConnectionStates,
+)
+
+
+def detect_baudrate(port: str) -> Optional[int]:
+    """
+    Detect the baud rate of an ELM327, by sending it a nonsense command at each rate until it
+        answers with its prompt. python-OBD detects it the same way, but doesn't expose the rate it
+        chose, so it's given the detected one instead.
+
+    :param port: the serial port of the adapter
+    :return: the baud rate, None if the adapter didn't answer at any, python-OBD then detects it
+    """
+    try:
+        with serial.serial_for_url(port, timeout=BAUDRATE_PROBE_TIMEOUT) as adapter:
+            for baudrate in BAUDRATES:
+                adapter.baudrate = baudrate
+                adapter.reset_input_buffer()
+                adapter.reset_output_buffer()
+                adapter.write(b"\x7f\x7f\r")
+                adapter.flush()
+                if adapter.read(1024).endswith(b">"):
+                    return baudrate
+    except (serial.SerialException, OSError):
+        pass
+    return None
+
+
+class ObdConnector:
+    """
+    The state machine of the connection to the OBD adapter, which never gives up on the vehicle:
+
+        CONNECTING --connect()--> CONNECTED --lost()--> RECONNECTING --connect()--> CONNECTED
+
+    Failed attempts are retried after a jittered exponential backoff. The protocol and baud rate
+        of each port are cached to a JSON file, and tried before detecting them again.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache_path: str,
+        on_state: Callable[[ConnectionStates], None],
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize the connector, with the protocols and baud rates negotiated before
+
+        :param cache_path: the path of the JSON file the negotiated protocols and baud rates are
+            cached to
+        :param on_state: called with the new state on every transition
+        :param seed: the seed of the backoff's jitter, for reproducible runs
+        """
+        self.__cache_path = cache_path
+        self.__on_state = on_state
+        self.__random = random.Random(seed)
+        self.state = ConnectionStates.CONNECTING
+        # The number of failed attempts in a row, and of those made with cached settings
+        self.failures = 0
+        self.__cached_failures = 0
+
+        # The protocol and baud rate of each port
+        self.__cache: Dict[str, dict] = {}
+        try:
+            with open(cache_path, "r", encoding="utf-8") as cache_file:
+                self.__cache = json.load(fp=cache_file)
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    def __set_state(self, state: ConnectionStates) -> None:
+        """
+        Transition to a state
+
+        :param state: the new state
+        """
+        if state != self.state:
+            self.state = state
+            self.__on_state(state)
+
+    def __save_cache(self) -> None:
+        """
+        Save the negotiated protocols and baud rates, the cache is only used to reconnect faster
+            so failing to save it is ignored
+        """
+        try:
+            os.makedirs(os.path.dirname(self.__cache_path), exist_ok=True)
+            with open(f"{self.__cache_path}.tmp", "w", encoding="utf-8") as cache_file:
+                json.dump(obj=self.__cache, fp=cache_file)
+            os.replace(f"{self.__cache_path}.tmp", self.__cache_path)
+        except OSError:
+            pass
+
+    def connect(
+        self, port: str, async_delay: Optional[float] = None
+    ) -> Optional[obd.OBD]:
+        """
+        Attempt to connect, with the protocol and baud rate cached for the port if there are.
+            Cached ones are detected again once the vehicle didn't answer MAX_CACHED_ATTEMPTS
+            attempts in a row with them, an ECU that answers without listing its PIDs yet doesn't
+            count. Without a cached baud rate, it's detected before connecting, if the probe misses
+            it python-OBD detects it instead.
+
+        :param port: the serial port of the adapter
+        :param async_delay: the delay_cmds of an obd.Async connection, None for an obd.OBD one
+        :return: the connection, or None if the attempt failed
+        """
+        cached = self.__cache.get(port, {})
+        negotiated = {
+            "baudrate": cached.get("baudrate") or detect_baudrate(port=port),
+            "protocol": cached.get("protocol"),
+        }
+
+        if async_delay is None:
+            connection = obd.OBD(port, **negotiated)
+        else:
+            connection = obd.Async(port, delay_cmds=async_delay, **negotiated)
+
+        # Without the listing of its PIDs, ie. while the ECU boots, no stat would be queried
+        if not connection.is_connected() or len(connection.supported_commands) <= len(
+            obd.commands.base_commands()
+        ):
+            # Only the vehicle not answering with them counts against the cached settings
+            answered = connection.is_connected()
+            connection.close()
+            if cached and not answered:
+                self.__cached_failures += 1
+                if self.__cached_failures >= MAX_CACHED_ATTEMPTS:
+                    self.__cached_failures = 0
+                    del self.__cache[port]
+                    self.__save_cache()
+            return None
+
+        self.failures = 0
+        self.__cached_failures = 0
+        negotiated["protocol"] = connection.protocol_id()
+        if negotiated != cached:
+            self.__cache[port] = negotiated
+            self.__save_cache()
+        self.__set_state(ConnectionStates.CONNECTED)
+        return connection
+
+    def lost(self) -> None:
+        """
+        Reconnect once the connection was lost
+        """
+        if self.state == ConnectionStates.CONNECTED:
+            self.__set_state(ConnectionStates.RECONNECTING)
+
+    def backoff(self) -> float:
+        """
+        Count a failed attempt, and get the seconds to wait before the next one
+
+        :return: the jittered delay
+        """
+        self.failures += 1
+        delay = min(
+            RECONNECT_BASE_DELAY * 2 ** min(self.failures - 1, 32), RECONNECT_MAX_DELAY
+        )
+        return delay * (1 - RECONNECT_JITTER * self.__random.random())
@@ -2,8 +2,133 @@
 Constants for the vehicle service
 """
 
+from enum import StrEnum
+
 # Validator for ODB/ELM reader serial port path
 PORT_PATH_VALIDATOR = r"^\/(.+)\/([^\/]+)$"
 
-# The max number of connection attempts before aborting
-MAX_ATTEMPTS = 4
+#
+# Connection
+#
+
+
+class ConnectionStates(StrEnum):
+    """
+    The states of the connection to the OBD adapter, published with the vehicle info
+    """
+
+    CONNECTING = "connecting"  # Not connected since the service started
+    CONNECTED = "connected"
+    RECONNECTING = "reconnecting"  # The connection was lost, ie. by a crank voltage dip
+
+
+# Failed connection attempts are retried after RECONNECT_BASE_DELAY seconds, doubled after each
+# failure up to RECONNECT_MAX_DELAY. Up to RECONNECT_JITTER of each delay is randomly taken off, so
+# the retries don't fall in step with the adapter's own resets.
+RECONNECT_BASE_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+RECONNECT_JITTER = 0.5
+
+# The baud rates an ELM327 is probed at when its rate isn't cached, its two boot rates first and
+# then the fastest to the slowest. It has BAUDRATE_PROBE_TIMEOUT seconds to answer a probe.
+BAUDRATES = (38400, 9600, 230400, 115200, 57600, 19200)
+BAUDRATE_PROBE_TIMEOUT = 0.1
+
+# The cached protocol and baud rate of a port are detected again after this many attempts in a row
+# the vehicle didn't answer with them, ie. once the adapter was swapped. A single failure is likely
+# the vehicle still booting, an ECU that answers without listing its PIDs yet isn't counted.
+MAX_CACHED_ATTEMPTS = 3
+
+# The connection is considered lost once this many requests in a row got no response
+MAX_FAILED_REQUESTS = 5
+
+#
+# OBD polling scheduler
+#
+
+# Max number of mode 01 PIDs an ELM327 accepts in a single request
+MAX_PIDS_PER_REQUEST = 6
+
+# python-OBD protocol ids of the CAN protocols, the only ones multi-PID requests are sent over
+CAN_PROTOCOL_IDS = {"6", "7", "8", "9"}
+
+# A stat is late once it's queried more than this fraction of its interval after it was due. Late
+# stats have their interval multiplied by the backoff factor, up to the max backoff times the
+# configured interval, and on time stats recover towards the configured interval.
+LATE_THRESHOLD = 0.5
+BACKOFF_FACTOR = 1.5
+RECOVERY_FACTOR = 0.9
+MAX_BACKOFF = 8
+
+# The number of seconds the achieved query rate of each stat is measured over
+RATE_WINDOW = 10
+
+# The number of seconds the service waits between connection checks when there are no stats
+POLL_IDLE_INTERVAL = 0.5
+
+# The seconds a step of a background job is assumed to take before one was measured, about the
+# round trip of a single OBD request. The estimate then follows the longest recent step, decaying
+# by this factor after each step.
+DEFAULT_STEP_DURATION = 0.1
+STEP_ESTIMATE_DECAY = 0.9
+
+#
+# Asynchronous acquisition
+#
+
+
+class AcquisitionModes(StrEnum):
+    """
+    How the vehicle stats are acquired, selected via the "acquisition" of the vehicle settings
+    """
+
+    POLL = "poll"  # Query the stats with the PollScheduler
+    ASYNC = "async"  # Watch the stats with python-OBD's Async loop
+
+
+# The seconds the Async loop waits between rounds of queries when there are no stats
+DEFAULT_ASYNC_DELAY = 0.25
+
+# The number of seconds between connection checks while the Async loop runs
+ASYNC_CHECK_INTERVAL = 1
+
+#
+# Derived metrics
+#
+
+
+class DerivedMetrics(StrEnum):
+    """
+    The metrics derived from the vehicle stats, selected via the "metric" of each entry of the
+        "metrics" in the vehicle settings
+    """
+
+    FUEL_ECONOMY = "fuel_economy"  # Instantaneous, from the MAF and the speed
+    TRIP_FUEL_ECONOMY = "trip_fuel_economy"  # Average over the trip
+    TRIP_DISTANCE = "trip_distance"  # Integrated from the speed
+    IDLE_PERCENT = "idle_percent"  # Share of the trip's engine run time spent stopped
+
+
+# The stoichiometric air-fuel mass ratio, and the density in grams per liter of gasoline, used to
+# convert the mass air flow into a fuel flow
+STOICHIOMETRIC_AFR = 14.7
+FUEL_DENSITY = 740
+
+# Samples further apart than this many seconds aren't integrated, ie. after the connection dropped
+MAX_SAMPLE_GAP = 5
+
+# A trip ends once no sample arrived for this many seconds, the next sample starts a new one
+TRIP_TIMEOUT = 600
+
+# Number of decimals the values of the metrics are rounded to
+METRIC_PRECISION = 2
+
+#
+# Diagnostic trouble codes
+#
+
+# The name of the file the active DTCs are kept in, so they aren't alerted again after a restart
+ACTIVE_DTCS_FILE = "active.json"
+
+# The max number of DTC captures kept, the oldest are removed first
+MAX_DTC_CAPTURES = 100
@@ -0,0 +1,253 @@
+"""
+The DTC monitor of the Vehicle service, reads the stored and pending diagnostic trouble codes as a
+background job of the poll scheduler. The freeze frame and the recent stat samples are captured
+once a new code shows up, as they tell what the vehicle was doing when it was set.
+"""
+
+import json
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import obd
+
+from .constants import ACTIVE_DTCS_FILE, MAX_DTC_CAPTURES
+from .watch import to_stat_value
+
+
+def freeze_frame_commands(
+    connection: obd.OBD, stats: List[dict]
+) -> List[Tuple[str, obd.OBDCommand]]:
+    """
+    Get the mode 02 commands of the freeze frame, the mode 01 stats that have one
+
+    :param connection: the python-OBD connection, commands it doesn't support are left out
+    :param stats: the acquired stats, in the form of the "stats" of the vehicle settings
+    :return: the name of each stat and its mode 02 command
+    """
+    commands = []
+    for stat in stats:
+        command = obd.commands[stat["command"]]
+        if command.mode != 1 or not obd.commands.has_pid(2, command.pid):
+            continue
+        freeze_frame_command = obd.commands[2][command.pid]
+        if connection.supports(freeze_frame_command):
+            commands.append((stat["name"], freeze_frame_command))
+    return commands
+
+
+def query_freeze_frame(connection: obd.OBD, command: obd.OBDCommand) -> obd.OBDResponse:
+    """
+    Query the value of a PID in the first freeze frame. Mode 02 requests and responses carry the
+        frame number after the PID, which python-OBD doesn't send nor expect.
+
+    :param connection: the python-OBD connection
+    :param command: the mode 02 command
+    :return: the response of the command
+    """
+    messages = connection.interface.send_and_parse(command.command + b"00") or []
+    for message in messages:
+        data = message.data
+        # Drop the frame number, after the mode byte (0x42) and the PID
+        message.data = data[:2] + data[3:]
+    messages = [message for message in messages if len(message.data) > 2]
+    if not messages:
+        return obd.OBDResponse()
+    return command(messages)
+
+
+def to_dtc(code: Tuple[str, str], pending: bool) -> dict:
+    """
+    Convert a DTC decoded by python-OBD to a dict
+
+    :param code: the code and its description
+    :param pending: whether the code is only pending, not stored yet
+    :return: the DTC dict, see ui/src/types/Vehicle.interface.ts
+    """
+    return {"code": code[0], "description": code[1], "pending": pending}
+
+
+class DtcMonitor:
+    """
+    Reads the DTCs of the vehicle, and captures the freeze frame and the preceding stat samples
+        once a new code shows up. Every capture is saved to a JSON file and passed on as an
+        alert. Codes are alerted again once they were cleared.
+    """
+
+    def __init__(
+        self, *, path: str, history: float, on_alert: Callable[[dict], None]
+    ) -> None:
+        """
+        Initialize the monitor, with the codes that were active when it last ran
+
+        :param path: the directory the captures are saved to
+        :param history: the seconds of stat samples kept for the captures
+        :param on_alert: called with each capture
+        :raises: OSError: if the directory can't be created
+        """
+        self.__path = path
+        self.__history = history
+        self.__on_alert = on_alert
+        # The recent samples of each stat, and their unit
+        self.__samples: Dict[str, Deque[Tuple[float, float]]] = {}
+        self.__units: Dict[str, str] = {}
+
+        os.makedirs(path, exist_ok=True)
+        self.active: List[dict] = []
+        try:
+            with open(
+                os.path.join(path, ACTIVE_DTCS_FILE), "r", encoding="utf-8"
+            ) as active_file:
+                self.active = json.load(fp=active_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def observe(
+        self, name: str, unit: str, value: float, timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Keep a sample of a stat, dropping the ones older than the history
+
+        :param name: the name of the stat
+        :param unit: the unit of the value
+        :param value: the value of the sample
+        :param timestamp: the unix time of the sample, defaults to now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        samples = self.__samples.setdefault(name, deque())
+        if self.__units.get(name, unit) != unit:
+            samples.clear()
+        self.__units[name] = unit
+        samples.append((timestamp, value))
+        while samples[0][0] < timestamp - self.__history:
+            samples.popleft()
+
+    def __recent_samples(self, until: float) -> List[dict]:
+        """
+        Get the samples of every stat within the history before a time
+
+        :param until: the unix time the history ends at
+        :return: the series dicts, with the unix time and value of each sample
+        """
+        series = []
+        for name, samples in self.__samples.items():
+            recent = [
+                sample
+                for sample in samples
+                if until - self.__history <= sample[0] <= until
+            ]
+            if recent:
+                series.append(
+                    {
+                        "name": name,
+                        "unit": self.__units[name],
+                        "timestamps": [sample[0] for sample in recent],
+                        "values": [sample[1] for sample in recent],
+                    }
+                )
+        return series
+
+    def __write(self, name: str, obj: object) -> None:
+        """
+        Replace a JSON file of the directory, so a power loss never leaves it half written
+
+        :param name: the name of the file
+        :param obj: the object saved
+        """
+        path = os.path.join(self.__path, name)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as json_file:
+            json.dump(obj=obj, fp=json_file)
+            json_file.flush()
+            os.fsync(json_file.fileno())
+        os.replace(f"{path}.tmp", path)
+
+    def __set_active(self, active: List[dict]) -> None:
+        """
+        Set the active codes, and save them
+
+        :param active: the DTC dicts of the active codes
+        """
+        self.active = active
+        self.__write(name=ACTIVE_DTCS_FILE, obj=active)
+
+    def __save(self, capture: dict) -> None:
+        """
+        Save a capture, removing the oldest ones past MAX_DTC_CAPTURES
+
+        :param capture: the capture dict
+        """
+        self.__write(
+            name=f"{round(capture['timestamp'] * 1000):013d}.json", obj=capture
+        )
+        captures = sorted(
+            entry
+            for entry in os.listdir(self.__path)
+            if entry.endswith(".json") and entry != ACTIVE_DTCS_FILE
+        )
+        for oldest in captures[:-MAX_DTC_CAPTURES]:
+            os.remove(os.path.join(self.__path, oldest))
+
+    def check(
+        self, connection: obd.OBD, freeze_frame: List[Tuple[str, obd.OBDCommand]]
+    ) -> Iterator[None]:
+        """
+        Read the DTCs, a step per request. If a new code showed up, the freeze frame is queried
+            and the capture is saved then alerted.
+
+        :param connection: the python-OBD connection
+        :param freeze_frame: the stat names and mode 02 commands queried for the freeze frame, see
+            freeze_frame_commands()
+        :raises: OSError: if the active codes or the capture failed to be saved
+        """
+        stored = connection.query(obd.commands["GET_DTC"])
+        yield
+        pending = connection.query(obd.commands["GET_CURRENT_DTC"])
+        yield
+        if stored.is_null() or pending.is_null():
+            # The read failed, keep the codes as they were
+            return
+
+        active = [to_dtc(code=code, pending=False) for code in stored.value]
+        stored_codes = {dtc["code"] for dtc in active}
+        active += [
+            to_dtc(code=code, pending=True)
+            for code in pending.value
+            if code[0] not in stored_codes
+        ]
+        known = {dtc["code"] for dtc in self.active}
+        new = [dtc for dtc in active if dtc["code"] not in known]
+        if not new:
+            if active != self.active:
+                self.__set_active(active=active)
+            return
+
+        timestamp = time.time()
+        capture = {
+            "timestamp": timestamp,
+            "codes": new,
+            "active": active,
+            # The code the freeze frame was stored for, None if there's no freeze frame
+            "freezeFrameCode": None,
+            "freezeFrame": [],
+            "telemetry": self.__recent_samples(until=timestamp),
+        }
+        response = query_freeze_frame(
+            connection=connection, command=obd.commands["DTC_FREEZE_DTC"]
+        )
+        yield
+        if not response.is_null() and response.value:
+            capture["freezeFrameCode"] = response.value[0]
+            for name, command in freeze_frame:
+                response = query_freeze_frame(connection=connection, command=command)
+                yield
+                if not response.is_null():
+                    capture["freezeFrame"].append(
+                        {"name": name, "value": to_stat_value(response=response)}
+                    )
+
+        # Only once captured, a run cut short by a lost connection captures the codes next time
+        self.__save(capture=capture)
+        self.__set_active(active=active)
+        self.__on_alert(capture)
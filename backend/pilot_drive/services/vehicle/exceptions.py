@@ -15,3 +15,9 @@ class InvalidQueryException(Exception):
     Exception raised when an query field is detected as specified in the QUERIED_FIELDS
     constants.py.
     """
+
+
+class InvalidMetricException(Exception):
+    """
+    Exception raised when a metric of the vehicle settings isn't a DerivedMetrics value.
+    """
@@ -0,0 +1,317 @@
+"""
+The derived metrics of the Vehicle service, computed from the acquired stats before they're
+pushed to the queue. Every metric is a stateful operator updated with each sample of its inputs
+at a constant cost, and published as another stat at its own interval.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from .constants import (
+    FUEL_DENSITY,
+    MAX_SAMPLE_GAP,
+    METRIC_PRECISION,
+    STOICHIOMETRIC_AFR,
+    TRIP_TIMEOUT,
+    DerivedMetrics,
+)
+from .exceptions import InvalidMetricException
+
+# Seconds per hour, speeds are in km/h
+HOUR = 3600
+
+
+def fuel_flow(maf: float) -> float:
+    """
+    Estimate the fuel flow of a gasoline engine running stoichiometric
+
+    :param maf: the mass air flow in grams per second
+    :return: the fuel flow in liters per hour
+    """
+    return maf / STOICHIOMETRIC_AFR / FUEL_DENSITY * HOUR
+
+
+class AbstractMetric(ABC):
+    """
+    The abstract class of derived metrics
+    """
+
+    # The python-OBD commands whose values the metric is derived from
+    inputs: Tuple[str, ...] = ()
+    # The pint unit name of the metric's values, converted by the UI like the stats' units
+    unit: str = ""
+
+    def __init__(self) -> None:
+        self.__last: Optional[float] = None
+
+    def elapsed(self, timestamp: float) -> Optional[float]:
+        """
+        Get the seconds since the previous call, starting a new trip after a long gap
+
+        :param timestamp: the unix time of the new sample
+        :return: the seconds to integrate over, None if the samples are too far apart
+        """
+        last, self.__last = self.__last, timestamp
+        if last is None:
+            return None
+        if timestamp - last > TRIP_TIMEOUT:
+            self.reset()
+            return None
+        if not 0 <= timestamp - last <= MAX_SAMPLE_GAP:
+            return None
+        return timestamp - last
+
+    @abstractmethod
+    def update(self, command: str, quantity: float, timestamp: float) -> None:
+        """
+        Update the metric with a sample of one of its inputs
+
+        :param command: the python-OBD command of the sample
+        :param quantity: the value of the sample
+        :param timestamp: the unix time of the sample
+        """
+
+    @abstractmethod
+    def value(self) -> Optional[float]:
+        """
+        Get the current value of the metric
+
+        :return: the value, None while it's unknown
+        """
+
+    @abstractmethod
+    def reset(self) -> None:
+        """
+        Forget the state of the metric, ie. once a new trip starts
+        """
+
+
+class FuelEconomy(AbstractMetric):
+    """
+    The instantaneous fuel economy, from the latest MAF and speed
+    """
+
+    inputs = ("MAF", "SPEED")
+    unit = "kilometer_per_liter"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__latest: Dict[str, float] = {}
+
+    def update(self, command: str, quantity: float, timestamp: float) -> None:
+        self.__latest[command] = quantity
+
+    def value(self) -> Optional[float]:
+        if len(self.__latest) < len(self.inputs) or self.__latest["MAF"] <= 0:
+            return None
+        return self.__latest["SPEED"] / fuel_flow(maf=self.__latest["MAF"])
+
+    def reset(self) -> None:
+        self.__latest.clear()
+
+
+class TripDistance(AbstractMetric):
+    """
+    The distance driven on the trip, integrating the speed with the trapezoidal rule
+    """
+
+    inputs = ("SPEED",)
+    unit = "kilometer"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.distance = 0.0
+        self.__speed: Optional[float] = None
+
+    def update(self, command: str, quantity: float, timestamp: float) -> None:
+        elapsed = self.elapsed(timestamp=timestamp)
+        if elapsed is not None and self.__speed is not None:
+            self.distance += (self.__speed + quantity) / 2 * elapsed / HOUR
+        self.__speed = quantity
+
+    def value(self) -> Optional[float]:
+        return self.distance
+
+    def reset(self) -> None:
+        self.distance = 0.0
+        self.__speed = None
+
+
+class TripFuelEconomy(AbstractMetric):
+    """
+    The average fuel economy of the trip, the distance driven over the fuel used
+    """
+
+    inputs = ("MAF", "SPEED")
+    unit = "kilometer_per_liter"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__distance = TripDistance()
+        self.__fuel = 0.0
+        self.__maf: Optional[float] = None
+
+    def update(self, command: str, quantity: float, timestamp: float) -> None:
+        if command == "SPEED":
+            self.__distance.update(
+                command=command, quantity=quantity, timestamp=timestamp
+            )
+            return
+        elapsed = self.elapsed(timestamp=timestamp)
+        if elapsed is not None and self.__maf is not None:
+            self.__fuel += fuel_flow(maf=(self.__maf + quantity) / 2) * elapsed / HOUR
+        self.__maf = quantity
+
+    def value(self) -> Optional[float]:
+        if self.__fuel <= 0:
+            return None
+        return self.__distance.distance / self.__fuel
+
+    def reset(self) -> None:
+        self.__distance.reset()
+        self.__fuel = 0.0
+        self.__maf = None
+
+
+class IdlePercent(AbstractMetric):
+    """
+    The share of the trip's engine run time spent stopped with the engine running
+    """
+
+    inputs = ("RPM", "SPEED")
+    unit = "percent"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__latest: Dict[str, float] = {}
+        self.__running = 0.0
+        self.__idle = 0.0
+
+    def update(self, command: str, quantity: float, timestamp: float) -> None:
+        elapsed = self.elapsed(timestamp=timestamp)
+        # The state held since the previous sample, until this one
+        if elapsed is not None and self.__latest.get("RPM", 0) > 0:
+            self.__running += elapsed
+            if self.__latest.get("SPEED") == 0:
+                self.__idle += elapsed
+        self.__latest[command] = quantity
+
+    def value(self) -> Optional[float]:
+        if not self.__running:
+            return None
+        return self.__idle / self.__running * 100
+
+    def reset(self) -> None:
+        self.__latest.clear()
+        self.__running = 0.0
+        self.__idle = 0.0
+
+
+METRICS = {
+    DerivedMetrics.FUEL_ECONOMY: FuelEconomy,
+    DerivedMetrics.TRIP_FUEL_ECONOMY: TripFuelEconomy,
+    DerivedMetrics.TRIP_DISTANCE: TripDistance,
+    DerivedMetrics.IDLE_PERCENT: IdlePercent,
+}
+
+
+@dataclass
+class PublishedMetric:
+    """
+    A metric of the vehicle settings, published as a stat
+    """
+
+    name: str
+    operator: AbstractMetric
+    interval: float
+    # The position of the metric among the published stats
+    index: int
+    deadband: float = 0
+    # The unix time the metric is next published at
+    due: float = 0
+
+
+class MetricPipeline:
+    """
+    Routes the samples of the acquired stats to the metrics derived from them
+    """
+
+    def __init__(self, metrics: List[dict], first_index: int) -> None:
+        """
+        Initialize the metrics
+
+        :param metrics: the "metrics" of the vehicle settings, a list of dicts in the form of:
+            {"name": "<name>", "metric": "<DerivedMetrics value>", "interval": <seconds>,
+            "deadband": <optional min change>}
+        :param first_index: the index of the first metric, following the stats
+        :raises: InvalidMetricException: if a metric isn't a DerivedMetrics value
+        """
+        self.metrics: List[PublishedMetric] = []
+        self.__routes: Dict[str, List[PublishedMetric]] = {}
+        for index, metric in enumerate(metrics, start=first_index):
+            try:
+                operator = METRICS[DerivedMetrics(metric["metric"])]()
+            except ValueError as exc:
+                raise InvalidMetricException(
+                    f'Metric: "{metric["metric"]}" of "{metric["name"]}" is not valid!'
+                ) from exc
+            published = PublishedMetric(
+                name=metric["name"],
+                operator=operator,
+                interval=metric["interval"],
+                index=index,
+                deadband=metric.get("deadband", 0),
+            )
+            self.metrics.append(published)
+            for command in operator.inputs:
+                self.__routes.setdefault(command, []).append(published)
+
+    @property
+    def inputs(self) -> Set[str]:
+        """
+        The python-OBD commands the metrics are derived from
+        """
+        return set(self.__routes)
+
+    def input_interval(self, command: str) -> float:
+        """
+        Get the interval an input has to be acquired at, so every metric derived from it is
+            up to date when it's published
+
+        :param command: the python-OBD command
+        :return: the shortest interval of the metrics using the input
+        """
+        return min(metric.interval for metric in self.__routes[command])
+
+    def update(
+        self, command: str, quantity: float, timestamp: float
+    ) -> List[Tuple[PublishedMetric, dict]]:
+        """
+        Update the metrics derived from a stat with a new sample
+
+        :param command: the python-OBD command of the stat
+        :param quantity: the value of the sample
+        :param timestamp: the unix time of the sample
+        :return: the metrics due to be published, with their value dicts
+        """
+        due = []
+        for metric in self.__routes.get(command, ()):
+            metric.operator.update(
+                command=command, quantity=quantity, timestamp=timestamp
+            )
+            value = metric.operator.value()
+            if value is None or timestamp < metric.due:
+                continue
+            metric.due = timestamp + metric.interval
+            due.append(
+                (
+                    metric,
+                    {
+                        "quantity": round(value, METRIC_PRECISION),
+                        "unit": metric.operator.unit,
+                        "magnitude": 1,
+                    },
+                )
+            )
+        return due
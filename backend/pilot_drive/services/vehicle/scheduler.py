@@ -0,0 +1,310 @@
+"""
+The OBD polling scheduler of the Vehicle service, decides which stats are queried next and how
+they're grouped into requests.
+"""
+
+import heapq
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import obd
+from obd.protocols import ECU_HEADER
+from obd.protocols.protocol import Message
+
+from .constants import (
+    BACKOFF_FACTOR,
+    CAN_PROTOCOL_IDS,
+    DEFAULT_STEP_DURATION,
+    LATE_THRESHOLD,
+    MAX_BACKOFF,
+    MAX_PIDS_PER_REQUEST,
+    RATE_WINDOW,
+    RECOVERY_FACTOR,
+    STEP_ESTIMATE_DECAY,
+)
+from .exceptions import InvalidQueryException
+
+
+@dataclass
+class ScheduledStat:  # pylint: disable=too-many-instance-attributes
+    """
+    A stat of the vehicle settings, and when it's due to be queried next
+    """
+
+    name: str
+    command: obd.OBDCommand
+    # The interval in seconds from the settings, and the one in use after backing off
+    interval: float
+    current_interval: float
+    # Monotonic time the stat is due to be queried at
+    due: float
+    # The position of the stat in the settings, the order stats are sent to the UI in
+    index: int
+    # Monotonic time the stat was first scheduled at
+    started: float
+    # The change of the stat's quantity below which new values aren't pushed
+    deadband: float = 0
+    # Monotonic times of recent queries, used to measure the achieved rate
+    queried: Deque[float] = field(default_factory=deque)
+
+    @property
+    def multi_pid(self) -> bool:
+        """
+        Whether the stat can be merged into a multi-PID request
+        """
+        return self.command.mode == 1 and self.command.header == ECU_HEADER.ENGINE
+
+    def to_rate(self, now: float) -> dict:
+        """
+        Get the configured and achieved query rates of the stat
+
+        :param now: the current monotonic time
+        :return: the rate dict, in queries per second
+        """
+        while self.queried and self.queried[0] < now - RATE_WINDOW:
+            self.queried.popleft()
+        # Right after the stat is scheduled, only measure over the time it's been scheduled for.
+        # The first query is made as soon as it's scheduled, so that counts as an interval.
+        window = min(now - self.started + self.interval, RATE_WINDOW)
+        return {
+            "name": self.name,
+            "configured": round(1 / self.interval, 2),
+            "achieved": round(len(self.queried) / window, 2),
+            "interval": round(self.current_interval, 2),
+        }
+
+
+@dataclass
+class BackgroundJob:
+    """
+    A low priority job run between the queries of the stats, ie. reading the DTCs
+    """
+
+    name: str
+    # The seconds between the starts of the job's runs
+    interval: float
+    # Starts a run of the job, each step of the returned iterator makes a single request
+    run: Callable[[], Iterator[None]]
+    # Monotonic time the next run is due at
+    due: float
+    # The steps of the run in progress
+    steps: Optional[Iterator[None]] = None
+    # The estimated seconds the next step takes
+    step_duration: float = DEFAULT_STEP_DURATION
+
+
+class PollScheduler:
+    """
+    Schedules the queries of the vehicle stats with a priority queue of next due times. Due stats
+        are queried earliest deadline first, with mode 01 stats merged into requests of up to
+        MAX_PIDS_PER_REQUEST PIDs. Stats that keep being queried late, as the bus can't keep up,
+        back off to a longer interval until they're on time again. Background jobs only run in
+        the gaps between stat queries.
+    """
+
+    def __init__(
+        self, stats: List[dict], clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Initialize the scheduler, every stat is due right away
+
+        :param stats: the "stats" of the vehicle settings, a list of dicts in the form of:
+            {"name": "<name>", "command": "<python OBD command>", "interval": <seconds>}
+        :param clock: the monotonic clock, replaceable for testing
+        :raises: InvalidQueryException: if a stat's command isn't a python-OBD command
+        """
+        self.__clock = clock
+        self.__stats: List[ScheduledStat] = []
+        self.__queue: List[Tuple[float, int]] = []
+        self.__jobs: List[BackgroundJob] = []
+
+        now = self.__clock()
+        for index, stat in enumerate(stats):
+            if not obd.commands.has_name(stat["command"]):
+                raise InvalidQueryException(
+                    f'OBD command: "{stat["command"]}" of "{stat["name"]}" is not valid!'
+                )
+            scheduled = ScheduledStat(
+                name=stat["name"],
+                command=obd.commands[stat["command"]],
+                interval=stat["interval"],
+                current_interval=stat["interval"],
+                due=now,
+                index=index,
+                started=now,
+                deadband=stat.get("deadband", 0),
+            )
+            self.__stats.append(scheduled)
+            heapq.heappush(self.__queue, (scheduled.due, index))
+
+    def __len__(self) -> int:
+        return len(self.__stats)
+
+    def time_until_due(self) -> Optional[float]:
+        """
+        Get the time until the next stat is due
+
+        :return: the seconds until the next stat is due, 0 if one is overdue, or None if there are
+            no stats
+        """
+        if not self.__queue:
+            return None
+        return max(self.__queue[0][0] - self.__clock(), 0)
+
+    def next_request(self, multi_pid: bool) -> List[ScheduledStat]:
+        """
+        Take the stats of the next request off the queue, the stat with the earliest deadline
+            along with the next due stats it can be merged with
+
+        :param multi_pid: whether the adapter supports multi-PID requests
+        :return: the stats to query, in deadline order. Empty if none are due
+        """
+        now = self.__clock()
+        if not self.__queue or self.__queue[0][0] > now:
+            return []
+
+        _, index = heapq.heappop(self.__queue)
+        request = [self.__stats[index]]
+        if not (multi_pid and request[0].multi_pid):
+            return request
+
+        skipped = []
+        while (
+            self.__queue
+            and self.__queue[0][0] <= now
+            and len(request) < MAX_PIDS_PER_REQUEST
+        ):
+            entry = heapq.heappop(self.__queue)
+            stat = self.__stats[entry[1]]
+            # The same PID can't be requested twice, and other modes are queried on their own
+            if stat.multi_pid and all(
+                stat.command.pid != merged.command.pid for merged in request
+            ):
+                request.append(stat)
+            else:
+                skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self.__queue, entry)
+        return request
+
+    def complete(self, request: List[ScheduledStat]) -> None:
+        """
+        Reschedule the stats of a request once it's been made, backing off the stats that were
+            queried late
+
+        :param request: the stats returned by next_request()
+        """
+        now = self.__clock()
+        for stat in request:
+            stat.queried.append(now)
+            if now - stat.due > stat.current_interval * LATE_THRESHOLD:
+                stat.current_interval = min(
+                    stat.current_interval * BACKOFF_FACTOR, stat.interval * MAX_BACKOFF
+                )
+            else:
+                stat.current_interval = max(
+                    stat.current_interval * RECOVERY_FACTOR, stat.interval
+                )
+
+            # Keep the cadence of the stat, unless it fell behind by a whole interval
+            stat.due = max(stat.due + stat.current_interval, now)
+            heapq.heappush(self.__queue, (stat.due, stat.index))
+
+    def add_job(
+        self, name: str, interval: float, run: Callable[[], Iterator[None]]
+    ) -> None:
+        """
+        Add a background job, its first run is due right away
+
+        :param name: the name of the job
+        :param interval: the seconds between the starts of the job's runs
+        :param run: starts a run of the job, returning an iterator whose every step makes a single
+            request
+        """
+        self.__jobs.append(
+            BackgroundJob(name=name, interval=interval, run=run, due=self.__clock())
+        )
+
+    def run_jobs(self, budget: float) -> None:
+        """
+        Run the steps of the due background jobs while no stat is due. A step only starts if its
+            estimated duration fits in the time until the next stat is due plus the budget, so the
+            stats are delayed by the budget at most.
+
+        :param budget: the max seconds a step may delay the next due stat by
+        """
+        for job in self.__jobs:
+            while True:
+                start = self.__clock()
+                if job.steps is None:
+                    if start < job.due:
+                        break
+                    job.steps = job.run()
+                    job.due = start + job.interval
+
+                wait = self.time_until_due()
+                if wait is not None and job.step_duration > wait + budget:
+                    break
+                try:
+                    next(job.steps)
+                except StopIteration:
+                    job.steps = None
+                    break
+                finally:
+                    job.step_duration = max(
+                        self.__clock() - start, job.step_duration * STEP_ESTIMATE_DECAY
+                    )
+
+    def rates(self) -> List[dict]:
+        """
+        Get the configured and achieved query rates of every stat
+
+        :return: the rate dicts in the order of the settings
+        """
+        now = self.__clock()
+        return [stat.to_rate(now=now) for stat in self.__stats]
+
+
+def supports_multi_pid(connection: obd.OBD) -> bool:
+    """
+    Check if multi-PID requests can be sent over a connection, ELM327 adapters only support them
+        on CAN protocols
+
+    :param connection: the python-OBD connection
+    :return: True if multi-PID requests can be sent, False otherwise
+    """
+    return connection.protocol_id() in CAN_PROTOCOL_IDS
+
+
+def query_multi_pid(
+    connection: obd.OBD, commands: List[obd.OBDCommand]
+) -> Dict[obd.OBDCommand, obd.OBDResponse]:
+    """
+    Query several mode 01 commands in a single request. The response of each ECU lists every PID
+        followed by its data, which is split into a message per command for python-OBD to decode.
+
+    :param connection: the python-OBD connection
+    :param commands: up to MAX_PIDS_PER_REQUEST mode 01 commands of the engine header
+    :return: the response of every command that was part of the reply
+    """
+    by_pid = {command.pid: command for command in commands}
+    command_string = b"01" + b"".join(command.command[2:] for command in commands)
+    messages = connection.interface.send_and_parse(command_string) or []
+
+    split: Dict[obd.OBDCommand, List[Message]] = {}
+    for message in messages:
+        data = message.data
+        # Skip the mode byte (0x41), then read PID after PID
+        offset = 1
+        while offset < len(data) and data[offset] in by_pid:
+            command = by_pid[data[offset]]
+            size = command.bytes - 2
+            pid_message = Message(message.frames)
+            pid_message.ecu = message.ecu
+            pid_message.data = bytearray(data[:1]) + data[offset : offset + 1 + size]
+            split.setdefault(command, []).append(pid_message)
+            offset += 1 + size
+
+    return {command: command(pid_messages) for command, pid_messages in split.items()}
@@ -1,20 +1,54 @@
 """
 The module that manages the connected vehicle
 """
+
+import multiprocessing
 import os
+import queue
 import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
 import obd
 
+from pilot_drive.constants import (
+    DEFAULT_DTC_SETTINGS,
+    DEFAULT_TELEMETRY_SETTINGS,
+    DEFAULT_VEHICLE_METRICS,
+    OBD_CACHE_PATH,
+)
 from pilot_drive.master_logging.master_logger import MasterLogger
 from pilot_drive.master_queue.master_event_queue import MasterEventQueue, EventType
+from pilot_drive.telemetry import (
+    HistoryQuery,
+    RollupEngine,
+    TelemetryReader,
+    TelemetryRecorder,
+)
 
 from ..abstract_service import AbstractService
 from ..settings import Settings
-from .constants import MAX_ATTEMPTS
-from .exceptions import InvalidQueryException, FailedObdConnectionException
+from .constants import (
+    ASYNC_CHECK_INTERVAL,
+    DEFAULT_ASYNC_DELAY,
+    MAX_FAILED_REQUESTS,
+    POLL_IDLE_INTERVAL,
+    AcquisitionModes,
+    ConnectionStates,
+)
+from .connection import ObdConnector
+from .dtc import DtcMonitor, freeze_frame_commands
+from .exceptions import FailedObdConnectionException, InvalidMetricException
+from .metrics import MetricPipeline
+from .scheduler import (
+    PollScheduler,
+    ScheduledStat,
+    query_multi_pid,
+    supports_multi_pid,
+)
+from .watch import DeadbandFilter, WatchRegistry, WatchedStat, to_stat_value
 
 
-class Vehicle(AbstractService):
+class Vehicle(AbstractService):  # pylint: disable=too-many-instance-attributes
     """
     The vehicle service that interfaces with the connected vehicle
     """
@@ -42,10 +76,54 @@ class Vehicle(AbstractService):
         self.__connected = False
         self.__failed = False
         self.__connection = None
-        self.__max_interval = 0
+        self.__connector = ObdConnector(
+            cache_path=OBD_CACHE_PATH, on_state=self.__on_connection_state
+        )
+        # The number of requests in a row that got no response
+        self.__failed_requests = 0
+        self.__scheduler: Optional[PollScheduler] = None
+        self.__multi_pid = False
+        self.__watches: Optional[WatchRegistry] = None
+        self.__deadband = DeadbandFilter()
+        # The latest value of each stat, by its position in the settings
+        self.__values: Dict[int, dict] = {}
+        # Created once main() runs, so they live in the process running the service
+        self.__telemetry: Optional[TelemetryRecorder] = None
+        self.__rollups: Optional[RollupEngine] = None
+        self.__dtc: Optional[DtcMonitor] = None
+        self.__dtc_settings = {
+            **DEFAULT_DTC_SETTINGS,
+            **settings.get_setting("vehicle").get("dtc", {}),
+        }
+        # History queries from the UI, answered by the process running the service
+        self.__history_requests: multiprocessing.Queue = multiprocessing.Queue()
 
         self.stats = []
 
+        acquisition = settings.get_setting("vehicle").get(
+            "acquisition", AcquisitionModes.POLL
+        )
+        try:
+            self.__acquisition = AcquisitionModes(acquisition)
+        except ValueError:
+            self.logger.error(
+                msg=f'Invalid vehicle acquisition "{acquisition}", '
+                f'defaulting to "{AcquisitionModes.POLL}"!'
+            )
+            self.__acquisition = AcquisitionModes.POLL
+
+        self.__metrics: Optional[MetricPipeline] = None
+        try:
+            # Published after the stats
+            self.__metrics = MetricPipeline(
+                metrics=settings.get_setting("vehicle").get(
+                    "metrics", DEFAULT_VEHICLE_METRICS
+                ),
+                first_index=len(self.queried_fields),
+            )
+        except InvalidMetricException as err:
+            self.logger.error(msg=f"{err} The derived metrics are disabled.")
+
     @property
     def is_connected(self):
         """
@@ -78,14 +156,244 @@ class Vehicle(AbstractService):
         """
         return self.__settings.get_setting("vehicle")["stats"]
 
+    def acquired_fields(self, connection: Optional[obd.OBD] = None) -> List[dict]:
+        """
+        Get the fields to acquire, the queried fields followed by the inputs of the derived
+            metrics that aren't queried already. The inputs aren't published.
+
+        :param connection: the connection to the vehicle, inputs it doesn't support are left out
+        :return: the fields, in the form of the "stats" of the vehicle settings
+        """
+        fields = self.queried_fields
+        if not self.__metrics:
+            return fields
+
+        inputs = []
+        for command in sorted(
+            self.__metrics.inputs - {stat["command"] for stat in fields}
+        ):
+            if connection and not connection.supports(obd.commands[command]):
+                self.logger.warning(
+                    msg=f'"{command}" isn\'t supported by the vehicle, the metrics derived '
+                    "from it won't be published."
+                )
+                continue
+            inputs.append(
+                {
+                    "name": command,
+                    "command": command,
+                    "interval": self.__metrics.input_interval(command=command),
+                }
+            )
+        return fields + inputs
+
+    def __start_telemetry(self) -> Optional[TelemetryRecorder]:
+        """
+        Create the telemetry recorder, settings missing from an older settings file use the
+            defaults
+
+        :return: the recorder, or None if telemetry is disabled or failed to start
+        """
+        telemetry_settings = {
+            **DEFAULT_TELEMETRY_SETTINGS,
+            **self.__settings.get_setting("vehicle").get("telemetry", {}),
+        }
+        if not telemetry_settings["enabled"]:
+            return None
+
+        try:
+            return TelemetryRecorder(
+                path=telemetry_settings["path"],
+                max_segment_size=telemetry_settings["maxSegmentSize"],
+                max_total_size=telemetry_settings["maxTotalSize"],
+                fsync_interval=telemetry_settings["fsyncInterval"],
+            )
+        except OSError as err:
+            self.logger.error(msg=f"Failed to start the telemetry recorder: {err}")
+            return None
+
+    def __start_rollups(self) -> Optional[RollupEngine]:
+        """
+        Create the rollups of the stat history, backfilled from the recorded telemetry
+
+        :return: the rollup engine, or None if numpy isn't installed
+        """
+        try:
+            rollups = RollupEngine()
+        except ImportError:
+            self.logger.warning(
+                msg="numpy isn't installed, the vehicle history is disabled."
+            )
+            return None
+
+        if self.__telemetry:
+            since = time.time() - rollups.retention
+            try:
+                reader = TelemetryReader(path=self.__telemetry.path)
+                for name, unit in reader.series().items():
+                    series = reader.read(name=name, since=since)
+                    rollups.backfill(
+                        name=name,
+                        unit=unit,
+                        timestamps=series.timestamps,
+                        values=series.values,
+                    )
+            except OSError as err:
+                self.logger.error(msg=f"Failed to backfill the vehicle history: {err}")
+        return rollups
+
+    def __start_dtc_monitor(self) -> Optional[DtcMonitor]:
+        """
+        Create the DTC monitor, the DTCs are read while polling
+
+        :return: the monitor, or None if it's disabled or failed to start
+        """
+        if not self.__dtc_settings["enabled"]:
+            return None
+        if self.__acquisition != AcquisitionModes.POLL:
+            self.logger.warning(
+                msg=f'DTCs are only read with the "{AcquisitionModes.POLL}" acquisition.'
+            )
+            return None
+
+        try:
+            return DtcMonitor(
+                path=self.__dtc_settings["path"],
+                history=self.__dtc_settings["history"],
+                on_alert=self.__on_dtc_alert,
+            )
+        except OSError as err:
+            self.logger.error(msg=f"Failed to start the DTC monitor: {err}")
+            return None
+
+    def __check_dtcs(
+        self, connection: obd.OBD, freeze_frame: List[Tuple[str, obd.OBDCommand]]
+    ) -> Iterator[None]:
+        """
+        Read the DTCs, run as a background job of the poll scheduler
+
+        :param connection: the connection to the vehicle
+        :param freeze_frame: the stats captured in the freeze frame, see freeze_frame_commands()
+        """
+        active = self.__dtc.active
+        try:
+            yield from self.__dtc.check(
+                connection=connection, freeze_frame=freeze_frame
+            )
+        except OSError as err:
+            self.logger.error(msg=f"Failed to save the DTCs: {err}")
+        if self.__dtc.active != active:
+            self.__push_info()
+
+    def __on_dtc_alert(self, capture: dict) -> None:
+        """
+        Push the capture of new DTCs to the UI
+
+        :param capture: the capture dict, see ui/src/types/Vehicle.interface.ts
+        """
+        codes = ", ".join(dtc["code"] for dtc in capture["codes"])
+        self.logger.warning(msg=f"New DTCs: {codes}")
+        self.push_to_queue(event=capture, event_type=EventType.ALERT)
+
+    def __record(self, name: str, value: dict) -> None:
+        """
+        Record a sample of a stat to the telemetry, the rollups of its history and the recent
+            samples of the DTC captures
+
+        :param name: the name of the stat
+        :param value: the value dict of the stat
+        """
+        if not isinstance(value["quantity"], (int, float)):
+            return
+        if self.__dtc:
+            self.__dtc.observe(name=name, unit=value["unit"], value=value["quantity"])
+        if self.__rollups:
+            self.__rollups.add(name=name, unit=value["unit"], value=value["quantity"])
+        if not self.__telemetry:
+            return
+        try:
+            self.__telemetry.record(
+                name=name, unit=value["unit"], value=value["quantity"]
+            )
+        except OSError as err:
+            self.logger.error(
+                msg=f"Failed to record telemetry, it's now disabled: {err}"
+            )
+            self.__telemetry = None
+
+    def __flush_telemetry(self) -> None:
+        """
+        Write the buffered telemetry if it's due, so samples aren't held back while no stat
+            is recorded
+        """
+        if not self.__telemetry:
+            return
+        try:
+            self.__telemetry.flush_if_due()
+        except OSError as err:
+            self.logger.error(
+                msg=f"Failed to record telemetry, it's now disabled: {err}"
+            )
+            self.__telemetry = None
+
+    def __answer_history(self, request: dict) -> None:
+        """
+        Push the history of a stat to the UI
+
+        :param request: the history query dict, see ui/src/types/Vehicle.interface.ts
+        """
+        try:
+            history_query = HistoryQuery.from_request(request=request)
+        except ValueError as err:
+            self.logger.error(msg=str(err))
+            return
+        if not self.__rollups:
+            self.logger.warning(
+                msg=f'History of "{history_query.name}" requested, but it\'s disabled.'
+            )
+            return
+        self.push_to_queue(
+            event=self.__rollups.query(query=history_query),
+            event_type=EventType.HISTORY,
+        )
+
+    def __wait(self, seconds: float) -> None:
+        """
+        Wait, answering the history queries that come in meanwhile
+
+        :param seconds: the number of seconds to wait
+        """
+        deadline = time.monotonic() + seconds
+        while True:
+            try:
+                request = self.__history_requests.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except queue.Empty:
+                return
+            self.__answer_history(request=request)
+
     def __handle_connect(self):
         """
         Initialize the connection to the OBD serial port.
         """
         if self.obd_port:
             if os.path.exists(self.obd_port):
-                connection = obd.OBD(self.obd_port)
-                if not connection.is_connected():
+                if self.__connection:
+                    # Release the serial port of the lost connection
+                    self.__connection.close()
+                async_delay = None
+                if self.__acquisition == AcquisitionModes.ASYNC:
+                    # The Async loop queries every watched stat, then waits for the shortest
+                    # interval
+                    async_delay = min(
+                        (stat["interval"] for stat in self.acquired_fields()),
+                        default=DEFAULT_ASYNC_DELAY,
+                    )
+                connection = self.__connector.connect(
+                    port=self.obd_port, async_delay=async_delay
+                )
+                if connection is None:
                     self.__handle_failed_connect()
                     raise FailedObdConnectionException(
                         "OBD Connection was unsuccessful!"
@@ -94,6 +402,12 @@ class Vehicle(AbstractService):
                 if connection != self.__connection:
                     self.__push_info()
                 self.__connection = connection
+                self.__failed_requests = 0
+                self.__deadband.reset()
+                if self.__acquisition == AcquisitionModes.ASYNC:
+                    self.__start_watching(connection=connection)
+                else:
+                    self.__poll(connection=connection)
                 self.logger.info(f"OBD connection made to {self.obd_port}.")
             else:
                 self.__handle_failed_connect()
@@ -107,6 +421,25 @@ class Vehicle(AbstractService):
             self.__handle_failed_connect()
             raise FailedObdConnectionException("No serial port was provided!")
 
+    def __poll(self, connection: obd.OBD) -> None:
+        """
+        Schedule the queries of the stats on a connection, and the DTC reads in their gaps
+
+        :param connection: the connection
+        """
+        stats = self.acquired_fields(connection=connection)
+        self.__scheduler = PollScheduler(stats=stats)
+        self.__multi_pid = supports_multi_pid(connection=connection)
+        if self.__dtc:
+            freeze_frame = freeze_frame_commands(connection=connection, stats=stats)
+            self.__scheduler.add_job(
+                name="dtc",
+                interval=self.__dtc_settings["interval"],
+                run=lambda: self.__check_dtcs(
+                    connection=connection, freeze_frame=freeze_frame
+                ),
+            )
+
     def __handle_failed_connect(self):
         """
         Check if a failure exists, then push the status
@@ -116,102 +449,256 @@ class Vehicle(AbstractService):
 
         self.__push_info()
 
+    def __on_connection_state(self, state: ConnectionStates) -> None:
+        """
+        Push the new state of the connection, so the UI shows the stats as reconnecting rather
+            than frozen
+
+        :param state: the new state
+        """
+        self.logger.info(msg=f"OBD connection {state}.")
+        self.__push_info()
+
     def __push_info(self):
         """
         Push the current vehicle data to the frontend
         """
         vehicle_info = {
             "connected": self.__connected,
+            "state": self.__connector.state,
             "failures": self.__failed,
             "stats": self.stats,
+            "rates": self.__scheduler.rates() if self.__scheduler else [],
+            "dtcs": self.__dtc.active if self.__dtc else [],
         }
         self.push_to_queue(vehicle_info)
 
-    def __query_fields(self, queries_made: float):
+    def __query(
+        self, request: List[ScheduledStat]
+    ) -> Dict[obd.OBDCommand, obd.OBDResponse]:
         """
-        Query the fields that are input.
-        Expects a list of dicts in the form of:
-        {"name": "<name>", "command": "<python OBD command>", "interval": <int query interval>}
+        Query the stats of a request, merged into a single multi-PID request when there are
+            several
 
-        In
+        :param request: the stats returned by the scheduler
+        :return: the response of each queried command
         """
-        if self.__connection and len(self.queried_fields) > 0:
-            field_index = 0
-            for field in self.queried_fields:
-                field_name = field["name"]
-                field_command = field["command"]
-                field_interval = field["interval"]
-                if not obd.commands.has_name(field_command):
-                    raise InvalidQueryException(
-                        f'OBD command: "{field_name}" is not valid!'
-                    )
+        commands = [stat.command for stat in request]
+        if len(commands) > 1:
+            responses = query_multi_pid(connection=self.__connection, commands=commands)
+            if responses:
+                return responses
+            # No PID came back, the adapter or the ECU doesn't support merged requests
+            self.logger.warning(
+                msg="Multi-PID request failed, querying stats one PID at a time."
+            )
+            self.__multi_pid = False
+
+        return {command: self.__connection.query(command) for command in commands}
+
+    def __query_fields(self):
+        """
+        Wait until the next stats are due, then query them and push the new values. The DTCs
+            are read meanwhile, when due.
+        """
+        self.__scheduler.run_jobs(budget=self.__dtc_settings["budget"])
+        wait = self.__scheduler.time_until_due()
+        if wait is None:
+            # There are no stats to query
+            self.__wait(seconds=POLL_IDLE_INTERVAL)
+            return
+        self.__wait(seconds=wait)
+
+        request = self.__scheduler.next_request(multi_pid=self.__multi_pid)
+        responses = self.__query(request=request)
+        self.__scheduler.complete(request=request)
+
+        updated = False
+        answered = False
+        for stat in request:
+            resp = responses.get(stat.command)
+            if resp is None or resp.value is None:
+                self.logger.error(msg=f'Failed to query for "{stat.name}"')
+                continue
+            answered = True
+
+            value = to_stat_value(response=resp)
+            self.__record(name=stat.name, value=value)
+            updated = self.__update_metrics(stat=stat, value=value) or updated
+            if stat.index >= len(self.queried_fields):
+                # Only acquired for the derived metrics
+                continue
+            if self.__deadband.changed(
+                index=stat.index, value=value, deadband=stat.deadband
+            ):
+                self.__set_value(index=stat.index, name=stat.name, value=value)
+                updated = True
+
+        self.__check_responding(request=request, answered=answered)
+        if updated:
+            self.__push_info()
+
+    def __check_responding(self, request: List[ScheduledStat], answered: bool) -> None:
+        """
+        Close the connection once the vehicle stopped responding, python-OBD keeps it open when
+            the adapter resets. Stats the vehicle doesn't support don't count.
+
+        :param request: the queried stats
+        :param answered: whether any stat of the request got a response
+        """
+        if answered or not any(
+            self.__connection.supports(stat.command) for stat in request
+        ):
+            self.__failed_requests = 0
+            return
+
+        self.__failed_requests += 1
+        if self.__failed_requests >= MAX_FAILED_REQUESTS:
+            self.logger.warning(
+                msg=f"No response to {self.__failed_requests} requests in a row, reconnecting."
+            )
+            self.__connection.close()
+
+    def __update_metrics(self, stat: ScheduledStat | WatchedStat, value: dict) -> bool:
+        """
+        Update the derived metrics with a new value of a stat, and set the values of the metrics
+            due to be published
+
+        :param stat: the acquired stat
+        :param value: the value dict of the stat
+        :return: True if a metric changed beyond its deadband, False otherwise
+        """
+        if not self.__metrics or not isinstance(value["quantity"], (int, float)):
+            return False
+
+        updated = False
+        for metric, metric_value in self.__metrics.update(
+            command=stat.command.name, quantity=value["quantity"], timestamp=time.time()
+        ):
+            self.__record(name=metric.name, value=metric_value)
+            if self.__deadband.changed(
+                index=metric.index, value=metric_value, deadband=metric.deadband
+            ):
+                self.__set_value(
+                    index=metric.index, name=metric.name, value=metric_value
+                )
+                updated = True
+        return updated
+
+    def __set_value(self, index: int, name: str, value: dict) -> None:
+        """
+        Set the latest value of a stat
 
-                # If the the current field's interval is greater than the global max, up the max
-                if not self.__max_interval and field_interval > self.__max_interval:
-                    self.__max_interval = field_interval
-
-                if queries_made % field_interval == 0:
-                    # Make the query
-                    resp = self.__connection.query(obd.commands[field_command])
-                    if resp.value is not None:
-                        # Convert to a tuple to get units & magnitude
-                        resp_tuple = resp.value.to_tuple()
-                        # pint converts tuples a little odd,
-                        # values come back as"(<quantity>, (('<unit>', <magnitude>),))"
-                        value = {
-                            "quantity": resp_tuple[0],
-                            "unit": resp_tuple[1][0][0],
-                            "magnitude": resp_tuple[1][0][1],
-                        }
-                        if len(self.stats) == field_index:
-                            self.stats.append({"name": field_name, "value": value})
-                        else:
-                            self.stats[field_index] = {
-                                "name": field_name,
-                                "value": value,
-                            }
-
-                        field_index += 1
-                    else:
-                        self.logger.error(msg=f'Failed to query for "{field_name}"')
-                        continue
-
-            if self.stats:
-                self.__push_info()
+        :param index: the position of the stat in the settings
+        :param name: the name of the stat
+        :param value: the value dict of the stat
+        """
+        self.__values[index] = {"name": name, "value": value}
+        self.stats = [self.__values[index] for index in sorted(self.__values)]
+
+    def __on_stat_change(self, stat: WatchedStat, value: dict) -> None:
+        """
+        Push a watched stat that changed beyond its deadband, called from the Async loop
+
+        :param stat: the stat that changed
+        :param value: the value dict of the stat
+        """
+        if stat.index >= len(self.queried_fields):
+            # Only acquired for the derived metrics
+            return
+        self.__set_value(index=stat.index, name=stat.name, value=value)
+        self.__push_info()
+
+    def __on_stat_sample(self, stat: WatchedStat, value: dict) -> None:
+        """
+        Record every value of a watched stat, called from the Async loop
+
+        :param stat: the queried stat
+        :param value: the value dict of the stat
+        """
+        self.__record(name=stat.name, value=value)
+        if self.__update_metrics(stat=stat, value=value):
+            self.__push_info()
+
+    def __start_watching(self, connection: obd.Async) -> None:
+        """
+        Watch every stat on an Async connection, and start its loop
+
+        :param connection: the Async connection
+        """
+        self.__watches = WatchRegistry(
+            stats=self.acquired_fields(),
+            on_change=self.__on_stat_change,
+            on_sample=self.__on_stat_sample,
+        )
+        for stat in self.__watches.watch(connection=connection):
+            self.logger.warning(
+                msg=f"\"{stat.name}\" isn't supported by the vehicle, it won't be watched."
+            )
+        connection.start()
+
+    def __watch_fields(self):
+        """
+        Wait while the Async loop pushes the stats, until the connection is lost.
+        """
+        while self.is_connected:
+            self.__wait(seconds=ASYNC_CHECK_INTERVAL)
+            self.__flush_telemetry()
+
+        self.logger.warning(msg="OBD connection lost, stopped watching stats.")
+        self.__watches.unwatch()
 
     def main(self):
-        # The number of times a connection to the vehicle has been attempted
-        connection_attempts = 0
+        if not self.__telemetry:
+            self.__telemetry = self.__start_telemetry()
+        if not self.__rollups:
+            self.__rollups = self.__start_rollups()
+        if not self.__dtc:
+            self.__dtc = self.__start_dtc_monitor()
 
-        # The number of queries made within the specified time interval
-        queries_made = 0
         while True:
-            if not self.is_connected and connection_attempts != MAX_ATTEMPTS:
+            self.__flush_telemetry()
+            if not self.is_connected:
+                self.__connector.lost()
                 try:
                     self.__handle_connect()
                 except FailedObdConnectionException as err:
+                    # Keep trying with a backoff, in case the adapter shows up
+                    delay = self.__connector.backoff()
                     self.logger.warning(
-                        msg=f'Invalid serial port specified: "{err}", '
-                        f"{MAX_ATTEMPTS-connection_attempts} connection attempts remaining."
+                        msg=f'Failed to connect to the vehicle: "{err}", '
+                        f"retrying in {delay:.1f} seconds."
                     )
-                    connection_attempts += 1
-                    time.sleep(
-                        0.5
-                    )  # Busy wait then continue to try and connect in case it happens to show up
-            elif not self.is_connected and connection_attempts >= MAX_ATTEMPTS:
-                self.logger.error(
-                    msg=f"Failed to connect to serial port in {MAX_ATTEMPTS} attempts. "
-                    "The vehicle service is exiting."
-                )
-                # Exit the service if the connection has been tried MAX_ATTEMPTS
-                return
+                    self.__wait(seconds=delay)
+                    continue
 
-            if self.is_connected:
-                self.__query_fields(queries_made=queries_made)
-                time.sleep(0.5)
-                queries_made = (
-                    0 if queries_made == self.__max_interval else queries_made + 0.5
-                )
+            if self.__acquisition == AcquisitionModes.ASYNC:
+                self.__watch_fields()
+            else:
+                self.__query_fields()
+
+    def stop(self) -> None:
+        """
+        Write the buffered telemetry and close its segment, samples would otherwise be lost on
+            every shutdown
+        """
+        if not self.__telemetry:
+            return
+        try:
+            self.__telemetry.close()
+        except OSError as err:
+            self.logger.error(msg=f"Failed to close the telemetry recorder: {err}")
+        self.__telemetry = None
+
+    def handler(self, message: dict) -> None:
+        """
+        Handle vehicle messages from the UI, history queries are passed on to the process running
+            the service
+
+        :param message: the vehicle message, ie. {"history": <query>}
+        """
+        if "history" in message:
+            self.__history_requests.put(message["history"])
 
     def refresh(self):
         self.__push_info()
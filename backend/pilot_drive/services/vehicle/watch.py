@@ -0,0 +1,173 @@
+"""
+The asynchronous acquisition of the Vehicle service, watches the vehicle stats with python-OBD's
+Async connection and only passes on values that changed beyond each stat's deadband.
+"""
+
+import functools
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import obd
+
+from .exceptions import InvalidQueryException
+
+
+def to_stat_value(response: obd.OBDResponse) -> dict:
+    """
+    Convert the value of a python-OBD response to the value sent to the UI
+
+    :param response: a response with a pint Quantity value
+    :return: the value dict
+    """
+    # Convert to a tuple to get units & magnitude
+    resp_tuple = response.value.to_tuple()
+    # pint converts tuples a little odd,
+    # values come back as"(<quantity>, (('<unit>', <magnitude>),))"
+    return {
+        "quantity": resp_tuple[0],
+        "unit": resp_tuple[1][0][0],
+        "magnitude": resp_tuple[1][0][1],
+    }
+
+
+class DeadbandFilter:
+    """
+    Drops stat values that didn't change beyond the stat's deadband since the last value passed
+        on, which cuts the events of slow moving stats like the fuel level. Thread safe.
+    """
+
+    def __init__(self) -> None:
+        self.__last: Dict[int, dict] = {}
+        self.__lock = threading.Lock()
+
+    def changed(self, index: int, value: dict, deadband: float) -> bool:
+        """
+        Check if a stat's value changed enough to be passed on, if so it's kept as the new
+            reference value
+
+        :param index: the position of the stat in the settings
+        :param value: the value dict of the stat
+        :param deadband: the change of the quantity below which the value is dropped
+        :return: True if the value should be passed on, False otherwise
+        """
+        with self.__lock:
+            last = self.__last.get(index)
+            if (
+                last is not None
+                and last["unit"] == value["unit"]
+                and abs(value["quantity"] - last["quantity"]) <= deadband
+            ):
+                return False
+            self.__last[index] = value
+            return True
+
+    def reset(self) -> None:
+        """
+        Forget the last values, so the next value of every stat is passed on
+        """
+        with self.__lock:
+            self.__last.clear()
+
+
+@dataclass
+class WatchedStat:
+    """
+    A stat of the vehicle settings, watched by an Async connection
+    """
+
+    name: str
+    command: obd.OBDCommand
+    # The position of the stat in the settings, the order stats are sent to the UI in
+    index: int
+    deadband: float
+
+
+# Called with the stat and its new value dict, from the Async connection's thread
+StatCallback = Callable[[WatchedStat, dict], None]
+
+
+class WatchRegistry:
+    """
+    The watches of an Async connection, one per stat of the vehicle settings
+    """
+
+    def __init__(
+        self,
+        stats: List[dict],
+        on_change: StatCallback,
+        on_sample: Optional[StatCallback] = None,
+    ) -> None:
+        """
+        Initialize the registry
+
+        :param stats: the "stats" of the vehicle settings, a list of dicts in the form of:
+            {"name": "<name>", "command": "<python OBD command>", "interval": <seconds>,
+            "deadband": <optional min change>}
+        :param on_change: called when a stat changed beyond its deadband
+        :param on_sample: called with every value of a stat, before the deadband is applied
+        :raises: InvalidQueryException: if a stat's command isn't a python-OBD command
+        """
+        self.__on_change = on_change
+        self.__on_sample = on_sample
+        self.__deadband = DeadbandFilter()
+        self.__connection: Optional[obd.Async] = None
+        self.stats: List[WatchedStat] = []
+        for index, stat in enumerate(stats):
+            if not obd.commands.has_name(stat["command"]):
+                raise InvalidQueryException(
+                    f'OBD command: "{stat["command"]}" of "{stat["name"]}" is not valid!'
+                )
+            self.stats.append(
+                WatchedStat(
+                    name=stat["name"],
+                    command=obd.commands[stat["command"]],
+                    index=index,
+                    deadband=stat.get("deadband", 0),
+                )
+            )
+
+    def __on_response(self, stat: WatchedStat, response: obd.OBDResponse) -> None:
+        """
+        The callback of a watched command, called after every query of the Async loop
+
+        :param stat: the stat of the command
+        :param response: the response of the query
+        """
+        if response.value is None:
+            return
+        value = to_stat_value(response=response)
+        if self.__on_sample:
+            self.__on_sample(stat, value)
+        if self.__deadband.changed(
+            index=stat.index, value=value, deadband=stat.deadband
+        ):
+            self.__on_change(stat, value)
+
+    def watch(self, connection: obd.Async) -> List[WatchedStat]:
+        """
+        Watch every stat on a connection, before its loop is started
+
+        :param connection: the Async connection
+        :return: the stats the vehicle doesn't support, which aren't watched
+        """
+        self.__connection = connection
+        self.__deadband.reset()
+        unsupported = []
+        for stat in self.stats:
+            if not connection.supports(stat.command):
+                unsupported.append(stat)
+                continue
+            connection.watch(
+                stat.command, callback=functools.partial(self.__on_response, stat)
+            )
+        return unsupported
+
+    def unwatch(self) -> None:
+        """
+        Stop the connection's loop and remove every watch
+        """
+        if self.__connection:
+            self.__connection.stop()
+            self.__connection.unwatch_all()
+            self.__connection = None
@@ -0,0 +1,7 @@
+"""
+The vehicle telemetry, every sample of the vehicle stats recorded to compact segment files
+"""
+
+from .reader import TelemetryReader, TelemetrySeries
+from .recorder import TelemetryRecorder
+from .rollups import HistoryQuery, RollupEngine
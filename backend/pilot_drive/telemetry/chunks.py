@@ -0,0 +1,190 @@
+"""
+The chunks of a telemetry segment. Each chunk holds consecutive samples of a single series, with
+delta-of-delta encoded timestamps and XOR encoded values:
+
+- Timestamps are epoch milliseconds. The first one is kept in the chunk header, followed by the
+  zigzag varint of the first delta, then of the change of every following delta. Samples taken at
+  a steady interval take a single byte.
+- Values are float64s XORed with the previous value, stored as a control byte holding the number
+  of trailing zero bytes and the number of remaining bytes kept. Repeated values take a single
+  byte, and the coarse values OBD returns only a few.
+"""
+
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Iterator
+
+from .constants import CHUNK_HEADER, CHUNK_MAGIC, CONTROL_SHIFT
+
+FLOAT = struct.Struct("<d")
+
+
+def zigzag(value: int) -> int:
+    """
+    Map a signed int to an unsigned one, small magnitudes staying small
+
+    :param value: the signed int
+    :return: the unsigned int
+    """
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    """
+    Append an unsigned int as a little endian base 128 varint
+
+    :param buffer: the buffer appended to
+    :param value: the unsigned int
+    """
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+class ChunkEncoder:  # pylint: disable=too-many-instance-attributes
+    """
+    Encodes the samples of a single series into a chunk as they're recorded
+    """
+
+    def __init__(self, name: str, unit: str) -> None:
+        """
+        Initialize an empty chunk
+
+        :param name: the name of the series
+        :param unit: the unit of the series' values
+        """
+        self.name = name
+        self.unit = unit
+        self.__reset()
+
+    def __reset(self) -> None:
+        """
+        Drop the encoded samples
+        """
+        self.count = 0
+        self.__first = 0
+        self.__last = 0
+        self.__delta = 0
+        self.__value = 0
+        self.__timestamps = bytearray()
+        self.__controls = bytearray()
+        self.__values = bytearray()
+
+    @property
+    def size(self) -> int:
+        """
+        The number of bytes of the encoded samples so far
+        """
+        return len(self.__timestamps) + len(self.__controls) + len(self.__values)
+
+    def append(self, timestamp: int, value: float) -> None:
+        """
+        Encode a sample
+
+        :param timestamp: the time of the sample in epoch milliseconds
+        :param value: the value of the sample
+        """
+        if self.count == 0:
+            self.__first = timestamp
+        else:
+            delta = timestamp - self.__last
+            write_varint(self.__timestamps, zigzag(delta - self.__delta))
+            self.__delta = delta
+        self.__last = timestamp
+
+        bits = int.from_bytes(FLOAT.pack(value), "little")
+        xor = bits ^ self.__value
+        self.__value = bits
+        if xor:
+            trailing = ((xor & -xor).bit_length() - 1) // 8
+            length = (xor.bit_length() + 7) // 8 - trailing
+            self.__controls.append(trailing << CONTROL_SHIFT | length)
+            self.__values += (xor >> trailing * 8).to_bytes(length, "little")
+        else:
+            self.__controls.append(0)
+        self.count += 1
+
+    def seal(self) -> bytes:
+        """
+        Get the chunk of the samples encoded so far, and start a new one
+
+        :return: the chunk, header included
+        """
+        name, unit = self.name.encode(), self.unit.encode()
+        body = b"".join((name, unit, self.__timestamps, self.__controls, self.__values))
+        header = CHUNK_HEADER.pack(
+            CHUNK_MAGIC,
+            len(name),
+            len(unit),
+            self.count,
+            self.__first,
+            self.__last,
+            len(self.__timestamps),
+            len(self.__values),
+            zlib.crc32(body),
+        )
+        self.__reset()
+        return header + body
+
+
+@dataclass
+class Chunk:  # pylint: disable=too-many-instance-attributes
+    """
+    A chunk read from a segment, the encoded samples are left for the reader to decode
+    """
+
+    name: str
+    unit: str
+    count: int
+    first: int
+    last: int
+    timestamps: memoryview
+    controls: memoryview
+    values: memoryview
+
+
+def iter_chunks(buffer: memoryview, offset: int) -> Iterator[Chunk]:
+    """
+    Iterate the chunks of a segment. A chunk cut short or corrupted by a power loss ends the
+        segment, as it's always the last one written.
+
+    :param buffer: the contents of the segment
+    :param offset: the offset of the first chunk, after the segment header
+    :return: an iterator of the chunks
+    """
+    while offset + CHUNK_HEADER.size <= len(buffer):
+        (
+            magic,
+            name_size,
+            unit_size,
+            count,
+            first,
+            last,
+            timestamps_size,
+            values_size,
+            crc,
+        ) = CHUNK_HEADER.unpack_from(buffer, offset)
+        start = offset + CHUNK_HEADER.size
+        end = start + name_size + unit_size + timestamps_size + count + values_size
+        if magic != CHUNK_MAGIC or end > len(buffer):
+            return
+        body = buffer[start:end]
+        if zlib.crc32(body) != crc:
+            return
+
+        position = name_size + unit_size
+        yield Chunk(
+            name=bytes(body[:name_size]).decode(),
+            unit=bytes(body[name_size:position]).decode(),
+            count=count,
+            first=first,
+            last=last,
+            timestamps=body[position : position + timestamps_size],
+            controls=body[
+                position + timestamps_size : position + timestamps_size + count
+            ],
+            values=body[position + timestamps_size + count :],
+        )
+        offset = end
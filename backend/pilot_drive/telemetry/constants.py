@@ -0,0 +1,40 @@
+"""
+Constants of the telemetry recorder, and the layout of its segment files
+"""
+
+import struct
+
+# A segment starts with the magic and the format version
+SEGMENT_MAGIC = b"PDTS"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct("<4sB")
+
+# Segments are named after the epoch milliseconds they were opened at, so they sort by age
+SEGMENT_EXTENSION = ".pdt"
+
+# Followed by the series name, its unit, the timestamps, the value control bytes and the value
+# bytes. Holds the magic, the name and unit lengths, the number of samples, the first and last
+# timestamps in epoch milliseconds, the size of the timestamps and of the values, and the CRC32 of
+# everything following the header.
+CHUNK_MAGIC = b"PC"
+CHUNK_HEADER = struct.Struct("<2sBBIqqIII")
+
+# The bits of a value control byte, the number of trailing zero bytes of the value XORed with the
+# previous one is stored in the high nibble, and the number of bytes kept in the low nibble
+CONTROL_SHIFT = 4
+CONTROL_LENGTH_MASK = 0x0F
+
+# Max number of bytes of samples buffered by the recorder before they're written, regardless of
+# the fsync interval
+TELEMETRY_BUFFER_SIZE = 65536
+
+# The resolutions in seconds of the rollups kept for each series, finest first
+ROLLUP_RESOLUTIONS = (1, 10, 60, 600)
+
+# Number of buckets kept per resolution, from an hour of 1 second buckets up to 25 days of 10 minute
+# buckets
+ROLLUP_CAPACITY = 3600
+
+# Default and max number of points returned by a history query
+DEFAULT_HISTORY_POINTS = 300
+MAX_HISTORY_POINTS = 3600
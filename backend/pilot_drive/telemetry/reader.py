@@ -0,0 +1,171 @@
+"""
+The telemetry reader, memory maps the segments written by the TelemetryRecorder and decodes the
+samples of a series into NumPy arrays
+"""
+
+import mmap
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, only needed to read the telemetry back
+    numpy = None
+
+from .chunks import Chunk, iter_chunks
+from .constants import (
+    CONTROL_LENGTH_MASK,
+    CONTROL_SHIFT,
+    SEGMENT_HEADER,
+    SEGMENT_MAGIC,
+    SEGMENT_VERSION,
+)
+from .recorder import list_segments
+
+
+def decode_timestamps(chunk: Chunk) -> "numpy.ndarray":
+    """
+    Decode the delta-of-delta timestamps of a chunk
+
+    :param chunk: the chunk
+    :return: the int64 epoch milliseconds of the samples
+    """
+    data = numpy.frombuffer(chunk.timestamps, dtype=numpy.uint8)
+    if data.size == 0:
+        return numpy.full(chunk.count, chunk.first, dtype=numpy.int64)
+
+    # Every varint ends with a byte that has its high bit clear
+    ends = data < 0x80
+    starts = numpy.flatnonzero(numpy.concatenate(([True], ends[:-1])))
+    varint = numpy.concatenate(([0], numpy.cumsum(ends[:-1])))
+    shifts = (numpy.arange(len(data)) - starts[varint]) * 7
+    parts = (data & 0x7F).astype(numpy.uint64) << shifts.astype(numpy.uint64)
+    zigzags = numpy.bitwise_or.reduceat(parts, starts)
+
+    changes = (zigzags >> numpy.uint64(1)).astype(numpy.int64) ^ -(
+        zigzags & numpy.uint64(1)
+    ).astype(numpy.int64)
+    deltas = numpy.cumsum(changes)
+    return chunk.first + numpy.concatenate(([0], numpy.cumsum(deltas)))
+
+
+def decode_values(chunk: Chunk) -> "numpy.ndarray":
+    """
+    Decode the XOR encoded values of a chunk
+
+    :param chunk: the chunk
+    :return: the float64 values of the samples
+    """
+    controls = numpy.frombuffer(chunk.controls, dtype=numpy.uint8)
+    data = numpy.frombuffer(chunk.values, dtype=numpy.uint8)
+    lengths = controls & CONTROL_LENGTH_MASK
+    offsets = numpy.cumsum(lengths) - lengths
+
+    xors = numpy.zeros(chunk.count, dtype=numpy.uint64)
+    for byte in range(int(lengths.max(initial=0))):
+        kept = lengths > byte
+        xors[kept] |= data[offsets[kept] + byte].astype(numpy.uint64) << numpy.uint64(
+            byte * 8
+        )
+    xors <<= (controls >> CONTROL_SHIFT).astype(numpy.uint64) * numpy.uint64(8)
+    return numpy.bitwise_xor.accumulate(xors).view(numpy.float64)
+
+
+@dataclass
+class TelemetrySeries:
+    """
+    The samples of a series, in the order they were recorded
+    """
+
+    name: str
+    unit: Optional[str]
+    # The float64 epoch seconds of the samples
+    timestamps: "numpy.ndarray"
+    values: "numpy.ndarray"
+
+
+class TelemetryReader:
+    """
+    Reads the telemetry segments of a directory, including the one being recorded to
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialize the reader
+
+        :param path: the directory of the segments
+        :raises: ImportError: if numpy isn't installed
+        """
+        if numpy is None:
+            raise ImportError("Reading telemetry requires the numpy package!")
+        self.__path = path
+
+    @staticmethod
+    def __chunks(segment: str) -> List[Chunk]:
+        """
+        Memory map a segment and parse its chunks, the map is closed once they're released
+
+        :param segment: the path of the segment
+        :return: the chunks of the segment, empty if it isn't a telemetry segment
+        """
+        with open(segment, "rb") as file:
+            if os.fstat(file.fileno()).st_size < SEGMENT_HEADER.size:
+                return []
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(mapped)
+        if SEGMENT_HEADER.unpack_from(buffer) != (SEGMENT_MAGIC, SEGMENT_VERSION):
+            return []
+        return list(iter_chunks(buffer=buffer, offset=SEGMENT_HEADER.size))
+
+    def series(self) -> Dict[str, str]:
+        """
+        Get the recorded series
+
+        :return: the unit of each series by name, the most recent if it changed
+        """
+        units = {}
+        for segment in list_segments(self.__path):
+            for chunk in self.__chunks(segment=segment):
+                units[chunk.name] = chunk.unit
+        return units
+
+    def read(
+        self, name: str, since: Optional[float] = None, until: Optional[float] = None
+    ) -> TelemetrySeries:
+        """
+        Read the samples of a series within a time range, chunks outside of it aren't decoded
+
+        :param name: the name of the series
+        :param since: the epoch seconds of the oldest sample, defaults to the first
+        :param until: the epoch seconds of the newest sample, defaults to the last
+        :return: the series, with empty arrays if there are no samples in range
+        """
+        since_ms = -numpy.inf if since is None else since * 1000
+        until_ms = numpy.inf if until is None else until * 1000
+
+        unit = None
+        timestamps, values = [], []
+        for segment in list_segments(self.__path):
+            for chunk in self.__chunks(segment=segment):
+                if (
+                    chunk.name != name
+                    or chunk.last < since_ms
+                    or chunk.first > until_ms
+                ):
+                    continue
+                unit = chunk.unit
+                chunk_timestamps = decode_timestamps(chunk=chunk)
+                in_range = (chunk_timestamps >= since_ms) & (
+                    chunk_timestamps <= until_ms
+                )
+                timestamps.append(chunk_timestamps[in_range])
+                values.append(decode_values(chunk=chunk)[in_range])
+
+        return TelemetrySeries(
+            name=name,
+            unit=unit,
+            timestamps=numpy.concatenate(timestamps or [[]]).astype(numpy.int64) / 1000,
+            values=numpy.concatenate(values or [[]]).astype(numpy.float64),
+        )
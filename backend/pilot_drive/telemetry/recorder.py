@@ -0,0 +1,207 @@
+"""
+The telemetry recorder, appends every sample of the vehicle stats to size rotated segment files.
+Samples are buffered in memory and written with a single fsync per batch, to spare the SD card.
+"""
+
+import glob
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .chunks import ChunkEncoder
+from .constants import (
+    SEGMENT_EXTENSION,
+    SEGMENT_HEADER,
+    SEGMENT_MAGIC,
+    SEGMENT_VERSION,
+    TELEMETRY_BUFFER_SIZE,
+)
+
+
+def list_segments(path: str) -> List[str]:
+    """
+    List the telemetry segments of a directory
+
+    :param path: the telemetry directory
+    :return: the paths of the segments, oldest first
+    """
+    return sorted(glob.glob(os.path.join(glob.escape(path), f"*{SEGMENT_EXTENSION}")))
+
+
+class TelemetryRecorder:  # pylint: disable=too-many-instance-attributes
+    """
+    Records samples into per series chunks, written to the current segment once the fsync
+        interval passes or the buffer fills up. A new segment is started once the current one
+        reaches the max segment size, and the oldest segments are removed once the directory
+        exceeds its disk budget. Thread safe.
+    """
+
+    def __init__(
+        self,
+        *,
+        path: str,
+        max_segment_size: int,
+        max_total_size: int,
+        fsync_interval: float,
+    ) -> None:
+        """
+        Initialize the recorder, and open a new segment within the disk budget
+
+        :param path: the directory of the segments
+        :param max_segment_size: the size in bytes a segment is rotated at
+        :param max_total_size: the max size in bytes of all segments
+        :param fsync_interval: the max seconds samples are buffered before being written. Samples
+            still buffered are lost on a power loss.
+        """
+        self.__path = path
+        self.__max_segment_size = max_segment_size
+        self.__max_total_size = max_total_size
+        self.__fsync_interval = fsync_interval
+
+        # A series is encoded separately for each unit it's recorded in
+        self.__encoders: Dict[Tuple[str, str], ChunkEncoder] = {}
+        self.__buffered = 0
+        self.__last_sync = time.monotonic()
+        self.__lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self.__fd: Optional[int] = None
+        self.__size = 0
+        self.__open_segment()
+        self.__enforce_budget()
+
+    def __open_segment(self) -> None:
+        """
+        Start a new segment, named after the current time
+        """
+        opened = round(time.time() * 1000)
+        while True:
+            segment = os.path.join(self.__path, f"{opened:013d}{SEGMENT_EXTENSION}")
+            try:
+                self.__fd = os.open(segment, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+                break
+            except FileExistsError:
+                opened += 1
+
+        self.__size = 0
+        self.__write_all(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION))
+
+    def __write_all(self, data: bytes) -> None:
+        """
+        Write to the current segment
+
+        :param data: the bytes written
+        """
+        view = memoryview(data)
+        while view:
+            written = os.write(self.__fd, view)
+            view = view[written:]
+        self.__size += len(data)
+
+    def __enforce_budget(self) -> None:
+        """
+        Remove the oldest segments until all segments fit the disk budget, once the new segment
+            is full
+        """
+        # The newest segment is the one being written
+        segments = list_segments(self.__path)[:-1]
+        total = sum(map(os.path.getsize, segments)) + self.__max_segment_size
+        while segments and total > self.__max_total_size:
+            oldest = segments.pop(0)
+            total -= os.path.getsize(oldest)
+            os.remove(oldest)
+
+    def __write(self) -> None:
+        """
+        Write and fsync the buffered samples, rotating the segment first if it's full
+        """
+        self.__last_sync = time.monotonic()
+        chunks = [
+            encoder.seal() for encoder in self.__encoders.values() if encoder.count
+        ]
+        self.__buffered = 0
+        if not chunks or self.__fd is None:
+            return
+
+        data = b"".join(chunks)
+        if (
+            self.__size > SEGMENT_HEADER.size
+            and self.__size + len(data) > self.__max_segment_size
+        ):
+            os.close(self.__fd)
+            self.__open_segment()
+            self.__enforce_budget()
+
+        self.__write_all(data)
+        os.fsync(self.__fd)
+
+    @property
+    def path(self) -> str:
+        """
+        The directory of the segments
+        """
+        return self.__path
+
+    def record(
+        self, name: str, unit: str, value: float, timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Record a sample, written once the fsync interval passed or the buffer is full
+
+        :param name: the name of the series, ie. the stat name
+        :param unit: the unit of the value
+        :param value: the value of the sample
+        :param timestamp: the epoch time of the sample, defaults to now
+        :raises: OSError: if the buffered samples failed to be written
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self.__lock:
+            encoder = self.__encoders.get((name, unit))
+            if encoder is None:
+                encoder = self.__encoders[(name, unit)] = ChunkEncoder(
+                    name=name, unit=unit
+                )
+
+            size = encoder.size
+            encoder.append(timestamp=round(timestamp * 1000), value=float(value))
+            self.__buffered += encoder.size - size
+            if (
+                self.__buffered >= TELEMETRY_BUFFER_SIZE
+                or time.monotonic() - self.__last_sync >= self.__fsync_interval
+            ):
+                self.__write()
+
+    def flush_if_due(self) -> None:
+        """
+        Write the buffered samples if the fsync interval has passed, called periodically so
+            samples don't sit in the buffer when no stat is recorded
+
+        :raises: OSError: if the buffered samples failed to be written
+        """
+        with self.__lock:
+            if time.monotonic() - self.__last_sync >= self.__fsync_interval:
+                self.__write()
+
+    def flush(self) -> None:
+        """
+        Write the buffered samples
+
+        :raises: OSError: if the buffered samples failed to be written
+        """
+        with self.__lock:
+            self.__write()
+
+    def close(self) -> None:
+        """
+        Write the buffered samples and close the current segment
+        """
+        with self.__lock:
+            try:
+                self.__write()
+            finally:
+                if self.__fd is not None:
+                    os.close(self.__fd)
+                    self.__fd = None
@@ -0,0 +1,349 @@
+"""
+The rollups of the vehicle telemetry, min/max/mean/count aggregates of each series at several
+resolutions. They're kept up to date as samples are recorded, so history queries are answered
+with a bounded number of points without decoding any raw samples.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, rollups are disabled without it
+    numpy = None
+
+from .constants import (
+    DEFAULT_HISTORY_POINTS,
+    MAX_HISTORY_POINTS,
+    ROLLUP_CAPACITY,
+    ROLLUP_RESOLUTIONS,
+)
+
+# The buckets, mins, maxs, sums and counts of a run of aggregates
+Aggregates = Tuple[
+    "numpy.ndarray", "numpy.ndarray", "numpy.ndarray", "numpy.ndarray", "numpy.ndarray"
+]
+
+
+def aggregate(
+    buckets: "numpy.ndarray",
+    mins: "numpy.ndarray",
+    maxs: "numpy.ndarray",
+    sums: "numpy.ndarray",
+    counts: "numpy.ndarray",
+) -> Aggregates:
+    """
+    Merge aggregates that share a bucket, raw samples are aggregates with a count of one
+
+    :param buckets: the int64 bucket of each aggregate, in ascending order
+    :param mins: the min of each aggregate
+    :param maxs: the max of each aggregate
+    :param sums: the sum of each aggregate
+    :param counts: the count of each aggregate
+    :return: the aggregates of each unique bucket
+    """
+    if buckets.size == 0:
+        return buckets, mins, maxs, sums, counts
+    starts = numpy.flatnonzero(numpy.diff(buckets, prepend=buckets[0] - 1))
+    return (
+        buckets[starts],
+        numpy.minimum.reduceat(mins, starts),
+        numpy.maximum.reduceat(maxs, starts),
+        numpy.add.reduceat(sums, starts),
+        numpy.add.reduceat(counts, starts),
+    )
+
+
+@dataclass
+class HistoryQuery:
+    """
+    A query of the history of a single series
+    """
+
+    name: str
+    # Unix times of the range, until defaults to now
+    since: float
+    until: Optional[float] = None
+    # Max number of points returned
+    points: int = DEFAULT_HISTORY_POINTS
+    # Echoed back, so the UI can tell the replies of its queries apart
+    request_id: Optional[str] = None
+
+    @classmethod
+    def from_request(cls, request: Dict) -> "HistoryQuery":
+        """
+        Create a query from the query of a history message, see ui/src/types/Vehicle.interface.ts
+
+        :param request: the query dict
+        :return: the query
+        :raises: ValueError: if the name or since is missing, or a key has the wrong type
+        """
+        try:
+            points = int(request.get("points", DEFAULT_HISTORY_POINTS))
+            return cls(
+                name=str(request["name"]),
+                since=float(request["since"]),
+                until=None if request.get("until") is None else float(request["until"]),
+                points=min(max(points, 1), MAX_HISTORY_POINTS),
+                request_id=request.get("id"),
+            )
+        except (KeyError, TypeError) as exc:
+            raise ValueError(f"Invalid history query: {request}") from exc
+
+
+class RollupRing:
+    """
+    The aggregates of a series at a single resolution, the oldest are overwritten once it's full
+    """
+
+    def __init__(self, resolution: int, capacity: int) -> None:
+        """
+        Initialize an empty ring
+
+        :param resolution: the seconds covered by each bucket
+        :param capacity: the max number of buckets kept
+        """
+        self.resolution = resolution
+        self.__capacity = capacity
+        # The buckets, mins, maxs, sums and counts
+        self.__columns: Aggregates = (
+            numpy.zeros(capacity, dtype=numpy.int64),
+            numpy.zeros(capacity),
+            numpy.zeros(capacity),
+            numpy.zeros(capacity),
+            numpy.zeros(capacity, dtype=numpy.int64),
+        )
+        self.__size = 0
+        # The position of the newest bucket
+        self.__head = capacity - 1
+
+    def __positions(self) -> "numpy.ndarray":
+        """
+        Get the positions of the buckets, oldest first
+        """
+        return (
+            self.__head + 1 - self.__size + numpy.arange(self.__size)
+        ) % self.__capacity
+
+    @property
+    def oldest(self) -> Optional[float]:
+        """
+        The unix time the oldest bucket starts at, None if the ring is empty
+        """
+        if not self.__size:
+            return None
+        return float(self.__columns[0][self.__positions()[0]] * self.resolution)
+
+    def extend(self, aggregates: Aggregates) -> None:
+        """
+        Add aggregates, merging the first into the newest bucket if they share it. Aggregates
+            older than the newest bucket, ie. after the clock went back, are dropped.
+
+        :param aggregates: the aggregates at the ring's resolution, in ascending bucket order
+        """
+        if self.__size:
+            buckets, mins, maxs, sums, counts = self.__columns
+            head = self.__head
+            aggregates = tuple(
+                column[aggregates[0] >= buckets[head]] for column in aggregates
+            )
+            if aggregates[0].size and aggregates[0][0] == buckets[head]:
+                mins[head] = min(mins[head], aggregates[1][0])
+                maxs[head] = max(maxs[head], aggregates[2][0])
+                sums[head] += aggregates[3][0]
+                counts[head] += aggregates[4][0]
+                aggregates = tuple(column[1:] for column in aggregates)
+
+        added = min(aggregates[0].size, self.__capacity)
+        if not added:
+            return
+        positions = (self.__head + 1 + numpy.arange(added)) % self.__capacity
+        for target, column in zip(self.__columns, aggregates):
+            target[positions] = column[-added:]
+        self.__head = int(positions[-1])
+        self.__size = min(self.__size + added, self.__capacity)
+
+    def range(self, since: float, until: float) -> Aggregates:
+        """
+        Get the buckets that overlap a time range
+
+        :param since: the unix time the range starts at
+        :param until: the unix time the range ends at
+        :return: copies of the aggregates, in ascending bucket order
+        """
+        positions = self.__positions()
+        buckets = self.__columns[0][positions]
+        overlapping = positions[
+            (buckets >= math.floor(since / self.resolution))
+            & (buckets * self.resolution <= until)
+        ]
+        return tuple(column[overlapping] for column in self.__columns)
+
+
+class RollupEngine:
+    """
+    The rollups of every series, at each resolution. Thread safe.
+    """
+
+    def __init__(
+        self,
+        resolutions: Tuple[int, ...] = ROLLUP_RESOLUTIONS,
+        capacity: int = ROLLUP_CAPACITY,
+    ) -> None:
+        """
+        Initialize the engine
+
+        :param resolutions: the seconds covered by a bucket at each resolution, finest first
+        :param capacity: the number of buckets kept per resolution
+        :raises: ImportError: if numpy isn't installed
+        """
+        if numpy is None:
+            raise ImportError("Telemetry rollups require the numpy package!")
+        self.__resolutions = resolutions
+        self.__capacity = capacity
+        self.__rings: Dict[str, List[RollupRing]] = {}
+        self.__units: Dict[str, str] = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def retention(self) -> float:
+        """
+        The seconds of history kept at the coarsest resolution
+        """
+        return self.__resolutions[-1] * self.__capacity
+
+    def __series(self, name: str, unit: str) -> List[RollupRing]:
+        """
+        Get the rings of a series, its rollups start over if its unit changed
+
+        :param name: the name of the series
+        :param unit: the unit of the new values
+        :return: the ring of each resolution, finest first
+        """
+        if self.__units.get(name, unit) != unit:
+            del self.__rings[name]
+        self.__units[name] = unit
+        if name not in self.__rings:
+            self.__rings[name] = [
+                RollupRing(resolution=resolution, capacity=self.__capacity)
+                for resolution in self.__resolutions
+            ]
+        return self.__rings[name]
+
+    def add(
+        self, name: str, unit: str, value: float, timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Add a sample to the rollups of its series
+
+        :param name: the name of the series, ie. the stat name
+        :param unit: the unit of the value
+        :param value: the value of the sample
+        :param timestamp: the unix time of the sample, defaults to now
+        """
+        self.backfill(
+            name=name,
+            unit=unit,
+            timestamps=numpy.array([time.time() if timestamp is None else timestamp]),
+            values=numpy.array([value], dtype=numpy.float64),
+        )
+
+    def backfill(
+        self,
+        name: str,
+        unit: str,
+        timestamps: "numpy.ndarray",
+        values: "numpy.ndarray",
+    ) -> None:
+        """
+        Add samples to the rollups of their series, aggregated in bulk
+
+        :param name: the name of the series
+        :param unit: the unit of the values
+        :param timestamps: the unix times of the samples
+        :param values: the values of the samples
+        """
+        order = numpy.argsort(timestamps, kind="stable")
+        timestamps, values = timestamps[order], values[order]
+        ones = numpy.ones(values.size, dtype=numpy.int64)
+        with self.__lock:
+            for ring in self.__series(name=name, unit=unit):
+                buckets = numpy.floor_divide(timestamps, ring.resolution).astype(
+                    numpy.int64
+                )
+                ring.extend(aggregate(buckets, values, values, values, ones))
+
+    def query(self, query: HistoryQuery) -> Dict:
+        """
+        Get the history of a series from the coarsest resolution that still gives the query's
+            points, falling back to a coarser one if it doesn't hold the start of the range. The
+            buckets are then merged down to the query's points.
+
+        :param query: the HistoryQuery
+        :return: the history dict, see ui/src/types/Vehicle.interface.ts
+        """
+        until = time.time() if query.until is None else query.until
+        span = max(until - query.since, 0)
+        history = {
+            "id": query.request_id,
+            "name": query.name,
+            "unit": None,
+            "resolution": None,
+            "timestamps": [],
+            "min": [],
+            "max": [],
+            "mean": [],
+            "count": [],
+        }
+
+        with self.__lock:
+            rings = self.__rings.get(query.name)
+            if not rings:
+                return history
+
+            # The finest resolution when even it gives fewer points than asked for
+            ring = next(
+                (
+                    ring
+                    for ring in reversed(rings)
+                    if span / ring.resolution >= query.points
+                ),
+                rings[0],
+            )
+            if ring.oldest is None or ring.oldest > query.since:
+                ring = next(
+                    (
+                        coarser
+                        for coarser in rings
+                        if coarser.resolution > ring.resolution
+                        and coarser.oldest is not None
+                        and coarser.oldest <= query.since
+                    ),
+                    ring,
+                )
+            buckets, mins, maxs, sums, counts = ring.range(
+                since=query.since, until=until
+            )
+            history["unit"] = self.__units[query.name]
+
+        if buckets.size > query.points:
+            # Spread the buckets over the points evenly, each point starts at its first bucket
+            groups = (
+                (buckets - buckets[0]) * query.points // (buckets[-1] - buckets[0] + 1)
+            )
+            firsts = buckets[numpy.flatnonzero(numpy.diff(groups, prepend=-1))]
+            _, mins, maxs, sums, counts = aggregate(groups, mins, maxs, sums, counts)
+            buckets = firsts
+
+        history.update(
+            resolution=ring.resolution,
+            timestamps=(buckets * ring.resolution).tolist(),
+            min=mins.tolist(),
+            max=maxs.tolist(),
+            mean=(sums / counts).tolist(),
+            count=counts.tolist(),
+        )
+        return history
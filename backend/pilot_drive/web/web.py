@@ -3,42 +3,119 @@ Module contains the static web file server
 """
 
 import http.server
+import os
+import re
 import socketserver
+import urllib.parse
+from http import HTTPStatus
+from typing import Optional
 
-from pilot_drive.constants import absolute_path
+from pilot_drive.constants import COVER_ART_URL, absolute_path
 from pilot_drive.master_logging.master_logger import MasterLogger
 
+# The name of a cover in the cover art cache, the digest of its content
+COVER_NAME = re.compile(r"[0-9a-f]{32}\.jpg")
+
+
+class WebRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Serves the static web assets, and the cover art cache at COVER_ART_URL
+    """
+
+    def __init__(self, *args, covers_directory: Optional[str] = None, **kwargs) -> None:
+        """
+        Constructor for the WebRequestHandler, handles the request right away
+
+        :param covers_directory: The directory of the cover art cache, None if it's disabled
+        """
+        self.__covers_directory = covers_directory
+        super().__init__(*args, **kwargs)
+
+    def __cover_name(self) -> Optional[str]:
+        """
+        Get the name of the cover requested
+
+        :return: the file name, None if the request isn't for a cover
+        """
+        path = urllib.parse.urlsplit(self.path).path
+        if self.__covers_directory is None or not path.startswith(COVER_ART_URL):
+            return None
+        return path[len(COVER_ART_URL) :]
+
+    def translate_path(self, path: str) -> str:
+        """
+        Map a URL path to a file, covers to the cover art cache
+
+        :param path: The URL path
+        :return: The path of the file
+        """
+        name = self.__cover_name()
+        if name is not None and COVER_NAME.fullmatch(name):
+            return os.path.join(self.__covers_directory, name)
+        return super().translate_path(path)
+
+    def send_head(self):
+        """
+        Send the headers of a response, only covers are served at COVER_ART_URL
+        """
+        name = self.__cover_name()
+        if name is not None and not COVER_NAME.fullmatch(name):
+            self.send_error(HTTPStatus.NOT_FOUND, "Cover not found")
+            return None
+        return super().send_head()
+
+    def send_response(self, code: int, message: Optional[str] = None) -> None:
+        """
+        Send the response code. Covers are content addressed so the same URL always serves the
+            same image, a served cover is cached for good.
+
+        :param code: The HTTP status code
+        :param message: The optional status message
+        """
+        super().send_response(code, message)
+        if code == HTTPStatus.OK and self.__cover_name() is not None:
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+
 
 class Web:
     """
     The class that serves the static web assets (the Vue frontend)
     """
 
-    def __init__(self, logger: MasterLogger, port: int, relative_directory: str):
+    def __init__(
+        self,
+        logger: MasterLogger,
+        port: int,
+        relative_directory: str,
+        covers_directory: Optional[str] = None,
+    ):
         """
         Constructor for the Web class
         :param port: The port that the server will be ran at (ie. http://localhost:<port>)
         :param relative_directory: The directory that the server will be serving from
+        :param covers_directory: The directory of the cover art cache, None if it's disabled
         """
         self.__port = port
         self.__directory = f"{absolute_path}{relative_directory}"
+        self.__covers_directory = covers_directory
         self.__logger = logger
         self.__logger.info(msg="Initializing the static web server!")
 
     def handler(self, request, client_address, server) -> None:
         """
-        The handler that passes the request params to the SimpleHttpRequestHandler,
-        along with the directory path
+        The handler that passes the request params to the WebRequestHandler,
+        along with the directory paths
 
         :param request: The socket request object
         :param client_address: The client address object
         :param server: The socketserver.TCPServer object
         """
-        http.server.SimpleHTTPRequestHandler(
+        WebRequestHandler(
             request=request,
             client_address=client_address,
             server=server,
             directory=self.__directory,
+            covers_directory=self.__covers_directory,
         )
 
     def main(self) -> None:
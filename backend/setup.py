@@ -19,6 +19,12 @@ setup(
         "Bug Tracker": "https://github.com/lamemakes/pilot-drive/issues",
     },
     install_requires=["websockets", "requests", "dasbus", "PyGObject", "obd"],
+    extras_require={
+        "msgpack": ["msgpack"],
+        "zstd": ["zstandard"],
+        "numpy": ["numpy"],
+        "covers": ["Pillow"],
+    },
     entry_points={"console_scripts": ["pilot-drive = pilot_drive.__main__:run"]},
     packages=find_packages(exclude=["*.tests", "*.tests.*", "tests.*", "tests"]),
     include_package_data=True,
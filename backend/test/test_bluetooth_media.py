@@ -0,0 +1,137 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from pilot_drive.services.bluetooth.constants import RpcTopics
+from pilot_drive.services.media import bluetooth_media
+from pilot_drive.services.media.bluetooth_media import BluetoothMedia
+
+PLAYER = "/org/bluez/hci0/dev_AA_BB_CC_DD_EE_FF/player0"
+
+
+class FakeClient:
+    """
+    A client of the Bluetooth service, its subscriber is called by the test
+    """
+
+    def __init__(self):
+        self.publish = None
+        self.topic = None
+
+    def subscribe(self, callback, topic):
+        self.publish = callback
+        self.topic = topic
+
+
+class FakeThread:
+    def __init__(self, target, args, kwargs, **_):
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+
+    def start(self):
+        self.target(*self.args, **self.kwargs)
+
+
+def state(position_received, **properties):
+    return {
+        "path": PLAYER,
+        "properties": properties,
+        "address": "AA:BB:CC:DD:EE:FF",
+        "positionReceived": position_received,
+    }
+
+
+@pytest.fixture
+def pending(monkeypatch):
+    """
+    The debounced pushes, the player states are applied right away
+    """
+    pending = []
+
+    def call_later(delay, callback, context=None):
+        if delay:
+            pending.append(callback)
+        else:
+            callback()
+        return callback
+
+    monkeypatch.setattr(bluetooth_media, "ThreadEventLoop", MagicMock())
+    monkeypatch.setattr(bluetooth_media, "Thread", FakeThread)
+    monkeypatch.setattr(bluetooth_media, "call_later", call_later)
+    return pending
+
+
+def test_player_states_are_applied_to_the_cache(pending):
+    track = {"Title": "Song", "Artist": "Band", "Album": "Record", "Duration": 1000}
+    client = FakeClient()
+    events = []
+    media = BluetoothMedia(
+        push_to_queue_callback=events.append, logger=MagicMock(), client=client
+    )
+    media.main()
+    assert client.topic == RpcTopics.PLAYER
+
+    client.publish(state(1000.0, Track=track, Position=10, Status="paused"))
+    assert len(pending) == 1
+    pending.pop()()
+    assert events[-1]["title"] == "Song"
+    assert events[-1]["playing"] is False
+
+    # A track change is a burst of states, pushed as a single event
+    new_track = {**track, "Title": "Next Song"}
+    client.publish(state(1000.0, Track=new_track, Position=10, Status="paused"))
+    client.publish(state(1001.0, Track=new_track, Position=0, Status="paused"))
+    client.publish(state(1001.0, Track=new_track, Position=0, Status="playing"))
+    assert len(pending) == 1
+    pending.pop()()
+    assert len(events) == 2
+    assert events[-1]["title"] == "Next Song"
+    assert events[-1]["playing"] is True
+
+    # The player is gone
+    client.publish(
+        {"path": None, "properties": {}, "address": None, "positionReceived": None}
+    )
+    pending.pop()()
+    assert events[-1]["title"] is None
+    assert events[-1]["playing"] is False
+
+
+def test_the_cached_position_is_extrapolated_while_playing(pending):
+    now = [1000.0]
+    track = {"Title": "Song", "Artist": "Band", "Album": "Record", "Duration": 60000}
+    client = FakeClient()
+    events = []
+    media = BluetoothMedia(
+        push_to_queue_callback=events.append,
+        logger=MagicMock(),
+        client=client,
+        clock=lambda: now[0],
+    )
+    media.main()
+
+    # The Position was received by the Bluetooth service 2 seconds before it's applied
+    client.publish(state(998.0, Track=track, Position=0, Status="playing"))
+    pending.pop()()
+    assert events[-1]["position"] == 2000
+    assert events[-1]["timestamp"] == 1000000
+
+    # An unrelated change (ie. Shuffle) publishes the same state 5 seconds later, the anchor holds
+    now[0] = 1005.0
+    client.publish(state(998.0, Track=track, Position=0, Status="playing"))
+    pending.pop()()
+    assert media.position == 7000
+    assert events[-1] == events[0]
+
+    # A pause holds the position where it happened
+    client.publish(state(998.0, Track=track, Position=0, Status="paused"))
+    now[0] = 1010.0
+    pending.pop()()
+    assert events[-1]["position"] == 7000
+    assert events[-1]["playing"] is False
+
+    # A signaled Position replaces the cached one
+    client.publish(state(1010.0, Track=track, Position=30000, Status="playing"))
+    pending.pop()()
+    assert events[-1]["position"] == 30000
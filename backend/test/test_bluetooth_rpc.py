@@ -0,0 +1,137 @@
+import threading
+import time
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+
+from pilot_drive.services.bluetooth import (
+    BluetoothClient,
+    BluetoothRpcException,
+    NoPlayerException,
+)
+from pilot_drive.services.bluetooth.constants import RpcMethods, RpcTopics
+from pilot_drive.services.bluetooth.rpc import BluetoothRpcServer
+
+
+def serve(address, handlers):
+    server = BluetoothRpcServer(handlers=handlers, logger=MagicMock(), address=address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def address():
+    return f"\0pilot-drive-test-{uuid.uuid4()}"
+
+
+def test_requests_are_answered(address):
+    commands = []
+
+    def track_control(command):
+        if not commands:
+            commands.append(command)
+            return
+        raise NoPlayerException("No BlueZ media player was found!")
+
+    server = serve(
+        address=address,
+        handlers={
+            RpcMethods.TRACK_CONTROL: track_control,
+            RpcMethods.ANCS_DEVICES: lambda: ["AA:BB:CC:DD:EE:FF"],
+            RpcMethods.DEVICES: lambda: 1 / 0,
+        },
+    )
+    client = BluetoothClient(address=address)
+
+    client.track_control(command="Play")
+    assert commands == ["Play"]
+    # Exceptions of the Bluetooth service are raised again, others are wrapped
+    with pytest.raises(NoPlayerException):
+        client.track_control(command="Pause")
+    with pytest.raises(BluetoothRpcException, match="ZeroDivisionError"):
+        client.devices()
+
+    # The client reconnects once the service restarted
+    server.close()
+    server = serve(address=address, handlers={RpcMethods.ANCS_DEVICES: lambda: []})
+    assert client.ancs_devices() == []
+    server.close()
+
+
+def test_subscribers_get_the_latest_event_first(address):
+    server = serve(address=address, handlers={})
+    server.publish(event={"powered": False, "devices": []})
+
+    events = []
+    received = threading.Semaphore(0)
+
+    def callback(event):
+        events.append(event)
+        received.release()
+
+    client = BluetoothClient(address=address)
+    threading.Thread(target=client.subscribe, args=(callback,), daemon=True).start()
+    assert received.acquire(timeout=5)
+
+    server.publish(event={"powered": True, "devices": []})
+    assert received.acquire(timeout=5)
+    assert [event["powered"] for event in events] == [False, True]
+    server.close()
+
+
+def test_subscribers_only_get_the_events_of_their_topic(address):
+    server = serve(address=address, handlers={})
+    server.publish(event={"powered": True, "devices": []})
+    server.publish(event={"path": None}, topic=RpcTopics.PLAYER)
+
+    events = []
+    received = threading.Semaphore(0)
+
+    def callback(event):
+        events.append(event)
+        received.release()
+
+    client = BluetoothClient(address=address)
+    threading.Thread(
+        target=client.subscribe,
+        args=(callback,),
+        kwargs={"topic": RpcTopics.PLAYER},
+        daemon=True,
+    ).start()
+    assert received.acquire(timeout=5)
+
+    server.publish(event={"powered": False, "devices": []})
+    server.publish(event={"path": "/player0"}, topic=RpcTopics.PLAYER)
+    assert received.acquire(timeout=5)
+    assert events == [{"path": None}, {"path": "/player0"}]
+    server.close()
+
+
+def test_a_stalled_subscriber_does_not_block_subscribing(address):
+    server = serve(address=address, handlers={})
+    server.publish(event={"powered": False, "devices": []})
+
+    # Subscribes, then never reads, so the publishes to it block once its socket is full
+    stalled = BluetoothClient(address=address)
+    threading.Thread(
+        target=stalled.subscribe,
+        args=(lambda event: threading.Event().wait(),),
+        daemon=True,
+    ).start()
+    time.sleep(0.5)
+
+    big_event = {"powered": True, "devices": ["x" * 65536]}
+    threading.Thread(
+        target=lambda: [server.publish(event=big_event) for _ in range(100)],
+        daemon=True,
+    ).start()
+    time.sleep(0.5)
+
+    received = threading.Event()
+    client = BluetoothClient(address=address)
+    threading.Thread(
+        target=client.subscribe, args=(lambda event: received.set(),), daemon=True
+    ).start()
+    assert received.wait(timeout=5)
+    server.close()
@@ -0,0 +1,254 @@
+from collections import Counter
+from unittest.mock import MagicMock
+
+from pilot_drive.master_queue import EventType
+from pilot_drive.services.bluetooth import Bluetooth
+from pilot_drive.services.bluetooth import bluetooth as bluetooth_module
+from pilot_drive.services.bluetooth.constants import NOTIFICATION_SOURCE_CHAR, RpcTopics
+
+ADAPTER = "/org/bluez/hci0"
+PHONE = "/org/bluez/hci0/dev_AA_BB_CC_DD_EE_FF"
+PLAYER = f"{PHONE}/player0"
+ANCS_CHAR = f"{PHONE}/service0010/char0011"
+
+
+class FakeVariant:
+    def __init__(self, value):
+        self.value = value
+
+    def unpack(self):
+        return self.value
+
+
+class FakeSignal:
+    def __init__(self):
+        self.callbacks = []
+
+    def connect(self, callback):
+        self.callbacks.append(callback)
+
+    def disconnect(self, callback):
+        self.callbacks.remove(callback)
+
+    def emit(self, *args):
+        for callback in self.callbacks:
+            callback(*args)
+
+
+class FakeProxy:
+    def __init__(self, bus, path):
+        self.bus = bus
+        self.path = path
+        self.InterfacesAdded = FakeSignal()
+        self.InterfacesRemoved = FakeSignal()
+        self.PropertiesChanged = FakeSignal()
+
+    def GetManagedObjects(self):
+        self.bus.calls["GetManagedObjects"] += 1
+        return self.bus.objects
+
+    def GetAll(self, interface):
+        self.bus.calls["GetAll"] += 1
+        return self.bus.objects[self.path][interface]
+
+
+class FakeBus:
+    """
+    A system bus serving a BlueZ object tree, counting the DBus calls
+    """
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.calls = Counter()
+        self.proxies = {}
+
+    def get_proxy(self, name, path):
+        self.calls["get_proxy"] += 1
+        self.proxies.setdefault(path, FakeProxy(bus=self, path=path))
+        return self.proxies[path]
+
+
+def properties(**values):
+    return {name: FakeVariant(value) for name, value in values.items()}
+
+
+def test_lookups_are_served_from_the_signals():
+    bus = FakeBus(
+        objects={
+            ADAPTER: {"org.bluez.Adapter1": properties(Powered=True)},
+            PHONE: {
+                "org.bluez.Device1": properties(
+                    Address="AA:BB:CC:DD:EE:FF", Connected=True
+                )
+            },
+            ANCS_CHAR: {
+                "org.bluez.GattCharacteristic1": properties(
+                    UUID=NOTIFICATION_SOURCE_CHAR
+                )
+            },
+        }
+    )
+    bluetooth = Bluetooth(
+        master_event_queue=MagicMock(),
+        service_type=EventType.BLUETOOTH,
+        logger=MagicMock(),
+        bus=bus,
+    )
+
+    assert bluetooth.bluez_adapter is bus.proxies[ADAPTER]
+    assert bluetooth.active_ancs_devices == ["AA:BB:CC:DD:EE:FF"]
+    assert bluetooth.objects.device_path(address="AA:BB:CC:DD:EE:FF") == PHONE
+    calls = bus.calls.copy()
+    for _ in range(10):
+        assert bluetooth.bluez_adapter is bus.proxies[ADAPTER]
+        assert bluetooth.active_ancs_devices == ["AA:BB:CC:DD:EE:FF"]
+    # Populated once, with a proxy for the root and each watched object
+    assert calls == {"GetManagedObjects": 1, "get_proxy": 3}
+    assert bus.calls == calls
+
+    root = bus.proxies["/"]
+    root.InterfacesAdded.emit(
+        PLAYER, {"org.bluez.MediaPlayer1": properties(Status="playing")}
+    )
+    assert bluetooth.bluez_media_player is bus.proxies[PLAYER]
+
+    bus.proxies[PHONE].PropertiesChanged.emit(
+        "org.bluez.Device1", {"Connected": FakeVariant(False)}, []
+    )
+    assert bluetooth.active_ancs_devices == []
+
+    root.InterfacesRemoved.emit(PHONE, ["org.bluez.Device1"])
+    assert bluetooth.objects.device_path(address="AA:BB:CC:DD:EE:FF") is None
+    assert bus.proxies[PHONE].PropertiesChanged.callbacks == []
+    # Only the new player was connected to
+    assert bus.calls == {"GetManagedObjects": 1, "get_proxy": 4}
+
+
+def test_events_are_built_from_the_mirror(monkeypatch):
+    monkeypatch.setattr(bluetooth_module, "ThreadEventLoop", MagicMock())
+    monkeypatch.setattr(bluetooth_module, "BluetoothRpcServer", MagicMock())
+    monkeypatch.setattr(bluetooth_module, "Thread", MagicMock())
+    bus = FakeBus(
+        objects={
+            ADAPTER: {
+                "org.bluez.Adapter1": properties(
+                    Name="pilot",
+                    Alias="PILOT Drive",
+                    Address="11:22:33:44:55:66",
+                    Powered=True,
+                )
+            },
+            PHONE: {
+                "org.bluez.Device1": properties(
+                    Alias="Phone", Address="AA:BB:CC:DD:EE:FF", Connected=True, UUIDs=[]
+                )
+            },
+        }
+    )
+    queue = MagicMock()
+    bluetooth = Bluetooth(
+        master_event_queue=queue,
+        service_type=EventType.BLUETOOTH,
+        logger=MagicMock(),
+        bus=bus,
+    )
+    # The fake proxies have no properties, reading one over DBus would raise
+    bluetooth.main()
+    event = queue.push_event.call_args.kwargs["event"]
+    assert event["hostname"] == "PILOT Drive"
+    assert event["address"] == "11:22:33:44:55:66"
+    assert event["powered"] is True
+    assert event["devices"] == [
+        {
+            "name": None,
+            "alias": "Phone",
+            "address": "AA:BB:CC:DD:EE:FF",
+            "connected": True,
+            "media": False,
+            "ancs": False,
+        }
+    ]
+
+    bus.proxies[ADAPTER].PropertiesChanged.emit(
+        "org.bluez.Adapter1", {"Powered": FakeVariant(False)}, []
+    )
+    bus.proxies[PHONE].PropertiesChanged.emit(
+        "org.bluez.Device1", {"Connected": FakeVariant(False)}, []
+    )
+    event = queue.push_event.call_args.kwargs["event"]
+    assert event["powered"] is False
+    assert event["devices"][0]["connected"] is False
+    assert bus.calls["GetManagedObjects"] == 1
+
+
+def test_player_states_are_published_from_the_mirror(monkeypatch):
+    now = [1000.0]
+    server = MagicMock()
+    monkeypatch.setattr(bluetooth_module, "ThreadEventLoop", MagicMock())
+    monkeypatch.setattr(bluetooth_module, "BluetoothRpcServer", lambda **_: server)
+    monkeypatch.setattr(bluetooth_module, "Thread", MagicMock())
+    monkeypatch.setattr(bluetooth_module, "time", MagicMock(time=lambda: now[0]))
+    track = {"Title": "Song", "Artist": "Band", "Album": "Record", "Duration": 1000}
+    bus = FakeBus(
+        objects={
+            ADAPTER: {"org.bluez.Adapter1": properties(Powered=True)},
+            PHONE: {
+                "org.bluez.Device1": properties(
+                    Address="AA:BB:CC:DD:EE:FF", Connected=True, UUIDs=[]
+                )
+            },
+            PLAYER: {
+                "org.bluez.MediaPlayer1": properties(
+                    Device=PHONE, Track=track, Position=10, Status="paused", Shuffle="off"
+                )
+            },
+        }
+    )
+    queue = MagicMock()
+    bluetooth = Bluetooth(
+        master_event_queue=queue,
+        service_type=EventType.BLUETOOTH,
+        logger=MagicMock(),
+        bus=bus,
+    )
+    bluetooth.main()
+
+    def published():
+        assert server.publish.call_args.kwargs["topic"] == RpcTopics.PLAYER
+        return server.publish.call_args.kwargs["event"]
+
+    assert published() == {
+        "path": PLAYER,
+        "properties": {"Track": track, "Position": 10, "Status": "paused"},
+        "address": "AA:BB:CC:DD:EE:FF",
+        "positionReceived": 1000.0,
+    }
+    pushes = queue.push_event.call_count
+
+    # Only a signaled Position moves the time it was received at
+    player = bus.proxies[PLAYER]
+    now[0] = 1005.0
+    player.PropertiesChanged.emit(
+        "org.bluez.MediaPlayer1", {"Status": FakeVariant("playing")}, []
+    )
+    assert published()["properties"]["Status"] == "playing"
+    assert published()["positionReceived"] == 1000.0
+    player.PropertiesChanged.emit(
+        "org.bluez.MediaPlayer1", {"Position": FakeVariant(0)}, []
+    )
+    assert published()["properties"]["Position"] == 0
+    assert published()["positionReceived"] == 1005.0
+
+    # An invalidated property is a gap, the player is read again
+    bus.objects[PLAYER]["org.bluez.MediaPlayer1"]["Track"] = FakeVariant(
+        {**track, "Title": "Next Song"}
+    )
+    player.PropertiesChanged.emit("org.bluez.MediaPlayer1", {}, ["Track"])
+    assert bus.calls["GetAll"] == 1
+    assert published()["properties"]["Track"]["Title"] == "Next Song"
+
+    bus.proxies["/"].InterfacesRemoved.emit(PLAYER, ["org.bluez.MediaPlayer1"])
+    assert published()["path"] is None
+    assert player.PropertiesChanged.callbacks == []
+    # The player isn't part of the bluetooth events
+    assert queue.push_event.call_count == pushes
@@ -0,0 +1,254 @@
+import asyncio
+import json
+from typing import List
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from pilot_drive.master_queue import MasterEventQueue, EventType
+from pilot_drive.master_queue.broadcaster import EventBroadcaster
+from pilot_drive.master_queue.codecs import JsonCodec, get_codec, select_subprotocol
+from pilot_drive.master_queue.constants import (
+    EventCodecs,
+    SlowConsumerPolicies,
+    SLOW_CONSUMER_CLOSE_CODE,
+)
+from pilot_drive.master_queue.exceptions import EventDecodeException
+
+
+class FakeClient:
+    """
+    A fake WebSocket client, optionally blocked until released to simulate a slow consumer
+    """
+
+    def __init__(self, blocked: bool = False) -> None:
+        self.received: List[dict] = []
+        self.close_code = None
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def send(self, message: str) -> None:
+        await self.unblocked.wait()
+        self.received.append(json.loads(message))
+
+    async def close(self, code: int, reason: str) -> None:
+        self.close_code = code
+
+
+async def run_clients(
+    clients: List[FakeClient],
+    events: List[dict],
+    outbox_size: int = 256,
+    policy: SlowConsumerPolicies = SlowConsumerPolicies.DROP_OLDEST,
+) -> EventBroadcaster:
+    """
+    Connect the clients to a broadcaster, push the events and wait for them to be sent
+    """
+    master_queue = MasterEventQueue(logging=MagicMock())
+    broadcaster = EventBroadcaster(
+        master_queue=master_queue,
+        logging=MagicMock(),
+        outbox_size=outbox_size,
+        policy=policy,
+    )
+    outboxes = [broadcaster.register(websocket=client) for client in clients]
+    tasks = [asyncio.create_task(outbox.run()) for outbox in outboxes]
+    drain = asyncio.create_task(broadcaster.run())
+
+    for event in events:
+        master_queue.push_event(
+            event_type=event["type"], event=event["data"], key=event.get("key")
+        )
+
+    # Let the drain task broadcast everything before the slow clients catch up
+    while master_queue.is_new_event:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+    for client in clients:
+        client.unblocked.set()
+    await asyncio.sleep(0.01)
+
+    drain.cancel()
+    for task in tasks:
+        task.cancel()
+    master_queue.close()
+    return broadcaster
+
+
+def make_events(count: int, event_type: EventType = EventType.VEHICLE) -> List[dict]:
+    return [{"type": event_type, "data": {"count": num}} for num in range(count)]
+
+
+@pytest.mark.parametrize("client_count", [1, 2, 8])
+def test_every_client_gets_every_event(client_count: int):
+    clients = [FakeClient() for _ in range(client_count)]
+    events = make_events(40)
+
+    asyncio.run(run_clients(clients=clients, events=events))
+
+    expected = [{"type": "vehicle", "vehicle": {"count": num}} for num in range(40)]
+    for client in clients:
+        assert client.received == expected
+
+
+def test_drop_oldest_only_affects_slow_client():
+    fast, slow = FakeClient(), FakeClient(blocked=True)
+
+    asyncio.run(
+        run_clients(clients=[fast, slow], events=make_events(20), outbox_size=5)
+    )
+
+    assert [event["vehicle"]["count"] for event in fast.received] == list(range(20))
+    # The slow client is stuck sending the first event, then gets the newest 5
+    assert [event["vehicle"]["count"] for event in slow.received] == [
+        0,
+        15,
+        16,
+        17,
+        18,
+        19,
+    ]
+
+
+def test_coalesce_keeps_other_event_types():
+    slow = FakeClient(blocked=True)
+    events = make_events(1, EventType.SETTINGS) + make_events(20)
+
+    asyncio.run(
+        run_clients(
+            clients=[slow],
+            events=events,
+            outbox_size=3,
+            policy=SlowConsumerPolicies.COALESCE,
+        )
+    )
+
+    assert slow.received[0]["type"] == "settings"
+    assert [event["type"] for event in slow.received[1:]] == ["vehicle"] * 3
+    assert slow.received[-1]["vehicle"]["count"] == 19
+
+
+def test_coalesce_keeps_other_keys():
+    slow = FakeClient(blocked=True)
+    events = [{**event, "key": "info"} for event in make_events(1)] + [
+        {**event, "key": "history"} for event in make_events(20)
+    ]
+
+    asyncio.run(
+        run_clients(
+            clients=[slow],
+            events=events,
+            outbox_size=3,
+            policy=SlowConsumerPolicies.COALESCE,
+        )
+    )
+
+    # The sub-key only separates the snapshots, it isn't sent
+    assert slow.received[0] == {"type": "vehicle", "vehicle": {"count": 0}}
+    assert [event["vehicle"]["count"] for event in slow.received[1:]] == [17, 18, 19]
+
+
+def test_disconnect_slow_client():
+    fast, slow = FakeClient(), FakeClient(blocked=True)
+
+    broadcaster = asyncio.run(
+        run_clients(
+            clients=[fast, slow],
+            events=make_events(20),
+            outbox_size=5,
+            policy=SlowConsumerPolicies.DISCONNECT,
+        )
+    )
+
+    assert len(fast.received) == 20
+    assert slow.close_code == SLOW_CONSUMER_CLOSE_CODE
+    assert broadcaster.clients == 1
+
+
+def test_clients_get_their_negotiated_codec():
+    msgpack = pytest.importorskip("msgpack")
+    json_client, msgpack_client = FakeClient(), FakeClient()
+    msgpack_client.subprotocol = EventCodecs.MSGPACK
+    msgpack_client.send = AsyncMock()
+
+    asyncio.run(
+        run_clients(clients=[json_client, msgpack_client], events=make_events(3))
+    )
+
+    assert [event["vehicle"]["count"] for event in json_client.received] == [0, 1, 2]
+    sent = [call.args[0] for call in msgpack_client.send.await_args_list]
+    assert all(isinstance(message, bytes) for message in sent)
+    assert [msgpack.unpackb(message)["vehicle"]["count"] for message in sent] == [
+        0,
+        1,
+        2,
+    ]
+
+
+def test_select_subprotocol():
+    assert select_subprotocol(None, []) is None
+    assert select_subprotocol(None, ["unknown", EventCodecs.JSON]) == EventCodecs.JSON
+    assert isinstance(get_codec(subprotocol=None), JsonCodec)
+
+    with pytest.raises(EventDecodeException):
+        JsonCodec().decode(message="{not json")
+
+
+def test_debug_event_log_skipped():
+    logging = MagicMock()
+    logging.is_enabled_for.return_value = False
+    master_queue = MasterEventQueue(logging=logging)
+
+    master_queue.push_event(event_type=EventType.VEHICLE, event={"count": 1})
+
+    logging.debug.assert_not_called()
+    master_queue.close()
+
+
+def test_logs_request_and_live_records():
+    logging = MagicMock()
+    logging.query_records.return_value = [{"message": "kept", "level": 30}]
+    broadcaster = EventBroadcaster(
+        master_queue=MagicMock(),
+        logging=logging,
+        outbox_size=16,
+        policy=SlowConsumerPolicies.DROP_OLDEST,
+    )
+    live, quiet = FakeClient(), FakeClient()
+
+    async def run():
+        outboxes = [
+            broadcaster.register(websocket=live),
+            broadcaster.register(websocket=quiet),
+        ]
+        tasks = [asyncio.create_task(outbox.run()) for outbox in outboxes]
+        broadcaster.logs_request(
+            websocket=live,
+            request={"query": {"level": 30, "service": "vehicle"}, "live": True},
+        )
+        broadcaster.logs_request(websocket=quiet, request={})
+        broadcaster.broadcast_logs(
+            records=[
+                {"level": 40, "service": "vehicle", "timestamp": 1},
+                {"level": 40, "service": "phone", "timestamp": 2},
+                {"level": 20, "service": "vehicle", "timestamp": 3},
+            ]
+        )
+        await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+
+    asyncio.run(run())
+
+    query = logging.query_records.call_args_list[0].kwargs["query"]
+    assert (query.level, query.service) == (30, "vehicle")
+    assert live.received == [
+        {"type": "logs", "logs": {"records": [{"message": "kept", "level": 30}]}},
+        {
+            "type": "logs",
+            "logs": {"records": [{"level": 40, "service": "vehicle", "timestamp": 1}]},
+        },
+    ]
+    # Clients that didn't subscribe only get the records they queried
+    assert len(quiet.received) == 1
@@ -0,0 +1,88 @@
+import io
+import os
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from pilot_drive.services.media.cover_art import BipClient, CoverArt, CoverArtCache
+
+
+class FakeObexResponder:
+    """
+    Stands in for obexd and the cover art (BIP) server of a phone, on the session bus
+    """
+
+    def __init__(self, images):
+        self.images = images
+        self.sessions = []
+        self.Status = "complete"
+
+    def get_proxy(self, name, path):
+        return self
+
+    def CreateSession(self, destination, args):
+        self.sessions.append(destination)
+        return f"/org/bluez/obex/client/session{len(self.sessions)}"
+
+    def Get(self, targetfile, handle, description):
+        with open(targetfile, "wb") as file:
+            file.write(self.images[handle])
+        return f"/org/bluez/obex/client/session{len(self.sessions)}/transfer0", {}
+
+
+def test_cache_evicts_the_least_recently_used_covers(tmp_path):
+    cache = CoverArtCache(directory=str(tmp_path), max_total_size=25)
+    first = cache.store(image=b"1" * 10)
+    second = cache.store(image=b"2" * 10)
+    assert cache.store(image=b"1" * 10) == first
+
+    assert cache.get(digest=first)
+    third = cache.store(image=b"3" * 10)
+    assert not cache.get(digest=second)
+    assert not os.path.exists(cache.path(digest=second))
+    assert cache.get(digest=first) and cache.get(digest=third)
+
+    # The covers on disk are kept across restarts
+    assert CoverArtCache(directory=str(tmp_path), max_total_size=25).total_size == 20
+
+
+def test_bip_sessions_are_kept_per_phone():
+    responder = FakeObexResponder(images={"1000001": b"cover", "1000002": b"next"})
+    client = BipClient(bus=responder)
+
+    assert client.fetch(address="AA:BB:CC:DD:EE:FF", psm=4101, handle="1000001") == b"cover"
+    assert client.fetch(address="AA:BB:CC:DD:EE:FF", psm=4101, handle="1000002") == b"next"
+    assert responder.sessions == ["AA:BB:CC:DD:EE:FF"]
+
+
+def test_covers_are_resized_once_and_served_by_digest(tmp_path):
+    image_module = pytest.importorskip("PIL.Image")
+    native = io.BytesIO()
+    image_module.new("RGB", (1200, 1000), "red").save(native, format="PNG")
+    responder = FakeObexResponder(images={"1000001": native.getvalue()})
+
+    cover_art = CoverArt(
+        logger=MagicMock(),
+        directory=str(tmp_path),
+        max_total_size=1048576,
+        resolution=[480, 480],
+        bus=responder,
+    )
+    track = ("Song", "Band", "Record")
+    assert cover_art.url(track=track) is None
+
+    fetched = threading.Event()
+    cover_art.request(
+        track=track,
+        address="AA:BB:CC:DD:EE:FF",
+        psm=4101,
+        handle="1000001",
+        callback=fetched.set,
+    )
+    assert fetched.wait(timeout=5)
+
+    url = cover_art.url(track=track)
+    assert url.startswith("/covers/") and url.endswith(".jpg")
+    with image_module.open(tmp_path / url.split("/")[-1]) as cover:
+        assert cover.size == (480, 400)
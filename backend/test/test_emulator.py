@@ -0,0 +1,47 @@
+import os
+import time
+
+from pilot_drive.emulator import Elm327Emulator
+
+
+def request(port: str, command: bytes) -> str:
+    fd = os.open(port, os.O_RDWR | os.O_NOCTTY)
+    try:
+        os.write(fd, command + b"\r")
+        response = b""
+        while not response.endswith(b">"):
+            response += os.read(fd, 1024)
+    finally:
+        os.close(fd)
+    return response.decode()
+
+
+def test_multi_pid_response_is_split_into_frames():
+    emulator = Elm327Emulator(pids={0x0C: bytes([0x1A, 0xF8]), 0x0D: bytes([50])})
+    try:
+        assert request(emulator.port, b"ATZ") == "ELM327 v1.5\r\r>"
+        assert request(emulator.port, b"010D") == "7E8 03 41 0D 32\r\r>"
+        # 0x0C and 0x0D are the 12th and 13th supported PIDs
+        assert request(emulator.port, b"0100") == "7E8 06 41 00 00 18 00 00\r\r>"
+        assert request(emulator.port, b"0100 0C 0D") == (
+            "7E8 10 0B 41 00 00 18 00 00\r7E8 21 0C 1A F8 0D 32\r\r>"
+        )
+        assert request(emulator.port, b"0110") == "NO DATA\r\r>"
+    finally:
+        emulator.close()
+
+
+def test_latency_and_errors():
+    emulator = Elm327Emulator(
+        pids={0x0D: lambda elapsed: bytes([50])}, latency=0.05, error_rate=1
+    )
+    try:
+        start = time.monotonic()
+        assert request(emulator.port, b"010D") == "NO DATA\r\r>"
+        assert time.monotonic() - start >= 0.05
+        # AT commands are always answered
+        assert request(emulator.port, b"ATRV") == "12.6V\r\r>"
+    finally:
+        emulator.close()
+
+    assert (emulator.requests, emulator.errors) == (1, 1)
@@ -0,0 +1,105 @@
+import gzip
+import logging
+import os
+import time
+
+from pilot_drive.master_logging.constants import LogCompressions
+from pilot_drive.master_logging.storage import RotatingLogStorage
+
+
+def _storage(path: str, **settings) -> RotatingLogStorage:
+    return RotatingLogStorage(
+        path=path,
+        **{
+            "max_file_size": 1024,
+            "rotate_interval": 3600,
+            "max_total_size": 1 << 20,
+            "compression": LogCompressions.GZIP,
+            "flush_interval": 60,
+            "flush_level": logging.ERROR,
+            **settings,
+        },
+    )
+
+
+def _record(msg: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, msg, None, None)
+
+
+def _wait_for_compression(path: str, timeout: float = 5) -> list:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        segments = [name for name in os.listdir(path) if name != "pilot-drive.log"]
+        if segments and all(name.endswith(".gz") for name in segments):
+            return segments
+        time.sleep(0.01)
+    raise AssertionError("segments were not compressed")
+
+
+def test_records_are_buffered_until_flushed(tmp_path):
+    path = str(tmp_path / "pilot-drive.log")
+    storage = _storage(path)
+
+    storage.emit(_record("buffered"))
+    assert os.path.getsize(path) == 0
+
+    # Records at the flush level are written right away, with everything before them
+    storage.emit(_record("failed", level=logging.ERROR))
+    with open(path, encoding="utf-8") as log_file:
+        assert log_file.read() == "buffered\nfailed\n"
+    storage.close()
+
+
+def test_rotated_segments_are_compressed(tmp_path):
+    path = str(tmp_path / "pilot-drive.log")
+    storage = _storage(path, max_file_size=100)
+
+    for num in range(3):
+        storage.emit(_record(f"{num}" * 80))
+        storage.flush()
+    storage.close()
+
+    contents = set()
+    for name in _wait_for_compression(str(tmp_path)):
+        with gzip.open(tmp_path / name, "rt", encoding="utf-8") as segment:
+            contents.add(segment.read())
+    assert contents == {f"{'0' * 80}\n", f"{'1' * 80}\n"}
+    with open(path, encoding="utf-8") as log_file:
+        assert log_file.read() == f"{'2' * 80}\n"
+
+
+def test_oldest_segments_are_removed_over_budget(tmp_path):
+    path = str(tmp_path / "pilot-drive.log")
+    # Left uncompressed by a previous run, older than anything rotated now
+    for num in range(3):
+        stale = tmp_path / f"pilot-drive.log.2020010{num}-000000"
+        stale.write_bytes(os.urandom(2048))
+        os.utime(stale, (num, num))
+    (tmp_path / "pilot-drive.log.20200103-000000.gz.tmp").write_bytes(b"partial")
+
+    storage = _storage(path, max_total_size=4096)
+    segments = _wait_for_compression(str(tmp_path))
+    storage.close()
+
+    # Random bytes don't compress, only the newest segment fits the budget
+    assert segments == ["pilot-drive.log.20200102-000000.gz"]
+
+
+def test_log_file_of_a_previous_run_is_aged_from_its_last_write(tmp_path):
+    path = str(tmp_path / "pilot-drive.log")
+    with open(path, "w", encoding="utf-8") as log_file:
+        log_file.write("previous run\n")
+    written = time.time() - 7200
+    os.utime(path, (written, written))
+
+    storage = _storage(path)
+    storage.emit(_record("new run"))
+    storage.flush()
+    storage.close()
+
+    # Rotated on the first write, as it's older than the interval
+    (segment,) = _wait_for_compression(str(tmp_path))
+    with gzip.open(tmp_path / segment, "rt", encoding="utf-8") as rotated:
+        assert rotated.read() == "previous run\n"
+    with open(path, encoding="utf-8") as log_file:
+        assert log_file.read() == "new run\n"
@@ -0,0 +1,90 @@
+import logging
+import os
+from multiprocessing import Process
+
+from pilot_drive.constants import absolute_path
+from pilot_drive.master_logging import MasterLogger
+from pilot_drive.master_logging.constants import CORE_SERVICE
+from pilot_drive.master_logging.master_logger import resolve_origin
+from pilot_drive.master_logging.records import LogQuery, resolve_service
+
+
+def _log_burst(master_logger: MasterLogger, count: int):
+    for num in range(count):
+        master_logger.debug(msg=f"burst {num}")
+        master_logger.info(msg=f"burst {num}")
+
+
+def test_burst_is_flushed_on_stop(caplog):
+    master_logger = MasterLogger(log_settings={"logLevel": 20, "logToFile": False})
+    master_logger.start()
+
+    with caplog.at_level(logging.INFO):
+        producer = Process(target=_log_burst, args=(master_logger, 500))
+        producer.start()
+        producer.join()
+        master_logger.stop()
+
+    # Debug events are filtered out in the producer, every info event is output in order
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 500
+    assert messages[-1].endswith("burst 499")
+    assert all(record.levelno == logging.INFO for record in caplog.records)
+
+
+def test_level_filter_before_queue(caplog):
+    master_logger = MasterLogger(log_settings={"logLevel": 30, "logToFile": False})
+
+    master_logger.info(msg="filtered")
+    master_logger.warning(msg="kept")
+    master_logger.stop()
+
+    # Without a listener thread, main() drains the queue until the stop event
+    with caplog.at_level(logging.INFO):
+        master_logger.main()
+
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().endswith("test_master_logger: kept")
+    assert master_logger.is_enabled_for(logging.INFO) is False
+    assert master_logger.is_enabled_for(logging.ERROR) is True
+
+
+def test_resolve_origin():
+    resolve_origin.cache_clear()
+    filename = f"{absolute_path}/services/vehicle/vehicle.py"
+
+    assert resolve_origin(filename=filename) == ".services.vehicle.vehicle"
+    assert resolve_origin(filename=filename) == ".services.vehicle.vehicle"
+    assert resolve_origin.cache_info().hits == 1
+
+
+def test_records_kept_for_queries():
+    master_logger = MasterLogger(
+        log_settings={"logLevel": 20, "logToFile": False, "recordBufferSize": 3}
+    )
+    published = []
+    master_logger.subscribe(callback=published.extend)
+
+    master_logger.info(msg="connected", port="/dev/ttyUSB0")
+    for num in range(3):
+        master_logger.warning(msg=f"slow {num}")
+    master_logger.stop()
+    master_logger.main()
+
+    # The ring only keeps the newest records, every record is published
+    assert len(published) == 4
+    assert published[0]["fields"] == {"port": "/dev/ttyUSB0"}
+    assert published[0]["pid"] == os.getpid()
+    records = master_logger.query_records(query=LogQuery())
+    assert [record["message"] for record in records] == ["slow 0", "slow 1", "slow 2"]
+    assert records[0]["levelName"] == "WARNING"
+    assert records[0]["service"] == CORE_SERVICE
+
+    query = LogQuery(level=logging.WARNING, since=records[1]["timestamp"], limit=1)
+    assert master_logger.query_records(query=query) == records[2:]
+    assert master_logger.query_records(query=LogQuery(service="vehicle")) == []
+
+
+def test_resolve_service():
+    assert resolve_service(origin=".services.vehicle.vehicle") == "vehicle"
+    assert resolve_service(origin=".master_queue.broadcaster") == CORE_SERVICE
@@ -0,0 +1,168 @@
+import json
+from multiprocessing import Process
+from unittest.mock import MagicMock
+
+import pytest
+
+from pilot_drive.master_queue import MasterEventQueue, EventType, QueueBackends
+from pilot_drive.master_queue.codecs import EncodedEvent, JsonCodec
+from pilot_drive.master_queue.exceptions import QueueFullException
+from pilot_drive.master_queue.shared_memory_ring import SharedMemoryRingBackend
+
+
+@pytest.fixture
+def ring():
+    ring_backend = SharedMemoryRingBackend(capacity=256)
+    yield ring_backend
+    ring_backend.close()
+
+
+def test_ring_round_trip(ring: SharedMemoryRingBackend):
+    assert ring.empty is True
+    assert ring.get() is None
+
+    ring.put({"type": "vehicle", "vehicle": {"stats": []}})
+    ring.put({"type": "media", "media": None})
+
+    assert ring.empty is False
+    assert ring.get() == {"type": "vehicle", "vehicle": {"stats": []}}
+    assert ring.get() == {"type": "media", "media": None}
+    assert ring.empty is True
+
+
+def test_ring_wraps_around(ring: SharedMemoryRingBackend):
+    # Each record is ~50 bytes, so a 256 byte ring wraps many times over
+    for count in range(100):
+        ring.put_bytes(json.dumps({"count": count}).encode())
+        assert json.loads(ring.get_bytes()) == {"count": count}
+
+    assert ring.gaps == 0
+
+
+def test_ring_full(ring: SharedMemoryRingBackend):
+    payload = b"x" * 100
+    ring.put_bytes(payload)
+    ring.put_bytes(payload)
+
+    with pytest.raises(QueueFullException):
+        ring.put_bytes(payload)
+
+    assert ring.dropped == 1
+    assert ring.get_bytes() == payload
+
+    # Freeing a record makes room again
+    ring.put_bytes(payload)
+    assert ring.get_bytes() == payload
+    assert ring.get_bytes() == payload
+    assert ring.get_bytes() is None
+
+
+def test_ring_oversized_event(ring: SharedMemoryRingBackend):
+    with pytest.raises(QueueFullException):
+        ring.put_bytes(b"x" * 512)
+
+    assert ring.dropped == 0
+
+
+def _produce(ring: SharedMemoryRingBackend, producer: int, count: int):
+    for index in range(count):
+        while True:
+            try:
+                ring.put({"producer": producer, "index": index})
+                break
+            except QueueFullException:
+                continue
+
+
+def test_ring_multiple_producers():
+    ring = SharedMemoryRingBackend(capacity=4096)
+    producers = [Process(target=_produce, args=(ring, num, 200)) for num in range(4)]
+    for producer in producers:
+        producer.start()
+
+    received = {num: [] for num in range(4)}
+    while sum(len(indexes) for indexes in received.values()) < 800:
+        event = ring.get()
+        if event is not None:
+            received[event["producer"]].append(event["index"])
+
+    for producer in producers:
+        producer.join()
+
+    # Every event arrives exactly once, and in order per producer
+    for indexes in received.values():
+        assert indexes == list(range(200))
+    assert ring.gaps == 0
+    ring.close()
+
+
+@pytest.mark.parametrize("backend", list(QueueBackends))
+def test_master_queue_backends(backend: QueueBackends):
+    master_queue = MasterEventQueue(logging=MagicMock(), backend=backend)
+
+    assert master_queue.is_new_event is False
+    master_queue.push_event(event_type=EventType.SETTINGS, event={"tfHourTime": True})
+    assert master_queue.is_new_event is True
+
+    assert master_queue.get() == {"type": "settings", "settings": {"tfHourTime": True}}
+    assert master_queue.is_new_event is False
+    assert master_queue.get() is None
+    master_queue.close()
+
+
+@pytest.mark.parametrize("backend", list(QueueBackends))
+def test_master_queue_coalescing(backend: QueueBackends):
+    master_queue = MasterEventQueue(logging=MagicMock(), backend=backend, coalesce=True)
+
+    for count in range(5):
+        master_queue.push_event(event_type=EventType.VEHICLE, event={"count": count})
+        master_queue.push_event(
+            event_type=EventType.UPDATER, event={"count": count}, key="ignored"
+        )
+    master_queue.push_event(event_type=EventType.MEDIA, event={"song": 1}, key="a")
+    master_queue.push_event(event_type=EventType.MEDIA, event={"song": 2}, key="b")
+    master_queue.push_event(event_type=EventType.MEDIA, event={"song": 3}, key="a")
+
+    events = master_queue.drain()
+
+    # Discrete events are all delivered, snapshots only the newest per type and key
+    assert [event["updater"]["count"] for event in events if "updater" in event] == [
+        0,
+        1,
+        2,
+        3,
+        4,
+    ]
+    assert [event["vehicle"] for event in events if "vehicle" in event] == [
+        {"count": 4}
+    ]
+    assert [event["media"] for event in events if "media" in event] == [
+        {"song": 2},
+        {"song": 3},
+    ]
+    # The sub-keys are kept for the broadcaster
+    assert [event.get("coalesceKey") for event in events if "media" in event] == [
+        "b",
+        "a",
+    ]
+    assert master_queue.coalesced == {"vehicle": 4, "media": 1}
+    master_queue.close()
+
+
+def test_shared_memory_events_are_encoded_once():
+    master_queue = MasterEventQueue(
+        logging=MagicMock(), backend=QueueBackends.SHARED_MEMORY, coalesce=True
+    )
+    event = {"song": {"title": "Song"}}
+    master_queue.push_event(event_type=EventType.MEDIA, event=event, key="player")
+
+    (drained,) = master_queue.drain()
+
+    # The JSON clients are sent the JSON the event was read from the ring as
+    assert isinstance(drained, EncodedEvent)
+    # The sub-key isn't part of the JSON, the broadcaster removes it
+    assert drained.pop("coalesceKey") == "player"
+    assert drained == {"type": "media", "media": event}
+    assert JsonCodec().encode(drained) is drained.encoded
+    assert json.loads(drained.encoded) == drained
+    master_queue.close()
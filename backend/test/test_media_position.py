@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock
+
+from pilot_drive.master_queue.state_sync import StateSync
+from pilot_drive.services.media.abstract_media_source import (
+    BaseMediaSource,
+    extrapolate,
+)
+
+
+class FakeSource(BaseMediaSource):
+    def __init__(self, push_to_queue_callback, clock):
+        super().__init__(push_to_queue_callback, MagicMock(), clock=clock)
+        self.track = {"Title": "Song", "Artist": None, "Album": None, "Duration": 60000}
+        self.position = 0
+        self.playing = True
+
+    track = None
+    position = None
+    playing = None
+
+    def main(self):
+        pass
+
+
+def test_the_anchor_is_only_resynced_when_the_position_drifts():
+    now = [100.0]
+    events = []
+    source = FakeSource(push_to_queue_callback=events.append, clock=lambda: now[0])
+
+    source.push_media_to_queue()
+    anchor = {"position": 0, "timestamp": 100000, "playing": True, "rate": 1.0}
+    assert {key: events[-1][key] for key in anchor} == anchor
+
+    # Sporadic position updates the anchor already predicts don't change the event
+    now[0], source.position = 110.0, 10500
+    source.push_media_to_queue()
+    assert events[-1] == events[0]
+
+    # A seek drifts past the threshold
+    source.position = 30000
+    source.push_media_to_queue()
+    assert events[-1]["position"] == 30000
+    assert events[-1]["timestamp"] == 110000
+
+    # A pause resyncs right away, the position then holds still
+    now[0], source.position, source.playing = 111.0, 31000, False
+    source.push_media_to_queue()
+    assert events[-1]["playing"] is False
+    now[0] = 200.0
+    source.push_media_to_queue()
+    assert events[-1]["timestamp"] == 111000
+
+    # So does a new track
+    source.track = {**source.track, "Title": "Next Song"}
+    source.push_media_to_queue()
+    assert events[-1]["timestamp"] == 200000
+
+
+def test_a_replayed_anchor_is_extrapolated_from_when_it_was_read():
+    now = [1000.0]
+    events = []
+    source = FakeSource(push_to_queue_callback=events.append, clock=lambda: now[0])
+    source.position = 5000
+    source.push_media_to_queue()
+
+    # The snapshot a client syncing 30 seconds later is sent
+    state_sync = StateSync()
+    state_sync.update(event={"type": "media", "media": {"song": events[-1]}})
+    now[0] = 1030.0
+    song = state_sync.snapshot(topic="media")["media"]["song"]
+
+    assert extrapolate(anchor=song, timestamp=int(now[0] * 1000)) == 35000
+    # The anchor still predicts the position, so the backend doesn't resync it
+    source.position = 35000
+    source.push_media_to_queue()
+    assert events[-1] == song
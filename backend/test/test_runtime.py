@@ -0,0 +1,145 @@
+import asyncio
+import sys
+import threading
+import time
+from multiprocessing import Event
+from unittest.mock import MagicMock
+
+from pilot_drive.runtime import (
+    ProcessServiceRunner,
+    RestartPolicies,
+    RuntimeModes,
+    ServiceStates,
+    ServiceSupervisor,
+    TaskServiceRunner,
+)
+from pilot_drive.runtime.threads import run_in_daemon_thread
+
+
+class FakeService:
+    """
+    A service with a blocking main(), run in a thread like AbstractService.run()
+    """
+
+    def __init__(
+        self, service_type: str, fail: bool = False, exit_code: int = None
+    ) -> None:
+        self.service_type = service_type
+        self.fail = fail
+        self.exit_code = exit_code
+        self.restart_policy = RestartPolicies.ON_FAILURE
+        self.thread = None
+        self.started = Event()
+
+    def main(self) -> None:
+        self.thread = threading.current_thread()
+        self.started.set()
+        if self.fail:
+            raise RuntimeError("Serial port went away")
+        if self.exit_code is not None:
+            sys.exit(self.exit_code)
+        time.sleep(0.05)
+
+    async def run(self) -> None:
+        await run_in_daemon_thread(func=self.main, name=self.service_type)
+
+    def stop(self) -> None:
+        pass
+
+
+async def wait_for(condition, timeout: float = 5) -> None:
+    """
+    Keep the event loop running until the condition is met
+    """
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.001)
+    assert condition()
+
+
+def test_task_runner_runs_services_in_threads():
+    logger = MagicMock()
+    exits = []
+    runner = TaskServiceRunner(
+        logger=logger, on_exit=lambda *exited: exits.append(exited)
+    )
+    services = [FakeService("vehicle"), FakeService("phone", fail=True)]
+    for service in services:
+        runner.start(service=service)
+
+    async def run():
+        await runner.run()
+        await wait_for(lambda: len(exits) == 2)
+
+    asyncio.run(run())
+
+    assert all(service.thread.daemon for service in services)
+    assert services[0].thread.name == "vehicle"
+    # A failing service is logged and reported, without stopping the others
+    logger.error.assert_called_once_with(
+        msg="The phone service failed: Serial port went away"
+    )
+    assert (services[1], "raised RuntimeError: Serial port went away", True) in exits
+    assert (services[0], "exited", False) in exits
+
+
+def test_process_runner_reports_exits():
+    exits = []
+    runner = ProcessServiceRunner(
+        logger=MagicMock(), on_exit=lambda *exited: exits.append(exited[1:])
+    )
+    runner.start(service=FakeService("settings"))
+    runner.start(service=FakeService("vehicle", exit_code=3))
+
+    async def run():
+        await runner.run()
+        await wait_for(lambda: len(exits) == 2)
+
+    asyncio.run(run())
+    runner.terminate()
+
+    assert sorted(exits) == [("exited", False), ("exited with code 3", True)]
+
+
+def test_supervisor_restarts_until_crash_loop():
+    master_queue = MagicMock()
+    supervisor = ServiceSupervisor(
+        mode=RuntimeModes.TASK,
+        master_queue=master_queue,
+        logger=MagicMock(),
+        runtime_settings={
+            "restartBackoff": 0.01,
+            "maxRestartBackoff": 0.02,
+            "crashLoopRestarts": 3,
+            "crashLoopWindow": 60,
+        },
+    )
+    crashing, stopping = FakeService("phone", fail=True), FakeService("settings")
+    supervisor.start(service=crashing)
+    supervisor.start(service=stopping)
+
+    async def run():
+        await supervisor.run()
+        await wait_for(
+            lambda: supervisor.health["phone"].state == ServiceStates.CRASH_LOOP
+        )
+        supervisor.terminate()
+
+    asyncio.run(run())
+
+    phone, settings = supervisor.health["phone"], supervisor.health["settings"]
+    assert phone.restarts == 3
+    assert phone.last_exit == "raised RuntimeError: Serial port went away"
+    # A clean exit isn't restarted with the on-failure policy
+    assert settings.state == ServiceStates.STOPPED
+    assert settings.restarts == 0
+
+    event = master_queue.push_event.call_args.kwargs["event"]
+    assert event["services"][0] == {
+        "name": "phone",
+        "state": "crash-loop",
+        "startedAt": None,
+        "uptime": 0,
+        "restarts": 3,
+        "lastExit": "raised RuntimeError: Serial port went away",
+    }
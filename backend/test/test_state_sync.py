@@ -0,0 +1,136 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from pilot_drive.master_queue import MasterEventQueue, EventType
+from pilot_drive.master_queue.broadcaster import EventBroadcaster
+from pilot_drive.master_queue.constants import SlowConsumerPolicies
+from pilot_drive.master_queue.state_sync import StateSync, apply_patch, diff
+
+from .test_broadcaster import FakeClient
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        ({"a": 1, "b": [1, 2]}, {"a": 2, "b": [1, 3]}),
+        ({"a": 1, "b": {"c": True}}, {"b": {"c": 1}, "d": None}),
+        ({"notifications": [1, 2]}, {"notifications": [0, 1, 2]}),
+        ({"a/b": {"~": 1}}, {"a/b": {"~": 2}}),
+        (None, {"connected": False}),
+    ],
+)
+def test_diff_round_trip(old, new):
+    assert apply_patch(document=old, operations=diff(old=old, new=new)) == new
+
+
+def test_diff_only_changed_values():
+    old = {"stats": [{"name": "speed", "value": 10}, {"name": "rpm", "value": 900}]}
+    new = {"stats": [{"name": "speed", "value": 12}, {"name": "rpm", "value": 900}]}
+
+    assert diff(old=old, new=new) == [
+        {"op": "replace", "path": "/stats/0/value", "value": 12}
+    ]
+    assert diff(old=new, new=new) == []
+
+
+def test_state_sync_sequence():
+    state_sync = StateSync()
+
+    snapshot = state_sync.update(event={"type": "vehicle", "vehicle": {"speed": 1}})
+    assert snapshot == {"type": "vehicle", "vehicle": {"speed": 1}, "seq": 0}
+
+    patch = state_sync.update(event={"type": "vehicle", "vehicle": {"speed": 2}})
+    assert patch["patch"] == {
+        "topic": "vehicle",
+        "seq": 1,
+        "ops": [{"op": "replace", "path": "/speed", "value": 2}],
+    }
+
+    # Unchanged state isn't sent, discrete events pass through
+    assert state_sync.update(event={"type": "vehicle", "vehicle": {"speed": 2}}) is None
+    updater = {"type": "updater", "updater": {"error": "failed"}}
+    assert state_sync.update(event=updater) == updater
+    assert state_sync.snapshot(topic="vehicle")["seq"] == 1
+
+
+def test_state_sync_keys():
+    state_sync = StateSync()
+
+    info = state_sync.update(
+        event={"type": "vehicle", "vehicle": {"speed": 1}}, key="info"
+    )
+    history = state_sync.update(
+        event={"type": "vehicle", "vehicle": {"rows": []}}, key="history"
+    )
+    assert info == {
+        "type": "vehicle",
+        "vehicle": {"speed": 1},
+        "seq": 0,
+        "coalesceKey": "info",
+    }
+    assert history["seq"] == 0
+
+    # Each sub-key is diffed against its own state
+    patch = state_sync.update(
+        event={"type": "vehicle", "vehicle": {"speed": 2}}, key="info"
+    )
+    assert patch["patch"] == {
+        "topic": "vehicle",
+        "coalesceKey": "info",
+        "seq": 1,
+        "ops": [{"op": "replace", "path": "/speed", "value": 2}],
+    }
+    assert state_sync.topics == ["vehicle"]
+    assert [
+        snapshot["vehicle"] for snapshot in state_sync.snapshots(topic="vehicle")
+    ] == [
+        {"speed": 2},
+        {"rows": []},
+    ]
+
+
+def test_sync_clients_get_patches():
+    async def run():
+        master_queue = MasterEventQueue(logging=MagicMock())
+        broadcaster = EventBroadcaster(
+            master_queue=master_queue,
+            logging=MagicMock(),
+            outbox_size=256,
+            policy=SlowConsumerPolicies.DROP_OLDEST,
+        )
+        legacy, synced = FakeClient(), FakeClient()
+        tasks = [
+            asyncio.create_task(broadcaster.register(websocket=client).run())
+            for client in (legacy, synced)
+        ]
+
+        broadcaster.broadcast(event={"type": "phone", "phone": {"state": 1}})
+        missing = broadcaster.sync_request(
+            websocket=synced, request={"enable": True, "snapshot": ["phone", "media"]}
+        )
+        broadcaster.broadcast(event={"type": "phone", "phone": {"state": 2}})
+        broadcaster.broadcast(event={"type": "phone", "phone": {"state": 2}})
+        await asyncio.sleep(0.01)
+
+        for task in tasks:
+            task.cancel()
+        master_queue.close()
+        return legacy, synced, missing
+
+    legacy, synced, missing = asyncio.run(run())
+
+    assert missing == ["media"]
+    assert [event["phone"]["state"] for event in legacy.received] == [1, 2, 2]
+    assert synced.received[1:] == [
+        {"type": "phone", "phone": {"state": 1}, "seq": 0},
+        {
+            "type": "patch",
+            "patch": {
+                "topic": "phone",
+                "seq": 1,
+                "ops": [{"op": "replace", "path": "/state", "value": 2}],
+            },
+        },
+    ]
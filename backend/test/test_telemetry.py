@@ -0,0 +1,169 @@
+import os
+
+import numpy
+
+from pilot_drive.telemetry import (
+    HistoryQuery,
+    RollupEngine,
+    TelemetryReader,
+    TelemetryRecorder,
+)
+
+START = 1700000000.0
+
+
+def _recorder(path, **settings) -> TelemetryRecorder:
+    return TelemetryRecorder(
+        path=str(path),
+        **{
+            "max_segment_size": 1 << 20,
+            "max_total_size": 1 << 30,
+            "fsync_interval": 3600,
+            **settings,
+        },
+    )
+
+
+def test_samples_round_trip_within_a_time_range(tmp_path):
+    recorder = _recorder(tmp_path)
+    # Jittered timestamps, repeated, coarse and fine values, and a unit change
+    timestamps = (
+        START + numpy.arange(1000) * 0.5 + numpy.tile([0, 0.003, -0.002], 334)[:1000]
+    )
+    speeds = numpy.repeat([0.0, 50.0, 51.0, 104.5, -1.25], 200)
+    fuel = numpy.linspace(0, 100, 1000) / 255
+    for timestamp, speed, level in zip(timestamps, speeds, fuel):
+        recorder.record(name="Speed", unit="kph", value=speed, timestamp=timestamp)
+        recorder.record(
+            name="Fuel Level", unit="percent", value=level, timestamp=timestamp
+        )
+        if timestamp > START + 250:
+            recorder.record(name="Speed", unit="mph", value=speed, timestamp=timestamp)
+    recorder.flush()
+
+    reader = TelemetryReader(str(tmp_path))
+    assert reader.series() == {"Speed": "mph", "Fuel Level": "percent"}
+
+    fuel_series = reader.read(name="Fuel Level")
+    assert fuel_series.unit == "percent"
+    assert numpy.array_equal(fuel_series.values, fuel)
+    assert numpy.allclose(fuel_series.timestamps, timestamps, atol=0.0005)
+
+    speed_series = reader.read(name="Speed", since=START + 100, until=START + 200)
+    in_range = (timestamps >= START + 100) & (timestamps <= START + 200)
+    assert numpy.array_equal(speed_series.values, speeds[in_range])
+    assert reader.read(name="RPM").values.size == 0
+
+    recorder.close()
+
+
+def test_steady_samples_are_compact(tmp_path):
+    recorder = _recorder(tmp_path)
+    for sample in range(1000):
+        recorder.record(
+            name="Speed", unit="kph", value=50 + sample // 100, timestamp=START + sample
+        )
+    recorder.close()
+
+    # A byte for the timestamp and the unchanged value, a few for the value changes
+    assert os.path.getsize(next(tmp_path.iterdir())) < 1000 * 2 + 100
+
+
+def test_segments_rotate_within_the_disk_budget(tmp_path):
+    recorder = _recorder(
+        tmp_path, max_segment_size=1024, max_total_size=4096, fsync_interval=0
+    )
+    for sample in range(2000):
+        recorder.record(
+            name="RPM",
+            unit="revolutions_per_minute",
+            value=sample,
+            timestamp=START + sample,
+        )
+    recorder.close()
+
+    segments = sorted(tmp_path.iterdir())
+    assert len(segments) > 1
+    assert all(os.path.getsize(segment) <= 1024 for segment in segments)
+    assert sum(os.path.getsize(segment) for segment in segments) <= 4096
+
+    # The newest samples are kept, in order
+    values = TelemetryReader(str(tmp_path)).read(name="RPM").values
+    assert values[-1] == 1999
+    assert numpy.array_equal(values, numpy.arange(2000 - len(values), 2000))
+
+
+def test_a_torn_chunk_ends_the_segment(tmp_path):
+    recorder = _recorder(tmp_path)
+    for sample in range(10):
+        recorder.record(name="RPM", unit="rpm", value=800, timestamp=START + sample)
+    recorder.flush()
+    for sample in range(10, 20):
+        recorder.record(name="RPM", unit="rpm", value=900, timestamp=START + sample)
+    recorder.close()
+
+    # Cut the last chunk short, like a power loss mid write
+    segment = next(tmp_path.iterdir())
+    os.truncate(segment, os.path.getsize(segment) - 3)
+
+    series = TelemetryReader(str(tmp_path)).read(name="RPM")
+    assert numpy.array_equal(series.timestamps, START + numpy.arange(10))
+    assert set(series.values) == {800}
+
+
+def test_backfilled_rollups_match_incremental_ones():
+    timestamps = START + numpy.arange(0, 1200, 0.5)
+    values = numpy.sin(numpy.arange(timestamps.size) / 10) * 1000 + 2000
+    incremental, backfilled = RollupEngine(), RollupEngine()
+    for timestamp, value in zip(timestamps, values):
+        incremental.add(name="RPM", unit="rpm", value=value, timestamp=timestamp)
+    # Split in two, so the second half is merged into the newest buckets
+    backfilled.backfill(
+        name="RPM", unit="rpm", timestamps=timestamps[:301], values=values[:301]
+    )
+    backfilled.backfill(
+        name="RPM", unit="rpm", timestamps=timestamps[301:], values=values[301:]
+    )
+
+    query = HistoryQuery(name="RPM", since=START, until=START + 1200, points=100)
+    history, bulk = incremental.query(query=query), backfilled.query(query=query)
+    # Only the order the sums were added in differs
+    means = history.pop("mean")
+    assert numpy.allclose(means, bulk.pop("mean"))
+    assert history == bulk
+
+    # The 10 second buckets give enough points, and are merged down to the point budget
+    assert history["resolution"] == 10
+    assert len(history["timestamps"]) == 100
+    assert sum(history["count"]) == timestamps.size
+    assert min(history["min"]) == values.min()
+    assert max(history["max"]) == values.max()
+    assert numpy.isclose(numpy.dot(means, history["count"]), values.sum())
+
+
+def test_history_falls_back_to_coarser_resolutions():
+    rollups = RollupEngine(resolutions=(1, 10, 60), capacity=100)
+    timestamps = START + numpy.arange(3000)
+    rollups.backfill(
+        name="Speed",
+        unit="kph",
+        timestamps=timestamps,
+        values=numpy.full(timestamps.size, 50.0),
+    )
+
+    # The 1 second buckets only hold the last 100 seconds
+    recent = rollups.query(
+        query=HistoryQuery(name="Speed", since=START + 2950, until=START + 3000)
+    )
+    assert recent["resolution"] == 1
+    assert recent["count"] == [1] * 50
+    older = rollups.query(
+        query=HistoryQuery(
+            name="Speed", since=START + 1000, until=START + 3000, points=1000
+        )
+    )
+    assert older["resolution"] == 60
+    assert older["timestamps"][0] <= START + 1000
+    assert set(older["mean"]) == {50}
+
+    assert rollups.query(query=HistoryQuery(name="RPM", since=START))["unit"] is None
@@ -0,0 +1,121 @@
+import json
+
+import obd
+import pytest
+
+from pilot_drive.emulator import Elm327Emulator
+from pilot_drive.services.vehicle.connection import ObdConnector, detect_baudrate
+from pilot_drive.services.vehicle.constants import (
+    BAUDRATES,
+    MAX_CACHED_ATTEMPTS,
+    RECONNECT_BASE_DELAY,
+    RECONNECT_JITTER,
+    RECONNECT_MAX_DELAY,
+)
+
+
+@pytest.fixture
+def elm327():
+    adapter = Elm327Emulator(pids={0x0D: bytes([50])})
+    yield adapter
+    adapter.close()
+
+
+def test_negotiated_settings_are_reused(elm327, tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "obd.json")
+    opened = []
+
+    def spy(port, **negotiated):
+        opened.append(negotiated)
+        return connect(port, **negotiated)
+
+    connect = obd.OBD
+    monkeypatch.setattr(obd, "OBD", spy)
+    states = []
+    connector = ObdConnector(cache_path=cache_path, on_state=states.append)
+
+    connection = connector.connect(port=elm327.port)
+    assert connection.query(obd.commands["SPEED"]).value.magnitude == 50
+    connection.close()
+    connector.lost()
+    connector.connect(port=elm327.port).close()
+    # Restarting the service keeps the cache
+    connector = ObdConnector(cache_path=cache_path, on_state=states.append)
+    connector.connect(port=elm327.port).close()
+
+    assert states == ["connected", "reconnecting", "connected", "connected"]
+    # The baud rate of a pseudo terminal is whichever is probed first, as any works
+    assert opened[0] == {"baudrate": BAUDRATES[0], "protocol": None}
+    assert opened[1] == {"baudrate": BAUDRATES[0], "protocol": "6"}
+    assert opened[2] == opened[1]
+    with open(cache_path, "r", encoding="utf-8") as cache_file:
+        assert json.load(cache_file) == {elm327.port: opened[1]}
+
+    # Stale settings are detected again
+    with open(cache_path, "w", encoding="utf-8") as cache_file:
+        json.dump({elm327.port: {**opened[1], "protocol": "Z"}}, cache_file)
+    connector = ObdConnector(cache_path=cache_path, on_state=states.append)
+    for _ in range(MAX_CACHED_ATTEMPTS):
+        assert connector.connect(port=elm327.port) is None
+    connector.connect(port=elm327.port).close()
+    assert opened[-1] == {"baudrate": BAUDRATES[0], "protocol": None}
+
+
+def test_a_booting_ecu_keeps_the_cached_settings(elm327, tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "obd.json")
+    opened = []
+
+    def spy(port, **negotiated):
+        opened.append(negotiated)
+        return connect(port, **negotiated)
+
+    connect = obd.OBD
+    monkeypatch.setattr(obd, "OBD", spy)
+    connector = ObdConnector(cache_path=cache_path, on_state=print)
+    connector.connect(port=elm327.port).close()
+    cached = opened[-1] = {"baudrate": BAUDRATES[0], "protocol": "6"}
+
+    # The ECU answers without listing its PIDs, ie. during a crank
+    pids, elm327.pids = elm327.pids, {}
+    for _ in range(MAX_CACHED_ATTEMPTS + 2):
+        assert connector.connect(port=elm327.port) is None
+    elm327.pids = pids
+    connector.connect(port=elm327.port).close()
+
+    assert opened[1:] == [cached] * (MAX_CACHED_ATTEMPTS + 3)
+    with open(cache_path, "r", encoding="utf-8") as cache_file:
+        assert json.load(cache_file) == {elm327.port: cached}
+
+
+def test_baudrate_is_detected_before_connecting(elm327, tmp_path, monkeypatch):
+    assert detect_baudrate(port=elm327.port) == BAUDRATES[0]
+
+    # Without an adapter answering the probe, python-OBD detects the baud rate itself
+    opened = []
+    connect = obd.OBD
+    monkeypatch.setattr(
+        obd,
+        "OBD",
+        lambda port, **negotiated: opened.append(negotiated) or connect(port),
+    )
+    missing = str(tmp_path / "missing")
+    assert detect_baudrate(port=missing) is None
+    connector = ObdConnector(cache_path=str(tmp_path / "obd.json"), on_state=print)
+    assert connector.connect(port=missing) is None
+    assert opened == [{"baudrate": None, "protocol": None}]
+
+
+def test_backoff_is_jittered_and_bounded(tmp_path):
+    connector = ObdConnector(
+        cache_path=str(tmp_path / "obd.json"), on_state=print, seed=1
+    )
+    delays = [connector.backoff() for _ in range(100)]
+
+    assert (1 - RECONNECT_JITTER) * RECONNECT_BASE_DELAY <= delays[0]
+    assert delays[0] <= RECONNECT_BASE_DELAY
+    assert delays[1] > delays[0]
+    assert all(
+        (1 - RECONNECT_JITTER) * RECONNECT_MAX_DELAY <= delay <= RECONNECT_MAX_DELAY
+        for delay in delays[10:]
+    )
+    assert len(set(delays[10:])) == 90
@@ -0,0 +1,82 @@
+import json
+import time
+
+import obd
+import pytest
+
+from pilot_drive.emulator import Elm327Emulator
+from pilot_drive.services.vehicle.dtc import DtcMonitor, freeze_frame_commands
+
+STATS = [
+    {"name": "Speed", "command": "SPEED", "interval": 0.5},
+    {"name": "RPM", "command": "RPM", "interval": 0.5},
+    {"name": "Voltage", "command": "ELM_VOLTAGE", "interval": 3},
+]
+
+
+@pytest.fixture
+def connection():
+    adapter = Elm327Emulator(pids={0x0D: bytes([50]), 0x0C: bytes([0x1A, 0xF8])})
+    connection = obd.OBD(adapter.port)
+    yield adapter, connection
+    connection.close()
+    adapter.close()
+
+
+def check(monitor: DtcMonitor, connection: obd.OBD) -> int:
+    freeze_frame = freeze_frame_commands(connection=connection, stats=STATS)
+    return sum(
+        1 for _ in monitor.check(connection=connection, freeze_frame=freeze_frame)
+    )
+
+
+def test_new_codes_are_captured_once(connection, tmp_path):
+    adapter, connection = connection
+    alerts = []
+    monitor = DtcMonitor(path=str(tmp_path), history=10, on_alert=alerts.append)
+    now = time.time()
+    for second in range(20):
+        monitor.observe(
+            name="Speed", unit="kph", value=second, timestamp=now - 19 + second
+        )
+
+    # A step per request, the freeze frame is only queried for new codes
+    assert check(monitor=monitor, connection=connection) == 2
+    adapter.dtcs = ["P0301"]
+    adapter.pending_dtcs = ["P0301", "P0420"]
+    assert check(monitor=monitor, connection=connection) == 5
+
+    assert len(alerts) == 1
+    capture = alerts[0]
+    assert [(dtc["code"], dtc["pending"]) for dtc in capture["codes"]] == [
+        ("P0301", False),
+        ("P0420", True),
+    ]
+    assert capture["freezeFrameCode"] == "P0301"
+    assert [
+        (stat["name"], stat["value"]["quantity"]) for stat in capture["freezeFrame"]
+    ] == [
+        ("Speed", 50),
+        ("RPM", 1726),
+    ]
+    # Only the samples within the history before the codes were read
+    assert [series["values"] for series in capture["telemetry"]] == [
+        list(range(10, 20))
+    ]
+
+    saved = [entry for entry in tmp_path.iterdir() if entry.name != "active.json"]
+    assert [json.loads(entry.read_text()) for entry in saved] == alerts
+
+    # Known codes aren't alerted again, even after a restart
+    check(monitor=monitor, connection=connection)
+    monitor = DtcMonitor(path=str(tmp_path), history=10, on_alert=alerts.append)
+    check(monitor=monitor, connection=connection)
+    assert len(alerts) == 1
+
+    # Until they're cleared
+    adapter.dtcs, adapter.pending_dtcs = [], []
+    check(monitor=monitor, connection=connection)
+    assert monitor.active == []
+    adapter.dtcs = ["P0301"]
+    check(monitor=monitor, connection=connection)
+    assert len(alerts) == 2
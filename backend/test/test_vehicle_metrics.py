@@ -0,0 +1,85 @@
+import pytest
+
+from pilot_drive.services.vehicle.constants import TRIP_TIMEOUT
+from pilot_drive.services.vehicle.exceptions import InvalidMetricException
+from pilot_drive.services.vehicle.metrics import (
+    FuelEconomy,
+    IdlePercent,
+    MetricPipeline,
+    TripDistance,
+    TripFuelEconomy,
+)
+
+METRICS = [
+    {"name": "Fuel Economy", "metric": "fuel_economy", "interval": 1},
+    {"name": "Trip Distance", "metric": "trip_distance", "interval": 5},
+]
+
+
+def test_trip_metrics_integrate_samples():
+    distance, economy, idle = TripDistance(), TripFuelEconomy(), IdlePercent()
+    # A minute at 60 kph burning 10 grams of air a second, then a minute stopped
+    for second in range(121):
+        speed = 60 if second <= 60 else 0
+        samples = (("SPEED", speed, second), ("RPM", 800, second + 0.5))
+        samples += (("MAF", 10, second + 0.5),)
+        for metric in (distance, economy, idle):
+            # Like the pipeline, only the metric's inputs are passed on
+            for command, quantity, timestamp in samples:
+                if command in metric.inputs:
+                    metric.update(
+                        command=command, quantity=quantity, timestamp=timestamp
+                    )
+
+    # The km driven, with the last second decelerating
+    assert distance.value() == pytest.approx(1 + 30 / 3600)
+    # 10 g/s of air over 120s, at 14.7 parts of air per part of a 740 g/l fuel
+    fuel = 10 * 120 / 14.7 / 740
+    assert economy.value() == pytest.approx(distance.value() / fuel)
+    assert idle.value() == pytest.approx(50, abs=1)
+
+    # Samples after a connection drop aren't integrated, a long gap starts a new trip
+    distance.update(command="SPEED", quantity=60, timestamp=200)
+    assert distance.value() == pytest.approx(1 + 30 / 3600)
+    distance.update(command="SPEED", quantity=60, timestamp=200 + TRIP_TIMEOUT + 1)
+    assert distance.value() == 0
+
+
+def test_fuel_economy_needs_both_inputs():
+    economy = FuelEconomy()
+    economy.update(command="SPEED", quantity=100, timestamp=0)
+    assert economy.value() is None
+    economy.update(command="MAF", quantity=14.7 * 740 / 3600 * 5, timestamp=0)
+    # 5 liters an hour at 100 kph
+    assert economy.value() == pytest.approx(20)
+
+
+def test_pipeline_publishes_metrics_at_their_interval():
+    pipeline = MetricPipeline(metrics=METRICS, first_index=4)
+    assert pipeline.inputs == {"MAF", "SPEED"}
+    assert pipeline.input_interval(command="SPEED") == 1
+
+    published = []
+    for second in range(11):
+        for command, quantity in (("MAF", 20), ("SPEED", 36)):
+            published += [
+                (metric.name, metric.index, second, value["unit"])
+                for metric, value in pipeline.update(
+                    command=command, quantity=quantity, timestamp=second
+                )
+            ]
+
+    assert published.count(("Trip Distance", 5, 0, "kilometer")) == 1
+    assert [entry[2] for entry in published if entry[0] == "Trip Distance"] == [
+        0,
+        5,
+        10,
+    ]
+    assert [entry[2] for entry in published if entry[0] == "Fuel Economy"] == list(
+        range(11)
+    )
+
+    with pytest.raises(InvalidMetricException):
+        MetricPipeline(
+            metrics=[{"name": "MPG", "metric": "mpg", "interval": 1}], first_index=0
+        )
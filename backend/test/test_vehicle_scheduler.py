@@ -0,0 +1,116 @@
+from unittest.mock import MagicMock
+
+import obd
+import pytest
+from obd.protocols import ECU
+from obd.protocols.protocol import Message
+
+from pilot_drive.services.vehicle.exceptions import InvalidQueryException
+from pilot_drive.services.vehicle.scheduler import PollScheduler, query_multi_pid
+
+STATS = [
+    {"name": "Speed", "command": "SPEED", "interval": 0.5},
+    {"name": "RPM", "command": "RPM", "interval": 0.5},
+    {"name": "Fuel Level", "command": "FUEL_LEVEL", "interval": 10},
+    {"name": "Voltage", "command": "ELM_VOLTAGE", "interval": 3},
+]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_due_stats_are_merged_by_deadline():
+    clock = FakeClock()
+    scheduler = PollScheduler(stats=STATS, clock=clock)
+
+    # Mode 01 stats are merged, the AT command is queried on its own
+    request = scheduler.next_request(multi_pid=True)
+    assert [stat.name for stat in request] == ["Speed", "RPM", "Fuel Level"]
+    scheduler.complete(request=request)
+    assert [stat.name for stat in scheduler.next_request(multi_pid=True)] == ["Voltage"]
+    assert scheduler.next_request(multi_pid=True) == []
+    assert scheduler.time_until_due() == 0.5
+
+    # Without multi-PID support, every stat is its own request
+    clock.now += 0.5
+    assert len(scheduler.next_request(multi_pid=False)) == 1
+
+
+def test_late_stats_back_off_and_recover():
+    clock = FakeClock()
+    scheduler = PollScheduler(stats=STATS[:1], clock=clock)
+
+    for _ in range(3):
+        clock.now += scheduler.time_until_due() + 1
+        scheduler.complete(request=scheduler.next_request(multi_pid=True))
+    assert scheduler.rates()[0]["interval"] == pytest.approx(0.5 * 1.5**3, abs=0.01)
+
+    for _ in range(20):
+        clock.now += scheduler.time_until_due()
+        scheduler.complete(request=scheduler.next_request(multi_pid=True))
+    rate = scheduler.rates()[0]
+    assert rate["interval"] == 0.5
+    assert rate["configured"] == 2
+    assert 0 < rate["achieved"] <= 2
+
+
+def test_invalid_command():
+    with pytest.raises(InvalidQueryException):
+        PollScheduler(stats=[{"name": "Warp", "command": "WARP", "interval": 1}])
+
+
+def test_multi_pid_response_is_split():
+    message = Message([])
+    message.ecu = ECU.ENGINE
+    message.data = bytearray([0x41, 0x0C, 0x1A, 0xF8, 0x0D, 0x32])
+    connection = MagicMock()
+    connection.interface.send_and_parse.return_value = [message]
+
+    responses = query_multi_pid(
+        connection=connection, commands=[obd.commands.RPM, obd.commands.SPEED]
+    )
+
+    connection.interface.send_and_parse.assert_called_once_with(b"010C0D")
+    assert responses[obd.commands.RPM].value.magnitude == 1726
+    assert responses[obd.commands.SPEED].value.magnitude == 50
+
+
+def test_background_jobs_only_run_in_the_gaps():
+    clock = FakeClock()
+    scheduler = PollScheduler(stats=STATS[:1], clock=clock)
+    steps = []
+
+    def run():
+        for step in range(3):
+            # Every step takes 0.2 seconds
+            clock.now += 0.2
+            steps.append(step)
+            yield
+
+    scheduler.add_job(name="dtc", interval=60, run=run)
+    # The stat is due, the first step is estimated to delay it by more than the budget
+    scheduler.run_jobs(budget=0.05)
+    assert steps == []
+
+    scheduler.complete(request=scheduler.next_request(multi_pid=True))
+    scheduler.run_jobs(budget=0.05)
+    # 0.5 seconds until the stat is due again, the third step would delay it by 0.1
+    assert steps == [0, 1]
+    assert scheduler.time_until_due() == pytest.approx(0.1)
+    scheduler.run_jobs(budget=0)
+    assert steps == [0, 1]
+    scheduler.run_jobs(budget=0.15)
+    assert steps == [0, 1, 2]
+
+    # The next run starts once the interval passed
+    for _ in range(130):
+        clock.now += scheduler.time_until_due()
+        scheduler.complete(request=scheduler.next_request(multi_pid=True))
+        scheduler.run_jobs(budget=0.05)
+    assert steps == [0, 1, 2, 0, 1, 2]
+    assert scheduler.rates()[0]["interval"] == 0.5
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from pilot_drive.constants import DEFAULT_VEHICLE_STATS
+from pilot_drive.emulator import Elm327Emulator
+from pilot_drive.master_queue import EventType
+from pilot_drive.runtime import ProcessServiceRunner
+from pilot_drive.services.vehicle import vehicle as vehicle_module
+from pilot_drive.services.vehicle.vehicle import Vehicle
+from pilot_drive.telemetry import TelemetryReader
+
+
+@pytest.fixture
+def elm327():
+    adapter = Elm327Emulator()
+    yield adapter
+    adapter.close()
+
+
+def test_buffered_telemetry_is_written_on_shutdown(elm327, tmp_path, monkeypatch):
+    monkeypatch.setattr(vehicle_module, "OBD_CACHE_PATH", str(tmp_path / "obd.json"))
+    settings = MagicMock()
+    settings.get_setting.return_value = {
+        "port": elm327.port,
+        "stats": DEFAULT_VEHICLE_STATS,
+        "metrics": [],
+        # Nothing is written until the fsync interval, unless the service is stopped
+        "telemetry": {"path": str(tmp_path / "telemetry"), "fsyncInterval": 3600},
+        "dtc": {"enabled": False},
+    }
+    vehicle = Vehicle(
+        master_event_queue=MagicMock(),
+        service_type=EventType.VEHICLE,
+        logger=MagicMock(),
+        settings=settings,
+    )
+    runner = ProcessServiceRunner(logger=MagicMock())
+    runner.start(service=vehicle)
+
+    async def run():
+        await runner.run()
+        deadline = time.monotonic() + 30
+        while elm327.requests < 20 and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        # Stopped like the supervisor does, with SIGTERM
+        runner.terminate()
+
+    asyncio.run(run())
+
+    speed = TelemetryReader(path=str(tmp_path / "telemetry")).read(name="Speed")
+    assert len(speed.values) > 0
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import obd
+import pytest
+
+from pilot_drive.emulator import Elm327Emulator
+from pilot_drive.services.vehicle.watch import DeadbandFilter, WatchRegistry
+
+STATS = [
+    {"name": "Speed", "command": "SPEED", "interval": 0.5},
+    {"name": "Fuel Level", "command": "FUEL_LEVEL", "interval": 10, "deadband": 1},
+    {"name": "Boost", "command": "INTAKE_PRESSURE", "interval": 0.5},
+]
+
+
+@pytest.fixture
+def elm327():
+    adapter = Elm327Emulator(
+        pids={0x0D: bytes([50]), 0x2F: bytes([128]), 0x0C: bytes([0x1A, 0xF8])}
+    )
+    yield adapter
+    adapter.close()
+
+
+def wait_for(condition, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_deadband_filter():
+    deadband = DeadbandFilter()
+    value = {"quantity": 50.0, "unit": "percent", "magnitude": 1}
+
+    assert deadband.changed(index=0, value=value, deadband=1)
+    assert not deadband.changed(index=0, value={**value, "quantity": 50.9}, deadband=1)
+    assert deadband.changed(index=0, value={**value, "quantity": 48.5}, deadband=1)
+    # Without a deadband, only identical values are dropped
+    assert deadband.changed(index=1, value=value, deadband=0)
+    assert not deadband.changed(index=1, value=value, deadband=0)
+
+    deadband.reset()
+    assert deadband.changed(index=0, value=value, deadband=1)
+
+
+def test_watched_stats_are_published_beyond_deadband(elm327):
+    changes = []
+    lock = threading.Lock()
+
+    def on_change(stat, value):
+        with lock:
+            changes.append((stat.name, round(value["quantity"], 1)))
+
+    connection = obd.Async(elm327.port, delay_cmds=0.01)
+    registry = WatchRegistry(stats=STATS, on_change=on_change)
+    unsupported = registry.watch(connection=connection)
+    connection.start()
+    try:
+        wait_for(lambda: len(changes) == 2)
+        # 50.2% to 50.6%, within the fuel level's deadband
+        elm327.pids[0x2F] = bytes([129])
+        elm327.pids[0x0D] = bytes([51])
+        wait_for(lambda: len(changes) == 3)
+        # 50.2% to 54.9%
+        elm327.pids[0x2F] = bytes([140])
+        wait_for(lambda: len(changes) == 4)
+    finally:
+        registry.unwatch()
+        connection.close()
+
+    # The fake vehicle doesn't support the intake pressure PID
+    assert [stat.name for stat in unsupported] == ["Boost"]
+    assert sorted(changes[:2]) == [("Fuel Level", 50.2), ("Speed", 50.0)]
+    assert changes[2:] == [("Speed", 51.0), ("Fuel Level", 54.9)]
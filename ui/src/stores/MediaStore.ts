@@ -9,7 +9,9 @@ export let MediaStore:Media = reactive({
         album: undefined,
         duration: undefined,
         position: undefined,
+        timestamp: undefined,
         playing: false,
+        rate: 1,
         cover: undefined,
     },
     radio: {
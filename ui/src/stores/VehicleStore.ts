@@ -4,6 +4,7 @@ import { Vehicle } from "../types/Vehicle.interface";
 export let VehicleStore:Vehicle = reactive({
     enabled: false,
     connected: false,
+    state: 'connecting',
     failures: false,
     stats: []
 })
\ No newline at end of file
@@ -1,18 +1,27 @@
 // Data types incoming from the backend
 
 import { BluetoothDevice } from "./Bluetooth.interface";
+import { Logs } from "./Logs.interface";
 import { Media } from "./Media.interface";
 import { Phone } from "./Phone.interface";
 import { Settings } from "./Settings.interface";
+import { Patch } from "./Sync.interface";
+import { System } from "./System.interface";
 import { Updates } from "./Updates.interface";
-import { Vehicle } from "./Vehicle.interface";
+import { Alert, History, Vehicle } from "./Vehicle.interface";
 
 export interface Data {
-    type: "bluetooth" | "media" | "phone" | "vehicle" | 'settings' | 'updater',
+    type: "bluetooth" | "media" | "phone" | "vehicle" | 'settings' | 'updater' | 'system' | 'patch' | 'logs' | 'history' | 'alert',
     bluetooth?: BluetoothDevice,
     media?: Media,
     phone?: Phone,
     vehicle?: Vehicle,
     settings?: Settings
     updater?: Updates
+    system?: System
+    logs?: Logs // Only sent in reply to a logs request, see Logs.interface.ts
+    history?: History // Only sent in reply to a vehicle history query, see Vehicle.interface.ts
+    alert?: Alert // Only sent once new DTCs show up, see Vehicle.interface.ts
+    patch?: Patch // Only sent to clients that enabled state sync, see Sync.interface.ts
+    seq?: number
 }
\ No newline at end of file
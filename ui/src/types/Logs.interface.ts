@@ -0,0 +1,34 @@
+// The structured log records the backend keeps in memory, for a live log pane.
+//
+// The client sends a LogsRequest, and gets the newest matching records back in a Logs message.
+// With `live: true`, every new matching record is sent as it's logged, until the next request.
+
+// Sent by the client: {type: "logs", logs: LogsRequest}
+export interface LogsRequest {
+    query?: LogQuery,
+    live?: boolean
+}
+
+// Every set condition has to match
+export interface LogQuery {
+    level?: number, // The min logging level (0-50)
+    service?: string, // ie. "vehicle", or "core" for records logged outside of a service
+    since?: number, // Unix times the records were logged between, inclusive
+    until?: number,
+    limit?: number // Max number of records, the newest are sent. Capped at 500
+}
+
+export interface Logs {
+    records: LogRecord[] // Oldest first
+}
+
+export interface LogRecord {
+    timestamp: number, // Unix time the record was logged at
+    level: number,
+    levelName: string, // ie. "WARNING"
+    origin: string, // The logging module, ie. ".services.vehicle.vehicle"
+    service: string,
+    pid: number,
+    message: string,
+    fields: Record<string, unknown> // Structured context passed along with the message
+}
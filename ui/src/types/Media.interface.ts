@@ -9,9 +9,11 @@ export interface Song {
     artist: string | undefined,
     album: string | undefined,
     duration: number | undefined,
-    position: number | undefined,
+    position: number | undefined, // Position anchor, in ms at the timestamp
+    timestamp: number | undefined, // Wall clock ms (since the epoch) the position was read at
     playing: boolean,
-    cover: Blob | undefined
+    rate: number, // Playback rate the position advances at while playing
+    cover: string | undefined // URL of the cover on the static web server
 }
 
 export interface Radio {
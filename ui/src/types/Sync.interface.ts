@@ -0,0 +1,49 @@
+// The versioned state sync protocol, an opt in alternative to receiving every full state event.
+//
+// 1. Once connected, the client sends a SyncRequest with `enable: true`, and the topics it needs
+//    a snapshot of (an empty list requests every topic).
+// 2. Each snapshot arrives as a regular Data message of that topic, with its `seq` set. The client
+//    stores the state and the sequence number of each topic.
+// 3. After that, changes to bluetooth, settings, phone, system, vehicle and media state arrive as
+//    Patch messages. A patch is applied only if its `seq` is the stored `seq` + 1, after which the
+//    stored `seq` is updated. Patches with an older `seq` are ignored.
+// 4. If a patch has a newer `seq` or arrives before the topic's snapshot, an update was missed
+//    (e.g. dropped for a slow connection). The client sends a SyncRequest for that topic and
+//    ignores its patches until the snapshot arrives.
+//
+// Other events (like updater) are always sent whole, without a `seq`.
+//
+// Snapshots and patches of a topic whose events are pushed with a coalescing sub-key carry it as
+// `coalesceKey`, each sub-key of a topic has its own state and `seq`.
+
+import { Data } from "./Data.interface";
+
+type Topic = "bluetooth" | "settings" | "phone" | "system" | "vehicle" | "media";
+
+// Sent by the client: {type: "sync", sync: SyncRequest}
+export interface SyncRequest {
+    enable?: boolean,
+    snapshot?: Topic[]
+}
+
+// A JSON Patch (RFC 6902) operation, `path` is a JSON Pointer (RFC 6901) into the topic's state.
+// An empty path replaces the whole state. Lists are patched by index, or replaced whole when
+// their length changes.
+export interface PatchOperation {
+    op: "add" | "remove" | "replace",
+    path: string,
+    value?: unknown
+}
+
+export interface Patch {
+    topic: Topic,
+    coalesceKey?: string,
+    seq: number,
+    ops: PatchOperation[]
+}
+
+// A snapshot of a topic's state, a Data message with the sequence number of the state
+export interface Snapshot extends Data {
+    seq: number,
+    coalesceKey?: string
+}
@@ -0,0 +1,13 @@
+// The health of the backend services, sent by the service supervisor
+export interface System {
+    services: ServiceHealth[]
+}
+
+export interface ServiceHealth {
+    name: string,
+    state: 'running' | 'restarting' | 'stopped' | 'crash-loop',
+    startedAt: number | null, // Unix time the service (re)started, null when not running
+    uptime: number, // Seconds the service had been running when the event was sent
+    restarts: number,
+    lastExit: string | null // Why the service last exited, ie. "exited with code 1"
+}
@@ -2,7 +2,10 @@ export interface Vehicle {
     enabled: boolean, // Is OBD reading enabled?
     failures: boolean,
     connected: boolean,
+    state?: 'connecting' | 'connected' | 'reconnecting', // The stats are stale while reconnecting
     stats: Stats[]
+    rates?: StatRate[] // Query rates of each stat, in the order of the settings
+    dtcs?: Dtc[] // The active DTCs, only read with the poll acquisition
 }
 
 export interface Stats {
@@ -12,4 +15,60 @@ export interface Stats {
         unit: string,
         magnitude: number
     }
-}
\ No newline at end of file
+}
+
+// Stats are queried less often than configured when the OBD adapter can't keep up
+export interface StatRate {
+    name: string,
+    configured: number, // Queries per second
+    achieved: number, // Queries per second, measured over the last 10 seconds
+    interval: number // The interval in seconds in use, backed off from the configured one
+}
+
+// The history of a stat, aggregated from the recorded telemetry.
+//
+// Sent by the client: {type: "vehicle", vehicle: {history: HistoryQuery}}, answered with a History
+// message sent as {type: "history", history: History}
+
+export interface HistoryQuery {
+    id?: string, // Echoed back in the reply
+    name: string, // The stat name, ie. "RPM"
+    since: number, // Unix times of the range, until defaults to now
+    until?: number,
+    points?: number // Max number of points, 300 by default and capped at 3600
+}
+
+// The points of the history, each aggregates the stat's values from its timestamp to the next
+export interface History {
+    id: string | null,
+    name: string,
+    unit: string | null, // null if the stat has no history
+    resolution: number | null, // The seconds covered by the buckets the points were merged from
+    timestamps: number[], // Unix times, oldest first
+    min: number[],
+    max: number[],
+    mean: number[],
+    count: number[]
+}
+
+// A diagnostic trouble code of the vehicle
+export interface Dtc {
+    code: string, // ie. "P0301"
+    description: string, // Empty if unknown
+    pending: boolean // Detected, but not stored (confirmed) yet
+}
+
+// Sent as {type: "alert", alert: Alert} once new DTCs show up, and saved to the "dtc.path" setting
+export interface Alert {
+    timestamp: number, // Unix time the codes were read at
+    codes: Dtc[], // The new codes
+    active: Dtc[],
+    freezeFrameCode: string | null, // The code the freeze frame was stored for, null if there's none
+    freezeFrame: Stats[], // The stats' values when the freeze frame was stored
+    telemetry: { // The stats' samples before the codes were read
+        name: string,
+        unit: string,
+        timestamps: number[], // Unix times, oldest first
+        values: number[]
+    }[]
+}
@@ -13,6 +13,10 @@ export function literToGallon(litres: number) {
     return litres / 3.79
 }
 
+export function kilometerPerLiterToMilePerGallon(kilometersPerLiter: number) {
+    return kilometerToMile(kilometersPerLiter) * 3.79
+}
+
 export function gramToOunce(grams: number) {
     return grams / 28.35
 }